@@ -19,30 +19,44 @@ from .tools import (
     hybrid_search_tool,
     enhanced_hybrid_search_tool,
     get_document_tool,
+    get_document_window_tool,
+    get_document_chunk_range_tool,
     list_documents_tool,
     get_entity_relationships_tool,
     get_entity_timeline_tool,
     search_people_tool,
     search_companies_tool,
     get_structured_entity_relationships_tool,
+    find_entity_paths_tool,
+    get_entity_neighbors_tool,
+    get_entity_subgraph_tool,
     VectorSearchInput,
     GraphSearchInput,
     HybridSearchInput,
     EnhancedHybridSearchInput,
     DocumentInput,
+    DocumentWindowInput,
+    DocumentChunkRangeInput,
     DocumentListInput,
     EntityRelationshipInput,
     EntityTimelineInput,
     PersonSearchInput,
     CompanySearchInput,
-    EntityRelationshipSearchInput
+    EntityRelationshipSearchInput,
+    EntityPathInput,
+    EntityNeighborsInput,
+    EntitySubgraphInput
 )
+from .db_utils import encode_document_cursor, DOCUMENT_CHUNK_RANGE_MAX
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Characters of the body get_document returns; the rest is read in windows
+DOCUMENT_PREVIEW_CHARS = int(os.getenv("DOCUMENT_PREVIEW_CHARS", "2000"))
+
 
 @dataclass
 class AgentDependencies:
@@ -73,7 +87,8 @@ rag_agent = Agent(
 async def vector_search(
     ctx: RunContext[AgentDependencies],
     query: str,
-    limit: int = 10
+    limit: int = 10,
+    alternative_queries: Optional[List[str]] = None
 ) -> List[Dict[str, Any]]:
     """
     Search for relevant information using semantic similarity.
@@ -85,13 +100,16 @@ async def vector_search(
     Args:
         query: Search query to find similar content
         limit: Maximum number of results to return (1-50)
+        alternative_queries: Other phrasings of the same question (e.g. an
+            abbreviation spelled out); searched together with the query
     
     Returns:
         List of matching chunks ordered by similarity (best first)
     """
     input_data = VectorSearchInput(
         query=query,
-        limit=limit
+        limit=limit,
+        alternative_queries=alternative_queries or []
     )
     
     results = await vector_search_tool(input_data)
@@ -112,7 +130,8 @@ async def vector_search(
 @rag_agent.tool
 async def graph_search(
     ctx: RunContext[AgentDependencies],
-    query: str
+    query: str,
+    search_profile: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
     Search the knowledge graph for facts and relationships.
@@ -124,6 +143,9 @@ async def graph_search(
 
     Args:
         query: Search query to find facts and relationships
+        search_profile: "fast" (keyword + semantic fusion) or "accurate" (adds LLM
+            reranking; slower, use when fast results look off-topic). Leave unset
+            for the configured default.
 
     Returns:
         List of facts with associated episodes, temporal data, and extracted relationships
@@ -135,7 +157,10 @@ async def graph_search(
             # Use specialized relationship search
             return await _search_entity_relationships(entities[0], entities[1])
 
-    input_data = GraphSearchInput(query=query)
+    input_data = GraphSearchInput(
+        query=query,
+        search_profile=search_profile if search_profile in ("fast", "accurate") else None
+    )
     results = await graph_search_tool(input_data)
 
     # Convert results to dict for agent with enhanced relationship extraction
@@ -270,7 +295,8 @@ async def hybrid_search(
         enable_query_expansion=enable_query_expansion,
         enable_semantic_reranking=enable_semantic_reranking,
         enable_deduplication=enable_deduplication,
-        boost_recent_documents=boost_recent_documents
+        boost_recent_documents=boost_recent_documents,
+        metadata_keys=[]  # Chunk metadata is not passed on to the model
     )
 
     results = await enhanced_hybrid_search_tool(input_data)
@@ -348,7 +374,8 @@ async def comprehensive_search(
                 limit=limit,
                 enable_query_expansion=True,
                 enable_semantic_reranking=True,
-                enable_deduplication=True
+                enable_deduplication=True,
+                metadata_keys=[]
             )
             hybrid_results = await enhanced_hybrid_search_tool(hybrid_input)
             search_results["hybrid_results"] = [
@@ -565,41 +592,124 @@ async def get_document(
     document_id: str
 ) -> Optional[Dict[str, Any]]:
     """
-    Retrieve the complete content of a specific document.
+    Get an overview of a specific document: metadata, size and its opening text.
     
-    This tool fetches the full document content along with all its chunks
-    and metadata. Best for getting comprehensive information from a specific
-    source when you need the complete context.
+    Documents can be very large, so this returns only the first part of the
+    body. Read further with get_document_text (character windows) or
+    get_document_chunks (chunk ranges, e.g. around a search hit).
     
     Args:
         document_id: UUID of the document to retrieve
     
     Returns:
-        Complete document data with content and metadata, or None if not found
+        Document metadata, chunk count, content length and a preview, or None if not found
     """
     input_data = DocumentInput(document_id=document_id)
     
     document = await get_document_tool(input_data)
     
     if document:
+        preview = await get_document_window_tool(
+            DocumentWindowInput(document_id=document_id, length=DOCUMENT_PREVIEW_CHARS)
+        )
+        
         # Format for agent consumption
         return {
             "id": document["id"],
             "title": document["title"],
             "source": document["source"],
-            "content": document["content"],
-            "chunk_count": len(document.get("chunks", [])),
+            "preview": preview["content"] if preview else "",
+            "content_length": document["content_length"],
+            "chunk_count": document["chunk_count"],
             "created_at": document["created_at"]
         }
     
     return None
 
 
+@rag_agent.tool
+async def get_document_text(
+    ctx: RunContext[AgentDependencies],
+    document_id: str,
+    start: int = 0,
+    length: int = 4000
+) -> Optional[Dict[str, Any]]:
+    """
+    Read part of a document's text by character position.
+    
+    Use this to continue reading after get_document's preview, or to read a
+    specific section of a long document. Keep windows small and read more
+    only if needed.
+    
+    Args:
+        document_id: UUID of the document
+        start: Character offset to start reading from
+        length: Number of characters to read
+    
+    Returns:
+        The text window with its start/end offsets and whether more follows, or None if not found
+    """
+    input_data = DocumentWindowInput(document_id=document_id, start=max(0, start), length=max(1, length))
+    
+    return await get_document_window_tool(input_data)
+
+
+@rag_agent.tool
+async def get_document_chunks(
+    ctx: RunContext[AgentDependencies],
+    document_id: str,
+    start_index: int = 0,
+    end_index: Optional[int] = None,
+    chunk_id: Optional[str] = None,
+    neighbors: int = 1
+) -> Dict[str, Any]:
+    """
+    Read consecutive chunks of a document.
+    
+    Best for expanding a search result: pass its document_id and chunk_id to
+    get the surrounding chunks for more context. Chunk indexes can be used
+    instead to read a specific part of the document.
+    
+    Args:
+        document_id: UUID of the document
+        start_index: First chunk index to read (when no chunk_id is given)
+        end_index: Last chunk index to read, inclusive
+        chunk_id: Chunk to read around, e.g. from a search result
+        neighbors: Number of chunks to add before and after
+    
+    Returns:
+        Chunks with their index and content, in document order, and whether
+        the range was cut short (read further with chunk indexes)
+    """
+    input_data = DocumentChunkRangeInput(
+        document_id=document_id,
+        start_index=max(0, start_index),
+        end_index=end_index,
+        chunk_id=chunk_id,
+        neighbors=min(max(0, neighbors), DOCUMENT_CHUNK_RANGE_MAX)
+    )
+    
+    result = await get_document_chunk_range_tool(input_data)
+    
+    return {
+        "chunks": [
+            {
+                "chunk_id": chunk["chunk_id"],
+                "chunk_index": chunk["chunk_index"],
+                "content": chunk["content"]
+            }
+            for chunk in result["chunks"]
+        ],
+        "truncated": result["truncated"]
+    }
+
+
 @rag_agent.tool
 async def list_documents(
     ctx: RunContext[AgentDependencies],
     limit: int = 20,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
     List available documents with their metadata.
@@ -611,11 +721,12 @@ async def list_documents(
     Args:
         limit: Maximum number of documents to return (1-100)
         offset: Number of documents to skip for pagination
+        cursor: Cursor of the last document already listed, to get the next page
     
     Returns:
-        List of documents with metadata and chunk counts
+        List of documents with metadata, chunk counts and cursors
     """
-    input_data = DocumentListInput(limit=limit, offset=offset)
+    input_data = DocumentListInput(limit=limit, offset=offset, cursor=cursor)
     
     documents = await list_documents_tool(input_data)
     
@@ -626,7 +737,8 @@ async def list_documents(
             "title": d.title,
             "source": d.source,
             "chunk_count": d.chunk_count,
-            "created_at": d.created_at.isoformat()
+            "created_at": d.created_at.isoformat(),
+            "cursor": encode_document_cursor(d.created_at, d.id)
         }
         for d in documents
     ]
@@ -894,6 +1006,45 @@ async def find_entity_connections(
     return all_relationships
 
 
+@rag_agent.tool
+async def get_entity_neighborhood(
+    ctx: RunContext[AgentDependencies],
+    entity_name: str,
+    depth: int = 1,
+    relationship_types: Optional[List[str]] = None,
+    limit: int = 25
+) -> Dict[str, Any]:
+    """
+    Get the entities directly or closely connected to an entity.
+
+    This tool walks the knowledge graph's fact edges around one entity.
+    With depth 1 it returns each neighbour together with the connecting fact;
+    with depth 2-3 it returns the surrounding subgraph. Best for questions like
+    "who is connected to X" or "what surrounds company Y".
+
+    Args:
+        entity_name: Name of the entity (e.g., "HKJC")
+        depth: Number of hops to expand (1-3)
+        relationship_types: Only follow these relationship names (depth 1 only)
+        limit: Maximum number of neighbours or subgraph nodes
+
+    Returns:
+        Neighbours with connecting facts, or subgraph nodes and edges
+    """
+    if depth <= 1:
+        return await get_entity_neighbors_tool(EntityNeighborsInput(
+            entity_name=entity_name,
+            relationship_types=relationship_types,
+            limit=max(1, min(limit, 200))
+        ))
+
+    return await get_entity_subgraph_tool(EntitySubgraphInput(
+        entity_name=entity_name,
+        depth=min(depth, 3),
+        max_nodes=max(1, min(limit, 2000))
+    ))
+
+
 # Helper functions for relationship search
 
 def _is_relationship_query(query: str) -> bool:
@@ -962,7 +1113,7 @@ async def _search_entity_relationships(entity1: str, entity2: str) -> List[Dict[
     """Search for relationships between two specific entities."""
     try:
         # Import here to avoid circular imports
-        from .graph_utils import search_knowledge_graph
+        from .graph_utils import search_knowledge_graph_many
 
         # Multiple search strategies for finding relationships
         search_queries = [
@@ -980,10 +1131,11 @@ async def _search_entity_relationships(entity1: str, entity2: str) -> List[Dict[
         all_results = []
         seen_facts = set()
 
-        for query in search_queries:
-            try:
-                results = await search_knowledge_graph(query)
+        # All phrasings run concurrently with a single embedding request
+        search_results = await search_knowledge_graph_many(search_queries)
 
+        for query, results in zip(search_queries, search_results):
+            try:
                 for result in results:
                     fact = result.get("fact", "")
                     if fact and fact not in seen_facts:
@@ -1017,12 +1169,89 @@ async def _search_entity_relationships(entity1: str, entity2: str) -> List[Dict[
         return []
 
 
+async def _graph_path_relationship_search(
+    entity1: str,
+    entity2: str,
+    search_depth: int = 2
+) -> Optional[Dict[str, Any]]:
+    """
+    Find relationships between two entities as shortest paths in the graph.
+
+    Args:
+        entity1: First entity name
+        entity2: Second entity name
+        search_depth: Maximum number of hops between the entities
+
+    Returns:
+        Relationship result in the same shape as the comprehensive search,
+        or None if no connecting path was found
+    """
+    path_data = await find_entity_paths_tool(EntityPathInput(
+        entity1=entity1,
+        entity2=entity2,
+        max_depth=max(1, min(search_depth, 5))
+    ))
+
+    paths = path_data.get("paths", [])
+    if not paths:
+        return None
+
+    direct_relationships = []
+    indirect_relationships = []
+    for path in paths:
+        relationship = {
+            "fact": "; ".join(edge.get("fact") or edge.get("name") or "" for edge in path["edges"]),
+            "path": path["summary"],
+            "hops": path["hops"],
+            "relevance_score": path["score"],
+            "nodes": path["nodes"],
+            "edges": path["edges"]
+        }
+        if path["hops"] == 1:
+            direct_relationships.append(relationship)
+        else:
+            indirect_relationships.append(relationship)
+
+    def _entity_info(name: str, nodes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not nodes:
+            return {"name": name}
+        return {
+            "name": nodes[0].get("name", name),
+            "uuid": nodes[0].get("uuid"),
+            "labels": nodes[0].get("labels", []),
+            "summary": nodes[0].get("summary"),
+            "matched_nodes": len(nodes)
+        }
+
+    shortest = paths[0]["hops"]
+    return {
+        "entity1": entity1,
+        "entity2": entity2,
+        "direct_relationships": direct_relationships,
+        "indirect_relationships": indirect_relationships,
+        "entity1_info": _entity_info(entity1, path_data.get("entity1_nodes", [])),
+        "entity2_info": _entity_info(entity2, path_data.get("entity2_nodes", [])),
+        "connection_strength": max(path["score"] for path in paths),
+        "search_method": "graph_path_search",
+        "summary": (
+            f"Found {len(paths)} path(s) between {entity1} and {entity2}; "
+            f"shortest is {shortest} hop(s): {paths[0]['summary']}"
+        )
+    }
+
+
 async def _comprehensive_relationship_search(entity1: str, entity2: str, search_depth: int = 2) -> Dict[str, Any]:
     """Perform comprehensive relationship search between two entities."""
     try:
         # Import here to avoid circular imports
         from .tools import get_enhanced_entity_relationships
 
+        # Prefer a bounded shortest-path search over the graph; only fall back
+        # to phrased text searches when neither entity resolves or no path exists
+        path_result = await _graph_path_relationship_search(entity1, entity2, search_depth)
+        if path_result:
+            return path_result
+
         result = {
             "entity1": entity1,
             "entity2": entity2,
@@ -3,16 +3,17 @@ FastAPI endpoints for the agentic RAG system.
 """
 
 import os
+import time
 import asyncio
 import json
 import logging
 from contextlib import asynccontextmanager
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime
 import uuid
 
 from fastapi import FastAPI, HTTPException, Request, Depends, File, UploadFile, Form
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 import uvicorn
@@ -21,22 +22,37 @@ from pydantic import BaseModel
 import tempfile
 import shutil
 
+try:
+    import orjson
+except ImportError:  # Fall back to FastAPI's encoder
+    orjson = None
+
 from .agent import rag_agent, AgentDependencies
+from .cache import AsyncTTLCache
 from .db_utils import (
     initialize_database,
     close_database,
-    create_session,
+    bootstrap_session,
     get_session,
-    add_message,
     get_session_messages,
-    test_connection
+    get_pool_stats,
+    encode_document_cursor,
+    decode_document_cursor,
+    test_connection,
+    DOCUMENT_CHUNK_RANGE_MAX
 )
-from .graph_utils import initialize_graph, close_graph, test_graph_connection
+from .graph_utils import initialize_graph, close_graph, test_graph_connection, get_graph_search_cache_stats
+from .graph_snapshot import initialize_graph_snapshot
+from .message_queue import message_queue, enqueue_message, close_message_queue
+from .session_sweeper import session_sweeper, start_session_sweeper, stop_session_sweeper
 from .models import (
     ChatRequest,
     ChatResponse,
     SearchRequest,
     SearchResponse,
+    SearchType,
+    ChunkResult,
+    GraphSearchResult,
     StreamDelta,
     ErrorResponse,
     HealthStatus,
@@ -47,10 +63,18 @@ from .tools import (
     graph_search_tool,
     hybrid_search_tool,
     list_documents_tool,
+    get_document_tool,
+    get_document_window_tool,
+    get_document_chunk_range_tool,
+    get_retrieval_cache_stats,
+    get_semantic_cache_stats,
     VectorSearchInput,
     GraphSearchInput,
     HybridSearchInput,
-    DocumentListInput
+    DocumentInput,
+    DocumentListInput,
+    DocumentWindowInput,
+    DocumentChunkRangeInput
 )
 
 # Load environment variables
@@ -64,6 +88,23 @@ APP_HOST = os.getenv("APP_HOST", "0.0.0.0")
 APP_PORT = int(os.getenv("APP_PORT", 8000))
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
+# Recent messages per session, updated as this process writes them so
+# follow-up chat requests skip the context query. Every API worker keeps its
+# own copy, so entries are only trusted for the TTL after they were loaded
+# (messages written through another worker show up after that).
+CONTEXT_MAX_MESSAGES = 10
+SESSION_CONTEXT_CACHE_ENABLED = os.getenv("SESSION_CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+SESSION_CONTEXT_CACHE_SIZE = int(os.getenv("SESSION_CONTEXT_CACHE_SIZE", "1000"))
+SESSION_CONTEXT_CACHE_TTL = float(os.getenv("SESSION_CONTEXT_CACHE_TTL", "300"))
+
+# session_id -> (valid_until epoch seconds, recent messages as role/content dicts)
+session_context_cache = AsyncTTLCache(
+    "session_context",
+    max_entries=SESSION_CONTEXT_CACHE_SIZE,
+    ttl_seconds=SESSION_CONTEXT_CACHE_TTL,
+    enabled=SESSION_CONTEXT_CACHE_ENABLED
+)
+
 # Configure logging
 logging.basicConfig(
     level=getattr(logging, LOG_LEVEL.upper()),
@@ -105,10 +146,18 @@ async def lifespan(app: FastAPI):
         await initialize_database()
         logger.info("Database initialized")
 
+        # Expire old sessions and keep message partitions ahead (if SESSION_SWEEP_ENABLED)
+        if start_session_sweeper():
+            logger.info("Session sweeper started")
+
         # Initialize graph database
         await initialize_graph()
         logger.info("Graph database initialized")
 
+        # Load the in-memory graph snapshot (if GRAPH_SNAPSHOT_ENABLED)
+        if await initialize_graph_snapshot():
+            logger.info("Graph snapshot loaded")
+
         # Test connections
         db_ok = await test_connection()
         graph_ok = await test_graph_connection()
@@ -130,6 +179,9 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down agentic RAG API...")
     
     try:
+        await stop_session_sweeper()
+        # Write out queued chat messages while the database is still open
+        await close_message_queue()
         await close_database()
         await close_graph()
         logger.info("Connections closed")
@@ -158,23 +210,82 @@ app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 
 # Helper functions for agent execution
-async def get_or_create_session(request: ChatRequest) -> str:
-    """Get existing session or create new one."""
+def _with_pending(messages: List[Dict[str, Any]], pending: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Add messages still in the write queue to ones read from the database."""
+    stored = {msg["id"] for msg in messages}
+    return messages + [msg for msg in pending if msg["id"] not in stored]
+
+
+def _cached_context(session_id: str) -> Optional[List[Dict[str, str]]]:
+    """Get a session's cached recent messages, or None if not cached or no longer valid."""
+    found, entry = session_context_cache.get(session_id)
+    if not found:
+        return None
+    
+    valid_until, context = entry
+    if valid_until <= time.time():
+        return None
+    return context
+
+
+def remember_messages(session_id: str, messages: List[Dict[str, str]]):
+    """
+    Append newly written messages to a session's cached context.
+    
+    Sessions that are not cached are left alone; their next request loads
+    the context from the database.
+    
+    Args:
+        session_id: Session ID
+        messages: Messages as role/content dicts, oldest first
+    """
+    found, entry = session_context_cache.get(session_id)
+    if found:
+        valid_until, context = entry
+        context = context + [{"role": msg["role"], "content": msg["content"]} for msg in messages]
+        session_context_cache.set(session_id, (valid_until, context[-CONTEXT_MAX_MESSAGES:]))
+
+
+async def get_or_create_session(request: ChatRequest) -> Tuple[str, List[Dict[str, str]]]:
+    """
+    Get the existing session or create a new one, together with its recent messages.
+    
+    A cached session needs no database call; otherwise the session lookup,
+    creation and context fetch happen in one round-trip.
+    
+    Args:
+        request: Chat request
+    
+    Returns:
+        Tuple of (session ID, recent messages as role/content dicts)
+    """
     if request.session_id:
-        session = await get_session(request.session_id)
-        if session:
-            return request.session_id
+        context = _cached_context(request.session_id)
+        if context is not None:
+            return request.session_id, context
     
-    # Create new session
-    return await create_session(
+    # Taken before the read so nothing flushed in between is missed
+    pending = message_queue.pending_messages(request.session_id) if request.session_id else []
+    session, messages = await bootstrap_session(
+        request.session_id,
         user_id=request.user_id,
-        metadata=request.metadata
+        metadata=request.metadata,
+        message_limit=CONTEXT_MAX_MESSAGES
     )
+    messages = _with_pending(messages, pending)[-CONTEXT_MAX_MESSAGES:]
+    context = [{"role": msg["role"], "content": msg["content"]} for msg in messages]
+    
+    valid_until = time.time() + SESSION_CONTEXT_CACHE_TTL
+    if session["expires_at"]:
+        valid_until = min(valid_until, datetime.fromisoformat(session["expires_at"]).timestamp())
+    session_context_cache.set(session["id"], (valid_until, context))
+    
+    return session["id"], context
 
 
 async def get_conversation_context(
     session_id: str,
-    max_messages: int = 10
+    max_messages: int = CONTEXT_MAX_MESSAGES
 ) -> List[Dict[str, str]]:
     """
     Get recent conversation context.
@@ -186,7 +297,13 @@ async def get_conversation_context(
     Returns:
         List of messages
     """
+    context = _cached_context(session_id)
+    if context is not None:
+        return context[-max_messages:]
+    
+    pending = message_queue.pending_messages(session_id)
     messages = await get_session_messages(session_id, limit=max_messages)
+    messages = _with_pending(messages, pending)[-max_messages:]
     
     return [
         {
@@ -352,7 +469,7 @@ async def save_conversation_turn(
     metadata: Optional[Dict[str, Any]] = None
 ):
     """
-    Save a conversation turn to the database.
+    Save a conversation turn to the database (through the message write queue).
     
     Args:
         session_id: Session ID
@@ -361,7 +478,7 @@ async def save_conversation_turn(
         metadata: Optional metadata
     """
     # Save user message
-    await add_message(
+    await enqueue_message(
         session_id=session_id,
         role="user",
         content=user_message,
@@ -369,19 +486,25 @@ async def save_conversation_turn(
     )
     
     # Save assistant message
-    await add_message(
+    await enqueue_message(
         session_id=session_id,
         role="assistant",
         content=assistant_message,
         metadata=metadata or {}
     )
+    
+    remember_messages(session_id, [
+        {"role": "user", "content": user_message},
+        {"role": "assistant", "content": assistant_message}
+    ])
 
 
 async def execute_agent(
     message: str,
     session_id: str,
     user_id: Optional[str] = None,
-    save_conversation: bool = True
+    save_conversation: bool = True,
+    context: Optional[List[Dict[str, str]]] = None
 ) -> tuple[str, List[ToolCall]]:
     """
     Execute the agent with a message.
@@ -391,6 +514,7 @@ async def execute_agent(
         session_id: Session ID
         user_id: Optional user ID
         save_conversation: Whether to save the conversation
+        context: Recent messages, if already loaded with the session
     
     Returns:
         Tuple of (agent response, tools used)
@@ -403,7 +527,8 @@ async def execute_agent(
         )
         
         # Get conversation context
-        context = await get_conversation_context(session_id)
+        if context is None:
+            context = await get_conversation_context(session_id)
         
         # Build prompt with context
         full_prompt = message
@@ -485,13 +610,14 @@ async def chat(request: ChatRequest):
     """Non-streaming chat endpoint."""
     try:
         # Get or create session
-        session_id = await get_or_create_session(request)
+        session_id, context = await get_or_create_session(request)
         
         # Execute agent
         response, tools_used = await execute_agent(
             message=request.message,
             session_id=session_id,
-            user_id=request.user_id
+            user_id=request.user_id,
+            context=context
         )
         
         return ChatResponse(
@@ -511,7 +637,7 @@ async def chat_stream(request: ChatRequest):
     """Streaming chat endpoint using Server-Sent Events."""
     try:
         # Get or create session
-        session_id = await get_or_create_session(request)
+        session_id, context = await get_or_create_session(request)
         
         async def generate_stream():
             """Generate streaming response using agent.iter() pattern."""
@@ -524,9 +650,6 @@ async def chat_stream(request: ChatRequest):
                     user_id=request.user_id
                 )
                 
-                # Get conversation context
-                context = await get_conversation_context(session_id)
-                
                 # Build input with context
                 full_prompt = request.message
                 if context:
@@ -536,13 +659,14 @@ async def chat_stream(request: ChatRequest):
                     ])
                     full_prompt = f"Previous conversation:\n{context_str}\n\nCurrent question: {request.message}"
                 
-                # Save user message immediately
-                await add_message(
+                # Queue the user message without holding up the stream
+                await enqueue_message(
                     session_id=session_id,
                     role="user",
                     content=request.message,
                     metadata={"user_id": request.user_id}
                 )
+                remember_messages(session_id, [{"role": "user", "content": request.message}])
                 
                 full_response = ""
                 
@@ -590,7 +714,7 @@ async def chat_stream(request: ChatRequest):
                     yield f"data: {json.dumps({'type': 'tools', 'tools': tools_data})}\n\n"
                 
                 # Save assistant response
-                await add_message(
+                await enqueue_message(
                     session_id=session_id,
                     role="assistant",
                     content=full_response,
@@ -599,6 +723,7 @@ async def chat_stream(request: ChatRequest):
                         "tool_calls": len(tools_used)
                     }
                 )
+                remember_messages(session_id, [{"role": "assistant", "content": full_response}])
                 
                 yield f"data: {json.dumps({'type': 'end'})}\n\n"
                 
@@ -625,13 +750,69 @@ async def chat_stream(request: ChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _json_default(value: Any) -> Any:
+    """Serialize pydantic models by their field values for orjson."""
+    if isinstance(value, BaseModel):
+        return value.__dict__
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _search_response(
+    search_type: SearchType,
+    query_time_ms: float,
+    results: Optional[List[ChunkResult]] = None,
+    graph_results: Optional[List[GraphSearchResult]] = None
+) -> Union[Response, SearchResponse]:
+    """
+    Build a search endpoint response with the SearchResponse schema.
+
+    With orjson available the body is written straight to JSON bytes,
+    skipping SearchResponse validation and FastAPI's jsonable_encoder pass
+    over every result; otherwise the SearchResponse model is returned.
+
+    Args:
+        search_type: Type of search performed
+        query_time_ms: Search time in milliseconds
+        results: Chunk results
+        graph_results: Graph results
+
+    Returns:
+        JSON response
+    """
+    results = results or []
+    graph_results = graph_results or []
+    total_results = len(results) if results else len(graph_results)
+
+    if orjson is None:
+        return SearchResponse(
+            results=results,
+            graph_results=graph_results,
+            total_results=total_results,
+            search_type=search_type,
+            query_time_ms=query_time_ms
+        )
+
+    body = {
+        "results": results,
+        "graph_results": graph_results,
+        "total_results": total_results,
+        "search_type": search_type,
+        "query_time_ms": query_time_ms
+    }
+    return Response(orjson.dumps(body, default=_json_default), media_type="application/json")
+
+
 @app.post("/search/vector")
 async def search_vector(request: SearchRequest):
     """Vector search endpoint."""
     try:
         input_data = VectorSearchInput(
             query=request.query,
-            limit=request.limit
+            alternative_queries=request.alternative_queries,
+            limit=request.limit,
+            ef_search=request.ef_search,
+            ivfflat_probes=request.ivfflat_probes,
+            filters=request.filters
         )
         
         start_time = datetime.now()
@@ -640,12 +821,7 @@ async def search_vector(request: SearchRequest):
         
         query_time = (end_time - start_time).total_seconds() * 1000
         
-        return SearchResponse(
-            results=results,
-            total_results=len(results),
-            search_type="vector",
-            query_time_ms=query_time
-        )
+        return _search_response(SearchType.VECTOR, query_time, results=results)
         
     except Exception as e:
         logger.error(f"Vector search failed: {e}")
@@ -657,7 +833,9 @@ async def search_graph(request: SearchRequest):
     """Knowledge graph search endpoint."""
     try:
         input_data = GraphSearchInput(
-            query=request.query
+            query=request.query,
+            search_profile=request.search_profile,
+            num_results=request.limit
         )
         
         start_time = datetime.now()
@@ -666,12 +844,7 @@ async def search_graph(request: SearchRequest):
         
         query_time = (end_time - start_time).total_seconds() * 1000
         
-        return SearchResponse(
-            graph_results=results,
-            total_results=len(results),
-            search_type="graph",
-            query_time_ms=query_time
-        )
+        return _search_response(SearchType.GRAPH, query_time, graph_results=results)
         
     except Exception as e:
         logger.error(f"Graph search failed: {e}")
@@ -684,7 +857,10 @@ async def search_hybrid(request: SearchRequest):
     try:
         input_data = HybridSearchInput(
             query=request.query,
-            limit=request.limit
+            limit=request.limit,
+            ef_search=request.ef_search,
+            ivfflat_probes=request.ivfflat_probes,
+            filters=request.filters
         )
         
         start_time = datetime.now()
@@ -693,12 +869,7 @@ async def search_hybrid(request: SearchRequest):
         
         query_time = (end_time - start_time).total_seconds() * 1000
         
-        return SearchResponse(
-            results=results,
-            total_results=len(results),
-            search_type="hybrid",
-            query_time_ms=query_time
-        )
+        return _search_response(SearchType.HYBRID, query_time, results=results)
         
     except Exception as e:
         logger.error(f"Hybrid search failed: {e}")
@@ -708,18 +879,31 @@ async def search_hybrid(request: SearchRequest):
 @app.get("/documents")
 async def list_documents_endpoint(
     limit: int = 20,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None
 ):
-    """List documents endpoint."""
+    """List documents endpoint (page with next_cursor rather than offset)."""
+    if cursor:
+        try:
+            decode_document_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
     try:
-        input_data = DocumentListInput(limit=limit, offset=offset)
+        input_data = DocumentListInput(limit=limit, offset=offset, cursor=cursor)
         documents = await list_documents_tool(input_data)
         
+        # A short page is the last one
+        next_cursor = None
+        if documents and len(documents) == limit:
+            next_cursor = encode_document_cursor(documents[-1].created_at, documents[-1].id)
+        
         return {
             "documents": documents,
             "total": len(documents),
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
@@ -727,6 +911,43 @@ async def list_documents_endpoint(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/documents/{document_id}")
+async def get_document_endpoint(document_id: str, include_content: bool = False):
+    """Get a document's metadata (the body only with include_content; prefer the ranged endpoints)."""
+    document = await get_document_tool(DocumentInput(document_id=document_id, include_content=include_content))
+    if document is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return document
+
+
+@app.get("/documents/{document_id}/content")
+async def get_document_content_endpoint(document_id: str, start: int = 0, length: int = 4000):
+    """Get a character window of a document's body."""
+    window = await get_document_window_tool(DocumentWindowInput(document_id=document_id, start=max(0, start), length=max(1, length)))
+    if window is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return window
+
+
+@app.get("/documents/{document_id}/chunks")
+async def get_document_chunks_endpoint(
+    document_id: str,
+    start_index: int = 0,
+    end_index: Optional[int] = None,
+    chunk_id: Optional[str] = None,
+    neighbors: int = 0
+):
+    """Get consecutive chunks of a document, by index or around a chunk."""
+    input_data = DocumentChunkRangeInput(
+        document_id=document_id,
+        start_index=max(0, start_index),
+        end_index=end_index,
+        chunk_id=chunk_id,
+        neighbors=min(max(0, neighbors), DOCUMENT_CHUNK_RANGE_MAX)
+    )
+    return await get_document_chunk_range_tool(input_data)
+
+
 @app.get("/sessions/{session_id}")
 async def get_session_info(session_id: str):
     """Get session information."""
@@ -744,6 +965,27 @@ async def get_session_info(session_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Get hit/miss statistics for the in-process result caches."""
+    return {
+        "graph_search": get_graph_search_cache_stats(),
+        "retrieval": get_retrieval_cache_stats(),
+        "semantic": get_semantic_cache_stats(),
+        "session_context": session_context_cache.stats()
+    }
+
+
+@app.get("/database/pool/stats")
+async def database_pool_stats():
+    """Get connection pool utilization, the message write queue and the session sweeper."""
+    return {
+        **get_pool_stats(),
+        "message_queue": message_queue.stats(),
+        "session_sweeper": session_sweeper.stats()
+    }
+
+
 # Exception handlers
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
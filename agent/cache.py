@@ -0,0 +1,481 @@
+"""
+Async result caching for expensive lookups.
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTTLCache:
+    """
+    In-process LRU cache with per-entry TTL and single-flight loading.
+
+    Concurrent requests for the same missing key share one call to the
+    loader instead of each hitting the backend. Entries are stamped with
+    the cache version at load time; bumping the version via ``invalidate``
+    drops everything cached so far, and results of loads that were already
+    in flight when the version changed are returned but not stored.
+
+    With ``refresh_after`` set, a hit on an entry older than that is served
+    as is while a background load refreshes it (stale-while-revalidate), so
+    keys that keep getting hit never expire in front of a caller. With
+    ``max_bytes`` and ``sizeof`` set, entries are also evicted to keep their
+    estimated total size within budget. Values rejected by ``cacheable``
+    (e.g. partial results) are returned to callers but never stored.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        ttl_seconds: float = 300.0,
+        enabled: bool = True,
+        refresh_after: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        cacheable: Optional[Callable[[Any], bool]] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            name: Name used in logs and stats
+            max_entries: Maximum number of cached entries (least recently used evicted)
+            ttl_seconds: Seconds an entry stays valid
+            enabled: When False, every lookup goes straight to the loader
+            refresh_after: Seconds after which a hit triggers a background refresh
+            max_bytes: Maximum estimated size of all cached values
+            sizeof: Estimates the size of a value in bytes (required for max_bytes)
+            cacheable: Returns False for loaded values that must not be stored
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.refresh_after = refresh_after
+        self.max_bytes = max_bytes if sizeof else None
+        self.sizeof = sizeof
+        self.cacheable = cacheable
+        self.version: Any = None
+
+        # key -> (expires_at, refresh_at, size, value)
+        self._entries: "OrderedDict[Hashable, Tuple[float, float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "stale_hits": 0,
+            "refreshes": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """True if the key is cached and fresh, or currently being loaded."""
+        entry = self._entries.get(key)
+        return key in self._in_flight or (entry is not None and entry[0] > time.monotonic())
+
+    def _lookup(self, key: Hashable) -> Optional[Tuple[float, float, int, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if entry[0] <= time.monotonic():
+            self._remove(key)
+            self._stats["expirations"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Look up a key without loading it.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Tuple of (found, value)
+        """
+        entry = self._lookup(key)
+        if entry is None:
+            return False, None
+        return True, entry[3]
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Store a value, evicting the least recently used entries if full.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        if not self.enabled or self.max_entries <= 0:
+            return
+
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        now = time.monotonic()
+        refresh_at = now + self.refresh_after if self.refresh_after is not None else float("inf")
+        self._remove(key)
+        self._entries[key] = (now + self.ttl_seconds, refresh_at, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            evicted_key = next(iter(self._entries))
+            self._remove(evicted_key)
+            self._stats["evictions"] += 1
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        refresher: Optional[Callable[[], Awaitable[Any]]] = None
+    ) -> Any:
+        """
+        Return the cached value for a key, loading it once if missing.
+
+        Exceptions from the loader propagate to every waiting caller and
+        nothing is cached.
+
+        Args:
+            key: Cache key
+            loader: Coroutine function producing the value
+            refresher: Loader for background refreshes of stale entries, when
+                they must bypass something the loader reads through (defaults to loader)
+
+        Returns:
+            Cached or freshly loaded value
+        """
+        if not self.enabled:
+            return await loader()
+
+        entry = self._lookup(key)
+        if entry is not None:
+            self._stats["hits"] += 1
+            if entry[1] <= time.monotonic() and key not in self._in_flight:
+                self._stats["stale_hits"] += 1
+                # Only the first stale hit schedules a refresh
+                self._entries[key] = (entry[0], float("inf"), entry[2], entry[3])
+                task = asyncio.create_task(self._refresh(key, refresher or loader))
+                self._refresh_tasks.add(task)
+                task.add_done_callback(self._refresh_tasks.discard)
+            return entry[3]
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self._stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                # The leading caller was cancelled, not us: load it ourselves
+                if not in_flight.cancelled():
+                    raise
+                return await self.get_or_load(key, loader, refresher)
+
+        self._stats["misses"] += 1
+        return await self._load(key, loader)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Run the loader as the single in-flight load for a key and cache the result."""
+        version = self.version
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            if self.version == version and (self.cacheable is None or self.cacheable(value)):
+                self.set(key, value)
+            return value
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    async def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        """Reload a stale entry in the background, keeping the old value on failure."""
+        self._stats["refreshes"] += 1
+        try:
+            await self._load(key, loader)
+        except Exception as e:
+            logger.warning(f"Background refresh of {self.name} cache entry failed: {e}")
+
+    def invalidate(self, version: Any = None):
+        """
+        Drop all cached entries and move to a new version.
+
+        Args:
+            version: New version marker (e.g. graph epoch)
+        """
+        self._entries.clear()
+        self._bytes = 0
+        # Loads started before the change must not be shared with new callers
+        self._in_flight.clear()
+        self.version = version
+        self._stats["invalidations"] += 1
+        logger.debug(f"Invalidated {self.name} cache (version {version})")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Hit/miss counters, size and configuration
+        """
+        lookups = self._stats["hits"] + self._stats["misses"] + self._stats["coalesced"]
+        return {
+            "name": self.name,
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "refresh_after": self.refresh_after,
+            "version": self.version,
+            "in_flight": len(self._in_flight),
+            "hit_rate": round((self._stats["hits"] + self._stats["coalesced"]) / lookups, 4) if lookups else 0.0,
+            **self._stats
+        }
+
+
+class SemanticCache:
+    """
+    Cache of recent query embeddings matched by cosine similarity.
+
+    Catches rephrasings that an exact-key cache misses. Embeddings are kept
+    L2-normalized in a preallocated float32 matrix used as a ring buffer, so
+    a lookup is a single matrix-vector product over at most max_entries rows.
+    Entries only match within the same namespace (the search parameters
+    other than the query text). ``invalidate`` drops everything, e.g. when
+    the corpus version changes.
+
+    Every lookup also records which of TUNING_THRESHOLDS its best match
+    would have passed, so stats() shows the hit rate other thresholds would
+    have given on the same traffic.
+    """
+
+    TUNING_THRESHOLDS = (0.8, 0.85, 0.9, 0.925, 0.95, 0.975, 0.99)
+    # Similarity at which put() treats an entry as the same query (float32 rounding)
+    SAME_QUERY_SIMILARITY = 0.9999
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        threshold: float = 0.95,
+        ttl_seconds: float = 600.0,
+        enabled: bool = True
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            name: Name used in logs and stats
+            max_entries: Number of recent queries kept (oldest overwritten first)
+            threshold: Minimum cosine similarity for a hit
+            ttl_seconds: Seconds an entry stays valid
+            enabled: When False, lookups always miss and nothing is stored
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled and max_entries > 0
+        self.version: Any = None
+
+        self._matrix: Optional[np.ndarray] = None  # allocated on first put, once the dimension is known
+        self._expires = np.zeros(max(max_entries, 0), dtype=np.float64)
+        self._namespaces = np.full(max(max_entries, 0), -1, dtype=np.int64)
+        self._values: List[Any] = [None] * max(max_entries, 0)
+        self._namespace_ids: Dict[Hashable, int] = {}
+        self._next_namespace_id = 0
+        self._next_slot = 0
+        self._size = 0
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        self._would_hit = {threshold: 0 for threshold in self.TUNING_THRESHOLDS}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    def _best_match(self, namespace: Hashable, embedding: Sequence[float]) -> Tuple[int, float]:
+        """Slot and similarity of the closest live entry in the namespace (-1 if none)."""
+        namespace_id = self._namespace_ids.get(namespace)
+        if namespace_id is None or self._matrix is None:
+            return -1, 0.0
+
+        vector = self._normalize(embedding)
+        if vector is None or vector.shape[0] != self._matrix.shape[1]:
+            return -1, 0.0
+
+        live = (self._namespaces[:self._size] == namespace_id) & (self._expires[:self._size] > time.monotonic())
+        if not live.any():
+            return -1, 0.0
+
+        similarities = self._matrix[:self._size] @ vector
+        similarities[~live] = -1.0
+        slot = int(np.argmax(similarities))
+        return slot, float(similarities[slot])
+
+    def lookup(self, namespace: Hashable, embedding: Sequence[float]) -> Tuple[bool, Any]:
+        """
+        Find the cached value of the most similar previous query.
+
+        Args:
+            namespace: Parameters the cached value must have been produced with
+            embedding: Embedding of the new query
+
+        Returns:
+            Tuple of (found, value)
+        """
+        if not self.enabled:
+            return False, None
+
+        slot, similarity = self._best_match(namespace, embedding)
+        if slot >= 0:
+            for threshold in self.TUNING_THRESHOLDS:
+                if similarity >= threshold:
+                    self._would_hit[threshold] += 1
+
+        if slot >= 0 and similarity >= self.threshold:
+            self._stats["hits"] += 1
+            return True, self._values[slot]
+
+        self._stats["misses"] += 1
+        return False, None
+
+    def put(self, namespace: Hashable, embedding: Sequence[float], value: Any):
+        """
+        Store the value produced for a query, overwriting the oldest entry if full.
+
+        A live entry for the same query (e.g. one being refreshed) is updated
+        in place, so lookups cannot keep finding the older copy.
+
+        Args:
+            namespace: Parameters the value was produced with
+            embedding: Embedding of the query
+            value: Value to cache
+        """
+        if not self.enabled:
+            return
+
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+
+        slot, similarity = self._best_match(namespace, embedding)
+        if slot >= 0 and similarity >= self.SAME_QUERY_SIMILARITY:
+            self._expires[slot] = time.monotonic() + self.ttl_seconds
+            self._values[slot] = value
+            return
+
+        if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+            self._clear()
+            self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+        namespace_id = self._namespace_ids.get(namespace)
+        if namespace_id is None:
+            if len(self._namespace_ids) >= self.max_entries:
+                # Forget namespaces no longer present in any slot
+                live_ids = set(self._namespaces[:self._size].tolist())
+                self._namespace_ids = {
+                    key: key_id for key, key_id in self._namespace_ids.items() if key_id in live_ids
+                }
+            namespace_id = self._next_namespace_id
+            self._next_namespace_id += 1
+            self._namespace_ids[namespace] = namespace_id
+
+        slot = self._next_slot
+        self._matrix[slot] = vector
+        self._namespaces[slot] = namespace_id
+        self._expires[slot] = time.monotonic() + self.ttl_seconds
+        self._values[slot] = value
+        self._next_slot = (slot + 1) % self.max_entries
+        self._size = min(self._size + 1, self.max_entries)
+
+    def _clear(self):
+        self._size = 0
+        self._next_slot = 0
+        self._values = [None] * len(self._values)
+        self._namespaces.fill(-1)
+        self._namespace_ids.clear()
+
+    def invalidate(self, version: Any = None):
+        """
+        Drop all cached entries and move to a new version.
+
+        Args:
+            version: New version marker (e.g. corpus version)
+        """
+        self._clear()
+        self.version = version
+        self._stats["invalidations"] += 1
+        logger.debug(f"Invalidated {self.name} cache (version {version})")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Hit/miss counters, configuration, and the hit rate each tuning
+            threshold would have produced
+        """
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "name": self.name,
+            "enabled": self.enabled,
+            "entries": self._size,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "version": self.version,
+            "lookups": lookups,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            "hit_rate_by_threshold": {
+                str(threshold): round(count / lookups, 4) if lookups else 0.0
+                for threshold, count in self._would_hit.items()
+            },
+            **self._stats
+        }
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query for use in cache keys."""
+    return " ".join(query.lower().split())
@@ -3,71 +3,232 @@ Database utilities for PostgreSQL connection and operations.
 """
 
 import os
+import re
 import json
+import time
+import base64
+import heapq
 import asyncio
-from typing import List, Dict, Any, Optional, Tuple
+import hashlib
+import itertools
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Callable, Awaitable, Union
 from datetime import datetime, timedelta, timezone
 from contextlib import asynccontextmanager
 from uuid import UUID
 import logging
 
 import asyncpg
+import numpy as np
 from asyncpg.pool import Pool
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library codec
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _encode_json(value: Any) -> str:
+    """Encode a json/jsonb parameter; strings are passed through as already-serialized JSON."""
+    if isinstance(value, str):
+        return value
+    if orjson is not None:
+        return orjson.dumps(value, default=str).decode()
+    return json.dumps(value, default=str)
+
+
+def _decode_metadata(value: Any) -> Dict[str, Any]:
+    """Metadata column as a dict, whether or not the connection's codec already decoded it."""
+    if value is None:
+        return {}
+    if isinstance(value, (str, bytes)):
+        return _json_loads(value)
+    return value
+
+
+async def _init_connection(conn):
+    """Register the JSON codecs on a new pool connection."""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=_encode_json,
+            decoder=_json_loads,
+            schema="pg_catalog"
+        )
+
+
+# Pool configuration
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "5"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+DB_POOL_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_POOL_MAX_INACTIVE_LIFETIME", "300"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "60"))
+# Prepared statements cached per connection (0 when running behind PgBouncer in transaction mode)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+# Read replicas for read-only queries: comma-separated URLs, routed round_robin or least_busy
+DATABASE_READ_URLS = [url.strip() for url in os.getenv("DATABASE_READ_URLS", "").split(",") if url.strip()]
+DB_READ_ROUTING = os.getenv("DB_READ_ROUTING", "round_robin").lower()
+# Corpus shards: comma-separated URLs. Each document and its chunks live on the
+# shard picked by hashing the document id; sessions and messages stay on DATABASE_URL.
+DATABASE_SHARD_URLS = [url.strip() for url in os.getenv("DATABASE_SHARD_URLS", "").split(",") if url.strip()]
+
 
 class DatabasePool:
-    """Manages PostgreSQL connection pool."""
+    """Manages PostgreSQL connection pools: the primary plus optional read replicas."""
     
-    def __init__(self, database_url: Optional[str] = None):
+    def __init__(
+        self,
+        database_url: Optional[str] = None,
+        read_urls: Optional[List[str]] = None,
+        read_routing: Optional[str] = None
+    ):
         """
         Initialize database pool.
         
         Args:
-            database_url: PostgreSQL connection URL
+            database_url: PostgreSQL connection URL of the primary
+            read_urls: Read replica URLs (defaults to DATABASE_READ_URLS)
+            read_routing: "round_robin" or "least_busy" (defaults to DB_READ_ROUTING)
         """
         self.database_url = database_url or os.getenv("DATABASE_URL")
         if not self.database_url:
             raise ValueError("DATABASE_URL environment variable not set")
         
+        self.read_urls = DATABASE_READ_URLS if read_urls is None else read_urls
+        self.read_routing = read_routing or DB_READ_ROUTING
+        if self.read_routing not in ("round_robin", "least_busy"):
+            raise ValueError(f"Unknown read routing: {self.read_routing}")
+        
         self.pool: Optional[Pool] = None
+        self.read_pools: List[Pool] = []
+        self._next_read = 0
+        self._acquire_stats: Dict[int, Dict[str, float]] = {}
+    
+    async def _create_pool(self, url: str) -> Pool:
+        return await asyncpg.create_pool(
+            url,
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            max_inactive_connection_lifetime=DB_POOL_MAX_INACTIVE_LIFETIME,
+            command_timeout=DB_COMMAND_TIMEOUT,
+            statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+            init=_init_connection
+        )
     
     async def initialize(self):
-        """Create connection pool."""
+        """Create the primary pool and one pool per reachable read replica."""
         if not self.pool:
-            self.pool = await asyncpg.create_pool(
-                self.database_url,
-                min_size=5,
-                max_size=20,
-                max_inactive_connection_lifetime=300,
-                command_timeout=60
-            )
+            self.pool = await self._create_pool(self.database_url)
             logger.info("Database connection pool initialized")
+            
+            for url in self.read_urls:
+                try:
+                    self.read_pools.append(await self._create_pool(url))
+                except Exception as e:
+                    # Reads fall back to the primary rather than failing startup
+                    logger.warning(f"Read replica unavailable, skipping it: {e}")
+            if self.read_pools:
+                logger.info(f"Routing reads to {len(self.read_pools)} replica(s) ({self.read_routing})")
     
     async def close(self):
-        """Close connection pool."""
+        """Close connection pools."""
+        for read_pool in self.read_pools:
+            await read_pool.close()
+        self.read_pools = []
         if self.pool:
             await self.pool.close()
             self.pool = None
             logger.info("Database connection pool closed")
     
+    def _read_pool(self) -> Pool:
+        """Pick a replica pool for a read, or the primary when there are none."""
+        if not self.read_pools:
+            return self.pool
+        
+        if self.read_routing == "least_busy":
+            return min(
+                self.read_pools,
+                key=lambda p: (p.get_size() - p.get_idle_size()) / max(p.get_max_size(), 1)
+            )
+        
+        read_pool = self.read_pools[self._next_read % len(self.read_pools)]
+        self._next_read += 1
+        return read_pool
+    
     @asynccontextmanager
-    async def acquire(self):
-        """Acquire a connection from the pool."""
+    async def acquire(self, readonly: bool = False):
+        """
+        Acquire a connection from the pool.
+        
+        Args:
+            readonly: Route to a read replica when any are configured; writes
+                must leave this False so they always go to the primary
+        """
         if not self.pool:
             await self.initialize()
         
-        async with self.pool.acquire() as connection:
+        pool = self._read_pool() if readonly else self.pool
+        started = time.perf_counter()
+        async with pool.acquire() as connection:
+            wait_ms = (time.perf_counter() - started) * 1000
+            stats = self._acquire_stats.setdefault(
+                id(pool), {"acquired": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+            )
+            stats["acquired"] += 1
+            stats["wait_ms_total"] += wait_ms
+            stats["wait_ms_max"] = max(stats["wait_ms_max"], wait_ms)
             yield connection
+    
+    def _pool_stats(self, role: str, pool: Pool) -> Dict[str, Any]:
+        size = pool.get_size()
+        in_use = size - pool.get_idle_size()
+        acquire_stats = self._acquire_stats.get(id(pool), {"acquired": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0})
+        acquired = acquire_stats["acquired"]
+        return {
+            "role": role,
+            "size": size,
+            "in_use": in_use,
+            "idle": size - in_use,
+            "min_size": pool.get_min_size(),
+            "max_size": pool.get_max_size(),
+            "utilization": round(in_use / max(pool.get_max_size(), 1), 4),
+            "acquired": acquired,
+            "avg_wait_ms": round(acquire_stats["wait_ms_total"] / acquired, 3) if acquired else 0.0,
+            "max_wait_ms": round(acquire_stats["wait_ms_max"], 3)
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get pool utilization statistics.
+        
+        Utilization near 1.0 or a growing average acquire wait means the pool
+        is saturated and requests are queueing for connections.
+        
+        Returns:
+            Routing mode and per-pool size, usage and acquire wait times
+        """
+        pools = []
+        if self.pool:
+            pools.append(self._pool_stats("primary", self.pool))
+        pools.extend(self._pool_stats("replica", read_pool) for read_pool in self.read_pools)
+        return {
+            "initialized": self.pool is not None,
+            "read_routing": self.read_routing if self.read_pools else "primary",
+            "read_replicas": len(self.read_pools),
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "pools": pools
+        }
 
 
 # Global database pool instance (lazy initialization)
 db_pool: Optional[DatabasePool] = None
+shard_pools: Optional[List[DatabasePool]] = None
 
 
 def get_db_pool() -> DatabasePool:
@@ -78,16 +239,117 @@ def get_db_pool() -> DatabasePool:
     return db_pool
 
 
+def get_shard_pools() -> List[DatabasePool]:
+    """Get the pool of every corpus shard ([] when sharding is off)."""
+    global shard_pools
+    if shard_pools is None:
+        shard_pools = [DatabasePool(url, read_urls=[]) for url in DATABASE_SHARD_URLS]
+    return shard_pools
+
+
+def shard_index(document_id: Union[str, UUID], shard_count: int) -> int:
+    """
+    Pick the shard owning a document.
+    
+    Uses a stable hash of the document id (not Python's per-process hash),
+    so every process agrees. Changing the shard count moves documents, which
+    means re-ingesting them.
+    
+    Args:
+        document_id: Document UUID
+        shard_count: Number of shards
+    
+    Returns:
+        Shard index in [0, shard_count)
+    """
+    digest = hashlib.blake2b(UUID(str(document_id)).bytes, digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shard_count
+
+
+def get_document_pool(document_id: Union[str, UUID]) -> DatabasePool:
+    """Get the pool holding a document and its chunks."""
+    shards = get_shard_pools()
+    return shards[shard_index(document_id, len(shards))] if shards else get_db_pool()
+
+
+def get_corpus_pools() -> List[DatabasePool]:
+    """Get every pool holding documents and chunks: all shards, or the main pool."""
+    return get_shard_pools() or [get_db_pool()]
+
+
 async def initialize_database():
-    """Initialize database connection pool."""
+    """Initialize database connection pools."""
     pool = get_db_pool()
     await pool.initialize()
+    for shard in get_shard_pools():
+        await shard.initialize()
 
 
 async def close_database():
-    """Close database connection pool."""
+    """Close database connection pools."""
     pool = get_db_pool()
     await pool.close()
+    for shard in get_shard_pools():
+        await shard.close()
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Get database pool utilization statistics.
+    
+    Returns:
+        Per-pool size, usage and acquire wait times (shards listed separately)
+    """
+    stats = get_db_pool().stats()
+    shards = get_shard_pools()
+    if shards:
+        stats["shards"] = [shard.stats() for shard in shards]
+    return stats
+
+
+class PartialResults(list):
+    """Search rows merged without the shards that failed; callers must not cache them."""
+
+
+async def _scatter(fetch: Callable[[DatabasePool], Awaitable[Any]]) -> Tuple[List[Any], bool]:
+    """
+    Run a query on every corpus pool concurrently.
+    
+    A failing shard is logged and left out so searches degrade rather than
+    fail; the error is raised only when every shard fails.
+    
+    Args:
+        fetch: Runs the query against one pool
+    
+    Returns:
+        Tuple of (one result per pool that answered, whether any shard failed)
+    """
+    pools = get_corpus_pools()
+    if len(pools) == 1:
+        return [await fetch(pools[0])], False
+    
+    outcomes = await asyncio.gather(*(fetch(pool) for pool in pools), return_exceptions=True)
+    results = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+    for shard, outcome in enumerate(outcomes):
+        if isinstance(outcome, BaseException):
+            logger.warning(f"Shard {shard} query failed: {outcome}")
+    if not results:
+        raise outcomes[0]
+    return results, len(results) < len(outcomes)
+
+
+def _merge_top_k(
+    per_shard: List[List[Dict[str, Any]]],
+    limit: int,
+    score_key: str,
+    degraded: bool = False
+) -> List[Dict[str, Any]]:
+    """Merge per-shard top-k lists into the global top-k by score (PartialResults if degraded)."""
+    if len(per_shard) == 1:
+        merged = per_shard[0]
+    else:
+        merged = heapq.nlargest(limit, itertools.chain.from_iterable(per_shard), key=lambda r: r[score_key])
+    return PartialResults(merged) if degraded else merged
 
 
 # Session Management Functions
@@ -124,17 +386,114 @@ async def create_session(
         return result["id"]
 
 
-async def get_session(session_id: str) -> Optional[Dict[str, Any]]:
+async def bootstrap_session(
+    session_id: Optional[str],
+    user_id: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    message_limit: int = 10,
+    timeout_minutes: int = 60
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Resolve a chat session and its recent messages in one round-trip.
+    
+    Looks up the session, creates a new one if it is missing or expired, and
+    returns the latest messages of an existing session, all in one statement.
+    
+    Args:
+        session_id: Session UUID from the request (None to always create)
+        user_id: User identifier for a new session
+        metadata: Metadata for a new session
+        message_limit: Maximum number of recent messages to return
+        timeout_minutes: Timeout for a new session in minutes
+    
+    Returns:
+        Tuple of (session with id, expires_at and created flag, latest
+        messages in creation order)
+    """
+    async with get_db_pool().acquire() as conn:
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=timeout_minutes)
+        
+        rows = await conn.fetch(
+            """
+            WITH existing AS (
+                SELECT id, expires_at
+                FROM sessions
+                WHERE id = $1::uuid
+                AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
+            ),
+            created AS (
+                INSERT INTO sessions (user_id, metadata, expires_at)
+                SELECT $2, $3, $4
+                WHERE NOT EXISTS (SELECT 1 FROM existing)
+                RETURNING id, expires_at
+            ),
+            session AS (
+                SELECT id, expires_at, FALSE AS created FROM existing
+                UNION ALL
+                SELECT id, expires_at, TRUE AS created FROM created
+            ),
+            recent AS (
+                SELECT id, role, content, metadata, created_at
+                FROM messages
+                WHERE session_id = (SELECT id FROM existing)
+                ORDER BY created_at DESC
+                LIMIT $5
+            )
+            SELECT
+                s.id::text AS session_id,
+                s.expires_at,
+                s.created,
+                r.id::text AS message_id,
+                r.role,
+                r.content,
+                r.metadata,
+                r.created_at
+            FROM session s
+            LEFT JOIN recent r ON TRUE
+            ORDER BY r.created_at
+            """,
+            session_id,
+            user_id,
+            json.dumps(metadata or {}),
+            expires_at,
+            message_limit
+        )
+        
+        first = rows[0]
+        session = {
+            "id": first["session_id"],
+            "expires_at": first["expires_at"].isoformat() if first["expires_at"] else None,
+            "created": first["created"]
+        }
+        messages = [
+            {
+                "id": row["message_id"],
+                "role": row["role"],
+                "content": row["content"],
+                "metadata": _decode_metadata(row["metadata"]),
+                "created_at": row["created_at"].isoformat()
+            }
+            for row in rows
+            if row["message_id"] is not None
+        ]
+        return session, messages
+
+
+async def get_session(session_id: str, readonly: bool = False) -> Optional[Dict[str, Any]]:
     """
     Get session by ID.
     
+    Reads the primary by default: a session created by the request before
+    may not have reached a lagging replica yet.
+    
     Args:
         session_id: Session UUID
+        readonly: Read from a replica instead, for callers that tolerate lag
     
     Returns:
         Session data or None if not found/expired
     """
-    async with get_db_pool().acquire() as conn:
+    async with get_db_pool().acquire(readonly=readonly) as conn:
         result = await conn.fetchrow(
             """
             SELECT 
@@ -155,7 +514,7 @@ async def get_session(session_id: str) -> Optional[Dict[str, Any]]:
             return {
                 "id": result["id"],
                 "user_id": result["user_id"],
-                "metadata": json.loads(result["metadata"]),
+                "metadata": _decode_metadata(result["metadata"]),
                 "created_at": result["created_at"].isoformat(),
                 "updated_at": result["updated_at"].isoformat(),
                 "expires_at": result["expires_at"].isoformat() if result["expires_at"] else None
@@ -225,44 +584,77 @@ async def add_message(
         return result["id"]
 
 
+async def insert_messages(messages: Sequence[Tuple[str, str, str, str, Dict[str, Any], datetime]]) -> None:
+    """
+    Insert several messages in one atomic batch.
+    
+    Ids and timestamps come from the caller, so messages keep the time and
+    order they were produced in even when written later in bulk.
+    
+    Args:
+        messages: (id, session_id, role, content, metadata, created_at) tuples
+    """
+    async with get_db_pool().acquire() as conn:
+        await conn.executemany(
+            """
+            INSERT INTO messages (id, session_id, role, content, metadata, created_at)
+            VALUES ($1::uuid, $2::uuid, $3, $4, $5, $6)
+            """,
+            [
+                (message_id, session_id, role, content, json.dumps(metadata or {}), created_at)
+                for message_id, session_id, role, content, metadata, created_at in messages
+            ]
+        )
+
+
 async def get_session_messages(
     session_id: str,
-    limit: Optional[int] = None
+    limit: Optional[int] = None,
+    readonly: bool = False
 ) -> List[Dict[str, Any]]:
     """
     Get messages for a session.
     
+    Reads the primary by default, like get_session, so the previous turn's
+    messages are not missed under replica lag.
+    
     Args:
         session_id: Session UUID
-        limit: Maximum number of messages to return
+        limit: Maximum number of messages to return (the most recent ones)
+        readonly: Read from a replica instead, for callers that tolerate lag
     
     Returns:
         List of messages ordered by creation time
     """
-    async with get_db_pool().acquire() as conn:
-        query = """
-            SELECT 
-                id::text,
-                role,
-                content,
-                metadata,
-                created_at
-            FROM messages
-            WHERE session_id = $1::uuid
+    async with get_db_pool().acquire(readonly=readonly) as conn:
+        # Take the latest messages first, then put them back in order
+        results = await conn.fetch(
+            """
+            SELECT id, role, content, metadata, created_at
+            FROM (
+                SELECT 
+                    id::text,
+                    role,
+                    content,
+                    metadata,
+                    created_at
+                FROM messages
+                WHERE session_id = $1::uuid
+                ORDER BY created_at DESC
+                LIMIT $2
+            ) recent
             ORDER BY created_at
-        """
-        
-        if limit:
-            query += f" LIMIT {limit}"
-        
-        results = await conn.fetch(query, session_id)
+            """,
+            session_id,
+            limit or None
+        )
         
         return [
             {
                 "id": row["id"],
                 "role": row["role"],
                 "content": row["content"],
-                "metadata": json.loads(row["metadata"]),
+                "metadata": _decode_metadata(row["metadata"]),
                 "created_at": row["created_at"].isoformat()
             }
             for row in results
@@ -270,136 +662,686 @@ async def get_session_messages(
 
 
 # Document Management Functions
-async def get_document(document_id: str) -> Optional[Dict[str, Any]]:
+# Upper bounds for ranged reads, so one call cannot pull a whole large body
+DOCUMENT_WINDOW_MAX_CHARS = int(os.getenv("DOCUMENT_WINDOW_MAX_CHARS", "20000"))
+DOCUMENT_CHUNK_RANGE_MAX = int(os.getenv("DOCUMENT_CHUNK_RANGE_MAX", "20"))
+
+
+async def get_document(document_id: str, include_content: bool = False) -> Optional[Dict[str, Any]]:
     """
     Get document by ID.
     
+    The body is only read when asked for; get_document_window and
+    get_document_chunk_range serve the parts of it a caller needs.
+    
     Args:
         document_id: Document UUID
+        include_content: Also return the full body
     
     Returns:
         Document data or None if not found
     """
-    async with get_db_pool().acquire() as conn:
+    body_join = "LEFT JOIN document_bodies b ON b.document_id = d.id" if include_content else ""
+    async with get_document_pool(document_id).acquire(readonly=True) as conn:
         result = await conn.fetchrow(
-            """
+            f"""
             SELECT 
-                id::text,
-                title,
-                source,
-                content,
-                metadata,
-                created_at,
-                updated_at
-            FROM documents
-            WHERE id = $1::uuid
+                d.id::text,
+                d.title,
+                d.source,
+                d.metadata,
+                d.chunk_count,
+                d.total_tokens,
+                d.content_length,
+                d.created_at,
+                d.updated_at
+                {", b.content" if include_content else ""}
+            FROM documents d
+            {body_join}
+            WHERE d.id = $1::uuid
             """,
             document_id
         )
         
         if result:
-            return {
+            document = {
                 "id": result["id"],
                 "title": result["title"],
                 "source": result["source"],
-                "content": result["content"],
-                "metadata": json.loads(result["metadata"]),
+                "metadata": _decode_metadata(result["metadata"]),
+                "chunk_count": result["chunk_count"],
+                "total_tokens": result["total_tokens"],
+                "content_length": result["content_length"],
                 "created_at": result["created_at"].isoformat(),
                 "updated_at": result["updated_at"].isoformat()
             }
+            if include_content:
+                document["content"] = result["content"] or ""
+            return document
         
         return None
 
 
+async def get_document_window(
+    document_id: str,
+    start: int = 0,
+    length: int = DOCUMENT_WINDOW_MAX_CHARS
+) -> Optional[Dict[str, Any]]:
+    """
+    Get a character window of a document's body.
+    
+    Postgres only decompresses the stored body up to the end of the window,
+    and only the window is sent back.
+    
+    Args:
+        document_id: Document UUID
+        start: Offset of the first character (0-based)
+        length: Characters to return (capped at DOCUMENT_WINDOW_MAX_CHARS)
+    
+    Returns:
+        The window with its bounds and the body length, or None if not found
+    """
+    start = max(0, start)
+    length = max(0, min(length, DOCUMENT_WINDOW_MAX_CHARS))
+    async with get_document_pool(document_id).acquire(readonly=True) as conn:
+        result = await conn.fetchrow(
+            """
+            SELECT d.content_length, substr(b.content, $2 + 1, $3) AS content
+            FROM documents d
+            LEFT JOIN document_bodies b ON b.document_id = d.id
+            WHERE d.id = $1::uuid
+            """,
+            document_id,
+            start,
+            length
+        )
+    
+    if result is None:
+        return None
+    
+    content = result["content"] or ""
+    return {
+        "document_id": document_id,
+        "start": start,
+        "end": start + len(content),
+        "content": content,
+        "content_length": result["content_length"],
+        "has_more": start + len(content) < result["content_length"]
+    }
+
+
+async def get_document_chunk_range(
+    document_id: str,
+    start_index: int = 0,
+    end_index: Optional[int] = None,
+    neighbors: int = 0,
+    chunk_id: Optional[str] = None,
+    metadata_keys: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """
+    Get a run of consecutive chunks of a document.
+    
+    Either give chunk indexes or anchor on a chunk (e.g. a search hit) with
+    chunk_id; neighbors widens the range on both sides. At most
+    DOCUMENT_CHUNK_RANGE_MAX chunks are returned: an index range keeps its
+    lowest indexes, while an anchored range trims neighbors evenly so the
+    anchor chunk stays in the middle.
+    
+    Args:
+        document_id: Document UUID
+        start_index: First chunk index (ignored with chunk_id)
+        end_index: Last chunk index, inclusive (defaults to start_index)
+        neighbors: Extra chunks to include before and after the range
+        chunk_id: Center the range on this chunk instead of using indexes
+        metadata_keys: Only return these metadata keys (None for all, [] for none)
+    
+    Returns:
+        The chunks ordered by chunk index (empty if the document or anchor
+        chunk is missing) and whether the range was cut to the cap
+    """
+    neighbors = max(0, neighbors)
+    max_neighbors = None
+    if chunk_id:
+        bounds = "SELECT chunk_index AS lo, chunk_index AS hi FROM chunks WHERE id = $2::uuid AND document_id = $1::uuid"
+        bound_args = [chunk_id]
+        if neighbors > (DOCUMENT_CHUNK_RANGE_MAX - 1) // 2:
+            # Fetch one chunk past the clamp on each side to tell whether any were cut
+            max_neighbors = (DOCUMENT_CHUNK_RANGE_MAX - 1) // 2
+            neighbors = max_neighbors + 1
+    else:
+        bounds = "SELECT $2::int AS lo, $3::int AS hi"
+        bound_args = [start_index, start_index if end_index is None else max(start_index, end_index)]
+    
+    next_param = len(bound_args) + 2
+    async with get_document_pool(document_id).acquire(readonly=True) as conn:
+        results = await conn.fetch(
+            f"""
+            WITH bounds AS ({bounds})
+            SELECT c.id::text AS chunk_id, c.content, c.chunk_index, c.chunk_index - b.lo AS anchor_offset,
+                   {_metadata_column("c.metadata", metadata_keys, next_param + 2)} AS metadata
+            FROM bounds b
+            JOIN chunks c
+              ON c.document_id = $1::uuid
+             AND c.chunk_index BETWEEN b.lo - ${next_param} AND b.hi + ${next_param}
+            ORDER BY c.chunk_index
+            LIMIT ${next_param + 1}
+            """,
+            document_id,
+            *bound_args,
+            neighbors,
+            DOCUMENT_CHUNK_RANGE_MAX + 2,
+            *_metadata_args(metadata_keys)
+        )
+    
+    if max_neighbors is not None:
+        kept = [row for row in results if abs(row["anchor_offset"]) <= max_neighbors]
+    else:
+        kept = results[:DOCUMENT_CHUNK_RANGE_MAX]
+    
+    return {
+        "document_id": document_id,
+        "chunks": [
+            {
+                "chunk_id": row["chunk_id"],
+                "content": row["content"],
+                "chunk_index": row["chunk_index"],
+                "metadata": _decode_metadata(row["metadata"])
+            }
+            for row in kept
+        ],
+        "truncated": len(kept) < len(results)
+    }
+
+
+def encode_document_cursor(created_at: Union[datetime, str], document_id: str) -> str:
+    """
+    Build the list_documents cursor that resumes after a document.
+    
+    Args:
+        created_at: The document's created_at (datetime or ISO string)
+        document_id: The document's ID
+    
+    Returns:
+        Opaque, URL-safe cursor
+    """
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    return base64.urlsafe_b64encode(f"{created_at}|{document_id}".encode()).decode().rstrip("=")
+
+
+def decode_document_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Parse a list_documents cursor.
+    
+    Args:
+        cursor: Cursor from encode_document_cursor
+    
+    Returns:
+        The (created_at, document_id) position it resumes after
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, document_id = decoded.split("|")
+        return datetime.fromisoformat(created_at), str(UUID(document_id))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid document cursor: {cursor!r}") from e
+
+
 async def list_documents(
     limit: int = 100,
     offset: int = 0,
-    metadata_filter: Optional[Dict[str, Any]] = None
+    metadata_filter: Optional[Dict[str, Any]] = None,
+    metadata_keys: Optional[Sequence[str]] = None,
+    cursor: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
-    List documents with optional filtering.
+    List documents, newest first, with optional filtering.
+    
+    Pages by keyset on (created_at, id): pass the cursor of the last document
+    of a page to get the next one, which costs the same at any depth. Chunk
+    counts are read from the document row rather than aggregated.
     
     Args:
         limit: Maximum number of documents to return
-        offset: Number of documents to skip
+        offset: Number of documents to skip (prefer cursor; deep offsets scan every skipped row)
         metadata_filter: Optional metadata filter
+        metadata_keys: Only return these metadata keys (None for all, [] for none)
+        cursor: Return documents after this cursor (from a previous result's "cursor")
     
     Returns:
         List of documents
+    
+    Raises:
+        ValueError: If the cursor is malformed
     """
-    async with get_db_pool().acquire() as conn:
-        query = """
-            SELECT 
-                d.id::text,
-                d.title,
-                d.source,
-                d.metadata,
-                d.created_at,
-                d.updated_at,
-                COUNT(c.id) AS chunk_count
-            FROM documents d
-            LEFT JOIN chunks c ON d.id = c.document_id
+    params = _metadata_args(metadata_keys)
+    conditions = []
+    
+    query = f"""
+        SELECT 
+            d.id::text,
+            d.title,
+            d.source,
+            {_metadata_column("d.metadata", metadata_keys, 1)} AS metadata,
+            d.created_at,
+            d.updated_at,
+            d.chunk_count,
+            d.total_tokens
+        FROM documents d
+    """
+    
+    if metadata_filter:
+        conditions.append(f"d.metadata @> ${len(params) + 1}::jsonb")
+        params.append(json.dumps(metadata_filter))
+    
+    if cursor:
+        conditions.append(f"(d.created_at, d.id) < (${len(params) + 1}, ${len(params) + 2}::uuid)")
+        params.extend(decode_document_cursor(cursor))
+    
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    
+    query += """
+        ORDER BY d.created_at DESC, d.id DESC
+        LIMIT $%d OFFSET $%d
+    """ % (len(params) + 1, len(params) + 2)
+    
+    # With shards, each returns its first offset + limit rows and the page is cut after merging
+    sharded = len(get_corpus_pools()) > 1
+    params.extend([limit + offset, 0] if sharded else [limit, offset])
+    
+    async def fetch(pool: DatabasePool) -> List[Any]:
+        async with pool.acquire(readonly=True) as conn:
+            return await conn.fetch(query, *params)
+    
+    per_shard, _ = await _scatter(fetch)
+    results = per_shard[0]
+    if sharded:
+        # UUIDs order the same as their text form, so this matches the SQL order
+        merged = sorted(
+            itertools.chain.from_iterable(per_shard),
+            key=lambda row: (row["created_at"], row["id"]),
+            reverse=True
+        )
+        results = merged[offset:offset + limit]
+    
+    return [
+        {
+            "id": row["id"],
+            "title": row["title"],
+            "source": row["source"],
+            "metadata": _decode_metadata(row["metadata"]),
+            "created_at": row["created_at"].isoformat(),
+            "updated_at": row["updated_at"].isoformat(),
+            "chunk_count": row["chunk_count"],
+            "total_tokens": row["total_tokens"],
+            "cursor": encode_document_cursor(row["created_at"], row["id"])
+        }
+        for row in results
+    ]
+
+
+async def get_corpus_version() -> int:
+    """
+    Get the corpus version, which changes whenever documents or chunks are written.
+    
+    With shards, every shard keeps its own counter and the corpus version is
+    their sum, which still moves on every write to any shard.
+    
+    Returns:
+        Current corpus version
+    """
+    async def fetch(pool: DatabasePool) -> int:
+        async with pool.acquire(readonly=True) as conn:
+            return await conn.fetchval("SELECT version FROM corpus_version") or 0
+    
+    pools = get_corpus_pools()
+    if len(pools) == 1:
+        return await fetch(pools[0])
+    return sum(await asyncio.gather(*(fetch(pool) for pool in pools)))
+
+
+async def bump_corpus_version(conn) -> int:
+    """
+    Increment the corpus version.
+    
+    Call this inside the transaction that writes documents or chunks, so the
+    new version becomes visible together with the data.
+    
+    Args:
+        conn: Connection with the open write transaction
+    
+    Returns:
+        The new corpus version
+    """
+    return await conn.fetchval(
         """
-        
-        params = []
-        conditions = []
-        
-        if metadata_filter:
-            conditions.append(f"d.metadata @> ${len(params) + 1}::jsonb")
-            params.append(json.dumps(metadata_filter))
-        
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += """
-            GROUP BY d.id, d.title, d.source, d.metadata, d.created_at, d.updated_at
-            ORDER BY d.created_at DESC
-            LIMIT $%d OFFSET $%d
-        """ % (len(params) + 1, len(params) + 2)
-        
-        params.extend([limit, offset])
-        
-        results = await conn.fetch(query, *params)
-        
-        return [
-            {
-                "id": row["id"],
-                "title": row["title"],
-                "source": row["source"],
-                "metadata": json.loads(row["metadata"]),
-                "created_at": row["created_at"].isoformat(),
-                "updated_at": row["updated_at"].isoformat(),
-                "chunk_count": row["chunk_count"]
-            }
-            for row in results
-        ]
+        INSERT INTO corpus_version (id, version) VALUES (TRUE, 1)
+        ON CONFLICT (id) DO UPDATE
+        SET version = corpus_version.version + 1, updated_at = CURRENT_TIMESTAMP
+        RETURNING version
+        """
+    )
 
 
 # Vector Search Functions
+# pgvector release that added iterative index scans for filtered ANN queries
+ITERATIVE_SCAN_VERSION = (0, 8, 0)
+# pgvector release that added HNSW indexes on bit (Hamming distance)
+QUANTIZED_INDEX_VERSION = (0, 7, 0)
+
+# Two-stage search: rank candidates on the binary-quantized embeddings, then
+# rerank limit * QUANTIZED_CANDIDATE_FACTOR of them on the full vectors
+QUANTIZED_SEARCH = os.getenv("QUANTIZED_SEARCH", "false").lower() == "true"
+QUANTIZED_CANDIDATE_FACTOR = int(os.getenv("QUANTIZED_CANDIDATE_FACTOR", "10"))
+
+# How often the query defaults stored on the embedding index are re-read
+INDEX_PARAMS_REFRESH_INTERVAL = float(os.getenv("INDEX_PARAMS_REFRESH_INTERVAL", "300"))
+
+_pgvector_version: Optional[Tuple[int, ...]] = None
+# id(pool) -> (read at, query defaults stored by agent.index_manager)
+_index_query_params: Dict[int, Tuple[float, Dict[str, int]]] = {}
+
+
+def _env_int(name: str) -> Optional[int]:
+    """Read an optional integer setting from the environment."""
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def _filters_json(filters: Optional[Dict[str, Any]]) -> str:
+    """
+    Serialize search filters for the SQL search functions.
+
+    Args:
+        filters: Filter dict (source, title, created_after, created_before, metadata)
+
+    Returns:
+        JSON object with empty values dropped ('{}' when unfiltered)
+    """
+    cleaned = {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in (filters or {}).items()
+        if value not in (None, "", {})
+    }
+    return json.dumps(cleaned)
+
+
+def _metadata_column(column: str, metadata_keys: Optional[Sequence[str]], param: int) -> str:
+    """
+    SQL for a metadata column, optionally projected down to some keys.
+
+    Projection happens in the database, so dropped keys are neither sent
+    over the wire nor decoded.
+
+    Args:
+        column: Qualified metadata column
+        metadata_keys: Keys to keep (None keeps the whole object, [] returns {})
+        param: Placeholder number metadata_keys is bound to (as text[])
+
+    Returns:
+        SQL expression
+    """
+    if metadata_keys is None:
+        return column
+    return (
+        f"COALESCE((SELECT jsonb_object_agg(k, {column} -> k) FROM unnest(${param}::text[]) AS k "
+        f"WHERE {column} ? k), '{{}}'::jsonb)"
+    )
+
+
+def _metadata_args(metadata_keys: Optional[Sequence[str]]) -> List[Any]:
+    """Query arguments to append for _metadata_column."""
+    return [] if metadata_keys is None else [list(metadata_keys)]
+
+
+def _decode_vector(data: bytes) -> np.ndarray:
+    """
+    Decode pgvector's binary format (vector_send) into a float32 array.
+
+    Args:
+        data: Two-byte dimension, two unused bytes, then big-endian float4 values
+
+    Returns:
+        Embedding vector
+    """
+    dim = int.from_bytes(data[:2], "big")
+    return np.frombuffer(data, dtype=">f4", count=dim, offset=4).astype(np.float32)
+
+
+def _sign_bits(embedding: Sequence[float]) -> asyncpg.BitString:
+    """Binary-quantize a query embedding the same way as embedding_sign_bits() in SQL."""
+    return asyncpg.BitString("".join("1" if value > 0 else "0" for value in embedding))
+
+
+def _quantized_search_sql(pgvector_version: Tuple[int, ...], metadata_keys: Optional[Sequence[str]]) -> str:
+    """
+    SQL for two-stage vector search over the quantized embeddings.
+
+    The first stage takes the $3 nearest chunks by Hamming distance between
+    embedding_bits and the query bits ($4). On pgvector 0.7+ it is written with
+    the <~> operator so the HNSW index on embedding_bits answers it; older
+    versions scan the compact column. The second stage reranks those candidates
+    by exact cosine distance to the query ($1), using cosine_distance() rather
+    than <=> to keep it off the full-precision ANN index, and keeps the top $2.
+
+    Args:
+        pgvector_version: Installed pgvector version
+        metadata_keys: Metadata keys to project (bound to $5)
+
+    Returns:
+        SQL query
+    """
+    if pgvector_version >= QUANTIZED_INDEX_VERSION:
+        hamming_distance = "c.embedding_bits <~> $4::bit(1536)"
+    else:
+        hamming_distance = "bit_count(c.embedding_bits # $4::bit(1536))"
+
+    return f"""
+        WITH candidates AS MATERIALIZED (
+            SELECT c.id
+            FROM chunks c
+            WHERE c.embedding_bits IS NOT NULL
+            ORDER BY {hamming_distance}
+            LIMIT $3
+        )
+        SELECT
+            c.id AS chunk_id,
+            c.document_id,
+            c.content,
+            (1 - cosine_distance(c.embedding, $1::vector))::FLOAT AS similarity,
+            {_metadata_column("c.metadata", metadata_keys, 5)} AS metadata,
+            d.title AS document_title,
+            d.source AS document_source
+        FROM candidates k
+        JOIN chunks c ON c.id = k.id
+        JOIN documents d ON d.id = c.document_id
+        ORDER BY cosine_distance(c.embedding, $1::vector)
+        LIMIT $2
+    """
+
+
+async def _get_pgvector_version(conn) -> Tuple[int, ...]:
+    """Get the installed pgvector version (cached after the first lookup)."""
+    global _pgvector_version
+    if _pgvector_version is None:
+        version = await conn.fetchval("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        _pgvector_version = tuple(int(part) for part in re.findall(r"\d+", version or "0"))
+    return _pgvector_version
+
+
+def parse_index_query_params(comment: Optional[str]) -> Dict[str, int]:
+    """
+    Parse the query parameters agent.index_manager stores as the embedding index comment.
+
+    Args:
+        comment: Comment on idx_chunks_embedding (None if there is none)
+
+    Returns:
+        Stored query parameters, e.g. {"probes": 32} (empty if missing or not ours)
+    """
+    try:
+        return {key: int(value) for key, value in json.loads(comment).items()}
+    except (TypeError, ValueError, AttributeError):
+        return {}
+
+
+async def _get_index_query_params(conn, pool: DatabasePool) -> Dict[str, int]:
+    """
+    Get the query defaults the index manager stored on the embedding index.
+
+    index_manager records the probes/ef_search tuned for the index it built
+    as a JSON comment on idx_chunks_embedding. They are cached per pool and
+    re-read every INDEX_PARAMS_REFRESH_INTERVAL seconds, so a rebuild from
+    another process is picked up.
+
+    Args:
+        conn: Connection to read with
+        pool: Pool the connection belongs to (each shard has its own index)
+
+    Returns:
+        Tuned query parameters, e.g. {"probes": 32} (empty if none were stored)
+    """
+    cached = _index_query_params.get(id(pool))
+    if cached is not None and time.monotonic() - cached[0] < INDEX_PARAMS_REFRESH_INTERVAL:
+        return cached[1]
+
+    comment = await conn.fetchval(
+        "SELECT obj_description(to_regclass('idx_chunks_embedding'), 'pg_class')"
+    )
+    params = parse_index_query_params(comment)
+    _index_query_params[id(pool)] = (time.monotonic(), params)
+    return params
+
+
+@asynccontextmanager
+async def ann_search_connection(
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    filtered: bool = False,
+    pool: Optional[DatabasePool] = None
+):
+    """
+    Acquire a connection with per-query ANN recall settings applied.
+
+    Settings fall back to HNSW_EF_SEARCH / IVFFLAT_PROBES from the environment,
+    then to the values tuned for the index when it was last rebuilt (see
+    agent.index_manager), and are left at the server defaults otherwise. They are set
+    transaction-locally so they never leak to other users of the pooled
+    connection. hnsw.ef_search also caps how many rows an HNSW scan returns,
+    so it should be at least the candidate count the query asks for.
+
+    Filtered queries that the planner answers by post-filtering an ANN scan
+    can come back short. For those, iterative index scans are enabled on
+    pgvector 0.8+, and on older versions ef_search is raised to at least
+    FILTERED_HNSW_EF_SEARCH.
+
+    Searches only read, so the connection comes from a read replica when any
+    are configured.
+
+    Args:
+        ef_search: HNSW candidate list size (higher = better recall, slower)
+        probes: Number of IVFFlat lists to scan (higher = better recall, slower)
+        filtered: Whether the query carries metadata filters
+        pool: Pool to search (defaults to the main pool)
+    """
+    pool = pool or get_db_pool()
+    async with pool.acquire(readonly=True) as conn:
+        tuned = await _get_index_query_params(conn, pool)
+        settings = {
+            "hnsw.ef_search": ef_search or _env_int("HNSW_EF_SEARCH") or tuned.get("ef_search"),
+            "ivfflat.probes": probes or _env_int("IVFFLAT_PROBES") or tuned.get("probes")
+        }
+        settings = {name: value for name, value in settings.items() if value}
+
+        if filtered:
+            if await _get_pgvector_version(conn) >= ITERATIVE_SCAN_VERSION:
+                settings["hnsw.iterative_scan"] = "relaxed_order"
+                settings["ivfflat.iterative_scan"] = "relaxed_order"
+            else:
+                settings["hnsw.ef_search"] = max(
+                    settings.get("hnsw.ef_search", 0),
+                    _env_int("FILTERED_HNSW_EF_SEARCH") or 200
+                )
+
+        if not settings:
+            yield conn
+            return
+
+        async with conn.transaction():
+            calls = ", ".join(
+                f"set_config('{name}', ${i}, true)" for i, name in enumerate(settings, start=1)
+            )
+            await conn.execute(f"SELECT {calls}", *(str(value) for value in settings.values()))
+            yield conn
+
+
 async def vector_search(
     embedding: List[float],
-    limit: int = 10
+    limit: int = 10,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    metadata_keys: Optional[Sequence[str]] = None,
+    quantized: Optional[bool] = None
 ) -> List[Dict[str, Any]]:
     """
     Perform vector similarity search.
     
+    Quantized search ranks candidates on the 1-bit embeddings and reranks
+    them on the full vectors (see _quantized_search_sql). Filtered searches
+    always use match_chunks.
+    
     Args:
         embedding: Query embedding vector
         limit: Maximum number of results
+        ef_search: Optional HNSW ef_search for this query
+        probes: Optional IVFFlat probes for this query
+        filters: Optional document filters (source, title, created_after, created_before, metadata)
+        metadata_keys: Only return these metadata keys (None for all, [] for none)
+        quantized: Use two-stage quantized search (defaults to QUANTIZED_SEARCH)
     
     Returns:
         List of matching chunks ordered by similarity (best first)
     """
-    async with get_db_pool().acquire() as conn:
+    filters_json = _filters_json(filters)
+    quantized = (QUANTIZED_SEARCH if quantized is None else quantized) and filters_json == "{}"
+    
+    async def search(pool: DatabasePool):
         # Convert embedding to PostgreSQL vector string format
         # PostgreSQL vector format: '[1.0,2.0,3.0]' (no spaces after commas)
         embedding_str = '[' + ','.join(map(str, embedding)) + ']'
         
-        results = await conn.fetch(
-            "SELECT * FROM match_chunks($1::vector, $2)",
-            embedding_str,
-            limit
-        )
+        if quantized:
+            candidates = limit * QUANTIZED_CANDIDATE_FACTOR
+            # The HNSW scan on embedding_bits returns at most ef_search rows
+            quantized_ef_search = max(ef_search or _env_int("HNSW_EF_SEARCH") or 0, candidates)
+            async with ann_search_connection(quantized_ef_search, probes, pool=pool) as conn:
+                results = await conn.fetch(
+                    _quantized_search_sql(await _get_pgvector_version(conn), metadata_keys),
+                    embedding_str,
+                    limit,
+                    candidates,
+                    _sign_bits(embedding),
+                    *_metadata_args(metadata_keys)
+                )
+        else:
+            async with ann_search_connection(ef_search, probes, filtered=filters_json != "{}", pool=pool) as conn:
+                results = await conn.fetch(
+                    f"""
+                    SELECT m.chunk_id, m.document_id, m.content, m.similarity,
+                           {_metadata_column("m.metadata", metadata_keys, 4)} AS metadata,
+                           m.document_title, m.document_source
+                    FROM match_chunks($1::vector, $2, $3::jsonb) m
+                    """,
+                    embedding_str,
+                    limit,
+                    filters_json,
+                    *_metadata_args(metadata_keys)
+                )
         
         return [
             {
@@ -407,19 +1349,99 @@ async def vector_search(
                 "document_id": row["document_id"],
                 "content": row["content"],
                 "similarity": row["similarity"],
-                "metadata": json.loads(row["metadata"]),
+                "metadata": _decode_metadata(row["metadata"]),
                 "document_title": row["document_title"],
                 "document_source": row["document_source"]
             }
             for row in results
         ]
+    
+    per_shard, degraded = await _scatter(search)
+    return _merge_top_k(per_shard, limit, "similarity", degraded)
+
+
+async def vector_search_many(
+    embeddings: List[List[float]],
+    limit: int = 10,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    metadata_keys: Optional[Sequence[str]] = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    Perform vector similarity search for several query embeddings at once.
+    
+    All queries are answered by one statement: the embeddings are unnested
+    and each runs its own top-k through a LATERAL call to match_chunks.
+    
+    Args:
+        embeddings: Query embedding vectors
+        limit: Maximum number of results per query
+        ef_search: Optional HNSW ef_search for these queries
+        probes: Optional IVFFlat probes for these queries
+        filters: Optional document filters (source, title, created_after, created_before, metadata)
+        metadata_keys: Only return these metadata keys (None for all, [] for none)
+    
+    Returns:
+        One list of matching chunks per embedding, in input order (best first),
+        each result tagged with its query_index
+    """
+    if not embeddings:
+        return []
+    
+    filters_json = _filters_json(filters)
+    
+    async def search(pool: DatabasePool):
+        async with ann_search_connection(ef_search, probes, filtered=filters_json != "{}", pool=pool) as conn:
+            embedding_strs = ['[' + ','.join(map(str, embedding)) + ']' for embedding in embeddings]
+        
+            results = await conn.fetch(
+                f"""
+                SELECT q.query_index - 1 AS query_index,
+                       m.chunk_id, m.document_id, m.content, m.similarity,
+                       {_metadata_column("m.metadata", metadata_keys, 4)} AS metadata,
+                       m.document_title, m.document_source
+                FROM unnest($1::vector[]) WITH ORDINALITY AS q(embedding, query_index)
+                CROSS JOIN LATERAL match_chunks(q.embedding, $2, $3::jsonb) m
+                ORDER BY q.query_index, m.similarity DESC
+                """,
+                embedding_strs,
+                limit,
+                filters_json,
+                *_metadata_args(metadata_keys)
+            )
+        
+            grouped: List[List[Dict[str, Any]]] = [[] for _ in embeddings]
+            for row in results:
+                grouped[row["query_index"]].append({
+                    "query_index": row["query_index"],
+                    "chunk_id": row["chunk_id"],
+                    "document_id": row["document_id"],
+                    "content": row["content"],
+                    "similarity": row["similarity"],
+                    "metadata": _decode_metadata(row["metadata"]),
+                    "document_title": row["document_title"],
+                    "document_source": row["document_source"]
+                })
+        
+            return grouped
+    
+    per_shard, degraded = await _scatter(search)
+    return [
+        _merge_top_k([shard[query_index] for shard in per_shard], limit, "similarity", degraded)
+        for query_index in range(len(embeddings))
+    ]
 
 
 async def hybrid_search(
     embedding: List[float],
     query_text: str,
     limit: int = 10,
-    text_weight: float = 0.3
+    text_weight: float = 0.3,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    metadata_keys: Optional[Sequence[str]] = None
 ) -> List[Dict[str, Any]]:
     """
     Perform hybrid search (vector + keyword).
@@ -429,37 +1451,55 @@ async def hybrid_search(
         query_text: Query text for keyword search
         limit: Maximum number of results
         text_weight: Weight for text similarity (0-1)
+        ef_search: Optional HNSW ef_search for this query
+        probes: Optional IVFFlat probes for this query
+        filters: Optional document filters (source, title, created_after, created_before, metadata)
+        metadata_keys: Only return these metadata keys (None for all, [] for none)
     
     Returns:
         List of matching chunks ordered by combined score (best first)
     """
-    async with get_db_pool().acquire() as conn:
-        # Convert embedding to PostgreSQL vector string format
-        # PostgreSQL vector format: '[1.0,2.0,3.0]' (no spaces after commas)
-        embedding_str = '[' + ','.join(map(str, embedding)) + ']'
+    filters_json = _filters_json(filters)
+    
+    async def search(pool: DatabasePool):
+        async with ann_search_connection(ef_search, probes, filtered=filters_json != "{}", pool=pool) as conn:
+            # Convert embedding to PostgreSQL vector string format
+            # PostgreSQL vector format: '[1.0,2.0,3.0]' (no spaces after commas)
+            embedding_str = '[' + ','.join(map(str, embedding)) + ']'
         
-        results = await conn.fetch(
-            "SELECT * FROM hybrid_search($1::vector, $2, $3, $4)",
-            embedding_str,
-            query_text,
-            limit,
-            text_weight
-        )
+            results = await conn.fetch(
+                f"""
+                SELECT h.chunk_id, h.document_id, h.content, h.combined_score,
+                       h.vector_similarity, h.text_similarity,
+                       {_metadata_column("h.metadata", metadata_keys, 6)} AS metadata,
+                       h.document_title, h.document_source
+                FROM hybrid_search($1::vector, $2, $3, $4, $5::jsonb) h
+                """,
+                embedding_str,
+                query_text,
+                limit,
+                text_weight,
+                filters_json,
+                *_metadata_args(metadata_keys)
+            )
         
-        return [
-            {
-                "chunk_id": row["chunk_id"],
-                "document_id": row["document_id"],
-                "content": row["content"],
-                "combined_score": row["combined_score"],
-                "vector_similarity": row["vector_similarity"],
-                "text_similarity": row["text_similarity"],
-                "metadata": json.loads(row["metadata"]),
-                "document_title": row["document_title"],
-                "document_source": row["document_source"]
-            }
-            for row in results
-        ]
+            return [
+                {
+                    "chunk_id": row["chunk_id"],
+                    "document_id": row["document_id"],
+                    "content": row["content"],
+                    "combined_score": row["combined_score"],
+                    "vector_similarity": row["vector_similarity"],
+                    "text_similarity": row["text_similarity"],
+                    "metadata": _decode_metadata(row["metadata"]),
+                    "document_title": row["document_title"],
+                    "document_source": row["document_source"]
+                }
+                for row in results
+            ]
+    
+    per_shard, degraded = await _scatter(search)
+    return _merge_top_k(per_shard, limit, "combined_score", degraded)
 
 
 async def enhanced_hybrid_search(
@@ -468,7 +1508,12 @@ async def enhanced_hybrid_search(
     original_query: str,
     limit: int = 10,
     text_weight: float = 0.3,
-    boost_recent_documents: bool = False
+    boost_recent_documents: bool = False,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    include_embeddings: bool = False,
+    metadata_keys: Optional[Sequence[str]] = None
 ) -> List[Dict[str, Any]]:
     """
     Perform enhanced hybrid search with advanced scoring and features.
@@ -480,63 +1525,102 @@ async def enhanced_hybrid_search(
         limit: Maximum number of results
         text_weight: Weight for text similarity (0-1)
         boost_recent_documents: Whether to boost recent documents
+        ef_search: Optional HNSW ef_search for this query
+        probes: Optional IVFFlat probes for this query
+        filters: Optional document filters (source, title, created_after, created_before, metadata)
+        include_embeddings: Also return each chunk's stored embedding (as a float32 array)
+        metadata_keys: Only return these metadata keys (None for all, [] for none)
 
     Returns:
         List of matching chunks with enhanced scoring
     """
-    async with get_db_pool().acquire() as conn:
-        # Convert embedding to PostgreSQL vector string format
-        embedding_str = '[' + ','.join(map(str, embedding)) + ']'
+    filters_json = _filters_json(filters)
+    
+    async def search(pool: DatabasePool):
+        async with ann_search_connection(ef_search, probes, filtered=filters_json != "{}", pool=pool) as conn:
+            # Convert embedding to PostgreSQL vector string format
+            embedding_str = '[' + ','.join(map(str, embedding)) + ']'
 
-        # Use enhanced hybrid search function
-        results = await conn.fetch(
-            "SELECT * FROM enhanced_hybrid_search($1::vector, $2, $3, $4, $5)",
-            embedding_str,
-            query_text,
-            limit,
-            text_weight,
-            boost_recent_documents
-        )
+            # Use enhanced hybrid search function. Per-chunk SimHash signatures (and
+            # optionally stored embeddings, in binary form so they decode without
+            # float parsing) are joined in by primary key.
+            embedding_column = ", vector_send(c.embedding) AS embedding" if include_embeddings else ""
+            query = f"""
+                SELECT s.chunk_id, s.document_id, s.content, s.enhanced_score, s.base_score,
+                       s.vector_similarity, s.text_similarity, s.recency_boost,
+                       s.content_length_factor, s.query_term_density,
+                       {_metadata_column("s.metadata", metadata_keys, 7)} AS metadata,
+                       s.document_title, s.document_source, c.simhash{embedding_column}
+                FROM enhanced_hybrid_search($1::vector, $2, $3, $4, $5, $6::jsonb) s
+                JOIN chunks c ON c.id = s.chunk_id
+                ORDER BY s.enhanced_score DESC
+            """
 
-        enhanced_results = []
-        for row in results:
-            result = {
-                "chunk_id": row["chunk_id"],
-                "document_id": row["document_id"],
-                "content": row["content"],
-                "enhanced_score": row["enhanced_score"],
-                "vector_similarity": row["vector_similarity"],
-                "text_similarity": row["text_similarity"],
-                "metadata": json.loads(row["metadata"]),
-                "document_title": row["document_title"],
-                "document_source": row["document_source"],
-                "relevance_factors": {
-                    "base_hybrid_score": row.get("base_score", 0),
-                    "recency_boost": row.get("recency_boost", 0) if boost_recent_documents else 0,
-                    "content_length_factor": row.get("content_length_factor", 1.0),
-                    "query_term_density": row.get("query_term_density", 0)
+            results = await conn.fetch(
+                query,
+                embedding_str,
+                query_text,
+                limit,
+                text_weight,
+                boost_recent_documents,
+                filters_json,
+                *_metadata_args(metadata_keys)
+            )
+
+            enhanced_results = []
+            for row in results:
+                result = {
+                    "chunk_id": row["chunk_id"],
+                    "document_id": row["document_id"],
+                    "content": row["content"],
+                    "enhanced_score": row["enhanced_score"],
+                    "vector_similarity": row["vector_similarity"],
+                    "text_similarity": row["text_similarity"],
+                    "metadata": _decode_metadata(row["metadata"]),
+                    "document_title": row["document_title"],
+                    "document_source": row["document_source"],
+                    "simhash": row["simhash"],
+                    "relevance_factors": {
+                        "base_hybrid_score": row.get("base_score", 0),
+                        "recency_boost": row.get("recency_boost", 0) if boost_recent_documents else 0,
+                        "content_length_factor": row.get("content_length_factor", 1.0),
+                        "query_term_density": row.get("query_term_density", 0)
+                    }
                 }
-            }
-            enhanced_results.append(result)
+                if include_embeddings:
+                    result["embedding"] = _decode_vector(row["embedding"]) if row["embedding"] else None
+                enhanced_results.append(result)
 
-        return enhanced_results
+            return enhanced_results
+    
+    per_shard, degraded = await _scatter(search)
+    return _merge_top_k(per_shard, limit, "enhanced_score", degraded)
 
 
 # Chunk Management Functions
-async def get_document_chunks(document_id: str) -> List[Dict[str, Any]]:
+async def get_document_chunks(
+    document_id: str,
+    metadata_keys: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
     """
     Get all chunks for a document.
     
     Args:
         document_id: Document UUID
+        metadata_keys: Only return these metadata keys (None for all, [] for none)
     
     Returns:
         List of chunks ordered by chunk index
     """
-    async with get_db_pool().acquire() as conn:
+    async with get_document_pool(document_id).acquire(readonly=True) as conn:
         results = await conn.fetch(
-            "SELECT * FROM get_document_chunks($1::uuid)",
-            document_id
+            f"""
+            SELECT g.chunk_id, g.content, g.chunk_index,
+                   {_metadata_column("g.metadata", metadata_keys, 2)} AS metadata
+            FROM get_document_chunks($1::uuid) g
+            """,
+            document_id,
+            *_metadata_args(metadata_keys)
         )
         
         return [
@@ -544,7 +1628,7 @@ async def get_document_chunks(document_id: str) -> List[Dict[str, Any]]:
                 "chunk_id": row["chunk_id"],
                 "content": row["content"],
                 "chunk_index": row["chunk_index"],
-                "metadata": json.loads(row["metadata"])
+                "metadata": _decode_metadata(row["metadata"])
             }
             for row in results
         ]
@@ -0,0 +1,587 @@
+"""
+In-memory snapshot of the knowledge graph for fast traversal queries.
+
+The Person/Company graph is small enough to hold in process memory, so
+neighbourhood, k-hop and path queries can be answered from compressed
+sparse row (CSR) adjacency arrays instead of a Bolt round-trip per query.
+The snapshot is optional (``GRAPH_SNAPSHOT_ENABLED``), loaded at API
+startup, and reloaded in the background whenever ingestion bumps the graph
+epoch stored in Neo4j.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+GRAPH_SNAPSHOT_ENABLED = os.getenv("GRAPH_SNAPSHOT_ENABLED", "false").lower() == "true"
+GRAPH_SNAPSHOT_CHECK_INTERVAL = float(os.getenv("GRAPH_SNAPSHOT_CHECK_INTERVAL", "30"))
+
+_NODE_QUERY = """
+MATCH (n)
+WHERE n:Entity OR n:Person OR n:Company
+RETURN n.uuid AS uuid,
+       n.name AS name,
+       labels(n) AS labels,
+       n.summary AS summary
+"""
+
+_EDGE_QUERY = """
+MATCH (a)-[r:RELATES_TO]->(b)
+WHERE (a:Entity OR a:Person OR a:Company)
+  AND (b:Entity OR b:Person OR b:Company)
+RETURN r.uuid AS uuid,
+       r.name AS name,
+       r.fact AS fact,
+       a.uuid AS source_node_uuid,
+       b.uuid AS target_node_uuid,
+       toString(r.valid_at) AS valid_at,
+       toString(r.invalid_at) AS invalid_at
+"""
+
+
+class GraphSnapshot:
+    """
+    Immutable CSR view of entity nodes and ``RELATES_TO`` fact edges.
+
+    Adjacency is stored undirected: ``offsets[i]:offsets[i + 1]`` slices
+    ``indices`` (neighbour node) and ``edge_ids`` (edge record) for node ``i``.
+    Edge direction, type and fact text are kept per edge so results can be
+    rendered exactly like the Cypher equivalents.
+    """
+
+    def __init__(
+        self,
+        nodes: Iterable[Dict[str, Any]],
+        edges: Iterable[Dict[str, Any]],
+        epoch: int = 0,
+        loaded_at: Optional[datetime] = None
+    ):
+        """
+        Build the snapshot.
+
+        Args:
+            nodes: Node records with uuid, name, labels and summary
+            edges: Edge records with uuid, name, fact, source_node_uuid,
+                target_node_uuid, valid_at and invalid_at
+            epoch: Graph epoch the records were loaded at
+            loaded_at: When the records were read from Neo4j
+        """
+        self.epoch = epoch
+        self.loaded_at = loaded_at or datetime.now(timezone.utc)
+
+        self.nodes: List[Dict[str, Any]] = []
+        self.uuid_to_index: Dict[str, int] = {}
+        for node in nodes:
+            uuid = node.get("uuid")
+            if not uuid:
+                continue
+            record = {
+                "uuid": uuid,
+                "name": node.get("name") or "",
+                "labels": [label for label in (node.get("labels") or []) if label != "Entity"],
+                "summary": node.get("summary")
+            }
+            if uuid in self.uuid_to_index:
+                self.nodes[self.uuid_to_index[uuid]] = record
+            else:
+                self.uuid_to_index[uuid] = len(self.nodes)
+                self.nodes.append(record)
+
+        self._lower_names = [node["name"].lower() for node in self.nodes]
+        self._name_index: Dict[str, List[int]] = {}
+        for index, name in enumerate(self._lower_names):
+            self._name_index.setdefault(name, []).append(index)
+
+        # Keep the latest record per edge uuid and drop edges to unknown nodes
+        edge_records: Dict[str, Dict[str, Any]] = {}
+        for edge in edges:
+            uuid = edge.get("uuid")
+            if (
+                uuid
+                and edge.get("source_node_uuid") in self.uuid_to_index
+                and edge.get("target_node_uuid") in self.uuid_to_index
+            ):
+                edge_records[uuid] = edge
+        self.edges: List[Dict[str, Any]] = list(edge_records.values())
+
+        self.edge_type_names: List[str] = []
+        type_codes: Dict[str, int] = {}
+        for edge in self.edges:
+            edge_type = (edge.get("name") or "RELATES_TO").upper()
+            if edge_type not in type_codes:
+                type_codes[edge_type] = len(self.edge_type_names)
+                self.edge_type_names.append(edge_type)
+        self._type_codes = type_codes
+
+        edge_count = len(self.edges)
+        node_count = len(self.nodes)
+        self.edge_source = np.fromiter(
+            (self.uuid_to_index[e["source_node_uuid"]] for e in self.edges), dtype=np.int32, count=edge_count
+        )
+        self.edge_target = np.fromiter(
+            (self.uuid_to_index[e["target_node_uuid"]] for e in self.edges), dtype=np.int32, count=edge_count
+        )
+        self.edge_types = np.fromiter(
+            (type_codes[(e.get("name") or "RELATES_TO").upper()] for e in self.edges), dtype=np.int16, count=edge_count
+        )
+        self.edge_invalid = np.fromiter(
+            (bool(e.get("invalid_at")) for e in self.edges), dtype=bool, count=edge_count
+        )
+
+        # Undirected CSR: every edge appears once from each endpoint
+        src = np.concatenate([self.edge_source, self.edge_target])
+        dst = np.concatenate([self.edge_target, self.edge_source])
+        eid = np.concatenate([np.arange(edge_count, dtype=np.int32)] * 2)
+        order = np.argsort(src, kind="stable")
+        self.indices = dst[order].astype(np.int32)
+        self.edge_ids = eid[order].astype(np.int32)
+        self.offsets = np.zeros(node_count + 1, dtype=np.int32)
+        np.cumsum(np.bincount(src, minlength=node_count), out=self.offsets[1:])
+
+    @property
+    def node_count(self) -> int:
+        """Number of nodes in the snapshot."""
+        return len(self.nodes)
+
+    @property
+    def edge_count(self) -> int:
+        """Number of edges in the snapshot."""
+        return len(self.edges)
+
+    def resolve(self, entity_name: str, limit: int = 3) -> List[int]:
+        """
+        Resolve an entity name to node indices.
+
+        Exact (case-insensitive) matches come first, then the shortest names
+        containing the query, matching ``GraphitiClient.resolve_entity_nodes``.
+
+        Args:
+            entity_name: Name of the entity
+            limit: Maximum number of candidate nodes
+
+        Returns:
+            Node indices
+        """
+        query = entity_name.strip().lower()
+        if not query:
+            return []
+
+        exact = list(self._name_index.get(query, []))
+        if len(exact) >= limit:
+            return exact[:limit]
+
+        partial = [
+            index for index, name in enumerate(self._lower_names)
+            if query in name and name != query
+        ]
+        partial.sort(key=lambda index: len(self._lower_names[index]))
+        return (exact + partial)[:limit]
+
+    def node_info(self, index: int, exact_name: Optional[str] = None) -> Dict[str, Any]:
+        """Return the public record for a node index."""
+        node = dict(self.nodes[index])
+        if exact_name is not None:
+            node["exact_match"] = self._lower_names[index] == exact_name.strip().lower()
+        return node
+
+    def edge_info(self, edge_id: int) -> Dict[str, Any]:
+        """Return the public record for an edge id."""
+        edge = self.edges[edge_id]
+        return {
+            "uuid": edge["uuid"],
+            "name": edge.get("name"),
+            "fact": edge.get("fact"),
+            "source_node_uuid": edge["source_node_uuid"],
+            "target_node_uuid": edge["target_node_uuid"],
+            "valid_at": edge.get("valid_at"),
+            "invalid_at": edge.get("invalid_at")
+        }
+
+    def _edge_mask(
+        self,
+        edge_ids: np.ndarray,
+        edge_types: Optional[List[str]] = None,
+        include_invalid: bool = True
+    ) -> Optional[np.ndarray]:
+        """Boolean mask selecting edges by type and validity, or None for all."""
+        mask = None
+        if edge_types:
+            codes = [self._type_codes[t.upper()] for t in edge_types if t.upper() in self._type_codes]
+            mask = np.isin(self.edge_types[edge_ids], np.asarray(codes, dtype=np.int16))
+        if not include_invalid:
+            valid = ~self.edge_invalid[edge_ids]
+            mask = valid if mask is None else mask & valid
+        return mask
+
+    def _expand(
+        self,
+        frontier: np.ndarray,
+        edge_types: Optional[List[str]] = None,
+        include_invalid: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Gather all adjacency entries of a frontier in one vectorised step.
+
+        Returns:
+            Tuple of (origin node, neighbour node, edge id) arrays
+        """
+        starts = self.offsets[frontier]
+        lengths = self.offsets[frontier + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            empty = np.empty(0, dtype=np.int32)
+            return empty, empty, empty
+
+        # Positions of every adjacency entry: each run starts at its offset
+        run_starts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions = run_starts + np.arange(total, dtype=np.int64)
+
+        origins = np.repeat(frontier, lengths)
+        neighbours = self.indices[positions]
+        edge_ids = self.edge_ids[positions]
+
+        mask = self._edge_mask(edge_ids, edge_types, include_invalid)
+        if mask is not None:
+            origins, neighbours, edge_ids = origins[mask], neighbours[mask], edge_ids[mask]
+        return origins, neighbours, edge_ids
+
+    def neighbors(
+        self,
+        index: int,
+        edge_types: Optional[List[str]] = None,
+        include_invalid: bool = True,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Direct neighbours of a node.
+
+        Args:
+            index: Node index
+            edge_types: Only follow edges with these relationship names
+            include_invalid: Whether to follow edges with an ``invalid_at``
+            limit: Maximum number of neighbours
+
+        Returns:
+            Neighbour nodes with the connecting edge and its direction
+        """
+        _, neighbours, edge_ids = self._expand(
+            np.asarray([index], dtype=np.int32), edge_types, include_invalid
+        )
+        results = []
+        for neighbour, edge_id in zip(neighbours.tolist(), edge_ids.tolist()):
+            results.append({
+                "node": self.node_info(neighbour),
+                "edge": self.edge_info(edge_id),
+                "direction": "outgoing" if self.edge_source[edge_id] == index else "incoming"
+            })
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def k_hop_subgraph(
+        self,
+        seeds: List[int],
+        depth: int = 2,
+        max_nodes: int = 500,
+        edge_types: Optional[List[str]] = None,
+        include_invalid: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Nodes and edges within ``depth`` hops of the seed nodes.
+
+        Args:
+            seeds: Seed node indices
+            depth: Number of hops to expand
+            max_nodes: Stop expanding once this many nodes were collected
+            edge_types: Only follow edges with these relationship names
+            include_invalid: Whether to follow edges with an ``invalid_at``
+
+        Returns:
+            Dictionary with ``nodes`` (including ``hops`` from the seeds),
+            ``edges`` between collected nodes, and ``truncated``
+        """
+        hop_of = np.full(self.node_count, -1, dtype=np.int32)
+        frontier = np.unique(np.asarray(seeds, dtype=np.int32))[:max_nodes]
+        hop_of[frontier] = 0
+        collected = len(frontier)
+        collected_edges = set()
+        truncated = False
+
+        for hop in range(1, depth + 1):
+            if len(frontier) == 0:
+                break
+            _, neighbours, edge_ids = self._expand(frontier, edge_types, include_invalid)
+            new_nodes = np.unique(neighbours[hop_of[neighbours] < 0])
+            if collected + len(new_nodes) > max_nodes:
+                new_nodes = new_nodes[:max_nodes - collected]
+                truncated = True
+            hop_of[new_nodes] = hop
+            collected += len(new_nodes)
+            keep = hop_of[neighbours] >= 0
+            collected_edges.update(edge_ids[keep].tolist())
+            frontier = new_nodes
+            if truncated:
+                break
+
+        node_indices = np.nonzero(hop_of >= 0)[0]
+        nodes = []
+        for index in node_indices.tolist():
+            node = self.node_info(index)
+            node["hops"] = int(hop_of[index])
+            nodes.append(node)
+        nodes.sort(key=lambda node: node["hops"])
+
+        return {
+            "nodes": nodes,
+            "edges": [self.edge_info(edge_id) for edge_id in sorted(collected_edges)],
+            "truncated": truncated
+        }
+
+    def shortest_paths(
+        self,
+        sources: List[int],
+        targets: List[int],
+        max_depth: int = 2,
+        limit: int = 30,
+        edge_types: Optional[List[str]] = None,
+        include_invalid: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        All shortest paths between two node sets via bidirectional BFS.
+
+        The smaller frontier is expanded each round, so the search touches
+        roughly ``2 * b^(d/2)`` nodes instead of ``b^d``.
+
+        Args:
+            sources: Source node indices
+            targets: Target node indices
+            max_depth: Maximum path length in hops
+            limit: Maximum number of paths to enumerate
+            edge_types: Only follow edges with these relationship names
+            include_invalid: Whether to follow edges with an ``invalid_at``
+
+        Returns:
+            Paths as ``{"nodes": [...], "edges": [...]}`` dictionaries, in the
+            same shape as the Cypher path query
+        """
+        if not sources or not targets or max_depth < 1:
+            return []
+
+        dist = [np.full(self.node_count, -1, dtype=np.int32) for _ in range(2)]
+        parents: List[Dict[int, List[Tuple[int, int]]]] = [{}, {}]
+        frontiers = [
+            np.unique(np.asarray(sources, dtype=np.int32)),
+            np.unique(np.asarray(targets, dtype=np.int32))
+        ]
+        dist[0][frontiers[0]] = 0
+        dist[1][frontiers[1]] = 0
+        depths = [0, 0]
+        meeting = np.empty(0, dtype=np.int32)
+
+        while depths[0] + depths[1] < max_depth:
+            if len(frontiers[0]) == 0 or len(frontiers[1]) == 0:
+                break
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            side_dist = dist[side]
+            next_depth = depths[side] + 1
+
+            origins, neighbours, edge_ids = self._expand(frontiers[side], edge_types, include_invalid)
+            # Keep every parent that reaches a node at its shortest distance
+            reachable = (side_dist[neighbours] < 0) | (side_dist[neighbours] == next_depth)
+            origins, neighbours, edge_ids = origins[reachable], neighbours[reachable], edge_ids[reachable]
+            side_dist[neighbours] = next_depth
+            side_parents = parents[side]
+            for origin, neighbour, edge_id in zip(origins.tolist(), neighbours.tolist(), edge_ids.tolist()):
+                side_parents.setdefault(neighbour, []).append((origin, edge_id))
+
+            frontiers[side] = np.unique(neighbours)
+            depths[side] = next_depth
+
+            both = np.nonzero((dist[0] >= 0) & (dist[1] >= 0))[0]
+            totals = dist[0][both] + dist[1][both]
+            connected = totals > 0
+            if connected.any():
+                best = totals[connected].min()
+                meeting = both[totals == best]
+                break
+
+        paths = []
+        seen = set()
+        for node in meeting.tolist():
+            for head in self._parent_chains(node, parents[0]):
+                for tail in self._parent_chains(node, parents[1]):
+                    node_path = [step[0] for step in reversed(head)] + [node] + [step[0] for step in tail]
+                    edge_path = [step[1] for step in reversed(head)] + [step[1] for step in tail]
+                    key = tuple(edge_path)
+                    if not edge_path or key in seen or node_path[0] == node_path[-1]:
+                        continue
+                    seen.add(key)
+                    paths.append({
+                        "nodes": [
+                            {field: value for field, value in self.node_info(index).items() if field != "summary"}
+                            for index in node_path
+                        ],
+                        "edges": [self.edge_info(edge_id) for edge_id in edge_path]
+                    })
+                    if len(paths) >= limit:
+                        return paths
+        return paths
+
+    def _parent_chains(
+        self,
+        node: int,
+        parents: Dict[int, List[Tuple[int, int]]]
+    ) -> Iterator[List[Tuple[int, int]]]:
+        """Yield (parent, edge id) chains from a node back to a BFS root."""
+        if node not in parents:
+            yield []
+            return
+        for parent, edge_id in parents[node]:
+            for chain in self._parent_chains(parent, parents):
+                yield [(parent, edge_id)] + chain
+
+
+class GraphSnapshotManager:
+    """Loads the graph snapshot and keeps it in step with the graph epoch."""
+
+    def __init__(self, check_interval: float = GRAPH_SNAPSHOT_CHECK_INTERVAL):
+        """
+        Initialize the manager.
+
+        Args:
+            check_interval: Minimum seconds between graph epoch checks
+        """
+        self.check_interval = check_interval
+        self.snapshot: Optional[GraphSnapshot] = None
+        self._lock = asyncio.Lock()
+        self._last_check = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def _fetch(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Read every node and edge record."""
+        from .graph_utils import get_graph_client
+
+        client = get_graph_client()
+        if not client._initialized:
+            await client.initialize()
+
+        node_records, _, _ = await client.graphiti.driver.execute_query(
+            _NODE_QUERY, database_=client.neo4j_database
+        )
+        edge_records, _, _ = await client.graphiti.driver.execute_query(
+            _EDGE_QUERY, database_=client.neo4j_database
+        )
+        return [dict(record) for record in node_records], [dict(record) for record in edge_records]
+
+    async def load(self) -> GraphSnapshot:
+        """
+        Load a full snapshot from Neo4j.
+
+        Returns:
+            The new snapshot
+        """
+        from .graph_utils import get_graph_client
+
+        async with self._lock:
+            started = time.perf_counter()
+            loaded_at = datetime.now(timezone.utc)
+            epoch = await get_graph_client().get_graph_epoch()
+            nodes, edges = await self._fetch()
+            self.snapshot = GraphSnapshot(nodes, edges, epoch=epoch["epoch"], loaded_at=loaded_at)
+            self._last_check = time.monotonic()
+            logger.info(
+                f"Loaded graph snapshot at epoch {epoch['epoch']}: {self.snapshot.node_count} nodes, "
+                f"{self.snapshot.edge_count} edges in {(time.perf_counter() - started) * 1000:.0f}ms"
+            )
+            return self.snapshot
+
+    async def refresh(self) -> Optional[GraphSnapshot]:
+        """
+        Bring the snapshot up to the current graph epoch.
+
+        Any epoch change triggers a full reload. Ingestion updates existing
+        records in place (entity summaries, labels from label cleanup, edges
+        invalidated by later episodes), and Graphiti's created_at times say
+        nothing about when a record was last written, so no reliable delta
+        can be read.
+
+        Returns:
+            The current snapshot
+        """
+        from .graph_utils import get_graph_client
+
+        if self.snapshot is None:
+            return await self.load()
+
+        epoch = await get_graph_client().get_graph_epoch()
+        self._last_check = time.monotonic()
+        current = self.snapshot
+        if epoch["epoch"] == current.epoch:
+            return current
+
+        return await self.load()
+
+    async def get_snapshot(self) -> Optional[GraphSnapshot]:
+        """
+        Return the current snapshot, scheduling a refresh check if one is due.
+
+        The refresh runs in the background so callers are served the previous
+        snapshot rather than waiting on Neo4j.
+
+        Returns:
+            The snapshot, or None if it has not been loaded
+        """
+        if self.snapshot is None:
+            return None
+
+        due = time.monotonic() - self._last_check >= self.check_interval
+        if due and (self._refresh_task is None or self._refresh_task.done()):
+            self._last_check = time.monotonic()
+            self._refresh_task = asyncio.create_task(self._refresh_quietly())
+        return self.snapshot
+
+    async def _refresh_quietly(self):
+        """Refresh and log failures instead of raising them."""
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"Graph snapshot refresh failed: {e}")
+
+
+# Global snapshot manager
+snapshot_manager = GraphSnapshotManager()
+
+
+async def initialize_graph_snapshot() -> bool:
+    """
+    Load the graph snapshot if enabled.
+
+    Returns:
+        True if a snapshot was loaded
+    """
+    if not GRAPH_SNAPSHOT_ENABLED:
+        return False
+
+    try:
+        await snapshot_manager.load()
+        return True
+    except Exception as e:
+        logger.error(f"Failed to load graph snapshot, falling back to Cypher queries: {e}")
+        return False
+
+
+async def get_graph_snapshot() -> Optional[GraphSnapshot]:
+    """Get the loaded graph snapshot, or None if disabled or not loaded."""
+    if not GRAPH_SNAPSHOT_ENABLED:
+        return None
+    return await snapshot_manager.get_snapshot()
@@ -4,6 +4,7 @@ Graph utilities for Neo4j/Graphiti integration.
 
 import os
 import json
+import time
 import logging
 from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime, timezone
@@ -16,7 +17,16 @@ from graphiti_core.llm_client.config import LLMConfig
 from .enhanced_openai_client import EnhancedOpenAIClient
 from graphiti_core.embedder.openai import OpenAIEmbedderConfig
 from .custom_embedder import TokenLimitedOpenAIEmbedder
+from .graph_snapshot import GraphSnapshot, get_graph_snapshot
+from .cache import AsyncTTLCache, normalize_query
 from graphiti_core.cross_encoder.openai_reranker_client import OpenAIRerankerClient
+from graphiti_core.search.search import search as graphiti_search
+from graphiti_core.search.search_config import DEFAULT_SEARCH_LIMIT
+from graphiti_core.search.search_config_recipes import (
+    EDGE_HYBRID_SEARCH_RRF,
+    EDGE_HYBRID_SEARCH_CROSS_ENCODER
+)
+from graphiti_core.search.search_filters import SearchFilters
 from dotenv import load_dotenv
 
 from .entity_models import (
@@ -29,6 +39,21 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Graph search profiles:
+# - fast: BM25 + cosine similarity fused with RRF, no LLM reranking
+# - accurate: adds BFS expansion and reranks with the LLM cross-encoder
+GRAPH_SEARCH_PROFILES = {
+    "fast": EDGE_HYBRID_SEARCH_RRF,
+    "accurate": EDGE_HYBRID_SEARCH_CROSS_ENCODER
+}
+DEFAULT_GRAPH_SEARCH_PROFILE = os.getenv("GRAPH_SEARCH_PROFILE", "fast")
+
+# Graph search result cache, invalidated whenever the graph epoch changes
+GRAPH_SEARCH_CACHE_ENABLED = os.getenv("GRAPH_SEARCH_CACHE_ENABLED", "true").lower() == "true"
+GRAPH_SEARCH_CACHE_SIZE = int(os.getenv("GRAPH_SEARCH_CACHE_SIZE", "1024"))
+GRAPH_SEARCH_CACHE_TTL = float(os.getenv("GRAPH_SEARCH_CACHE_TTL", "300"))
+GRAPH_EPOCH_CHECK_INTERVAL = float(os.getenv("GRAPH_EPOCH_CHECK_INTERVAL", "10"))
+
 # Help from this PR for setting up the custom clients: https://github.com/getzep/graphiti/pull/601/files
 class GraphitiClient:
     """Manages Graphiti knowledge graph operations."""
@@ -75,6 +100,14 @@ class GraphitiClient:
         
         self.graphiti: Optional[Graphiti] = None
         self._initialized = False
+
+        self.search_cache = AsyncTTLCache(
+            "graph_search",
+            max_entries=GRAPH_SEARCH_CACHE_SIZE,
+            ttl_seconds=GRAPH_SEARCH_CACHE_TTL,
+            enabled=GRAPH_SEARCH_CACHE_ENABLED
+        )
+        self._epoch_checked_at = 0.0
     
     async def initialize(self):
         """Initialize Graphiti client."""
@@ -362,11 +395,185 @@ class GraphitiClient:
 
         return "\n".join(content_parts)
 
+    async def _sync_search_cache_epoch(self):
+        """Invalidate the search cache if the graph epoch has moved on."""
+        now = time.monotonic()
+        if now - self._epoch_checked_at < GRAPH_EPOCH_CHECK_INTERVAL:
+            return
+        self._epoch_checked_at = now
+
+        try:
+            epoch = (await self.get_graph_epoch())["epoch"]
+        except Exception as e:
+            logger.warning(f"Could not read graph epoch for search cache: {e}")
+            return
+
+        if epoch != self.search_cache.version:
+            self.search_cache.invalidate(epoch)
+
+    @staticmethod
+    def _resolve_search_profile(profile: Optional[str]) -> str:
+        """Return a known search profile name, falling back to the default."""
+        profile = (profile or DEFAULT_GRAPH_SEARCH_PROFILE).lower()
+        if profile not in GRAPH_SEARCH_PROFILES:
+            logger.warning(f"Unknown graph search profile '{profile}', using 'fast'")
+            return "fast"
+        return profile
+
+    async def _run_graphiti_search(
+        self,
+        query: str,
+        query_vector: Optional[List[float]] = None,
+        profile: str = "fast",
+        num_results: int = DEFAULT_SEARCH_LIMIT
+    ) -> List[Any]:
+        """
+        Run a Graphiti hybrid edge search with the given profile.
+
+        Equivalent to ``Graphiti.search`` but works on a copy of the search
+        recipe (``Graphiti.search`` mutates the shared one, which is unsafe
+        under concurrency) and accepts a precomputed query embedding.
+        ``num_results`` is pushed down, so it also bounds the candidate pool
+        (each search method fetches ``2 * num_results`` candidates).
+
+        Args:
+            query: Search query
+            query_vector: Query embedding, computed by Graphiti if omitted
+            profile: Search profile name
+            num_results: Maximum number of results
+
+        Returns:
+            Graphiti edge results
+        """
+        config = GRAPH_SEARCH_PROFILES[profile].model_copy(update={"limit": num_results})
+        results = await graphiti_search(
+            self.graphiti.clients,
+            query,
+            None,
+            config,
+            SearchFilters(),
+            query_vector=query_vector
+        )
+        return results.edges
+
+    async def _cached_graphiti_search(
+        self,
+        query: str,
+        profile: Optional[str] = None,
+        num_results: int = DEFAULT_SEARCH_LIMIT
+    ) -> List[Any]:
+        """
+        Run a Graphiti search through the result cache.
+
+        Identical queries (after normalization) with the same profile and
+        result count share one cached result, and concurrent identical
+        queries share one in-flight search.
+
+        Args:
+            query: Search query
+            profile: Search profile name (defaults to GRAPH_SEARCH_PROFILE)
+            num_results: Maximum number of results
+
+        Returns:
+            Graphiti edge results (shared between callers, do not mutate)
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        profile = self._resolve_search_profile(profile)
+        if not self.search_cache.enabled:
+            return await self._run_graphiti_search(query, profile=profile, num_results=num_results)
+
+        await self._sync_search_cache_epoch()
+        key = ("search", normalize_query(query), profile, num_results)
+        return await self.search_cache.get_or_load(
+            key, lambda: self._run_graphiti_search(query, profile=profile, num_results=num_results)
+        )
+
+    @staticmethod
+    def _edges_to_dicts(results: List[Any]) -> List[Dict[str, Any]]:
+        """Convert Graphiti edge results to fresh dictionaries."""
+        converted_results = []
+        for result in results:
+            if isinstance(result, dict):
+                # Already a dictionary (copied, cached results are shared)
+                converted_results.append(dict(result))
+            else:
+                # Object format, convert to dictionary
+                converted_results.append({
+                    "fact": getattr(result, "fact", ""),
+                    "uuid": str(getattr(result, "uuid", "")),
+                    "valid_at": str(result.valid_at) if hasattr(result, 'valid_at') and result.valid_at else None,
+                    "invalid_at": str(result.invalid_at) if hasattr(result, 'invalid_at') and result.invalid_at else None,
+                    "source_node_uuid": str(result.source_node_uuid) if hasattr(result, 'source_node_uuid') and result.source_node_uuid else None
+                })
+        return converted_results
+
+    async def search_many(
+        self,
+        queries: List[str],
+        profile: Optional[str] = None,
+        num_results: int = DEFAULT_SEARCH_LIMIT
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run several searches concurrently with one batched embedding call.
+
+        Queries that are already cached (or being searched) are not embedded
+        again; the rest are embedded together and searched in parallel, so
+        the wall time is close to that of a single search.
+
+        Args:
+            queries: Search queries
+            profile: Search profile name (defaults to GRAPH_SEARCH_PROFILE)
+            num_results: Maximum number of results per query
+
+        Returns:
+            Search results for each query, in input order (empty on failure)
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        profile = self._resolve_search_profile(profile)
+        await self._sync_search_cache_epoch()
+        keys = [("search", normalize_query(query), profile, num_results) for query in queries]
+
+        pending: Dict[str, str] = {}
+        for query, key in zip(queries, keys):
+            if query.strip() and key not in self.search_cache and key[1] not in pending:
+                pending[key[1]] = query
+
+        vectors: Dict[str, List[float]] = {}
+        if pending:
+            try:
+                embeddings = await self.graphiti.embedder.create_batch(
+                    [query.replace("\n", " ") for query in pending.values()]
+                )
+                vectors = dict(zip(pending.keys(), embeddings))
+            except Exception as e:
+                logger.warning(f"Batched query embedding failed, embedding per search: {e}")
+
+        async def run(query: str, key: Tuple[Any, ...]) -> List[Dict[str, Any]]:
+            try:
+                results = await self.search_cache.get_or_load(
+                    key,
+                    lambda: self._run_graphiti_search(
+                        query, vectors.get(key[1]), profile=profile, num_results=num_results
+                    )
+                )
+                return self._edges_to_dicts(results)
+            except Exception as e:
+                logger.warning(f"Search query '{query}' failed: {e}")
+                return []
+
+        return list(await asyncio.gather(*(run(query, key) for query, key in zip(queries, keys))))
+
     async def search(
         self,
         query: str,
         center_node_distance: int = 2,
-        use_hybrid_search: bool = True
+        use_hybrid_search: bool = True,
+        profile: Optional[str] = None,
+        num_results: int = DEFAULT_SEARCH_LIMIT
     ) -> List[Dict[str, Any]]:
         """
         Search the knowledge graph.
@@ -375,6 +582,8 @@ class GraphitiClient:
             query: Search query
             center_node_distance: Distance from center nodes
             use_hybrid_search: Whether to use hybrid search
+            profile: Search profile ("fast" or "accurate")
+            num_results: Maximum number of results
         
         Returns:
             Search results
@@ -383,26 +592,11 @@ class GraphitiClient:
             await self.initialize()
         
         try:
-            # Use Graphiti's search method (simplified parameters)
-            results = await self.graphiti.search(query)
+            # Use Graphiti's hybrid search with the selected profile
+            results = await self._cached_graphiti_search(query, profile=profile, num_results=num_results)
             
             # Convert results to dictionaries, handling both dict and object formats
-            converted_results = []
-            for result in results:
-                if isinstance(result, dict):
-                    # Already a dictionary
-                    converted_results.append(result)
-                else:
-                    # Object format, convert to dictionary
-                    converted_results.append({
-                        "fact": getattr(result, "fact", ""),
-                        "uuid": str(getattr(result, "uuid", "")),
-                        "valid_at": str(result.valid_at) if hasattr(result, 'valid_at') and result.valid_at else None,
-                        "invalid_at": str(result.invalid_at) if hasattr(result, 'invalid_at') and result.invalid_at else None,
-                        "source_node_uuid": str(result.source_node_uuid) if hasattr(result, 'source_node_uuid') and result.source_node_uuid else None
-                    })
-
-            return converted_results
+            return self._edges_to_dicts(results)
             
         except Exception as e:
             logger.error(f"Graph search failed: {e}")
@@ -438,7 +632,7 @@ class GraphitiClient:
         query = " ".join(query_parts) if query_parts else "nodes"
 
         try:
-            results = await self.graphiti.search(query)
+            results = await self._cached_graphiti_search(query)
 
             # Filter and format results
             node_results = []
@@ -506,10 +700,11 @@ class GraphitiClient:
             all_relationships = []
             seen_facts = set()
 
-            for query in search_queries:
-                try:
-                    results = await self.graphiti.search(query)
+            # Run all phrasings concurrently with a single embedding request
+            search_results = await self.search_many(search_queries)
 
+            for query, results in zip(search_queries, search_results):
+                try:
                     for result in results:
                         # Handle both dict and object formats
                         if isinstance(result, dict):
@@ -942,7 +1137,7 @@ class GraphitiClient:
             await self.initialize()
         
         # Use Graphiti search to find related information about the entity
-        results = await self.graphiti.search(f"relationships involving {entity_name}")
+        results = await self._cached_graphiti_search(f"relationships involving {entity_name}")
         
         # Extract entity information from the search results
         related_entities = set()
@@ -974,7 +1169,354 @@ class GraphitiClient:
             "related_facts": facts,
             "search_method": "graphiti_semantic_search"
         }
-    
+
+    async def resolve_entity_nodes(
+        self,
+        entity_name: str,
+        limit: int = 3
+    ) -> List[Dict[str, Any]]:
+        """
+        Resolve an entity name to graph nodes.
+
+        Exact (case-insensitive) name matches rank first, then the shortest
+        names containing the query, so "HKJC" does not lose to a long
+        sentence-like node name.
+
+        Args:
+            entity_name: Name of the entity
+            limit: Maximum number of candidate nodes
+
+        Returns:
+            List of candidate nodes with uuid, name, labels and summary
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        query = """
+        MATCH (n)
+        WHERE (n:Entity OR n:Person OR n:Company)
+          AND toLower(n.name) CONTAINS toLower($entity_name)
+        RETURN n.uuid AS uuid,
+               n.name AS name,
+               labels(n) AS labels,
+               n.summary AS summary,
+               CASE WHEN toLower(n.name) = toLower($entity_name) THEN 0 ELSE 1 END AS match_rank
+        ORDER BY match_rank, size(n.name)
+        LIMIT $limit
+        """
+
+        records, _, _ = await self.graphiti.driver.execute_query(
+            query,
+            params={"entity_name": entity_name.strip(), "limit": limit},
+            database_=self.neo4j_database
+        )
+
+        return [
+            {
+                "uuid": record["uuid"],
+                "name": record["name"],
+                "labels": [label for label in record["labels"] if label != "Entity"],
+                "summary": record["summary"],
+                "exact_match": record["match_rank"] == 0
+            }
+            for record in records
+        ]
+
+    async def find_paths_between_entities(
+        self,
+        entity1: str,
+        entity2: str,
+        max_depth: int = 2,
+        limit: int = 10
+    ) -> Dict[str, Any]:
+        """
+        Find connecting paths between two entities with a bounded graph search.
+
+        Both names are resolved to nodes first, then Neo4j's bidirectional
+        ``allShortestPaths`` expansion runs over ``RELATES_TO`` fact edges up
+        to ``max_depth`` hops. Episodic ``MENTIONS`` edges are not followed.
+
+        Args:
+            entity1: First entity name
+            entity2: Second entity name
+            max_depth: Maximum number of hops (1-5)
+            limit: Maximum number of paths to return
+
+        Returns:
+            Resolved nodes for both entities and ranked paths with edge facts
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        # Variable-length bounds cannot be query parameters, so clamp before formatting
+        max_depth = max(1, min(int(max_depth), 5))
+
+        source_nodes, target_nodes = await asyncio.gather(
+            self.resolve_entity_nodes(entity1),
+            self.resolve_entity_nodes(entity2)
+        )
+
+        result = {
+            "entity1_nodes": source_nodes,
+            "entity2_nodes": target_nodes,
+            "max_depth": max_depth,
+            "paths": [],
+            "source": "neo4j"
+        }
+
+        if not source_nodes or not target_nodes:
+            return result
+
+        query = """
+        MATCH (a) WHERE a.uuid IN $source_uuids
+        MATCH (b) WHERE b.uuid IN $target_uuids AND a <> b
+        MATCH p = allShortestPaths((a)-[:RELATES_TO*..%d]-(b))
+        RETURN [n IN nodes(p) | {uuid: n.uuid, name: n.name, labels: labels(n)}] AS nodes,
+               [r IN relationships(p) | {
+                   uuid: r.uuid,
+                   name: r.name,
+                   fact: r.fact,
+                   source_node_uuid: startNode(r).uuid,
+                   target_node_uuid: endNode(r).uuid,
+                   valid_at: toString(r.valid_at),
+                   invalid_at: toString(r.invalid_at)
+               }] AS edges
+        LIMIT $path_limit
+        """ % max_depth
+
+        records, _, _ = await self.graphiti.driver.execute_query(
+            query,
+            params={
+                "source_uuids": [node["uuid"] for node in source_nodes],
+                "target_uuids": [node["uuid"] for node in target_nodes],
+                # Fetch extra paths so ranking has something to choose from
+                "path_limit": limit * 3
+            },
+            database_=self.neo4j_database
+        )
+
+        exact_uuids = {
+            node["uuid"] for node in source_nodes + target_nodes if node["exact_match"]
+        }
+        result["paths"] = rank_entity_paths(
+            [{"nodes": record["nodes"], "edges": record["edges"]} for record in records],
+            exact_uuids
+        )[:limit]
+
+        return result
+
+    async def get_entity_neighbors(
+        self,
+        entity_name: str,
+        relationship_types: Optional[List[str]] = None,
+        include_invalid: bool = True,
+        limit: int = 25
+    ) -> Dict[str, Any]:
+        """
+        Get the direct neighbours of an entity over fact edges.
+
+        Args:
+            entity_name: Name of the entity
+            relationship_types: Only follow relationships with these names
+            include_invalid: Whether to follow facts that have been invalidated
+            limit: Maximum number of neighbours
+
+        Returns:
+            Resolved entity nodes and neighbours with the connecting edge
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        seed_nodes = (await self.resolve_entity_nodes(entity_name))[:1]
+        result = {"entity": entity_name, "entity_nodes": seed_nodes, "neighbors": [], "source": "neo4j"}
+        if not seed_nodes:
+            return result
+
+        query = """
+        MATCH (n {uuid: $uuid})-[r:RELATES_TO]-(m)
+        WHERE ($types IS NULL OR toUpper(r.name) IN $types)
+          AND ($include_invalid OR r.invalid_at IS NULL)
+        RETURN m.uuid AS uuid, m.name AS name, labels(m) AS labels, m.summary AS summary,
+               r.uuid AS edge_uuid, r.name AS edge_name, r.fact AS fact,
+               startNode(r).uuid AS source_node_uuid, endNode(r).uuid AS target_node_uuid,
+               toString(r.valid_at) AS valid_at, toString(r.invalid_at) AS invalid_at
+        LIMIT $limit
+        """
+
+        records, _, _ = await self.graphiti.driver.execute_query(
+            query,
+            params={
+                "uuid": seed_nodes[0]["uuid"],
+                "types": [t.upper() for t in relationship_types] if relationship_types else None,
+                "include_invalid": include_invalid,
+                "limit": limit
+            },
+            database_=self.neo4j_database
+        )
+
+        result["neighbors"] = [
+            {
+                "node": {
+                    "uuid": record["uuid"],
+                    "name": record["name"],
+                    "labels": [label for label in record["labels"] if label != "Entity"],
+                    "summary": record["summary"]
+                },
+                "edge": {
+                    "uuid": record["edge_uuid"],
+                    "name": record["edge_name"],
+                    "fact": record["fact"],
+                    "source_node_uuid": record["source_node_uuid"],
+                    "target_node_uuid": record["target_node_uuid"],
+                    "valid_at": record["valid_at"],
+                    "invalid_at": record["invalid_at"]
+                },
+                "direction": "outgoing" if record["source_node_uuid"] == seed_nodes[0]["uuid"] else "incoming"
+            }
+            for record in records
+        ]
+        return result
+
+    async def get_entity_subgraph(
+        self,
+        entity_name: str,
+        depth: int = 2,
+        max_nodes: int = 200
+    ) -> Dict[str, Any]:
+        """
+        Get the k-hop neighbourhood of an entity over fact edges.
+
+        Args:
+            entity_name: Name of the entity
+            depth: Number of hops to expand (1-3)
+            max_nodes: Maximum number of nodes to return
+
+        Returns:
+            Resolved entity nodes, subgraph nodes with hop distance, and the
+            fact edges between them
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        # Variable-length bounds cannot be query parameters, so clamp before formatting
+        depth = max(1, min(int(depth), 3))
+
+        seed_nodes = (await self.resolve_entity_nodes(entity_name))[:1]
+        result = {
+            "entity": entity_name,
+            "entity_nodes": seed_nodes,
+            "nodes": [],
+            "edges": [],
+            "truncated": False,
+            "source": "neo4j"
+        }
+        if not seed_nodes:
+            return result
+
+        node_query = """
+        MATCH path = (n {uuid: $uuid})-[:RELATES_TO*1..%d]-(m)
+        WHERE m <> n
+        WITH m, min(length(path)) AS hops
+        ORDER BY hops
+        LIMIT $limit
+        RETURN m.uuid AS uuid, m.name AS name, labels(m) AS labels, m.summary AS summary, hops
+        """ % depth
+
+        records, _, _ = await self.graphiti.driver.execute_query(
+            node_query,
+            params={"uuid": seed_nodes[0]["uuid"], "limit": max_nodes},
+            database_=self.neo4j_database
+        )
+
+        nodes = [dict(seed_nodes[0], hops=0)]
+        nodes[0].pop("exact_match", None)
+        for record in records:
+            nodes.append({
+                "uuid": record["uuid"],
+                "name": record["name"],
+                "labels": [label for label in record["labels"] if label != "Entity"],
+                "summary": record["summary"],
+                "hops": record["hops"]
+            })
+        result["nodes"] = nodes[:max_nodes]
+        result["truncated"] = len(records) >= max_nodes
+
+        edge_query = """
+        MATCH (a)-[r:RELATES_TO]->(b)
+        WHERE a.uuid IN $uuids AND b.uuid IN $uuids
+        RETURN r.uuid AS uuid, r.name AS name, r.fact AS fact,
+               a.uuid AS source_node_uuid, b.uuid AS target_node_uuid,
+               toString(r.valid_at) AS valid_at, toString(r.invalid_at) AS invalid_at
+        """
+
+        edge_records, _, _ = await self.graphiti.driver.execute_query(
+            edge_query,
+            params={"uuids": [node["uuid"] for node in result["nodes"]]},
+            database_=self.neo4j_database
+        )
+        result["edges"] = [dict(record) for record in edge_records]
+        return result
+
+    async def get_graph_epoch(self) -> Dict[str, int]:
+        """
+        Get the graph epoch counter.
+
+        The epoch is bumped after every ingestion that changes the graph, so
+        in-process snapshots and caches can tell when they are stale.
+
+        Returns:
+            Dictionary with the current ``epoch`` and the ``reset_epoch`` of
+            the last destructive change
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        records, _, _ = await self.graphiti.driver.execute_query(
+            """
+            MATCH (m:GraphEpoch {key: 'graph'})
+            RETURN m.epoch AS epoch, m.reset_epoch AS reset_epoch
+            """,
+            database_=self.neo4j_database
+        )
+
+        if not records:
+            return {"epoch": 0, "reset_epoch": 0}
+        return {
+            "epoch": records[0]["epoch"] or 0,
+            "reset_epoch": records[0]["reset_epoch"] or 0
+        }
+
+    async def bump_graph_epoch(self, reset: bool = False) -> int:
+        """
+        Increment the graph epoch counter.
+
+        Args:
+            reset: Mark the change as destructive (deletes or merges), which
+                forces snapshots to reload instead of refreshing incrementally
+
+        Returns:
+            The new epoch
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        records, _, _ = await self.graphiti.driver.execute_query(
+            """
+            MERGE (m:GraphEpoch {key: 'graph'})
+            ON CREATE SET m.epoch = 0, m.reset_epoch = 0
+            SET m.epoch = m.epoch + 1, m.updated_at = datetime()
+            SET m.reset_epoch = CASE WHEN $reset THEN m.epoch ELSE m.reset_epoch END
+            RETURN m.epoch AS epoch
+            """,
+            params={"reset": reset},
+            database_=self.neo4j_database
+        )
+
+        epoch = records[0]["epoch"]
+        self.search_cache.invalidate(epoch)
+        logger.info(f"Graph epoch bumped to {epoch}{' (reset)' if reset else ''}")
+        return epoch
+
     async def get_entity_timeline(
         self,
         entity_name: str,
@@ -996,7 +1538,7 @@ class GraphitiClient:
             await self.initialize()
         
         # Search for temporal information about the entity
-        results = await self.graphiti.search(f"timeline history of {entity_name}")
+        results = await self._cached_graphiti_search(f"timeline history of {entity_name}")
         
         timeline = []
         for result in results:
@@ -1058,6 +1600,7 @@ class GraphitiClient:
             # Use Graphiti's proper clear_data function with the driver
             await clear_data(self.graphiti.driver)
             logger.warning("Cleared all data from knowledge graph")
+            await self.bump_graph_epoch(reset=True)
         except Exception as e:
             logger.error(f"Failed to clear graph using clear_data: {e}")
             # Fallback: Close and reinitialize (this will create fresh indices)
@@ -1185,6 +1728,11 @@ def get_neo4j_session_sync():
     return sync_driver.session(database=client.neo4j_database)
 
 
+def get_graph_search_cache_stats() -> Dict[str, Any]:
+    """Get statistics for the graph search result cache."""
+    return get_graph_client().search_cache.stats()
+
+
 async def initialize_graph():
     """Initialize graph client."""
     client = get_graph_client()
@@ -1230,18 +1778,41 @@ async def add_to_knowledge_graph(
 
 
 async def search_knowledge_graph(
-    query: str
+    query: str,
+    profile: Optional[str] = None,
+    num_results: int = DEFAULT_SEARCH_LIMIT
 ) -> List[Dict[str, Any]]:
     """
     Search the knowledge graph.
     
     Args:
         query: Search query
+        profile: Search profile ("fast" or "accurate")
+        num_results: Maximum number of results
     
     Returns:
         Search results
     """
-    return await get_graph_client().search(query)
+    return await get_graph_client().search(query, profile=profile, num_results=num_results)
+
+
+async def search_knowledge_graph_many(
+    queries: List[str],
+    profile: Optional[str] = None,
+    num_results: int = DEFAULT_SEARCH_LIMIT
+) -> List[List[Dict[str, Any]]]:
+    """
+    Search the knowledge graph for several queries at once.
+    
+    Args:
+        queries: Search queries
+        profile: Search profile ("fast" or "accurate")
+        num_results: Maximum number of results per query
+    
+    Returns:
+        Search results for each query, in input order
+    """
+    return await get_graph_client().search_many(queries, profile=profile, num_results=num_results)
 
 
 async def get_entity_relationships(
@@ -1261,6 +1832,197 @@ async def get_entity_relationships(
     return await get_graph_client().get_related_entities(entity, depth=depth)
 
 
+def rank_entity_paths(
+    paths: List[Dict[str, Any]],
+    exact_node_uuids: Optional[set] = None
+) -> List[Dict[str, Any]]:
+    """
+    Deduplicate and rank graph paths between two entities.
+
+    Shorter paths rank first. Within the same length, paths made only of
+    currently valid facts and paths whose endpoints matched the entity names
+    exactly score higher.
+
+    Args:
+        paths: Paths as returned by the path query (``nodes`` and ``edges`` lists)
+        exact_node_uuids: UUIDs of nodes that matched an entity name exactly
+
+    Returns:
+        Ranked paths with hop count, score and a readable summary
+    """
+    exact_node_uuids = exact_node_uuids or set()
+    ranked = []
+    seen = set()
+
+    for path in paths:
+        nodes = path.get("nodes") or []
+        edges = path.get("edges") or []
+        if not edges:
+            continue
+
+        path_key = tuple(edge.get("uuid") for edge in edges)
+        if path_key in seen:
+            continue
+        seen.add(path_key)
+
+        hops = len(edges)
+        score = 1.0 / hops
+        if any(edge.get("invalid_at") for edge in edges):
+            score *= 0.8
+        if nodes and nodes[0].get("uuid") in exact_node_uuids and nodes[-1].get("uuid") in exact_node_uuids:
+            score *= 1.1
+
+        # Render each hop in its stored direction, e.g. "A -[EMPLOYED_BY]-> B"
+        summary = nodes[0].get("name", "") if nodes else ""
+        for index, edge in enumerate(edges):
+            next_node = nodes[index + 1] if index + 1 < len(nodes) else {}
+            relation = edge.get("name") or "RELATES_TO"
+            if edge.get("source_node_uuid") == next_node.get("uuid"):
+                summary += f" <-[{relation}]- {next_node.get('name', '')}"
+            else:
+                summary += f" -[{relation}]-> {next_node.get('name', '')}"
+
+        ranked.append({
+            "hops": hops,
+            "score": round(min(score, 1.0), 4),
+            "nodes": nodes,
+            "edges": edges,
+            "summary": summary
+        })
+
+    ranked.sort(key=lambda p: (p["hops"], -p["score"]))
+    return ranked
+
+
+async def find_entity_paths(
+    entity1: str,
+    entity2: str,
+    max_depth: int = 2,
+    limit: int = 10
+) -> Dict[str, Any]:
+    """
+    Find ranked graph paths between two entities.
+
+    Args:
+        entity1: First entity name
+        entity2: Second entity name
+        max_depth: Maximum number of hops
+        limit: Maximum number of paths
+
+    Returns:
+        Resolved nodes and ranked paths
+    """
+    snapshot = await get_graph_snapshot()
+    if snapshot is not None:
+        return _find_snapshot_paths(snapshot, entity1, entity2, max_depth=max_depth, limit=limit)
+
+    return await get_graph_client().find_paths_between_entities(
+        entity1, entity2, max_depth=max_depth, limit=limit
+    )
+
+
+def _find_snapshot_paths(
+    snapshot: GraphSnapshot,
+    entity1: str,
+    entity2: str,
+    max_depth: int = 2,
+    limit: int = 10
+) -> Dict[str, Any]:
+    """Path search against the in-memory snapshot, shaped like the Cypher version."""
+    max_depth = max(1, min(int(max_depth), 5))
+    sources = snapshot.resolve(entity1)
+    targets = snapshot.resolve(entity2)
+
+    source_nodes = [snapshot.node_info(index, exact_name=entity1) for index in sources]
+    target_nodes = [snapshot.node_info(index, exact_name=entity2) for index in targets]
+    exact_uuids = {node["uuid"] for node in source_nodes + target_nodes if node["exact_match"]}
+
+    # Search each candidate pair separately, like allShortestPaths in Cypher,
+    # so a closer but less likely name match does not hide the other pairs
+    paths = []
+    for source in sources:
+        for target in targets:
+            if source != target:
+                paths.extend(snapshot.shortest_paths([source], [target], max_depth=max_depth, limit=limit * 3))
+
+    return {
+        "entity1_nodes": source_nodes,
+        "entity2_nodes": target_nodes,
+        "max_depth": max_depth,
+        "paths": rank_entity_paths(paths, exact_uuids)[:limit],
+        "source": "snapshot"
+    }
+
+
+async def get_entity_neighbors(
+    entity: str,
+    relationship_types: Optional[List[str]] = None,
+    include_invalid: bool = True,
+    limit: int = 25
+) -> Dict[str, Any]:
+    """
+    Get direct neighbours of an entity, from the snapshot when loaded.
+
+    Args:
+        entity: Entity name
+        relationship_types: Only follow relationships with these names
+        include_invalid: Whether to follow invalidated facts
+        limit: Maximum number of neighbours
+
+    Returns:
+        Resolved entity nodes and neighbours
+    """
+    snapshot = await get_graph_snapshot()
+    if snapshot is None:
+        return await get_graph_client().get_entity_neighbors(
+            entity, relationship_types=relationship_types, include_invalid=include_invalid, limit=limit
+        )
+
+    seeds = snapshot.resolve(entity, limit=1)
+    return {
+        "entity": entity,
+        "entity_nodes": [snapshot.node_info(index, exact_name=entity) for index in seeds],
+        "neighbors": snapshot.neighbors(
+            seeds[0], edge_types=relationship_types, include_invalid=include_invalid, limit=limit
+        ) if seeds else [],
+        "source": "snapshot"
+    }
+
+
+async def get_entity_subgraph(
+    entity: str,
+    depth: int = 2,
+    max_nodes: int = 200
+) -> Dict[str, Any]:
+    """
+    Get the k-hop neighbourhood of an entity, from the snapshot when loaded.
+
+    Args:
+        entity: Entity name
+        depth: Number of hops (1-3)
+        max_nodes: Maximum number of nodes
+
+    Returns:
+        Resolved entity nodes, subgraph nodes and edges
+    """
+    snapshot = await get_graph_snapshot()
+    if snapshot is None:
+        return await get_graph_client().get_entity_subgraph(entity, depth=depth, max_nodes=max_nodes)
+
+    seeds = snapshot.resolve(entity, limit=1)
+    result = {
+        "entity": entity,
+        "entity_nodes": [snapshot.node_info(index, exact_name=entity) for index in seeds],
+        "nodes": [],
+        "edges": [],
+        "truncated": False,
+        "source": "snapshot"
+    }
+    if seeds:
+        result.update(snapshot.k_hop_subgraph(seeds, depth=max(1, min(int(depth), 3)), max_nodes=max_nodes))
+    return result
+
+
 async def add_person_to_graph(
     name: str,
     person_type: Optional[PersonType] = None,
@@ -1367,7 +2129,8 @@ async def search_people(
     name_query: Optional[str] = None,
     company: Optional[str] = None,
     position: Optional[str] = None,
-    limit: int = 10
+    limit: int = 10,
+    profile: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
     Search for people in the knowledge graph.
@@ -1377,6 +2140,7 @@ async def search_people(
         company: Filter by company
         position: Filter by position
         limit: Maximum number of results
+        profile: Search profile ("fast" or "accurate")
 
     Returns:
         List of person search results
@@ -1393,8 +2157,7 @@ async def search_people(
     query = " ".join(query_parts)
 
     try:
-        results = await get_graph_client().search(query)
-        return results[:limit]
+        return await get_graph_client().search(query, profile=profile, num_results=limit)
     except Exception as e:
         logger.error(f"Person search failed: {e}")
         return []
@@ -1404,7 +2167,8 @@ async def search_companies(
     name_query: Optional[str] = None,
     industry: Optional[str] = None,
     location: Optional[str] = None,
-    limit: int = 10
+    limit: int = 10,
+    profile: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
     Search for companies in the knowledge graph.
@@ -1414,6 +2178,7 @@ async def search_companies(
         industry: Filter by industry
         location: Filter by location
         limit: Maximum number of results
+        profile: Search profile ("fast" or "accurate")
 
     Returns:
         List of company search results
@@ -1430,8 +2195,7 @@ async def search_companies(
     query = " ".join(query_parts)
 
     try:
-        results = await get_graph_client().search(query)
-        return results[:limit]
+        return await get_graph_client().search(query, profile=profile, num_results=limit)
     except Exception as e:
         logger.error(f"Company search failed: {e}")
         return []
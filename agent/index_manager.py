@@ -0,0 +1,352 @@
+"""
+Vector index management for chunk embeddings.
+
+Chooses HNSW or IVFFlat parameters from the number of embedded chunks and
+rebuilds idx_chunks_embedding with CREATE INDEX CONCURRENTLY, so searches keep
+running while the new index is built. The query parameters tuned for the
+index (probes or ef_search) are stored as a JSON comment on it, and searches
+use them unless a request or the environment sets its own. With
+DATABASE_SHARD_URLS set, every shard has its own index and is checked and
+rebuilt separately.
+
+Usage:
+    python -m agent.index_manager status
+    python -m agent.index_manager rebuild [--method hnsw|ivfflat] [--force] [--dry-run]
+"""
+
+import os
+import re
+import json
+import math
+import asyncio
+import logging
+import argparse
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from .db_utils import (
+    DatabasePool,
+    get_db_pool,
+    get_corpus_pools,
+    initialize_database,
+    close_database,
+    parse_index_query_params
+)
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "idx_chunks_embedding"
+INDEX_OPCLASS = "vector_cosine_ops"
+
+# Above this many rows HNSW builds get slow and memory hungry; prefer IVFFlat
+HNSW_MAX_ROWS = int(os.getenv("HNSW_MAX_ROWS", "5000000"))
+VECTOR_INDEX_METHOD = os.getenv("VECTOR_INDEX_METHOD", "auto").lower()
+
+_INDEX_METHOD_PATTERN = re.compile(r"USING (\w+)")
+_INDEX_PARAM_PATTERN = re.compile(r"(\w+)\s*=\s*'?(\d+)'?")
+
+
+@dataclass
+class IndexParams:
+    """Build and query parameters for the embedding index."""
+    method: str
+    build_params: Dict[str, int] = field(default_factory=dict)
+    query_params: Dict[str, int] = field(default_factory=dict)
+    row_count: int = 0
+
+    def create_sql(self, index_name: str = INDEX_NAME, concurrently: bool = True) -> str:
+        """
+        Render the CREATE INDEX statement.
+
+        Args:
+            index_name: Name of the index to create
+            concurrently: Build without blocking writes
+
+        Returns:
+            SQL statement
+        """
+        with_clause = ", ".join(f"{key} = {value}" for key, value in self.build_params.items())
+        return (
+            f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}{index_name} "
+            f"ON chunks USING {self.method} (embedding {INDEX_OPCLASS}) WITH ({with_clause})"
+        )
+
+    def comment_sql(self, index_name: str = INDEX_NAME) -> str:
+        """
+        Render the COMMENT statement that stores the query parameters on the index.
+
+        Args:
+            index_name: Name of the index to comment on
+
+        Returns:
+            SQL statement
+        """
+        # Only integer values, so the JSON needs no quoting inside the literal
+        return f"COMMENT ON INDEX {index_name} IS '{json.dumps(self.query_params, sort_keys=True)}'"
+
+
+def recommend_index_params(row_count: int, method: str = "auto") -> IndexParams:
+    """
+    Pick index parameters for a table size.
+
+    HNSW uses m=16/ef_construction=64, moving to m=24/ef_construction=128
+    past a million rows. IVFFlat uses lists ~ sqrt(rows) and probes ~ sqrt(lists).
+
+    Args:
+        row_count: Number of chunks with embeddings
+        method: "hnsw", "ivfflat" or "auto" (HNSW up to HNSW_MAX_ROWS)
+
+    Returns:
+        Recommended index parameters
+    """
+    if method == "auto":
+        method = "hnsw" if row_count <= HNSW_MAX_ROWS else "ivfflat"
+
+    if method == "hnsw":
+        if row_count < 1_000_000:
+            return IndexParams("hnsw", {"m": 16, "ef_construction": 64}, {"ef_search": 40}, row_count)
+        return IndexParams("hnsw", {"m": 24, "ef_construction": 128}, {"ef_search": 100}, row_count)
+
+    if method == "ivfflat":
+        lists = max(1, round(math.sqrt(row_count)))
+        probes = max(1, round(math.sqrt(lists)))
+        return IndexParams("ivfflat", {"lists": lists}, {"probes": probes}, row_count)
+
+    raise ValueError(f"Unknown vector index method: {method}")
+
+
+def parse_index_definition(indexdef: str) -> Optional[IndexParams]:
+    """
+    Parse method and build parameters out of a pg_indexes definition.
+
+    Args:
+        indexdef: Definition from pg_indexes.indexdef
+
+    Returns:
+        Parsed parameters, or None if the definition is not recognised
+    """
+    method_match = _INDEX_METHOD_PATTERN.search(indexdef)
+    if not method_match:
+        return None
+
+    with_part = indexdef.split(" WITH ", 1)[1] if " WITH " in indexdef else ""
+    build_params = {key: int(value) for key, value in _INDEX_PARAM_PATTERN.findall(with_part)}
+    return IndexParams(method_match.group(1), build_params)
+
+
+def needs_rebuild(current: Optional[IndexParams], recommended: IndexParams) -> bool:
+    """
+    Decide whether the current index is far enough off to rebuild.
+
+    IVFFlat lists are allowed to drift within a factor of two so that normal
+    growth does not trigger a rebuild after every ingestion run.
+
+    Args:
+        current: Parameters of the existing index (None if missing)
+        recommended: Parameters for the current table size
+
+    Returns:
+        True if the index should be rebuilt
+    """
+    if current is None or current.method != recommended.method:
+        return True
+
+    if recommended.method == "ivfflat":
+        lists = current.build_params.get("lists", 100)
+        target = recommended.build_params["lists"]
+        return not (target / 2 <= lists <= target * 2)
+
+    # pgvector defaults when parameters are omitted
+    current_hnsw = {"m": 16, "ef_construction": 64, **current.build_params}
+    return any(current_hnsw.get(key) != value for key, value in recommended.build_params.items())
+
+
+async def get_index_status(pool: Optional[DatabasePool] = None) -> Dict[str, Any]:
+    """
+    Describe the embedding index and what would be recommended for it.
+
+    Args:
+        pool: Database (shard) to inspect; defaults to the main pool
+
+    Returns:
+        Row count, current definition and validity, and recommended parameters
+    """
+    async with (pool or get_db_pool()).acquire() as conn:
+        row_count = await conn.fetchval("SELECT count(*) FROM chunks WHERE embedding IS NOT NULL")
+        index = await conn.fetchrow(
+            """
+            SELECT i.indexdef, x.indisvalid, pg_relation_size(c.oid) AS size_bytes,
+                   obj_description(c.oid, 'pg_class') AS comment
+            FROM pg_indexes i
+            JOIN pg_class c ON c.relname = i.indexname
+            JOIN pg_index x ON x.indexrelid = c.oid
+            WHERE i.tablename = 'chunks' AND i.indexname = $1
+            """,
+            INDEX_NAME
+        )
+
+    current = parse_index_definition(index["indexdef"]) if index else None
+    if current is not None:
+        current.query_params = parse_index_query_params(index["comment"])
+    recommended = recommend_index_params(row_count, VECTOR_INDEX_METHOD)
+    return {
+        "row_count": row_count,
+        "index_definition": index["indexdef"] if index else None,
+        "index_valid": index["indisvalid"] if index else False,
+        "index_size_bytes": index["size_bytes"] if index else 0,
+        "current": current,
+        "recommended": recommended,
+        "needs_rebuild": (not index or not index["indisvalid"]) or needs_rebuild(current, recommended)
+    }
+
+
+async def rebuild_embedding_index(
+    params: IndexParams,
+    maintenance_work_mem: Optional[str] = None,
+    pool: Optional[DatabasePool] = None
+):
+    """
+    Build a new embedding index concurrently and swap it in.
+
+    The replacement is built under a temporary name while the old index keeps
+    serving queries, then the old one is dropped concurrently and the new one
+    renamed. A leftover temporary index from an interrupted run is dropped first.
+
+    Args:
+        params: Index parameters to build with
+        maintenance_work_mem: Optional maintenance_work_mem for the build (e.g. "2GB")
+        pool: Database (shard) to rebuild on; defaults to the main pool
+    """
+    temp_name = f"{INDEX_NAME}_new"
+    async with (pool or get_db_pool()).acquire() as conn:
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {temp_name}")
+        if maintenance_work_mem:
+            await conn.execute("SELECT set_config('maintenance_work_mem', $1, false)", maintenance_work_mem)
+
+        logger.info(f"Building {params.method} index {params.build_params} over {params.row_count} rows")
+        try:
+            await conn.execute(params.create_sql(temp_name, concurrently=True), timeout=None)
+        finally:
+            if maintenance_work_mem:
+                await conn.execute("RESET maintenance_work_mem")
+
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+        await conn.execute(f"ALTER INDEX {temp_name} RENAME TO {INDEX_NAME}")
+        await conn.execute(params.comment_sql())
+        await conn.execute("ANALYZE chunks")
+
+    logger.info(f"Rebuilt {INDEX_NAME} using {params.method} (query defaults {params.query_params})")
+
+
+async def store_query_params(params: IndexParams, pool: Optional[DatabasePool] = None):
+    """
+    Store the query parameters for the existing index without rebuilding it.
+
+    Args:
+        params: Parameters whose query_params searches should default to
+        pool: Database (shard) to update; defaults to the main pool
+    """
+    async with (pool or get_db_pool()).acquire() as conn:
+        await conn.execute(params.comment_sql())
+
+
+async def ensure_embedding_index(
+    method: Optional[str] = None,
+    force: bool = False,
+    maintenance_work_mem: Optional[str] = None
+) -> bool:
+    """
+    Rebuild the embedding index if it no longer suits the table size.
+
+    Intended to run after bulk ingestion. Each shard is sized and rebuilt
+    on its own.
+
+    Args:
+        method: Index method override ("hnsw", "ivfflat" or "auto")
+        force: Rebuild even if the current index looks fine
+        maintenance_work_mem: Optional maintenance_work_mem for the build
+
+    Returns:
+        True if any index was rebuilt
+    """
+    rebuilt = False
+    for pool in get_corpus_pools():
+        status = await get_index_status(pool)
+        recommended = recommend_index_params(status["row_count"], method or VECTOR_INDEX_METHOD)
+
+        rebuild = force or not status["index_valid"] or needs_rebuild(status["current"], recommended)
+        if not rebuild:
+            if status["current"].query_params != recommended.query_params:
+                # e.g. an index built before query parameters were stored
+                await store_query_params(recommended, pool)
+                logger.info(f"Stored query defaults {recommended.query_params} on the embedding index")
+            logger.info(f"Embedding index is up to date ({status['index_definition']})")
+            continue
+
+        await rebuild_embedding_index(recommended, maintenance_work_mem, pool)
+        rebuilt = True
+    return rebuilt
+
+
+def _format_params(params: Optional[IndexParams]) -> str:
+    if params is None:
+        return "none"
+    build = ", ".join(f"{key}={value}" for key, value in params.build_params.items())
+    query = ", ".join(f"{key}={value}" for key, value in params.query_params.items())
+    return f"{params.method} ({build})" + (f" query: {query}" if query else "")
+
+
+async def main():
+    """Main function for the index management command."""
+    parser = argparse.ArgumentParser(description="Manage the chunk embedding index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Show the current and recommended index")
+    rebuild_parser = subparsers.add_parser("rebuild", help="Rebuild the index concurrently if needed")
+    rebuild_parser.add_argument("--method", choices=["auto", "hnsw", "ivfflat"], default=None, help="Index method")
+    rebuild_parser.add_argument("--force", action="store_true", help="Rebuild even if the index looks fine")
+    rebuild_parser.add_argument("--dry-run", action="store_true", help="Print the statement without running it")
+    rebuild_parser.add_argument("--maintenance-work-mem", default=None, help="maintenance_work_mem for the build, e.g. 2GB")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    await initialize_database()
+    try:
+        pools = get_corpus_pools()
+        for shard, pool in enumerate(pools):
+            if len(pools) > 1:
+                print(f"Shard {shard}:")
+            status = await get_index_status(pool)
+            print(f"Rows with embeddings: {status['row_count']}")
+            print(f"Current index:        {status['index_definition'] or 'missing'}"
+                  + ("" if status["index_valid"] or not status["index_definition"] else " (INVALID)"))
+            print(f"Index size:           {status['index_size_bytes'] / 1024 / 1024:.1f} MiB")
+            query_params = status["current"].query_params if status["current"] else {}
+            print(f"Query defaults:       {', '.join(f'{k}={v}' for k, v in query_params.items()) or 'server defaults'}")
+
+            if args.command == "status":
+                print(f"Recommended:          {_format_params(status['recommended'])}")
+                print(f"Needs rebuild:        {status['needs_rebuild']}")
+                continue
+
+            recommended = recommend_index_params(status["row_count"], args.method or VECTOR_INDEX_METHOD)
+            print(f"Target:               {_format_params(recommended)}")
+            if args.dry_run:
+                print(recommended.create_sql())
+
+        if args.command == "status" or args.dry_run:
+            return
+
+        rebuilt = await ensure_embedding_index(args.method, args.force, args.maintenance_work_mem)
+        print("Index rebuilt" if rebuilt else "Index already matches; use --force to rebuild anyway")
+    finally:
+        await close_database()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
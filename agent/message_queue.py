@@ -0,0 +1,297 @@
+"""
+Write-behind queue for chat message persistence.
+
+Chat endpoints hand messages to the queue instead of inserting them one at a
+time on the request path. A background task writes them in batches: as soon
+as MESSAGE_QUEUE_BATCH_SIZE messages are waiting, or MESSAGE_QUEUE_FLUSH_MS
+after the first one arrived. Ids and timestamps are assigned when a message
+is queued, so callers get the id immediately and ordering is preserved.
+
+MESSAGE_WRITE_MODE picks the durability trade-off:
+    write_behind  queue and return (the default; pending messages are lost if
+                  the process dies before a flush, but are flushed on shutdown)
+    group_commit  queue and wait until the batch holding the message commits
+    direct        insert immediately, one statement per message
+"""
+
+import os
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from .db_utils import insert_messages
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_WRITE_MODES = ("write_behind", "group_commit", "direct")
+MESSAGE_WRITE_MODE = os.getenv("MESSAGE_WRITE_MODE", "write_behind").lower()
+MESSAGE_QUEUE_FLUSH_MS = float(os.getenv("MESSAGE_QUEUE_FLUSH_MS", "20"))
+MESSAGE_QUEUE_BATCH_SIZE = int(os.getenv("MESSAGE_QUEUE_BATCH_SIZE", "200"))
+# Beyond this many unwritten messages, callers write directly (backpressure)
+MESSAGE_QUEUE_MAX_PENDING = int(os.getenv("MESSAGE_QUEUE_MAX_PENDING", "10000"))
+
+
+class _PendingMessage:
+    """A queued message and, in group_commit mode, the future its caller waits on."""
+
+    __slots__ = ("row", "future")
+
+    def __init__(self, row: tuple, future: Optional[asyncio.Future]):
+        self.row = row
+        self.future = future
+
+    @property
+    def session_id(self) -> str:
+        return self.row[1]
+
+
+class MessageWriteQueue:
+    """Batches message inserts across requests and writes them in the background."""
+
+    def __init__(
+        self,
+        mode: str = MESSAGE_WRITE_MODE,
+        flush_ms: float = MESSAGE_QUEUE_FLUSH_MS,
+        batch_size: int = MESSAGE_QUEUE_BATCH_SIZE,
+        max_pending: int = MESSAGE_QUEUE_MAX_PENDING
+    ):
+        """
+        Initialize the queue.
+
+        Args:
+            mode: write_behind, group_commit or direct
+            flush_ms: Milliseconds a batch may wait to fill up before it is written
+            batch_size: Messages per insert batch (a full batch is written at once)
+            max_pending: Unwritten messages allowed before callers write directly
+        """
+        if mode not in MESSAGE_WRITE_MODES:
+            logger.warning(f"Unknown MESSAGE_WRITE_MODE {mode!r}, using write_behind")
+            mode = "write_behind"
+        self.mode = mode
+        self.flush_interval = flush_ms / 1000
+        self.batch_size = max(1, batch_size)
+        self.max_pending = max_pending
+
+        self._pending: List[_PendingMessage] = []
+        # Batch being inserted right now (no longer pending, not yet committed)
+        self._writing: List[_PendingMessage] = []
+        self._has_pending: Optional[asyncio.Event] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._stats = {
+            "queued": 0,
+            "written": 0,
+            "batches": 0,
+            "direct_writes": 0,
+            "failed": 0
+        }
+
+    def _ensure_worker(self):
+        """Start the flush task on first use, in the running event loop."""
+        if self._task is None or self._task.done():
+            self._has_pending = asyncio.Event()
+            self._batch_full = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            if self._pending:
+                self._has_pending.set()
+            self._task = asyncio.create_task(self._run())
+
+    async def add(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Queue a message for insertion.
+
+        Args:
+            session_id: Session UUID
+            role: Message role (user/assistant/system)
+            content: Message content
+            metadata: Optional message metadata
+
+        Returns:
+            Message ID
+        """
+        message_id = str(uuid.uuid4())
+        row = (message_id, session_id, role, content, metadata or {}, datetime.now(timezone.utc))
+
+        if self.mode == "direct" or self._closed or len(self._pending) >= self.max_pending:
+            self._stats["direct_writes"] += 1
+            await insert_messages([row])
+            return message_id
+
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future() if self.mode == "group_commit" else None
+        self._pending.append(_PendingMessage(row, future))
+        self._stats["queued"] += 1
+        self._has_pending.set()
+        if len(self._pending) >= self.batch_size:
+            self._batch_full.set()
+
+        if future is not None:
+            await future
+        return message_id
+
+    def pending_messages(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Get a session's messages that are queued or being written but not yet committed.
+
+        Args:
+            session_id: Session UUID
+
+        Returns:
+            Messages in queue order, shaped like get_session_messages results
+        """
+        return [
+            {
+                "id": message.row[0],
+                "role": message.row[2],
+                "content": message.row[3],
+                "metadata": message.row[4],
+                "created_at": message.row[5].isoformat()
+            }
+            for message in self._writing + self._pending
+            if message.session_id == session_id
+        ]
+
+    async def _run(self):
+        """Write batches until closed."""
+        while True:
+            await self._has_pending.wait()
+            # Give the batch a moment to fill up unless it already has
+            if len(self._pending) < self.batch_size and not self._closed:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Message queue flush failed: {e}")
+            if self._closed and not self._pending:
+                return
+
+    async def flush(self):
+        """Write every queued message now."""
+        if self._flush_lock is None:
+            return
+
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                if len(self._pending) < self.batch_size:
+                    self._batch_full.clear()
+                if not self._pending:
+                    self._has_pending.clear()
+                self._writing = batch
+                try:
+                    await self._write(batch)
+                finally:
+                    self._writing = []
+
+    async def _write(self, batch: List[_PendingMessage]):
+        """Insert a batch, falling back to one insert per message if it fails."""
+        try:
+            await insert_messages([message.row for message in batch])
+            self._stats["batches"] += 1
+            self._stats["written"] += len(batch)
+            self._resolve(batch)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                self._drop(batch[0], e)
+                return
+            logger.warning(f"Message batch of {len(batch)} failed, writing individually: {e}")
+
+        # One bad row (e.g. a deleted session) must not take the others down with it
+        for message in batch:
+            try:
+                await insert_messages([message.row])
+                self._stats["written"] += 1
+                self._resolve([message])
+            except Exception as e:
+                self._drop(message, e)
+
+    def _drop(self, message: _PendingMessage, error: Exception):
+        """Give up on a message that could not be written."""
+        self._stats["failed"] += 1
+        logger.error(f"Dropping message {message.row[0]} for session {message.session_id}: {error}")
+        self._resolve([message], error=error)
+
+    @staticmethod
+    def _resolve(batch: List[_PendingMessage], error: Optional[Exception] = None):
+        """Wake group_commit callers waiting on these messages."""
+        for message in batch:
+            if message.future is not None and not message.future.done():
+                if error is None:
+                    message.future.set_result(message.row[0])
+                else:
+                    message.future.set_exception(error)
+
+    async def close(self):
+        """Flush everything still queued and stop the flush task (writes after this go direct)."""
+        self._closed = True
+        if self._task is not None and not self._task.done():
+            self._has_pending.set()
+            self._batch_full.set()
+            await self._task
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get queue statistics.
+
+        Returns:
+            Counters, current backlog and configuration
+        """
+        return {
+            "mode": self.mode,
+            "pending": len(self._pending),
+            "flush_ms": self.flush_interval * 1000,
+            "batch_size": self.batch_size,
+            "max_pending": self.max_pending,
+            **self._stats
+        }
+
+
+# Global message queue
+message_queue = MessageWriteQueue()
+
+
+async def enqueue_message(
+    session_id: str,
+    role: str,
+    content: str,
+    metadata: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Persist a chat message through the global write queue.
+
+    Args:
+        session_id: Session UUID
+        role: Message role (user/assistant/system)
+        content: Message content
+        metadata: Optional message metadata
+
+    Returns:
+        Message ID
+    """
+    return await message_queue.add(session_id, role, content, metadata)
+
+
+async def close_message_queue():
+    """Flush pending messages; call on shutdown before closing the database."""
+    await message_queue.close()
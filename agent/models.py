@@ -23,6 +23,12 @@ class SearchType(str, Enum):
     GRAPH = "graph"
 
 
+class SearchProfile(str, Enum):
+    """Knowledge graph search profile enumeration."""
+    FAST = "fast"  # BM25 + cosine with RRF fusion, no LLM reranking
+    ACCURATE = "accurate"  # Adds BFS expansion and LLM cross-encoder reranking
+
+
 # Request Models
 class ChatRequest(BaseModel):
     """Chat request model."""
@@ -35,14 +41,35 @@ class ChatRequest(BaseModel):
     model_config = ConfigDict(use_enum_values=True)
 
 
+class SearchFilters(BaseModel):
+    """Document filters pushed down into vector and hybrid search."""
+    source: Optional[str] = Field(None, description="Exact document source path")
+    title: Optional[str] = Field(None, description="Case-insensitive substring of the document title")
+    created_after: Optional[datetime] = Field(None, description="Only documents created at or after this time")
+    created_before: Optional[datetime] = Field(None, description="Only documents created before this time")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="JSONB containment match on document metadata")
+    
+    model_config = ConfigDict(extra="forbid")
+
+
 class SearchRequest(BaseModel):
     """Search request model."""
     query: str = Field(..., description="Search query")
+    alternative_queries: List[str] = Field(default_factory=list, max_length=10, description="Other phrasings for vector search, answered in the same round-trip")
     search_type: SearchType = Field(default=SearchType.HYBRID, description="Type of search")
     limit: int = Field(default=10, ge=1, le=50, description="Maximum results")
     filters: Dict[str, Any] = Field(default_factory=dict, description="Search filters")
+    search_profile: Optional[SearchProfile] = Field(None, description="Graph search profile (fast or accurate)")
+    ef_search: Optional[int] = Field(None, ge=1, le=1000, description="HNSW ef_search for vector/hybrid search (recall vs latency)")
+    ivfflat_probes: Optional[int] = Field(None, ge=1, le=10000, description="IVFFlat probes for vector/hybrid search (recall vs latency)")
     
     model_config = ConfigDict(use_enum_values=True)
+    
+    @field_validator('filters')
+    @classmethod
+    def validate_filters(cls, v: Dict[str, Any]) -> Dict[str, Any]:
+        """Reject unknown filter keys and normalize values."""
+        return SearchFilters(**v).model_dump(mode="json", exclude_none=True)
 
 
 # Response Models
@@ -55,6 +82,7 @@ class DocumentMetadata(BaseModel):
     created_at: datetime
     updated_at: datetime
     chunk_count: Optional[int] = None
+    total_tokens: Optional[int] = None
 
 
 class ChunkResult(BaseModel):
@@ -66,6 +94,9 @@ class ChunkResult(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict)
     document_title: str
     document_source: str
+    vector_similarity: Optional[float] = None
+    text_similarity: Optional[float] = None
+    relevance_factors: Dict[str, Any] = Field(default_factory=dict)
     
     @field_validator('score')
     @classmethod
@@ -212,6 +243,7 @@ class IngestionConfig(BaseModel):
     extract_entities: bool = True
     # New option for faster ingestion
     skip_graph_building: bool = Field(default=False, description="Skip knowledge graph building for faster ingestion")
+    skip_near_duplicates: bool = Field(default=True, description="Skip LLM extraction for near-duplicate chunks")
     
     @field_validator('chunk_overlap')
     @classmethod
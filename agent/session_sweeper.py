@@ -0,0 +1,244 @@
+"""
+Background upkeep for chat sessions and the partitioned messages table.
+
+Each sweep:
+    1. creates the monthly message partitions for the next
+       MESSAGE_PARTITIONS_AHEAD months,
+    2. deletes expired sessions, and with them their messages, in batches of
+       SESSION_SWEEP_BATCH_SIZE, at most SESSION_SWEEP_MAX_BATCHES per sweep,
+    3. with MESSAGE_RETENTION_MONTHS set, drops message partitions older than
+       that, or only detaches them for archiving with MESSAGE_PARTITION_ARCHIVE.
+
+The API sweeps every SESSION_SWEEP_INTERVAL seconds when SESSION_SWEEP_ENABLED
+is set. A Postgres advisory lock makes sure only one API worker (or cron job)
+sweeps at a time.
+
+Usage:
+    python -m agent.session_sweeper
+"""
+
+import os
+import time
+import asyncio
+import logging
+import argparse
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from .db_utils import DatabasePool, get_db_pool, initialize_database, close_database
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SESSION_SWEEP_ENABLED = os.getenv("SESSION_SWEEP_ENABLED", "true").lower() == "true"
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "3600"))
+SESSION_SWEEP_BATCH_SIZE = int(os.getenv("SESSION_SWEEP_BATCH_SIZE", "500"))
+SESSION_SWEEP_MAX_BATCHES = int(os.getenv("SESSION_SWEEP_MAX_BATCHES", "20"))
+# Pause between delete batches so the sweep does not monopolize the database
+SESSION_SWEEP_BATCH_PAUSE = float(os.getenv("SESSION_SWEEP_BATCH_PAUSE", "0.1"))
+MESSAGE_PARTITIONS_AHEAD = int(os.getenv("MESSAGE_PARTITIONS_AHEAD", "2"))
+# 0 keeps every partition
+MESSAGE_RETENTION_MONTHS = int(os.getenv("MESSAGE_RETENTION_MONTHS", "0"))
+MESSAGE_PARTITION_ARCHIVE = os.getenv("MESSAGE_PARTITION_ARCHIVE", "false").lower() == "true"
+
+# pg_try_advisory_lock key shared by every sweeper
+SWEEP_LOCK_KEY = 4_820_117_305
+
+
+async def sweep(
+    pool: Optional[DatabasePool] = None,
+    batch_size: int = SESSION_SWEEP_BATCH_SIZE,
+    max_batches: int = SESSION_SWEEP_MAX_BATCHES,
+    retention_months: int = MESSAGE_RETENTION_MONTHS,
+    archive: bool = MESSAGE_PARTITION_ARCHIVE,
+    months_ahead: int = MESSAGE_PARTITIONS_AHEAD
+) -> Dict[str, Any]:
+    """
+    Run one sweep.
+
+    Every delete batch is its own statement, so locks are held only briefly
+    and a sweep cut short keeps the batches already done.
+
+    Args:
+        pool: Pool holding sessions and messages (defaults to the main pool)
+        batch_size: Expired sessions deleted per statement
+        max_batches: Maximum delete batches in this sweep
+        retention_months: Retire message partitions older than this (0 keeps all)
+        archive: Detach retired partitions instead of dropping them
+        months_ahead: Upcoming months to create message partitions for
+
+    Returns:
+        What the sweep did (skipped is True if another sweeper held the lock)
+    """
+    async with (pool or get_db_pool()).acquire() as conn:
+        if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", SWEEP_LOCK_KEY):
+            return {"skipped": True}
+
+        try:
+            partitions_created = await conn.fetchval("SELECT ensure_message_partitions($1)", months_ahead)
+
+            sessions_deleted = 0
+            for batch in range(max_batches):
+                if batch:
+                    await asyncio.sleep(SESSION_SWEEP_BATCH_PAUSE)
+                deleted = await conn.fetchval(
+                    """
+                    WITH expired AS (
+                        SELECT id
+                        FROM sessions
+                        WHERE expires_at <= CURRENT_TIMESTAMP
+                        ORDER BY expires_at
+                        LIMIT $1
+                        FOR UPDATE SKIP LOCKED
+                    ),
+                    deleted AS (
+                        DELETE FROM sessions s
+                        USING expired e
+                        WHERE s.id = e.id
+                        RETURNING 1
+                    )
+                    SELECT count(*) FROM deleted
+                    """,
+                    batch_size
+                )
+                sessions_deleted += deleted
+                if deleted < batch_size:
+                    break
+
+            partitions_retired = []
+            if retention_months > 0:
+                rows = await conn.fetch(
+                    "SELECT * FROM retire_message_partitions($1, $2)",
+                    retention_months,
+                    archive
+                )
+                partitions_retired = [row[0] for row in rows]
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", SWEEP_LOCK_KEY)
+
+    result = {
+        "skipped": False,
+        "partitions_created": partitions_created,
+        "sessions_deleted": sessions_deleted,
+        "partitions_retired": partitions_retired,
+        "partitions_archived": archive and bool(partitions_retired)
+    }
+    if partitions_created or sessions_deleted or partitions_retired:
+        logger.info(f"Session sweep: {result}")
+    return result
+
+
+class SessionSweeper:
+    """Runs sweep() periodically in the background."""
+
+    def __init__(self, interval: float = SESSION_SWEEP_INTERVAL):
+        """
+        Initialize the sweeper.
+
+        Args:
+            interval: Seconds between sweeps
+        """
+        self.interval = interval
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.last_run: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start sweeping in the background (the first sweep runs right away)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        """Sweep every interval, logging failures instead of raising them."""
+        while True:
+            try:
+                self.last_result = await sweep()
+                self.last_run = time.time()
+            except Exception as e:
+                logger.warning(f"Session sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def stop(self):
+        """Stop the background task."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the sweeper state.
+
+        Returns:
+            Whether it is running, the interval and the last sweep's result
+        """
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval,
+            "last_run": self.last_run,
+            "last_result": self.last_result
+        }
+
+
+# Global sweeper
+session_sweeper = SessionSweeper()
+
+
+def start_session_sweeper() -> bool:
+    """
+    Start the background sweeper if enabled.
+
+    Returns:
+        True if it was started
+    """
+    if not SESSION_SWEEP_ENABLED:
+        return False
+    session_sweeper.start()
+    return True
+
+
+async def stop_session_sweeper():
+    """Stop the background sweeper."""
+    await session_sweeper.stop()
+
+
+async def main():
+    """Run a single sweep from the command line (e.g. from cron)."""
+    parser = argparse.ArgumentParser(description="Delete expired sessions and maintain message partitions")
+    parser.add_argument("--batch-size", type=int, default=SESSION_SWEEP_BATCH_SIZE, help="Sessions deleted per batch")
+    parser.add_argument("--max-batches", type=int, default=SESSION_SWEEP_MAX_BATCHES, help="Maximum delete batches")
+    parser.add_argument("--retention-months", type=int, default=MESSAGE_RETENTION_MONTHS,
+                        help="Retire message partitions older than this many months (0 keeps all)")
+    parser.add_argument("--archive", action="store_true", default=MESSAGE_PARTITION_ARCHIVE,
+                        help="Detach retired partitions instead of dropping them")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    await initialize_database()
+    try:
+        result = await sweep(
+            batch_size=args.batch_size,
+            max_batches=args.max_batches,
+            retention_months=args.retention_months,
+            archive=args.archive
+        )
+        if result["skipped"]:
+            print("Another sweep is running; nothing done")
+            return
+        print(f"Partitions created:  {result['partitions_created']}")
+        print(f"Sessions deleted:    {result['sessions_deleted']}")
+        action = "detached" if args.archive else "dropped"
+        print(f"Partitions {action}:  {', '.join(result['partitions_retired']) or 'none'}")
+    finally:
+        await close_database()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
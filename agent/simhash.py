@@ -0,0 +1,140 @@
+"""
+SimHash signatures for near-duplicate text detection.
+
+Each text gets a 64-bit signature built from hashed word shingles; texts that
+share most of their shingles end up with signatures only a few bits apart.
+SimHashIndex finds such pairs with LSH banding: the signature is split into
+max_distance + 1 bands, and any two signatures within max_distance bits must
+agree exactly on at least one band, so a lookup only compares against entries
+that share a band instead of everything seen so far.
+
+Signatures are returned as signed 64-bit integers so they fit a BIGINT column.
+"""
+
+import os
+import re
+import hashlib
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+# Signatures at most this many bits apart count as near-duplicates
+SIMHASH_MAX_DISTANCE = int(os.getenv("SIMHASH_MAX_DISTANCE", "3"))
+
+_MASK = (1 << SIMHASH_BITS) - 1
+_WORD_PATTERN = re.compile(r"\w+")
+_BIT_VALUES = np.uint64(1) << np.arange(SIMHASH_BITS, dtype=np.uint64)
+
+
+def _shingles(text: str) -> List[str]:
+    """Lower-cased overlapping word n-grams (the whole text if shorter)."""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+
+def _to_signed(value: int) -> int:
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def simhash(text: str) -> int:
+    """
+    Compute the SimHash signature of a text.
+
+    Args:
+        text: Text to sign
+
+    Returns:
+        Signed 64-bit signature (0 for text without words)
+    """
+    shingles = _shingles(text)
+    if not shingles:
+        return 0
+
+    hashes = np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+            for shingle in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+
+    # Each shingle votes +1/-1 on every bit; the signature keeps the majority
+    set_counts = ((hashes[:, None] & _BIT_VALUES) != 0).sum(axis=0)
+    signature = int(_BIT_VALUES[set_counts * 2 > len(shingles)].sum())
+    return _to_signed(signature)
+
+
+def hamming_distance(signature1: int, signature2: int) -> int:
+    """
+    Count the differing bits between two signatures.
+
+    Args:
+        signature1: First signature
+        signature2: Second signature
+
+    Returns:
+        Number of differing bits
+    """
+    return bin((signature1 ^ signature2) & _MASK).count("1")
+
+
+class SimHashIndex:
+    """In-memory LSH index over SimHash signatures."""
+
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE):
+        """
+        Initialize the index.
+
+        Args:
+            max_distance: Maximum number of differing bits for a near-duplicate
+        """
+        self.max_distance = max_distance
+        self._band_count = min(max_distance + 1, SIMHASH_BITS)
+        self._band_bits = SIMHASH_BITS // self._band_count
+        self._buckets: List[Dict[int, List[Tuple[int, Hashable]]]] = [{} for _ in range(self._band_count)]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _bands(self, signature: int) -> List[int]:
+        band_mask = (1 << self._band_bits) - 1
+        return [(signature >> (band * self._band_bits)) & band_mask for band in range(self._band_count)]
+
+    def find(self, signature: int, exclude: Optional[Callable[[Hashable], bool]] = None) -> Optional[Hashable]:
+        """
+        Find an indexed near-duplicate of a signature.
+
+        Args:
+            signature: Signature to look up
+            exclude: Skip near-duplicates whose key this returns True for
+
+        Returns:
+            Key of the first near-duplicate found, or None
+        """
+        for bucket, band in zip(self._buckets, self._bands(signature)):
+            for other, key in bucket.get(band, ()):
+                if hamming_distance(signature, other) <= self.max_distance and not (exclude and exclude(key)):
+                    return key
+        return None
+
+    def add(self, signature: int, key: Hashable):
+        """
+        Add a signature to the index.
+
+        Args:
+            signature: Signature to add
+            key: Value returned by find() for near-duplicates of this signature
+        """
+        for bucket, band in zip(self._buckets, self._bands(signature)):
+            bucket.setdefault(band, []).append((signature, key))
+        self._size += 1
@@ -3,24 +3,37 @@ Tools for the Pydantic AI agent.
 """
 
 import os
+import json
+import time
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
 from datetime import datetime
 import asyncio
 
-from pydantic import BaseModel, Field
+import numpy as np
+from pydantic import BaseModel, Field, ConfigDict
 from dotenv import load_dotenv
 
 from .db_utils import (
     vector_search,
+    vector_search_many,
     hybrid_search,
+    enhanced_hybrid_search,
+    get_corpus_version,
     get_document,
+    get_document_window,
+    get_document_chunk_range,
     list_documents,
-    get_document_chunks
+    PartialResults,
+    DOCUMENT_CHUNK_RANGE_MAX
 )
 from .graph_utils import (
     search_knowledge_graph,
+    search_knowledge_graph_many,
     get_entity_relationships,
+    find_entity_paths,
+    get_entity_neighbors,
+    get_entity_subgraph,
     search_people,
     search_companies,
     get_person_relationships,
@@ -28,8 +41,10 @@ from .graph_utils import (
     get_graph_client
 )
 from .entity_models import EntityType, PersonType, CompanyType
-from .models import ChunkResult, GraphSearchResult, DocumentMetadata
+from .models import ChunkResult, GraphSearchResult, DocumentMetadata, SearchProfile
 from .providers import get_embedding_client, get_embedding_model
+from .simhash import simhash, SimHashIndex, SIMHASH_MAX_DISTANCE
+from .cache import AsyncTTLCache, SemanticCache, normalize_query
 
 # Load environment variables
 load_dotenv()
@@ -40,6 +55,50 @@ logger = logging.getLogger(__name__)
 embedding_client = get_embedding_client()
 EMBEDDING_MODEL = get_embedding_model()
 
+# Vector/hybrid search result cache, invalidated whenever the corpus version changes
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() == "true"
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "2048"))
+RETRIEVAL_CACHE_MAX_MB = float(os.getenv("RETRIEVAL_CACHE_MAX_MB", "64"))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "600"))
+RETRIEVAL_CACHE_REFRESH_AFTER = float(os.getenv("RETRIEVAL_CACHE_REFRESH_AFTER", "300"))
+CORPUS_VERSION_CHECK_INTERVAL = float(os.getenv("CORPUS_VERSION_CHECK_INTERVAL", "10"))
+
+# Reuse results of a recent query whose embedding is nearly identical (rephrasings)
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1024"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "600"))
+
+
+def _chunk_results_size(results: List[ChunkResult]) -> int:
+    """Rough in-memory size of a list of chunk results in bytes."""
+    return sum(
+        len(r.content) + len(r.document_title) + len(r.document_source)
+        + len(json.dumps(r.metadata, default=str)) + 512
+        for r in results
+    )
+
+
+retrieval_cache = AsyncTTLCache(
+    "retrieval",
+    max_entries=RETRIEVAL_CACHE_SIZE,
+    ttl_seconds=RETRIEVAL_CACHE_TTL,
+    enabled=RETRIEVAL_CACHE_ENABLED,
+    refresh_after=RETRIEVAL_CACHE_REFRESH_AFTER,
+    max_bytes=int(RETRIEVAL_CACHE_MAX_MB * 1024 * 1024),
+    sizeof=_chunk_results_size,
+    # Results missing a failed shard are served but not cached
+    cacheable=lambda results: not isinstance(results, PartialResults)
+)
+semantic_cache = SemanticCache(
+    "semantic_retrieval",
+    max_entries=SEMANTIC_CACHE_SIZE,
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    ttl_seconds=SEMANTIC_CACHE_TTL,
+    enabled=SEMANTIC_CACHE_ENABLED
+)
+_corpus_version_checked_at = 0.0
+
 
 async def generate_embedding(text: str) -> List[float]:
     """
@@ -83,16 +142,179 @@ async def generate_embedding(text: str) -> List[float]:
         raise
 
 
+async def _sync_retrieval_cache_version():
+    """Invalidate the retrieval caches if the corpus version has moved on."""
+    global _corpus_version_checked_at
+    now = time.monotonic()
+    if now - _corpus_version_checked_at < CORPUS_VERSION_CHECK_INTERVAL:
+        return
+    _corpus_version_checked_at = now
+
+    try:
+        version = await get_corpus_version()
+    except Exception as e:
+        logger.warning(f"Could not read corpus version for retrieval cache: {e}")
+        return
+
+    if version != retrieval_cache.version:
+        retrieval_cache.invalidate(version)
+    if version != semantic_cache.version:
+        semantic_cache.invalidate(version)
+
+
+def _search_params(kind: str, input_data: BaseModel, *extra: Any) -> Tuple:
+    """Everything that shapes a search besides the query text: kind, limit, ANN settings, filters and extras."""
+    return (
+        kind,
+        input_data.limit,
+        input_data.ef_search,
+        input_data.ivfflat_probes,
+        json.dumps(input_data.filters, sort_keys=True, default=str),
+        *extra
+    )
+
+
+def _retrieval_cache_key(kind: str, input_data: BaseModel, *extra: Any) -> Tuple:
+    """Cache key for a search: the normalized query plus its search parameters."""
+    return (normalize_query(input_data.query),) + _search_params(kind, input_data, *extra)
+
+
+def _to_chunk_results(results: List[Dict[str, Any]], score_key: str) -> List[ChunkResult]:
+    """
+    Convert search rows to ChunkResult models scored by the given column.
+
+    Rows come from our own SQL functions, so the models are built without
+    validation; the score is clamped here as ChunkResult's validator would.
+    PartialResults stay PartialResults so they are kept out of the caches.
+    """
+    chunks = [
+        ChunkResult.model_construct(
+            chunk_id=str(r["chunk_id"]),
+            document_id=str(r["document_id"]),
+            content=r["content"],
+            score=max(0.0, min(1.0, r[score_key])),
+            metadata=r["metadata"],
+            document_title=r["document_title"],
+            document_source=r["document_source"]
+        )
+        for r in results
+    ]
+    return PartialResults(chunks) if isinstance(results, PartialResults) else chunks
+
+
+async def _semantic_cached_search(
+    params: Tuple,
+    embedding: List[float],
+    search: Callable[[], Awaitable[List[Dict[str, Any]]]],
+    score_key: str,
+    use_semantic: bool = True
+) -> List[ChunkResult]:
+    """
+    Run a search unless a near-identical query with the same parameters ran recently.
+
+    Args:
+        params: Search parameters from _search_params
+        embedding: Embedding of the query
+        search: Runs the search and returns its rows
+        score_key: Row column used as the result score
+        use_semantic: Look up the semantic cache first; False always searches
+            (for retrieval cache refreshes) and only stores the fresh results
+
+    Returns:
+        Search results, possibly those of the similar earlier query
+    """
+    if use_semantic:
+        found, cached = semantic_cache.lookup(params, embedding)
+        if found:
+            return cached
+
+    version = semantic_cache.version
+    results = _to_chunk_results(await search(), score_key)
+    # Don't store results from before an invalidation that happened mid-search,
+    # or results missing a failed shard
+    if semantic_cache.version == version and not isinstance(results, PartialResults):
+        semantic_cache.put(params, embedding, results)
+    return results
+
+
+def get_retrieval_cache_stats() -> Dict[str, Any]:
+    """
+    Get retrieval cache statistics.
+
+    Returns:
+        Hit/miss counters, size and configuration of the retrieval cache
+    """
+    return retrieval_cache.stats()
+
+
+def get_semantic_cache_stats() -> Dict[str, Any]:
+    """
+    Get semantic query cache statistics.
+
+    Returns:
+        Hit rate, configuration, and the hit rate other thresholds would give
+    """
+    return semantic_cache.stats()
+
+
+async def generate_embeddings(texts: List[str]) -> List[List[float]]:
+    """
+    Generate embeddings for several texts with one API request.
+
+    Args:
+        texts: Texts to embed
+
+    Returns:
+        Embedding vectors in input order
+    """
+    if not texts:
+        return []
+
+    try:
+        # Import here to avoid circular imports
+        from ..ingestion.embedder import EmbeddingGenerator
+
+        # Use the proper embedder with token limiting
+        embedder = EmbeddingGenerator(model=EMBEDDING_MODEL)
+        return await embedder.generate_embeddings_batch(texts)
+
+    except ImportError:
+        # Fallback to direct API call with basic truncation
+        max_chars = 8191 * 4  # Rough estimation
+        texts = [text[:max_chars] for text in texts]
+
+        try:
+            response = await embedding_client.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=texts
+            )
+            return [data.embedding for data in sorted(response.data, key=lambda data: data.index)]
+        except Exception as e:
+            logger.error(f"Failed to generate embeddings: {e}")
+            raise
+    except Exception as e:
+        logger.error(f"Failed to generate embeddings: {e}")
+        raise
+
+
 # Tool Input Models
 class VectorSearchInput(BaseModel):
     """Input for vector search tool."""
     query: str = Field(..., description="Search query")
+    alternative_queries: List[str] = Field(default_factory=list, max_length=10, description="Other phrasings searched in the same round-trip; results are merged")
     limit: int = Field(default=10, description="Maximum number of results")
+    ef_search: Optional[int] = Field(default=None, ge=1, le=1000, description="HNSW ef_search override")
+    ivfflat_probes: Optional[int] = Field(default=None, ge=1, le=10000, description="IVFFlat probes override")
+    filters: Dict[str, Any] = Field(default_factory=dict, description="Document filters: source, title, created_after, created_before, metadata")
 
 
 class GraphSearchInput(BaseModel):
     """Input for graph search tool."""
     query: str = Field(..., description="Search query")
+    search_profile: Optional[SearchProfile] = Field(None, description="Search profile: fast (no LLM rerank) or accurate")
+    num_results: int = Field(default=10, ge=1, le=50, description="Maximum results per query variation")
+
+    model_config = ConfigDict(use_enum_values=True)
 
 
 class HybridSearchInput(BaseModel):
@@ -100,6 +322,9 @@ class HybridSearchInput(BaseModel):
     query: str = Field(..., description="Search query")
     limit: int = Field(default=10, description="Maximum number of results")
     text_weight: float = Field(default=0.3, description="Weight for text similarity (0-1)")
+    ef_search: Optional[int] = Field(default=None, ge=1, le=1000, description="HNSW ef_search override")
+    ivfflat_probes: Optional[int] = Field(default=None, ge=1, le=10000, description="IVFFlat probes override")
+    filters: Dict[str, Any] = Field(default_factory=dict, description="Document filters: source, title, created_after, created_before, metadata")
 
 
 class EnhancedHybridSearchInput(BaseModel):
@@ -111,17 +336,39 @@ class EnhancedHybridSearchInput(BaseModel):
     enable_semantic_reranking: bool = Field(default=True, description="Enable semantic reranking")
     enable_deduplication: bool = Field(default=True, description="Enable result deduplication")
     boost_recent_documents: bool = Field(default=False, description="Boost recent documents")
+    ef_search: Optional[int] = Field(default=None, ge=1, le=1000, description="HNSW ef_search override")
+    ivfflat_probes: Optional[int] = Field(default=None, ge=1, le=10000, description="IVFFlat probes override")
+    filters: Dict[str, Any] = Field(default_factory=dict, description="Document filters: source, title, created_after, created_before, metadata")
+    metadata_keys: Optional[List[str]] = Field(default=None, description="Only return these chunk metadata keys (None for all, [] for none)")
 
 
 class DocumentInput(BaseModel):
     """Input for document retrieval."""
     document_id: str = Field(..., description="Document ID to retrieve")
+    include_content: bool = Field(default=False, description="Return the full body (prefer windows or chunk ranges)")
+
+
+class DocumentWindowInput(BaseModel):
+    """Input for reading a character window of a document."""
+    document_id: str = Field(..., description="Document ID")
+    start: int = Field(default=0, ge=0, description="Offset of the first character")
+    length: int = Field(default=4000, ge=1, description="Number of characters")
+
+
+class DocumentChunkRangeInput(BaseModel):
+    """Input for reading consecutive chunks of a document."""
+    document_id: str = Field(..., description="Document ID")
+    start_index: int = Field(default=0, ge=0, description="First chunk index")
+    end_index: Optional[int] = Field(default=None, description="Last chunk index, inclusive (defaults to start_index)")
+    chunk_id: Optional[str] = Field(default=None, description="Center the range on this chunk instead")
+    neighbors: int = Field(default=0, ge=0, le=DOCUMENT_CHUNK_RANGE_MAX, description="Extra chunks before and after the range")
 
 
 class DocumentListInput(BaseModel):
     """Input for listing documents."""
     limit: int = Field(default=20, description="Maximum number of documents")
     offset: int = Field(default=0, description="Number of documents to skip")
+    cursor: Optional[str] = Field(default=None, description="Continue after this document cursor (keyset pagination)")
 
 
 class EntityRelationshipInput(BaseModel):
@@ -143,6 +390,9 @@ class PersonSearchInput(BaseModel):
     company: Optional[str] = Field(None, description="Filter by company")
     position: Optional[str] = Field(None, description="Filter by position/title")
     limit: int = Field(default=10, description="Maximum number of results")
+    search_profile: Optional[SearchProfile] = Field(None, description="Search profile: fast or accurate")
+
+    model_config = ConfigDict(use_enum_values=True)
 
 
 class CompanySearchInput(BaseModel):
@@ -151,6 +401,9 @@ class CompanySearchInput(BaseModel):
     industry: Optional[str] = Field(None, description="Filter by industry")
     location: Optional[str] = Field(None, description="Filter by location")
     limit: int = Field(default=10, description="Maximum number of results")
+    search_profile: Optional[SearchProfile] = Field(None, description="Search profile: fast or accurate")
+
+    model_config = ConfigDict(use_enum_values=True)
 
 
 class EntityRelationshipSearchInput(BaseModel):
@@ -161,11 +414,38 @@ class EntityRelationshipSearchInput(BaseModel):
     limit: int = Field(default=10, description="Maximum number of results")
 
 
+class EntityPathInput(BaseModel):
+    """Input for path search between two entities."""
+    entity1: str = Field(..., description="First entity name")
+    entity2: str = Field(..., description="Second entity name")
+    max_depth: int = Field(default=2, ge=1, le=5, description="Maximum number of hops")
+    limit: int = Field(default=10, description="Maximum number of paths")
+
+
+class EntityNeighborsInput(BaseModel):
+    """Input for direct neighbour expansion of an entity."""
+    entity_name: str = Field(..., description="Name of the entity")
+    relationship_types: Optional[List[str]] = Field(default=None, description="Only follow these relationship names")
+    include_invalid: bool = Field(default=True, description="Whether to include invalidated facts")
+    limit: int = Field(default=25, ge=1, le=200, description="Maximum number of neighbours")
+
+
+class EntitySubgraphInput(BaseModel):
+    """Input for k-hop subgraph retrieval around an entity."""
+    entity_name: str = Field(..., description="Name of the entity")
+    depth: int = Field(default=2, ge=1, le=3, description="Number of hops to expand")
+    max_nodes: int = Field(default=200, ge=1, le=2000, description="Maximum number of nodes")
+
+
 # Tool Implementation Functions
 async def vector_search_tool(input_data: VectorSearchInput) -> List[ChunkResult]:
     """
     Perform vector similarity search.
     
+    Results are served from the retrieval cache when the same search ran
+    recently against the current corpus version, or from the semantic cache
+    when a near-identical query did.
+    
     Args:
         input_data: Search parameters
     
@@ -173,34 +453,80 @@ async def vector_search_tool(input_data: VectorSearchInput) -> List[ChunkResult]
         List of matching chunks
     """
     try:
-        # Generate embedding for the query
-        embedding = await generate_embedding(input_data.query)
-        
-        # Perform vector search
-        results = await vector_search(
-            embedding=embedding,
-            limit=input_data.limit
+        await _sync_retrieval_cache_version()
+        key = _retrieval_cache_key(
+            "vector",
+            input_data,
+            tuple(normalize_query(query) for query in input_data.alternative_queries)
         )
-
-        # Convert to ChunkResult models
-        return [
-            ChunkResult(
-                chunk_id=str(r["chunk_id"]),
-                document_id=str(r["document_id"]),
-                content=r["content"],
-                score=r["similarity"],
-                metadata=r["metadata"],
-                document_title=r["document_title"],
-                document_source=r["document_source"]
-            )
-            for r in results
-        ]
+        return list(await retrieval_cache.get_or_load(
+            key,
+            lambda: _run_vector_search(input_data),
+            refresher=lambda: _run_vector_search(input_data, use_semantic=False)
+        ))
         
     except Exception as e:
         logger.error(f"Vector search failed: {e}")
         return []
 
 
+async def _run_vector_search(input_data: VectorSearchInput, use_semantic: bool = True) -> List[ChunkResult]:
+    """Embed the query (or queries) and run the vector search (refreshes pass use_semantic=False)."""
+    queries = list(dict.fromkeys([input_data.query] + input_data.alternative_queries))
+    if len(queries) > 1:
+        results = await _multi_query_vector_search(queries, input_data)
+        return _to_chunk_results(results, "similarity")
+
+    # Generate embedding for the query
+    embedding = await generate_embedding(input_data.query)
+
+    # Perform vector search (or reuse a near-identical query's results)
+    return await _semantic_cached_search(
+        _search_params("vector", input_data),
+        embedding,
+        lambda: vector_search(
+            embedding=embedding,
+            limit=input_data.limit,
+            ef_search=input_data.ef_search,
+            probes=input_data.ivfflat_probes,
+            filters=input_data.filters
+        ),
+        "similarity",
+        use_semantic=use_semantic
+    )
+
+
+async def _multi_query_vector_search(queries: List[str], input_data: VectorSearchInput) -> List[Dict[str, Any]]:
+    """
+    Search several phrasings with one embedding request and one SQL round-trip.
+
+    Args:
+        queries: Distinct query strings (the main query first)
+        input_data: Search parameters
+
+    Returns:
+        Merged chunks, each scored by its best similarity across the queries
+    """
+    embeddings = await generate_embeddings(queries)
+    per_query = await vector_search_many(
+        embeddings,
+        limit=input_data.limit,
+        ef_search=input_data.ef_search,
+        probes=input_data.ivfflat_probes,
+        filters=input_data.filters
+    )
+
+    best: Dict[Any, Dict[str, Any]] = {}
+    for results in per_query:
+        for r in results:
+            current = best.get(r["chunk_id"])
+            if current is None or r["similarity"] > current["similarity"]:
+                best[r["chunk_id"]] = r
+
+    merged = sorted(best.values(), key=lambda r: r["similarity"], reverse=True)[:input_data.limit]
+    return PartialResults(merged) if any(isinstance(results, PartialResults) for results in per_query) else merged
+
+
 async def graph_search_tool(input_data: GraphSearchInput) -> List[GraphSearchResult]:
     """
     Enhanced search of the knowledge graph with multiple search strategies.
@@ -214,46 +540,41 @@ async def graph_search_tool(input_data: GraphSearchInput) -> List[GraphSearchRes
     try:
         # Use multiple search strategies for better coverage
         all_results = []
-        seen_facts = set()
+        seen_uuids = set()
 
-        # Strategy 1: Direct search
-        try:
-            results = await search_knowledge_graph(query=input_data.query)
+        # Direct search plus query variations, run concurrently with one
+        # batched embedding request for all of them
+        queries = [input_data.query] + [
+            variation for variation in _generate_query_variations(input_data.query)
+            if variation != input_data.query
+        ]
+        search_results = await search_knowledge_graph_many(
+            queries,
+            profile=input_data.search_profile,
+            num_results=input_data.num_results
+        )
+
+        for index, results in enumerate(search_results):
             for r in results:
-                fact = r.get("fact", "")
-                if fact and fact not in seen_facts:
-                    seen_facts.add(fact)
+                # Deduplicate by fact UUID, keeping the earliest strategy's hit
+                key = r.get("uuid") or r.get("fact", "")
+                if r.get("fact") and key not in seen_uuids:
+                    seen_uuids.add(key)
+                    if index > 0:
+                        r["search_variation"] = queries[index]
                     all_results.append(r)
-        except Exception as e:
-            logger.warning(f"Direct search failed: {e}")
-
-        # Strategy 2: Enhanced search with variations
-        query_variations = _generate_query_variations(input_data.query)
-        for variation in query_variations:
-            try:
-                results = await search_knowledge_graph(query=variation)
-                for r in results:
-                    fact = r.get("fact", "")
-                    if fact and fact not in seen_facts:
-                        seen_facts.add(fact)
-                        r["search_variation"] = variation
-                        all_results.append(r)
-            except Exception as e:
-                logger.warning(f"Variation search '{variation}' failed: {e}")
 
         # Convert to GraphSearchResult models
         graph_results = []
         for r in all_results:
-            graph_result = GraphSearchResult(
+            graph_results.append(GraphSearchResult(
                 fact=r["fact"],
                 uuid=r["uuid"],
                 valid_at=r.get("valid_at"),
                 invalid_at=r.get("invalid_at"),
-                source_node_uuid=r.get("source_node_uuid")
-            )
-            # Add search metadata
-            graph_result.search_variation = r.get("search_variation")
-            graph_results.append(graph_result)
+                source_node_uuid=r.get("source_node_uuid"),
+                search_variation=r.get("search_variation")
+            ))
 
         return graph_results
 
@@ -300,14 +621,18 @@ def _generate_query_variations(query: str) -> List[str]:
         elif expansion.upper() in query_upper:
             variations.append(query.replace(expansion, abbrev))
 
-    # Remove duplicates and return
-    return list(set(variations))[:5]  # Limit to 5 variations
+    # Remove duplicates (keeping order so repeated queries hit the search cache) and return
+    return list(dict.fromkeys(variations))[:5]  # Limit to 5 variations
 
 
 async def hybrid_search_tool(input_data: HybridSearchInput) -> List[ChunkResult]:
     """
     Perform hybrid search (vector + keyword).
     
+    Results are served from the retrieval cache when the same search ran
+    recently against the current corpus version, or from the semantic cache
+    when a near-identical query did.
+    
     Args:
         input_data: Search parameters
     
@@ -315,36 +640,42 @@ async def hybrid_search_tool(input_data: HybridSearchInput) -> List[ChunkResult]
         List of matching chunks
     """
     try:
-        # Generate embedding for the query
-        embedding = await generate_embedding(input_data.query)
-        
-        # Perform hybrid search
-        results = await hybrid_search(
-            embedding=embedding,
-            query_text=input_data.query,
-            limit=input_data.limit,
-            text_weight=input_data.text_weight
-        )
-        
-        # Convert to ChunkResult models
-        return [
-            ChunkResult(
-                chunk_id=str(r["chunk_id"]),
-                document_id=str(r["document_id"]),
-                content=r["content"],
-                score=r["combined_score"],
-                metadata=r["metadata"],
-                document_title=r["document_title"],
-                document_source=r["document_source"]
-            )
-            for r in results
-        ]
+        await _sync_retrieval_cache_version()
+        key = _retrieval_cache_key("hybrid", input_data, input_data.text_weight)
+        return list(await retrieval_cache.get_or_load(
+            key,
+            lambda: _run_hybrid_search(input_data),
+            refresher=lambda: _run_hybrid_search(input_data, use_semantic=False)
+        ))
         
     except Exception as e:
         logger.error(f"Hybrid search failed: {e}")
         return []
 
 
+async def _run_hybrid_search(input_data: HybridSearchInput, use_semantic: bool = True) -> List[ChunkResult]:
+    """Embed the query and run the hybrid search (refreshes pass use_semantic=False)."""
+    # Generate embedding for the query
+    embedding = await generate_embedding(input_data.query)
+
+    # Perform hybrid search (or reuse a near-identical query's results)
+    return await _semantic_cached_search(
+        _search_params("hybrid", input_data, input_data.text_weight),
+        embedding,
+        lambda: hybrid_search(
+            embedding=embedding,
+            query_text=input_data.query,
+            limit=input_data.limit,
+            text_weight=input_data.text_weight,
+            ef_search=input_data.ef_search,
+            probes=input_data.ivfflat_probes,
+            filters=input_data.filters
+        ),
+        "combined_score",
+        use_semantic=use_semantic
+    )
+
+
 async def enhanced_hybrid_search_tool(input_data: EnhancedHybridSearchInput) -> List[ChunkResult]:
     """
     Perform enhanced hybrid search with advanced features.
@@ -361,8 +692,15 @@ async def enhanced_hybrid_search_tool(input_data: EnhancedHybridSearchInput) ->
         if input_data.enable_query_expansion:
             processed_query = await _expand_query(input_data.query)
 
-        # Step 2: Generate embedding for the processed query
-        embedding = await generate_embedding(processed_query)
+        # Step 2: Generate embedding for the processed query. Reranking compares
+        # against the original query, which only needs its own embedding when
+        # expansion changed the text; both then go out in one request.
+        rerank = input_data.enable_semantic_reranking
+        if rerank and processed_query != input_data.query:
+            embedding, query_embedding = await generate_embeddings([processed_query, input_data.query])
+        else:
+            embedding = await generate_embedding(processed_query)
+            query_embedding = embedding
 
         # Step 3: Perform enhanced hybrid search
         results = await enhanced_hybrid_search(
@@ -371,16 +709,21 @@ async def enhanced_hybrid_search_tool(input_data: EnhancedHybridSearchInput) ->
             original_query=input_data.query,
             limit=input_data.limit,
             text_weight=input_data.text_weight,
-            boost_recent_documents=input_data.boost_recent_documents
+            boost_recent_documents=input_data.boost_recent_documents,
+            ef_search=input_data.ef_search,
+            probes=input_data.ivfflat_probes,
+            filters=input_data.filters,
+            include_embeddings=rerank,
+            metadata_keys=input_data.metadata_keys
         )
 
-        # Step 4: Apply semantic reranking if enabled
-        if input_data.enable_semantic_reranking and len(results) > 1:
-            results = await _apply_semantic_reranking(results, input_data.query)
+        # Step 4: Apply semantic reranking against the stored chunk embeddings
+        if rerank and len(results) > 1:
+            results = _apply_semantic_reranking(results, query_embedding)
 
         # Step 5: Apply deduplication if enabled
         if input_data.enable_deduplication and len(results) > 1:
-            results = await _deduplicate_results(results)
+            results = _deduplicate_results(results)
 
         # Convert to ChunkResult models with enhanced metadata
         enhanced_results = []
@@ -392,14 +735,11 @@ async def enhanced_hybrid_search_tool(input_data: EnhancedHybridSearchInput) ->
                 score=r["enhanced_score"],
                 metadata=r["metadata"],
                 document_title=r["document_title"],
-                document_source=r["document_source"]
+                document_source=r["document_source"],
+                vector_similarity=r.get("vector_similarity", 0.0),
+                text_similarity=r.get("text_similarity", 0.0),
+                relevance_factors=r.get("relevance_factors", {})
             )
-
-            # Add enhanced metadata
-            chunk_result.vector_similarity = r.get("vector_similarity", 0.0)
-            chunk_result.text_similarity = r.get("text_similarity", 0.0)
-            chunk_result.relevance_factors = r.get("relevance_factors", {})
-
             enhanced_results.append(chunk_result)
 
         return enhanced_results
@@ -411,7 +751,7 @@ async def enhanced_hybrid_search_tool(input_data: EnhancedHybridSearchInput) ->
 
 async def get_document_tool(input_data: DocumentInput) -> Optional[Dict[str, Any]]:
     """
-    Retrieve a complete document.
+    Retrieve a document's metadata, and its body only if asked for.
     
     Args:
         input_data: Document retrieval parameters
@@ -420,20 +760,55 @@ async def get_document_tool(input_data: DocumentInput) -> Optional[Dict[str, Any
         Document data or None
     """
     try:
-        document = await get_document(input_data.document_id)
-        
-        if document:
-            # Also get all chunks for the document
-            chunks = await get_document_chunks(input_data.document_id)
-            document["chunks"] = chunks
-        
-        return document
+        return await get_document(input_data.document_id, include_content=input_data.include_content)
         
     except Exception as e:
         logger.error(f"Document retrieval failed: {e}")
         return None
 
 
+async def get_document_window_tool(input_data: DocumentWindowInput) -> Optional[Dict[str, Any]]:
+    """
+    Read a character window of a document.
+    
+    Args:
+        input_data: Window parameters
+    
+    Returns:
+        Window data or None if the document is not found
+    """
+    try:
+        return await get_document_window(input_data.document_id, input_data.start, input_data.length)
+        
+    except Exception as e:
+        logger.error(f"Document window retrieval failed: {e}")
+        return None
+
+
+async def get_document_chunk_range_tool(input_data: DocumentChunkRangeInput) -> Dict[str, Any]:
+    """
+    Read consecutive chunks of a document.
+    
+    Args:
+        input_data: Chunk range parameters
+    
+    Returns:
+        Chunks ordered by chunk index and whether the range was truncated
+    """
+    try:
+        return await get_document_chunk_range(
+            input_data.document_id,
+            start_index=input_data.start_index,
+            end_index=input_data.end_index,
+            neighbors=input_data.neighbors,
+            chunk_id=input_data.chunk_id
+        )
+        
+    except Exception as e:
+        logger.error(f"Document chunk range retrieval failed: {e}")
+        return {"document_id": input_data.document_id, "chunks": [], "truncated": False}
+
+
 async def list_documents_tool(input_data: DocumentListInput) -> List[DocumentMetadata]:
     """
     List available documents.
@@ -447,7 +822,8 @@ async def list_documents_tool(input_data: DocumentListInput) -> List[DocumentMet
     try:
         documents = await list_documents(
             limit=input_data.limit,
-            offset=input_data.offset
+            offset=input_data.offset,
+            cursor=input_data.cursor
         )
         
         # Convert to DocumentMetadata models
@@ -459,7 +835,8 @@ async def list_documents_tool(input_data: DocumentListInput) -> List[DocumentMet
                 metadata=d["metadata"],
                 created_at=datetime.fromisoformat(d["created_at"]),
                 updated_at=datetime.fromisoformat(d["updated_at"]),
-                chunk_count=d.get("chunk_count")
+                chunk_count=d.get("chunk_count"),
+                total_tokens=d.get("total_tokens")
             )
             for d in documents
         ]
@@ -496,6 +873,92 @@ async def get_entity_relationships_tool(input_data: EntityRelationshipInput) ->
         }
 
 
+async def find_entity_paths_tool(input_data: EntityPathInput) -> Dict[str, Any]:
+    """
+    Find ranked paths connecting two entities in the knowledge graph.
+
+    Args:
+        input_data: Path search parameters
+
+    Returns:
+        Resolved nodes and ranked paths with their edge facts
+    """
+    try:
+        return await find_entity_paths(
+            entity1=input_data.entity1,
+            entity2=input_data.entity2,
+            max_depth=input_data.max_depth,
+            limit=input_data.limit
+        )
+
+    except Exception as e:
+        logger.error(f"Entity path search failed: {e}")
+        return {
+            "entity1_nodes": [],
+            "entity2_nodes": [],
+            "max_depth": input_data.max_depth,
+            "paths": [],
+            "error": str(e)
+        }
+
+
+async def get_entity_neighbors_tool(input_data: EntityNeighborsInput) -> Dict[str, Any]:
+    """
+    Get the direct neighbours of an entity in the knowledge graph.
+
+    Args:
+        input_data: Neighbour expansion parameters
+
+    Returns:
+        Resolved entity nodes and neighbours with the connecting facts
+    """
+    try:
+        return await get_entity_neighbors(
+            entity=input_data.entity_name,
+            relationship_types=input_data.relationship_types,
+            include_invalid=input_data.include_invalid,
+            limit=input_data.limit
+        )
+
+    except Exception as e:
+        logger.error(f"Entity neighbour query failed: {e}")
+        return {
+            "entity": input_data.entity_name,
+            "entity_nodes": [],
+            "neighbors": [],
+            "error": str(e)
+        }
+
+
+async def get_entity_subgraph_tool(input_data: EntitySubgraphInput) -> Dict[str, Any]:
+    """
+    Get the k-hop subgraph around an entity in the knowledge graph.
+
+    Args:
+        input_data: Subgraph parameters
+
+    Returns:
+        Subgraph nodes with hop distance and the facts between them
+    """
+    try:
+        return await get_entity_subgraph(
+            entity=input_data.entity_name,
+            depth=input_data.depth,
+            max_nodes=input_data.max_nodes
+        )
+
+    except Exception as e:
+        logger.error(f"Entity subgraph query failed: {e}")
+        return {
+            "entity": input_data.entity_name,
+            "entity_nodes": [],
+            "nodes": [],
+            "edges": [],
+            "truncated": False,
+            "error": str(e)
+        }
+
+
 async def get_entity_timeline_tool(input_data: EntityTimelineInput) -> List[Dict[str, Any]]:
     """
     Get timeline of facts for an entity.
@@ -545,7 +1008,8 @@ async def search_people_tool(input_data: PersonSearchInput) -> List[Dict[str, An
             name_query=input_data.name_query,
             company=input_data.company,
             position=input_data.position,
-            limit=input_data.limit
+            limit=input_data.limit,
+            profile=input_data.search_profile
         )
 
         return results
@@ -570,7 +1034,8 @@ async def search_companies_tool(input_data: CompanySearchInput) -> List[Dict[str
             name_query=input_data.name_query,
             industry=input_data.industry,
             location=input_data.location,
-            limit=input_data.limit
+            limit=input_data.limit,
+            profile=input_data.search_profile
         )
 
         return results
@@ -1525,13 +1990,17 @@ async def _expand_query(query: str) -> str:
         return query
 
 
-async def _apply_semantic_reranking(results: List[Dict[str, Any]], original_query: str) -> List[Dict[str, Any]]:
+def _apply_semantic_reranking(results: List[Dict[str, Any]], query_embedding: List[float]) -> List[Dict[str, Any]]:
     """
     Apply semantic reranking to improve result relevance.
 
+    Uses the chunk embeddings returned with the results, so reranking is a
+    single matrix-vector product with no embedding API calls. Results without
+    an embedding keep their score.
+
     Args:
-        results: Search results to rerank
-        original_query: Original search query
+        results: Search results to rerank (with "embedding" arrays)
+        query_embedding: Embedding of the original search query
 
     Returns:
         Reranked results
@@ -1540,38 +2009,38 @@ async def _apply_semantic_reranking(results: List[Dict[str, Any]], original_quer
         if len(results) <= 1:
             return results
 
-        # Generate embedding for original query
-        query_embedding = await generate_embedding(original_query)
-
-        # Calculate semantic similarity for each result
-        for result in results:
-            try:
-                # Generate embedding for result content
-                content_embedding = await generate_embedding(result["content"][:500])  # Limit content length
-
-                # Calculate cosine similarity
-                similarity = _calculate_cosine_similarity(query_embedding, content_embedding)
+        embedded = [result for result in results if result.get("embedding") is not None]
+        if not embedded:
+            return results
 
-                # Combine with existing score (weighted average)
-                original_score = result.get("enhanced_score", result.get("combined_score", 0))
-                semantic_boost = similarity * 0.3  # 30% weight for semantic similarity
+        # Cosine similarity of every result against the query at once
+        matrix = np.vstack([result["embedding"] for result in embedded])
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        similarities = np.divide(
+            matrix @ query,
+            norms,
+            out=np.zeros(len(embedded), dtype=np.float32),
+            where=norms > 0
+        )
 
-                result["enhanced_score"] = original_score * 0.7 + semantic_boost
-                result["semantic_similarity"] = similarity
+        for result, similarity in zip(embedded, similarities.tolist()):
+            # Combine with existing score (weighted average)
+            original_score = result.get("enhanced_score", result.get("combined_score", 0))
+            semantic_boost = similarity * 0.3  # 30% weight for semantic similarity
 
-                # Add relevance factors
-                if "relevance_factors" not in result:
-                    result["relevance_factors"] = {}
-                result["relevance_factors"]["semantic_reranking"] = similarity
+            result["enhanced_score"] = original_score * 0.7 + semantic_boost
+            result["semantic_similarity"] = similarity
 
-            except Exception as e:
-                logger.warning(f"Semantic reranking failed for result: {e}")
-                continue
+            # Add relevance factors
+            if "relevance_factors" not in result:
+                result["relevance_factors"] = {}
+            result["relevance_factors"]["semantic_reranking"] = similarity
 
         # Sort by enhanced score
         results.sort(key=lambda x: x.get("enhanced_score", 0), reverse=True)
 
-        logger.debug(f"Applied semantic reranking to {len(results)} results")
+        logger.debug(f"Applied semantic reranking to {len(embedded)} results")
         return results
 
     except Exception as e:
@@ -1579,13 +2048,17 @@ async def _apply_semantic_reranking(results: List[Dict[str, Any]], original_quer
         return results
 
 
-async def _deduplicate_results(results: List[Dict[str, Any]], similarity_threshold: float = 0.85) -> List[Dict[str, Any]]:
+def _deduplicate_results(results: List[Dict[str, Any]], max_distance: int = SIMHASH_MAX_DISTANCE) -> List[Dict[str, Any]]:
     """
     Remove duplicate or highly similar results.
 
+    Compares the SimHash signatures stored with each chunk through an LSH
+    index, so each result is checked in roughly constant time. Signatures
+    missing from older rows are computed from the content.
+
     Args:
-        results: Search results to deduplicate
-        similarity_threshold: Threshold for considering results as duplicates
+        results: Search results to deduplicate (best first)
+        max_distance: Maximum differing signature bits for a near-duplicate
 
     Returns:
         Deduplicated results
@@ -1594,29 +2067,24 @@ async def _deduplicate_results(results: List[Dict[str, Any]], similarity_thresho
         if len(results) <= 1:
             return results
 
+        index = SimHashIndex(max_distance)
         deduplicated = []
-        seen_content = []
 
         for result in results:
-            content = result["content"]
-            is_duplicate = False
-
-            # Check against previously seen content
-            for seen in seen_content:
-                # Simple similarity check based on content overlap
-                similarity = _calculate_text_similarity(content, seen)
-                if similarity > similarity_threshold:
-                    is_duplicate = True
-                    break
+            signature = result.get("simhash")
+            if signature is None:
+                signature = simhash(result["content"])
+
+            if index.find(signature) is not None:
+                continue
 
-            if not is_duplicate:
-                deduplicated.append(result)
-                seen_content.append(content)
+            index.add(signature, result["chunk_id"])
+            deduplicated.append(result)
 
-                # Add relevance factor
-                if "relevance_factors" not in result:
-                    result["relevance_factors"] = {}
-                result["relevance_factors"]["deduplication"] = "unique"
+            # Add relevance factor
+            if "relevance_factors" not in result:
+                result["relevance_factors"] = {}
+            result["relevance_factors"]["deduplication"] = "unique"
 
         logger.debug(f"Deduplicated {len(results)} results to {len(deduplicated)} unique results")
         return deduplicated
@@ -1624,44 +2092,3 @@ async def _deduplicate_results(results: List[Dict[str, Any]], similarity_thresho
     except Exception as e:
         logger.warning(f"Deduplication failed: {e}")
         return results
-
-
-def _calculate_cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
-    """Calculate cosine similarity between two vectors."""
-    try:
-        import math
-
-        # Calculate dot product
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-
-        # Calculate magnitudes
-        magnitude1 = math.sqrt(sum(a * a for a in vec1))
-        magnitude2 = math.sqrt(sum(a * a for a in vec2))
-
-        # Avoid division by zero
-        if magnitude1 == 0 or magnitude2 == 0:
-            return 0.0
-
-        return dot_product / (magnitude1 * magnitude2)
-
-    except Exception:
-        return 0.0
-
-
-def _calculate_text_similarity(text1: str, text2: str) -> float:
-    """Calculate text similarity using simple overlap metrics."""
-    try:
-        # Simple word-based similarity
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split())
-
-        if not words1 or not words2:
-            return 0.0
-
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-
-        return len(intersection) / len(union) if union else 0.0
-
-    except Exception:
-        return 0.0
\ No newline at end of file
@@ -58,6 +58,7 @@ class DocumentChunk:
     end_char: int
     metadata: Dict[str, Any]
     token_count: Optional[int] = None
+    simhash: Optional[int] = None
     
     def __post_init__(self):
         """Calculate token count if not provided."""
@@ -305,7 +305,8 @@ class EmbeddingGenerator:
                             "embedding_model": self.model,
                             "embedding_generated_at": datetime.now().isoformat()
                         },
-                        token_count=chunk.token_count
+                        token_count=chunk.token_count,
+                        simhash=chunk.simhash
                     )
                     
                     # Add embedding as a separate attribute
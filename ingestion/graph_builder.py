@@ -759,7 +759,8 @@ class GraphBuilder:
                     "entity_extraction_date": datetime.now().isoformat(),
                     "entity_extraction_scope": "document_level"  # Indicate this was document-level extraction
                 },
-                token_count=chunk.token_count
+                token_count=chunk.token_count,
+                simhash=chunk.simhash
             )
 
             # Preserve embedding if it exists
@@ -951,7 +952,8 @@ class GraphBuilder:
                     "entities": entities,
                     "entity_extraction_date": datetime.now().isoformat()
                 },
-                token_count=chunk.token_count
+                token_count=chunk.token_count,
+                simhash=chunk.simhash
             )
             
             # Preserve embedding if it exists
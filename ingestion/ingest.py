@@ -7,6 +7,7 @@ import asyncio
 import logging
 import json
 import glob
+import uuid
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from datetime import datetime
@@ -21,17 +22,25 @@ from .graph_builder import create_graph_builder
 
 # Import agent utilities
 try:
-    from ..agent.db_utils import initialize_database, close_database, get_db_pool
+    from ..agent.db_utils import (
+        initialize_database, close_database, get_db_pool, get_document_pool, get_corpus_pools, bump_corpus_version
+    )
     from ..agent.graph_utils import initialize_graph, close_graph
+    from ..agent.index_manager import ensure_embedding_index
     from ..agent.models import IngestionConfig, IngestionResult
+    from ..agent.simhash import simhash, SimHashIndex
 except ImportError:
     # For direct execution or testing
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from agent.db_utils import initialize_database, close_database, get_db_pool
+    from agent.db_utils import (
+        initialize_database, close_database, get_db_pool, get_document_pool, get_corpus_pools, bump_corpus_version
+    )
     from agent.graph_utils import initialize_graph, close_graph
+    from agent.index_manager import ensure_embedding_index
     from agent.models import IngestionConfig, IngestionResult
+    from agent.simhash import simhash, SimHashIndex
 
 # Load environment variables
 load_dotenv()
@@ -46,7 +55,8 @@ class DocumentIngestionPipeline:
         self,
         config: IngestionConfig,
         documents_folder: str = "documents",
-        clean_before_ingest: bool = False
+        clean_before_ingest: bool = False,
+        tune_vector_index: bool = True
     ):
         """
         Initialize ingestion pipeline.
@@ -55,10 +65,12 @@ class DocumentIngestionPipeline:
             config: Ingestion configuration
             documents_folder: Folder containing markdown documents
             clean_before_ingest: Whether to clean existing data before ingestion
+            tune_vector_index: Whether to rebuild the embedding index after ingestion if it no longer fits the table size
         """
         self.config = config
         self.documents_folder = documents_folder
         self.clean_before_ingest = clean_before_ingest
+        self.tune_vector_index = tune_vector_index
         
         # Initialize components
         self.chunker_config = ChunkingConfig(
@@ -72,6 +84,9 @@ class DocumentIngestionPipeline:
         self.embedder = create_embedder()
         self.graph_builder = create_graph_builder()
         
+        # Signatures of stored and already processed chunks (loaded per run)
+        self.simhash_index: Optional[SimHashIndex] = None
+        
         self._initialized = False
     
     async def initialize(self):
@@ -117,6 +132,8 @@ class DocumentIngestionPipeline:
         if self.clean_before_ingest:
             await self._clean_databases()
         
+        await self._load_simhash_index()
+        
         # Find all markdown files
         markdown_files = self._find_markdown_files()
         
@@ -156,6 +173,13 @@ class DocumentIngestionPipeline:
         
         logger.info(f"Ingestion complete: {len(results)} documents, {total_chunks} chunks, {total_errors} errors")
         
+        # Retune the embedding index once, after the bulk load
+        if total_chunks and self.tune_vector_index:
+            try:
+                await ensure_embedding_index()
+            except Exception as e:
+                logger.warning(f"Embedding index tuning failed: {e}")
+        
         return results
     
     async def _ingest_single_document(self, file_path: str) -> IngestionResult:
@@ -202,12 +226,15 @@ class DocumentIngestionPipeline:
         
         logger.info(f"Created {len(chunks)} chunks")
         
+        # Flag near-duplicate chunks before any LLM work on them
+        unique_chunks = self._flag_near_duplicates(chunks, document_source)
+        
         # Extract entities if configured
         entities_extracted = 0
-        if self.config.extract_entities:
+        if self.config.extract_entities and unique_chunks:
             logger.info("Using document-level entity extraction for better context")
-            chunks = await self.graph_builder.extract_entities_from_document(
-                chunks,
+            enriched_chunks = await self.graph_builder.extract_entities_from_document(
+                unique_chunks,
                 extract_companies=True,
                 extract_technologies=True,
                 extract_people=True,
@@ -226,10 +253,12 @@ class DocumentIngestionPipeline:
                 use_llm_for_transactions=True,  # Use LLM for transactions
                 use_llm_for_personal_connections=True  # Use LLM for personal connections
             )
+            enriched_by_index = {chunk.index: chunk for chunk in enriched_chunks}
+            chunks = [enriched_by_index.get(chunk.index, chunk) for chunk in chunks]
 
             # Count entities from document-level extraction (all chunks have same entities)
-            if chunks:
-                sample_entities = chunks[0].metadata.get("entities", {})
+            if enriched_chunks:
+                sample_entities = enriched_chunks[0].metadata.get("entities", {})
                 entities_extracted = 0
 
                 # Debug: Log extracted entities
@@ -277,7 +306,7 @@ class DocumentIngestionPipeline:
             try:
                 logger.info("Building knowledge graph relationships (this may take several minutes)...")
                 graph_result = await self.graph_builder.add_document_to_graph(
-                    chunks=embedded_chunks,
+                    chunks=[chunk for chunk in embedded_chunks if "near_duplicate_of" not in chunk.metadata],
                     document_title=document_title,
                     document_source=document_source,
                     document_metadata=document_metadata
@@ -299,10 +328,21 @@ class DocumentIngestionPipeline:
                 except Exception as cleanup_error:
                     logger.warning(f"Entity label cleanup failed (non-critical): {cleanup_error}")
 
+                # Let in-process graph snapshots know the graph has changed
+                if relationships_created:
+                    try:
+                        await self.graph_builder.graph_client.bump_graph_epoch()
+                    except Exception as epoch_error:
+                        logger.warning(f"Failed to bump graph epoch (non-critical): {epoch_error}")
+
             except Exception as e:
                 error_msg = f"Failed to add to knowledge graph: {str(e)}"
                 logger.error(error_msg)
                 graph_errors.append(error_msg)
+            
+            # Only a complete extraction lets later near-duplicates skip the LLM
+            if self.config.extract_entities and not graph_errors:
+                await self._mark_graph_extracted(document_id, document_source, unique_chunks)
         else:
             logger.info("Skipping knowledge graph building (skip_graph_building=True)")
         
@@ -319,6 +359,110 @@ class DocumentIngestionPipeline:
             errors=graph_errors
         )
     
+    async def _load_simhash_index(self):
+        """
+        Load signatures of stored chunks that made it into the graph.
+        
+        Only those are safe to skip as near-duplicates: a chunk stored without
+        graph extraction (a --fast or --no-entities run, or a failed graph
+        build) must still be extracted when it comes round again.
+        """
+        self.simhash_index = SimHashIndex()
+        if not self.config.skip_near_duplicates:
+            return
+        
+        try:
+            loaded = 0
+            for pool in get_corpus_pools():
+                async with pool.acquire() as conn:
+                    rows = await conn.fetch(
+                        """
+                        SELECT d.source, c.chunk_index, c.simhash
+                        FROM chunks c
+                        JOIN documents d ON d.id = c.document_id
+                        WHERE c.graph_extracted AND c.simhash IS NOT NULL
+                        """
+                    )
+                for row in rows:
+                    self.simhash_index.add(row["simhash"], f"{row['source']}#{row['chunk_index']}")
+                loaded += len(rows)
+            logger.info(f"Loaded {loaded} chunk signatures for near-duplicate detection")
+        except Exception as e:
+            logger.warning(f"Failed to load chunk signatures: {e}")
+    
+    async def _mark_graph_extracted(self, document_id: str, document_source: str, chunks: List[DocumentChunk]):
+        """
+        Record that chunks went through entity extraction and into the graph.
+        
+        Args:
+            document_id: ID of the stored document
+            document_source: Source of the document
+            chunks: The document's chunks that were extracted (not near-duplicates)
+        """
+        if not chunks:
+            return
+        
+        try:
+            async with get_document_pool(document_id).acquire() as conn:
+                await conn.execute(
+                    "UPDATE chunks SET graph_extracted = TRUE WHERE document_id = $1::uuid AND chunk_index = ANY($2::int[])",
+                    document_id,
+                    [chunk.index for chunk in chunks]
+                )
+        except Exception as e:
+            logger.warning(f"Failed to record graph extraction (chunks will be extracted again next time): {e}")
+            return
+        
+        if self.config.skip_near_duplicates and self.simhash_index is not None:
+            for chunk in chunks:
+                self.simhash_index.add(chunk.simhash, f"{document_source}#{chunk.index}")
+    
+    def _flag_near_duplicates(self, chunks: List[DocumentChunk], document_source: str) -> List[DocumentChunk]:
+        """
+        Sign chunks and flag near-duplicates of chunks seen before.
+        
+        Near-duplicates (typically boilerplate repeated across documents) are
+        still stored and embedded, but carry near_duplicate_of in their metadata
+        and skip LLM entity extraction and graph building.
+        
+        Chunks are matched against earlier chunks of this document and against
+        chunks of other documents already in the graph. Stored chunks of this
+        same source (a re-ingest) never count. This document's chunks join the
+        shared index only once _mark_graph_extracted records their extraction.
+        
+        Args:
+            chunks: Chunks of the current document
+            document_source: Source of the current document
+        
+        Returns:
+            Chunks that are not near-duplicates
+        """
+        if self.simhash_index is None:
+            self.simhash_index = SimHashIndex()
+        
+        own_prefix = f"{document_source}#"
+        document_index = SimHashIndex(self.simhash_index.max_distance)
+        unique_chunks = []
+        for chunk in chunks:
+            chunk.simhash = simhash(chunk.content)
+            if not self.config.skip_near_duplicates:
+                unique_chunks.append(chunk)
+                continue
+            
+            original = document_index.find(chunk.simhash)
+            if original is None:
+                original = self.simhash_index.find(chunk.simhash, exclude=lambda key: str(key).startswith(own_prefix))
+            if original is not None:
+                chunk.metadata["near_duplicate_of"] = original
+                continue
+            
+            document_index.add(chunk.simhash, f"{own_prefix}{chunk.index}")
+            unique_chunks.append(chunk)
+        
+        if len(unique_chunks) < len(chunks):
+            logger.info(f"Skipping LLM extraction for {len(chunks) - len(unique_chunks)} near-duplicate chunks")
+        return unique_chunks
+    
     def _find_markdown_files(self) -> List[str]:
         """Find all markdown files in the documents folder."""
         if not os.path.exists(self.documents_folder):
@@ -393,24 +537,36 @@ class DocumentIngestionPipeline:
         chunks: List[DocumentChunk],
         metadata: Dict[str, Any]
     ) -> str:
-        """Save document and chunks to PostgreSQL."""
-        async with get_db_pool().acquire() as conn:
+        """Save document and chunks to PostgreSQL (on the document's shard when sharded)."""
+        # The id is generated here rather than by the database because it picks the shard
+        document_id = str(uuid.uuid4())
+        async with get_document_pool(document_id).acquire() as conn:
             async with conn.transaction():
                 # Insert document
                 document_result = await conn.fetchrow(
                     """
-                    INSERT INTO documents (title, source, content, metadata)
-                    VALUES ($1, $2, $3, $4)
+                    INSERT INTO documents (id, title, source, metadata, chunk_count, total_tokens, content_length)
+                    VALUES ($1::uuid, $2, $3, $4, $5, $6, $7)
                     RETURNING id::text
                     """,
+                    document_id,
                     title,
                     source,
-                    content,
-                    json.dumps(metadata)
+                    json.dumps(metadata),
+                    len(chunks),
+                    sum(chunk.token_count or 0 for chunk in chunks),
+                    len(content)
                 )
                 
                 document_id = document_result["id"]
                 
+                # The body goes to its own table, away from the hot metadata row
+                await conn.execute(
+                    "INSERT INTO document_bodies (document_id, content) VALUES ($1::uuid, $2)",
+                    document_id,
+                    content
+                )
+                
                 # Insert chunks
                 for chunk in chunks:
                     # Convert embedding to PostgreSQL vector string format
@@ -421,17 +577,21 @@ class DocumentIngestionPipeline:
                     
                     await conn.execute(
                         """
-                        INSERT INTO chunks (document_id, content, embedding, chunk_index, metadata, token_count)
-                        VALUES ($1::uuid, $2, $3::vector, $4, $5, $6)
+                        INSERT INTO chunks (document_id, content, embedding, chunk_index, metadata, token_count, simhash)
+                        VALUES ($1::uuid, $2, $3::vector, $4, $5, $6, $7)
                         """,
                         document_id,
                         chunk.content,
                         embedding_data,
                         chunk.index,
                         json.dumps(chunk.metadata),
-                        chunk.token_count
+                        chunk.token_count,
+                        chunk.simhash
                     )
                 
+                # Cached search results elsewhere are stale once this commits
+                await bump_corpus_version(conn)
+                
                 return document_id
     
     async def _clean_databases(self):
@@ -439,12 +599,17 @@ class DocumentIngestionPipeline:
         logger.warning("Cleaning existing data from databases...")
         
         # Clean PostgreSQL
-        async with db_pool.acquire() as conn:
+        async with get_db_pool().acquire() as conn:
             async with conn.transaction():
                 await conn.execute("DELETE FROM messages")
                 await conn.execute("DELETE FROM sessions")
-                await conn.execute("DELETE FROM chunks")
-                await conn.execute("DELETE FROM documents")
+        
+        for pool in get_corpus_pools():
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute("DELETE FROM chunks")
+                    await conn.execute("DELETE FROM documents")
+                    await bump_corpus_version(conn)
         
         logger.info("Cleaned PostgreSQL database")
         
@@ -535,6 +700,45 @@ class DocumentIngestionPipeline:
             return None
 
 
+async def backfill_chunk_simhashes(batch_size: int = 500) -> int:
+    """
+    Compute SimHash signatures for chunks stored without one.
+    
+    Args:
+        batch_size: Number of chunks signed per round trip
+    
+    Returns:
+        Number of chunks updated
+    """
+    updated = 0
+    for pool in get_corpus_pools():
+        last_id = None
+        async with pool.acquire() as conn:
+            while True:
+                rows = await conn.fetch(
+                    """
+                    SELECT id, content FROM chunks
+                    WHERE simhash IS NULL AND ($1::uuid IS NULL OR id > $1)
+                    ORDER BY id
+                    LIMIT $2
+                    """,
+                    last_id,
+                    batch_size
+                )
+                if not rows:
+                    break
+            
+                await conn.executemany(
+                    "UPDATE chunks SET simhash = $2 WHERE id = $1",
+                    [(row["id"], simhash(row["content"])) for row in rows]
+                )
+                updated += len(rows)
+                last_id = rows[-1]["id"]
+                logger.info(f"Signed {updated} chunks")
+    
+    return updated
+
+
 async def main():
     """Main function for running ingestion."""
     parser = argparse.ArgumentParser(description="Ingest documents into vector DB and knowledge graph")
@@ -545,6 +749,9 @@ async def main():
     parser.add_argument("--no-semantic", action="store_true", help="Disable semantic chunking (recommended for large chunks)")
     parser.add_argument("--no-entities", action="store_true", help="Disable entity extraction")
     parser.add_argument("--fast", "-f", action="store_true", help="Fast mode: skip knowledge graph building")
+    parser.add_argument("--no-index-tuning", action="store_true", help="Skip rebuilding the embedding index after ingestion")
+    parser.add_argument("--keep-near-duplicates", action="store_true", help="Run LLM extraction on near-duplicate chunks too")
+    parser.add_argument("--backfill-simhash", action="store_true", help="Compute SimHash signatures for existing chunks and exit")
     parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose logging")
     
     args = parser.parse_args()
@@ -556,20 +763,31 @@ async def main():
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
     
+    if args.backfill_simhash:
+        await initialize_database()
+        try:
+            updated = await backfill_chunk_simhashes()
+            print(f"Computed SimHash signatures for {updated} chunks")
+        finally:
+            await close_database()
+        return
+    
     # Create ingestion configuration
     config = IngestionConfig(
         chunk_size=args.chunk_size,
         chunk_overlap=args.chunk_overlap,
         use_semantic_chunking=not args.no_semantic,
         extract_entities=not args.no_entities,
-        skip_graph_building=args.fast
+        skip_graph_building=args.fast,
+        skip_near_duplicates=not args.keep_near_duplicates
     )
     
     # Create and run pipeline
     pipeline = DocumentIngestionPipeline(
         config=config,
         documents_folder=args.documents,
-        clean_before_ingest=args.clean
+        clean_before_ingest=args.clean,
+        tune_vector_index=not args.no_index_tuning
     )
     
     def progress_callback(current: int, total: int):
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark the in-memory graph snapshot against the equivalent Cypher queries.
+
+Loads the snapshot from Neo4j, samples entity names, and times neighbour
+expansion, 2-hop subgraphs and path finding both ways. With --synthetic the
+snapshot side runs on a generated graph so no database is needed.
+
+Usage:
+    python scripts/benchmark_graph_snapshot.py --samples 50
+    python scripts/benchmark_graph_snapshot.py --synthetic --nodes 50000 --edges 200000
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from typing import List, Callable, Awaitable
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.graph_snapshot import GraphSnapshot, GraphSnapshotManager
+
+
+def summarize(label: str, timings: List[float]):
+    """Print p50/p99/mean latency in milliseconds."""
+    if not timings:
+        print(f"{label:<28} no samples")
+        return
+    ordered = sorted(timings)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{label:<28} p50={statistics.median(ordered):8.3f}ms "
+        f"p99={p99:8.3f}ms mean={statistics.mean(ordered):8.3f}ms n={len(ordered)}"
+    )
+
+
+async def time_async(call: Callable[[], Awaitable], repeat: int = 1) -> List[float]:
+    """Time an async call in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def time_sync(call: Callable[[], object], repeat: int = 1) -> List[float]:
+    """Time a sync call in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def build_synthetic_snapshot(node_count: int, edge_count: int, seed: int) -> GraphSnapshot:
+    """Generate a random graph with a skewed degree distribution."""
+    rng = np.random.default_rng(seed)
+    nodes = [{"uuid": f"n{i}", "name": f"Entity {i}", "labels": ["Person"]} for i in range(node_count)]
+    # Zipf-like endpoints give a few hubs, like company nodes in the real graph
+    weights = 1.0 / np.arange(1, node_count + 1) ** 0.8
+    weights /= weights.sum()
+    sources = rng.choice(node_count, size=edge_count, p=weights)
+    targets = rng.integers(0, node_count, size=edge_count)
+    edge_types = ["EMPLOYED_BY", "DIRECTOR_OF", "SHAREHOLDER_OF", "RELATES_TO"]
+    edges = [
+        {
+            "uuid": f"e{i}",
+            "name": edge_types[i % len(edge_types)],
+            "fact": f"Entity {s} relates to Entity {t}",
+            "source_node_uuid": f"n{s}",
+            "target_node_uuid": f"n{t}"
+        }
+        for i, (s, t) in enumerate(zip(sources.tolist(), targets.tolist()))
+        if s != t
+    ]
+    return GraphSnapshot(nodes, edges)
+
+
+def benchmark_snapshot(snapshot: GraphSnapshot, names: List[str], repeat: int):
+    """Time traversal operations against the snapshot only."""
+    neighbours, subgraphs, paths = [], [], []
+    for name in names:
+        seeds = snapshot.resolve(name, limit=1)
+        if not seeds:
+            continue
+        neighbours += time_sync(lambda: snapshot.neighbors(seeds[0], limit=25), repeat)
+        subgraphs += time_sync(lambda: snapshot.k_hop_subgraph(seeds, depth=2, max_nodes=200), repeat)
+        other = snapshot.resolve(random.choice(names), limit=1)
+        if other and other != seeds:
+            paths += time_sync(lambda: snapshot.shortest_paths(seeds, other, max_depth=4, limit=30), repeat)
+
+    summarize("snapshot neighbours", neighbours)
+    summarize("snapshot 2-hop subgraph", subgraphs)
+    summarize("snapshot paths (<=4 hops)", paths)
+
+
+async def benchmark_against_neo4j(samples: int, repeat: int):
+    """Load the snapshot from Neo4j and compare with Cypher queries."""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from agent.graph_utils import get_graph_client, _find_snapshot_paths
+
+    client = get_graph_client()
+    await client.initialize()
+    try:
+        started = time.perf_counter()
+        snapshot = await GraphSnapshotManager().load()
+        print(
+            f"Loaded snapshot: {snapshot.node_count} nodes, {snapshot.edge_count} edges "
+            f"in {(time.perf_counter() - started) * 1000:.0f}ms "
+            f"(~{(snapshot.offsets.nbytes + snapshot.indices.nbytes + snapshot.edge_ids.nbytes + snapshot.edge_types.nbytes) / 1024:.0f} KiB adjacency)"
+        )
+        if snapshot.node_count < 2:
+            print("Graph is too small to benchmark")
+            return
+
+        names = [node["name"] for node in random.sample(snapshot.nodes, min(samples, snapshot.node_count))]
+        pairs = list(zip(names, names[1:] + names[:1]))
+
+        cypher_neighbours, cypher_subgraphs, cypher_paths = [], [], []
+        snap_neighbours, snap_subgraphs, snap_paths = [], [], []
+        for name, other in pairs:
+            cypher_neighbours += await time_async(lambda: client.get_entity_neighbors(name, limit=25), repeat)
+            cypher_subgraphs += await time_async(lambda: client.get_entity_subgraph(name, depth=2), repeat)
+            cypher_paths += await time_async(
+                lambda: client.find_paths_between_entities(name, other, max_depth=4), repeat
+            )
+
+            seeds = snapshot.resolve(name, limit=1)
+            snap_neighbours += time_sync(lambda: snapshot.neighbors(seeds[0], limit=25), repeat)
+            snap_subgraphs += time_sync(lambda: snapshot.k_hop_subgraph(seeds, depth=2, max_nodes=200), repeat)
+            snap_paths += time_sync(lambda: _find_snapshot_paths(snapshot, name, other, max_depth=4), repeat)
+
+        summarize("cypher neighbours", cypher_neighbours)
+        summarize("snapshot neighbours", snap_neighbours)
+        summarize("cypher 2-hop subgraph", cypher_subgraphs)
+        summarize("snapshot 2-hop subgraph", snap_subgraphs)
+        summarize("cypher paths (<=4 hops)", cypher_paths)
+        summarize("snapshot paths (<=4 hops)", snap_paths)
+    finally:
+        await client.close()
+
+
+def main():
+    """Main function for running the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark graph snapshot traversal against Cypher")
+    parser.add_argument("--samples", type=int, default=50, help="Number of sampled entities")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per query")
+    parser.add_argument("--synthetic", action="store_true", help="Benchmark a generated graph without Neo4j")
+    parser.add_argument("--nodes", type=int, default=50000, help="Synthetic node count")
+    parser.add_argument("--edges", type=int, default=200000, help="Synthetic edge count")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    if args.synthetic:
+        started = time.perf_counter()
+        snapshot = build_synthetic_snapshot(args.nodes, args.edges, args.seed)
+        print(
+            f"Built synthetic snapshot: {snapshot.node_count} nodes, {snapshot.edge_count} edges "
+            f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+        names = [node["name"] for node in random.sample(snapshot.nodes, min(args.samples, snapshot.node_count))]
+        benchmark_snapshot(snapshot, names, args.repeat)
+    else:
+        asyncio.run(benchmark_against_neo4j(args.samples, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark two-stage quantized vector search against the exact path.
+
+Queries are stored chunk embeddings with Gaussian noise added, so they look
+like real queries with close neighbours in the corpus. For each query the
+exact top-k (a full scan ordered by cosine distance) is the reference; the
+current search path (match_chunks on the full-precision index) and the
+quantized path (Hamming distance on embedding_bits, then an exact rerank)
+are timed and scored by recall@k against it.
+
+--synthetic inserts clustered random embeddings under a temporary document
+first and deletes them afterwards, for databases without ingested data.
+
+Usage:
+    python scripts/benchmark_quantized_search.py --queries 50 --limit 10
+    python scripts/benchmark_quantized_search.py --synthetic 20000 --factor 5
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from typing import List, Callable, Awaitable, Optional
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agent.db_utils as db_utils
+from agent.db_utils import get_db_pool, initialize_database, close_database, vector_search
+
+
+def summarize(label: str, timings: List[float], recall: Optional[List[float]] = None):
+    """Print p50/p99/mean latency in milliseconds and mean recall."""
+    ordered = sorted(timings)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    line = (
+        f"{label:<28} p50={statistics.median(ordered):8.3f}ms "
+        f"p99={p99:8.3f}ms mean={statistics.mean(ordered):8.3f}ms n={len(ordered)}"
+    )
+    if recall is not None:
+        line += f" recall={statistics.mean(recall):.3f}"
+    print(line)
+
+
+async def time_async(call: Callable[[], Awaitable]) -> tuple:
+    """Time an async call in milliseconds, returning (milliseconds, result)."""
+    started = time.perf_counter()
+    result = await call()
+    return (time.perf_counter() - started) * 1000, result
+
+
+def to_vector(embedding: np.ndarray) -> str:
+    """Format an embedding as a pgvector literal."""
+    return "[" + ",".join(map(str, embedding.tolist())) + "]"
+
+
+async def insert_synthetic(count: int, clusters: int, seed: int) -> str:
+    """Insert clustered, zero-centred embeddings under a temporary document."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, 1536))
+    async with get_db_pool().acquire() as conn:
+        document_id = await conn.fetchval(
+            "INSERT INTO documents (title, source) VALUES ($1, $2) RETURNING id::text",
+            "Quantized search benchmark", "benchmark_quantized_search"
+        )
+        for start in range(0, count, 1000):
+            rows = centres[rng.integers(clusters, size=min(1000, count - start))]
+            rows = rows + rng.normal(scale=0.5, size=rows.shape)
+            await conn.executemany(
+                "INSERT INTO chunks (document_id, content, embedding, chunk_index) VALUES ($1::uuid, '', $2::vector, $3)",
+                [(document_id, to_vector(row), start + i) for i, row in enumerate(rows)]
+            )
+        await conn.execute("ANALYZE chunks")
+    print(f"Inserted {count} synthetic chunks")
+    return document_id
+
+
+async def sample_queries(count: int, noise: float, seed: int) -> List[List[float]]:
+    """Stored embeddings plus Gaussian noise scaled to each vector's RMS value."""
+    rng = np.random.default_rng(seed)
+    async with get_db_pool().acquire() as conn:
+        await conn.execute("SELECT setseed($1)", random.Random(seed).random())
+        rows = await conn.fetch(
+            "SELECT embedding::real[] AS embedding FROM chunks WHERE embedding IS NOT NULL ORDER BY random() LIMIT $1",
+            count
+        )
+    queries = []
+    for row in rows:
+        embedding = np.asarray(row["embedding"], dtype=np.float64)
+        scale = noise * np.sqrt(np.mean(embedding ** 2))
+        queries.append((embedding + rng.normal(scale=scale, size=embedding.shape)).tolist())
+    return queries
+
+
+async def exact_top_k(embedding: List[float], limit: int) -> List[str]:
+    """Full scan ordered by cosine distance (the reference result)."""
+    async with get_db_pool().acquire() as conn:
+        rows = await conn.fetch(
+            "SELECT id FROM chunks WHERE embedding IS NOT NULL ORDER BY cosine_distance(embedding, $1::vector) LIMIT $2",
+            to_vector(np.asarray(embedding)), limit
+        )
+    return [row["id"] for row in rows]
+
+
+async def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark quantized two-stage vector search")
+    parser.add_argument("--queries", type=int, default=50, help="Number of queries")
+    parser.add_argument("--limit", type=int, default=10, help="Results per query (k)")
+    parser.add_argument("--factor", type=int, default=db_utils.QUANTIZED_CANDIDATE_FACTOR,
+                        help="Candidates reranked per result")
+    parser.add_argument("--noise", type=float, default=0.3, help="Query noise relative to embedding RMS")
+    parser.add_argument("--synthetic", type=int, default=0, help="Insert this many synthetic chunks first")
+    parser.add_argument("--clusters", type=int, default=200, help="Clusters for synthetic chunks")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    db_utils.QUANTIZED_CANDIDATE_FACTOR = args.factor
+    await initialize_database()
+    synthetic_document_id = None
+    try:
+        if args.synthetic:
+            synthetic_document_id = await insert_synthetic(args.synthetic, args.clusters, args.seed)
+
+        queries = await sample_queries(args.queries, args.noise, args.seed)
+        if not queries:
+            print("No chunk embeddings to query (ingest documents or use --synthetic)")
+            return
+
+        timings = {"exact": [], "current": [], "quantized": []}
+        recall = {"current": [], "quantized": []}
+        for embedding in queries:
+            elapsed, expected = await time_async(lambda: exact_top_k(embedding, args.limit))
+            timings["exact"].append(elapsed)
+            expected = set(expected)
+            for name, quantized in (("current", False), ("quantized", True)):
+                elapsed, results = await time_async(
+                    lambda: vector_search(embedding, limit=args.limit, quantized=quantized)
+                )
+                timings[name].append(elapsed)
+                recall[name].append(len(expected & {r["chunk_id"] for r in results}) / len(expected))
+
+        print(f"{len(queries)} queries, k={args.limit}, {args.limit * args.factor} quantized candidates")
+        summarize("exact (full scan)", timings["exact"])
+        summarize("current (match_chunks)", timings["current"], recall["current"])
+        summarize("quantized (bits + rerank)", timings["quantized"], recall["quantized"])
+    finally:
+        if synthetic_document_id:
+            async with get_db_pool().acquire() as conn:
+                await conn.execute("DELETE FROM documents WHERE id = $1::uuid", synthetic_document_id)
+        await close_database()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
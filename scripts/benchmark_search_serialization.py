@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark search response serialization for the REST search endpoints.
+
+Times the path from decoded database rows to JSON bytes for a synthetic
+response: the previous path (validated ChunkResult models, a SearchResponse
+model and FastAPI's jsonable_encoder + json.dumps) against the orjson path
+used by the endpoints now.
+
+Usage:
+    python scripts/benchmark_search_serialization.py --results 50 --repeat 2000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.api import _search_response
+from agent.models import ChunkResult, SearchResponse, SearchType
+from agent.tools import _to_chunk_results
+
+
+def summarize(label: str, timings: List[float]):
+    """Print p50/p99/mean latency in milliseconds."""
+    ordered = sorted(timings)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{label:<28} p50={statistics.median(ordered):8.3f}ms "
+        f"p99={p99:8.3f}ms mean={statistics.mean(ordered):8.3f}ms n={len(ordered)}"
+    )
+
+
+def time_sync(call: Callable[[], object], repeat: int) -> List[float]:
+    """Time a sync call in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def build_rows(count: int, entities: int, seed: int) -> List[Dict[str, Any]]:
+    """Generate search rows shaped like match_chunks output with entity metadata."""
+    rng = random.Random(seed)
+    words = ["racing", "club", "jockey", "chairman", "director", "board", "annual", "report", "horse", "betting"]
+    return [
+        {
+            "chunk_id": f"00000000-0000-0000-0000-{i:012d}",
+            "document_id": "00000000-0000-0000-0000-000000000001",
+            "content": " ".join(rng.choices(words, k=250)),
+            "similarity": rng.random(),
+            "metadata": {
+                "chunk_method": "semantic",
+                "total_chunks": count,
+                "entities": {
+                    "people": [f"Person {rng.randrange(1000)}" for _ in range(entities)],
+                    "companies": [f"Company {rng.randrange(1000)}" for _ in range(entities)]
+                }
+            },
+            "document_title": "Annual Report",
+            "document_source": "annual_report.md"
+        }
+        for i in range(count)
+    ]
+
+
+def previous_path(rows: List[Dict[str, Any]]) -> bytes:
+    """Validated models, SearchResponse, jsonable_encoder and json.dumps (FastAPI's JSONResponse)."""
+    results = [
+        ChunkResult(
+            chunk_id=str(r["chunk_id"]),
+            document_id=str(r["document_id"]),
+            content=r["content"],
+            score=r["similarity"],
+            metadata=r["metadata"],
+            document_title=r["document_title"],
+            document_source=r["document_source"]
+        )
+        for r in rows
+    ]
+    response = SearchResponse(
+        results=results,
+        total_results=len(results),
+        search_type="vector",
+        query_time_ms=1.0
+    )
+    return json.dumps(
+        jsonable_encoder(response),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def fast_path(rows: List[Dict[str, Any]]) -> bytes:
+    """Unvalidated models serialized straight to bytes with orjson."""
+    return _search_response(SearchType.VECTOR, 1.0, results=_to_chunk_results(rows, "similarity")).body
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark search response serialization")
+    parser.add_argument("--results", type=int, default=50, help="Results per response")
+    parser.add_argument("--entities", type=int, default=20, help="Entities per metadata list")
+    parser.add_argument("--repeat", type=int, default=2000, help="Responses to serialize per path")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    rows = build_rows(args.results, args.entities, args.seed)
+    if json.loads(previous_path(rows)) != json.loads(fast_path(rows)):
+        print("Responses differ between paths")
+        sys.exit(1)
+
+    print(f"{args.results} results per response, {len(fast_path(rows)) / 1024:.1f} KiB")
+    summarize("pydantic + jsonable_encoder", time_sync(lambda: previous_path(rows), args.repeat))
+    summarize("orjson", time_sync(lambda: fast_path(rows), args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -210,6 +210,21 @@ def remove_self_relationships(driver):
         count = result.single()['count']
         print(f"✅ Removed {count} self-referencing relationships")
 
+def bump_graph_epoch(driver):
+    """Mark the graph as reset so in-memory graph snapshots reload fully."""
+    with driver.session() as session:
+        query = """
+        MERGE (m:GraphEpoch {key: 'graph'})
+        ON CREATE SET m.epoch = 0, m.reset_epoch = 0
+        SET m.epoch = m.epoch + 1, m.updated_at = datetime()
+        SET m.reset_epoch = m.epoch
+        RETURN m.epoch as epoch
+        """
+        
+        result = session.run(query)
+        epoch = result.single()['epoch']
+        print(f"✅ Graph epoch bumped to {epoch}")
+
 def main():
     """Main function to fix duplicate entities."""
     print("🚀 Starting entity cleanup process...")
@@ -245,6 +260,10 @@ def main():
         print("\n🔗 Step 4: Removing self-relationships...")
         remove_self_relationships(driver)
         
+        # Step 5: Invalidate graph snapshots
+        print("\n🔁 Step 5: Bumping graph epoch...")
+        bump_graph_epoch(driver)
+        
         print("\n✅ Entity cleanup completed successfully!")
         
     except Exception as e:
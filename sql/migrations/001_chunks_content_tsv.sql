@@ -0,0 +1,243 @@
+-- Migration: stored tsvector column and GIN index for keyword search on chunks.
+--
+-- Run with psql in autocommit mode (not with -1/--single-transaction), since
+-- the backfill commits between batches and the index is built concurrently:
+--
+--   psql "$DATABASE_URL" -f sql/migrations/001_chunks_content_tsv.sql
+--
+-- Fresh installs get content_tsv as a GENERATED ... STORED column from
+-- sql/schema.sql. Adding a generated column to an existing table rewrites it
+-- under an ACCESS EXCLUSIVE lock, so here it is added as a plain column kept
+-- up to date by a trigger. Both hold to_tsvector('english', content).
+
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS content_tsv tsvector;
+
+CREATE OR REPLACE FUNCTION update_chunks_content_tsv()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.content_tsv = to_tsvector('english', NEW.content);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_chunks_content_tsv ON chunks;
+CREATE TRIGGER update_chunks_content_tsv BEFORE INSERT OR UPDATE OF content ON chunks
+    FOR EACH ROW EXECUTE FUNCTION update_chunks_content_tsv();
+
+-- Backfill in primary key order, committing every batch so row locks are
+-- held only briefly and concurrent ingestion keeps going.
+DO $$
+DECLARE
+    batch_size CONSTANT INT := 5000;
+    last_id UUID := '00000000-0000-0000-0000-000000000000';
+    batch_last_id UUID;
+BEGIN
+    LOOP
+        batch_last_id := NULL;
+        WITH batch AS (
+            SELECT id FROM chunks
+            WHERE id > last_id
+            ORDER BY id
+            LIMIT batch_size
+        ),
+        updated AS (
+            UPDATE chunks c
+            SET content_tsv = to_tsvector('english', c.content)
+            FROM batch b
+            WHERE c.id = b.id AND c.content_tsv IS NULL
+        )
+        SELECT id INTO batch_last_id FROM batch ORDER BY id DESC LIMIT 1;
+
+        EXIT WHEN batch_last_id IS NULL;
+        last_id := batch_last_id;
+        COMMIT;
+    END LOOP;
+END;
+$$;
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_chunks_content_fts;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunks_content_tsv ON chunks USING GIN (content_tsv);
+
+ANALYZE chunks;
+
+-- Hybrid search functions build two small candidate sets with top-k queries
+-- the planner can answer from the ANN index (ORDER BY distance LIMIT k) and
+-- the GIN index on content_tsv, then score only the union of those candidates.
+-- They are plain SQL so they get inlined into the caller's plan.
+CREATE OR REPLACE FUNCTION hybrid_search(
+    query_embedding vector(1536),
+    query_text TEXT,
+    match_count INT DEFAULT 10,
+    text_weight FLOAT DEFAULT 0.3
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    document_id UUID,
+    content TEXT,
+    combined_score FLOAT,
+    vector_similarity FLOAT,
+    text_similarity FLOAT,
+    metadata JSONB,
+    document_title TEXT,
+    document_source TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    text_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.content_tsv @@ plainto_tsquery('english', query_text)
+        ORDER BY ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text)) DESC
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    candidates AS (
+        SELECT id FROM vector_candidates
+        UNION
+        SELECT id FROM text_candidates
+    ),
+    scored AS (
+        SELECT
+            c.id,
+            c.document_id,
+            c.content,
+            c.metadata,
+            COALESCE(1 - (c.embedding <=> query_embedding), 0)::FLOAT AS vector_sim,
+            ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text))::FLOAT AS text_sim
+        FROM candidates k
+        JOIN chunks c ON c.id = k.id
+    )
+    SELECT
+        s.id AS chunk_id,
+        s.document_id,
+        s.content,
+        (s.vector_sim * (1 - text_weight) + s.text_sim * text_weight)::FLOAT AS combined_score,
+        s.vector_sim AS vector_similarity,
+        s.text_sim AS text_similarity,
+        s.metadata,
+        d.title AS document_title,
+        d.source AS document_source
+    FROM scored s
+    JOIN documents d ON s.document_id = d.id
+    ORDER BY combined_score DESC
+    LIMIT match_count;
+$$;
+
+CREATE OR REPLACE FUNCTION enhanced_hybrid_search(
+    query_embedding vector(1536),
+    query_text TEXT,
+    match_count INT DEFAULT 10,
+    text_weight FLOAT DEFAULT 0.3,
+    boost_recent BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    document_id UUID,
+    content TEXT,
+    enhanced_score FLOAT,
+    base_score FLOAT,
+    vector_similarity FLOAT,
+    text_similarity FLOAT,
+    recency_boost FLOAT,
+    content_length_factor FLOAT,
+    query_term_density FLOAT,
+    metadata JSONB,
+    document_title TEXT,
+    document_source TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    text_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.content_tsv @@ plainto_tsquery('english', query_text)
+        ORDER BY ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text)) DESC
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    candidates AS (
+        SELECT id FROM vector_candidates
+        UNION
+        SELECT id FROM text_candidates
+    ),
+    scored AS (
+        SELECT
+            c.id,
+            c.document_id,
+            c.content,
+            c.metadata,
+            d.title AS doc_title,
+            d.source AS doc_source,
+            d.created_at,
+            COALESCE(1 - (c.embedding <=> query_embedding), 0)::FLOAT AS vector_sim,
+            ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text))::FLOAT AS text_sim
+        FROM candidates k
+        JOIN chunks c ON c.id = k.id
+        JOIN documents d ON c.document_id = d.id
+    ),
+    enhanced_results AS (
+        SELECT
+            s.id AS chunk_id,
+            s.document_id,
+            s.content,
+            -- Base hybrid score
+            (s.vector_sim * (1 - text_weight) + s.text_sim * text_weight)::FLOAT AS base_score,
+            s.vector_sim,
+            s.text_sim,
+            -- Recency boost (newer documents get higher scores)
+            CASE
+                WHEN boost_recent THEN
+                    GREATEST(0, 1 - EXTRACT(DAYS FROM (NOW() - s.created_at)) / 365.0) * 0.1
+                ELSE 0
+            END::FLOAT AS recency_boost,
+            -- Content length factor (moderate length preferred)
+            CASE
+                WHEN LENGTH(s.content) BETWEEN 200 AND 2000 THEN 1.1
+                WHEN LENGTH(s.content) BETWEEN 100 AND 200 THEN 1.05
+                WHEN LENGTH(s.content) > 2000 THEN 0.95
+                ELSE 1.0
+            END::FLOAT AS content_length_factor,
+            -- Query term density
+            (
+                SELECT COUNT(*)::FLOAT / GREATEST(1, array_length(string_to_array(s.content, ' '), 1))
+                FROM unnest(string_to_array(lower(query_text), ' ')) AS query_term
+                WHERE position(query_term IN lower(s.content)) > 0
+            ) AS query_term_density,
+            s.metadata,
+            s.doc_title,
+            s.doc_source
+        FROM scored s
+    )
+    SELECT
+        er.chunk_id,
+        er.document_id,
+        er.content,
+        -- Enhanced score combining all factors
+        ((er.base_score + er.recency_boost) * er.content_length_factor + (er.query_term_density * 0.1))::FLOAT AS enhanced_score,
+        er.base_score,
+        er.vector_sim AS vector_similarity,
+        er.text_sim AS text_similarity,
+        er.recency_boost,
+        er.content_length_factor,
+        er.query_term_density,
+        er.metadata,
+        er.doc_title AS document_title,
+        er.doc_source AS document_source
+    FROM enhanced_results er
+    ORDER BY enhanced_score DESC
+    LIMIT match_count;
+$$;
@@ -0,0 +1,304 @@
+-- Migration: document filters for vector and hybrid search.
+--
+-- Adds indexes for the new source/title filters and re-creates the search
+-- functions with a trailing filters JSONB argument. Run with psql in
+-- autocommit mode (the indexes are built concurrently):
+--
+--   psql "$DATABASE_URL" -f sql/migrations/002_search_filters.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_documents_source ON documents (source);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_documents_title_trgm ON documents USING GIN (title gin_trgm_ops);
+
+-- Search filters are passed as one JSONB object; every key is optional:
+--   {"source": "exact/source.md", "title": "substring (case-insensitive)",
+--    "created_after": "2024-01-01T00:00:00Z", "created_before": "...",
+--    "metadata": {"category": "annual_report"}}   -- containment on documents.metadata
+CREATE OR REPLACE FUNCTION filter_documents(filters JSONB)
+RETURNS TABLE (id UUID)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT d.id
+    FROM documents d
+    WHERE (filters->>'source' IS NULL OR d.source = filters->>'source')
+      AND (filters->>'title' IS NULL OR d.title ILIKE '%' || (filters->>'title') || '%')
+      AND (filters->>'created_after' IS NULL OR d.created_at >= (filters->>'created_after')::timestamptz)
+      AND (filters->>'created_before' IS NULL OR d.created_at < (filters->>'created_before')::timestamptz)
+      AND (filters->'metadata' IS NULL OR d.metadata @> (filters->'metadata'));
+$$;
+
+-- Old signatures without the filters argument would make calls ambiguous
+DROP FUNCTION IF EXISTS match_chunks(vector, INT);
+DROP FUNCTION IF EXISTS hybrid_search(vector, TEXT, INT, FLOAT);
+DROP FUNCTION IF EXISTS enhanced_hybrid_search(vector, TEXT, INT, FLOAT, BOOLEAN);
+
+-- With filters, vector candidates come from a separate branch so the planner
+-- can pick an exact scan over a small filtered set instead of post-filtering
+-- the ANN results. Only one branch runs for a given call.
+CREATE OR REPLACE FUNCTION match_chunks(
+    query_embedding vector(1536),
+    match_count INT DEFAULT 10,
+    filters JSONB DEFAULT '{}'
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    document_id UUID,
+    content TEXT,
+    similarity FLOAT,
+    metadata JSONB,
+    document_title TEXT,
+    document_source TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH candidates AS (
+        (
+            SELECT c.id, c.embedding <=> query_embedding AS distance
+            FROM chunks c
+            WHERE c.embedding IS NOT NULL
+              AND filters = '{}'::jsonb
+            ORDER BY c.embedding <=> query_embedding
+            LIMIT match_count
+        )
+        UNION ALL
+        (
+            SELECT c.id, c.embedding <=> query_embedding AS distance
+            FROM chunks c
+            WHERE c.embedding IS NOT NULL
+              AND filters <> '{}'::jsonb
+              AND c.document_id IN (SELECT f.id FROM filter_documents(filters) f)
+            ORDER BY c.embedding <=> query_embedding
+            LIMIT match_count
+        )
+    )
+    SELECT
+        c.id AS chunk_id,
+        c.document_id,
+        c.content,
+        (1 - k.distance)::FLOAT AS similarity,
+        c.metadata,
+        d.title AS document_title,
+        d.source AS document_source
+    FROM candidates k
+    JOIN chunks c ON c.id = k.id
+    JOIN documents d ON c.document_id = d.id
+    ORDER BY k.distance
+    LIMIT match_count;
+$$;
+
+-- Hybrid search functions build two small candidate sets with top-k queries
+-- the planner can answer from the ANN index (ORDER BY distance LIMIT k) and
+-- the GIN index on content_tsv, then score only the union of those candidates.
+-- They are plain SQL so they get inlined into the caller's plan.
+CREATE OR REPLACE FUNCTION hybrid_search(
+    query_embedding vector(1536),
+    query_text TEXT,
+    match_count INT DEFAULT 10,
+    text_weight FLOAT DEFAULT 0.3,
+    filters JSONB DEFAULT '{}'
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    document_id UUID,
+    content TEXT,
+    combined_score FLOAT,
+    vector_similarity FLOAT,
+    text_similarity FLOAT,
+    metadata JSONB,
+    document_title TEXT,
+    document_source TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH filtered_documents AS (
+        SELECT f.id FROM filter_documents(filters) f
+    ),
+    vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters = '{}'::jsonb
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    filtered_vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters <> '{}'::jsonb
+          AND c.document_id IN (SELECT id FROM filtered_documents)
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    text_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.content_tsv @@ plainto_tsquery('english', query_text)
+          AND (filters = '{}'::jsonb OR c.document_id IN (SELECT id FROM filtered_documents))
+        ORDER BY ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text)) DESC
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    candidates AS (
+        SELECT id FROM vector_candidates
+        UNION
+        SELECT id FROM filtered_vector_candidates
+        UNION
+        SELECT id FROM text_candidates
+    ),
+    scored AS (
+        SELECT
+            c.id,
+            c.document_id,
+            c.content,
+            c.metadata,
+            COALESCE(1 - (c.embedding <=> query_embedding), 0)::FLOAT AS vector_sim,
+            ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text))::FLOAT AS text_sim
+        FROM candidates k
+        JOIN chunks c ON c.id = k.id
+    )
+    SELECT
+        s.id AS chunk_id,
+        s.document_id,
+        s.content,
+        (s.vector_sim * (1 - text_weight) + s.text_sim * text_weight)::FLOAT AS combined_score,
+        s.vector_sim AS vector_similarity,
+        s.text_sim AS text_similarity,
+        s.metadata,
+        d.title AS document_title,
+        d.source AS document_source
+    FROM scored s
+    JOIN documents d ON s.document_id = d.id
+    ORDER BY combined_score DESC
+    LIMIT match_count;
+$$;
+
+CREATE OR REPLACE FUNCTION enhanced_hybrid_search(
+    query_embedding vector(1536),
+    query_text TEXT,
+    match_count INT DEFAULT 10,
+    text_weight FLOAT DEFAULT 0.3,
+    boost_recent BOOLEAN DEFAULT FALSE,
+    filters JSONB DEFAULT '{}'
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    document_id UUID,
+    content TEXT,
+    enhanced_score FLOAT,
+    base_score FLOAT,
+    vector_similarity FLOAT,
+    text_similarity FLOAT,
+    recency_boost FLOAT,
+    content_length_factor FLOAT,
+    query_term_density FLOAT,
+    metadata JSONB,
+    document_title TEXT,
+    document_source TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH filtered_documents AS (
+        SELECT f.id FROM filter_documents(filters) f
+    ),
+    vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters = '{}'::jsonb
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    filtered_vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters <> '{}'::jsonb
+          AND c.document_id IN (SELECT id FROM filtered_documents)
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    text_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.content_tsv @@ plainto_tsquery('english', query_text)
+          AND (filters = '{}'::jsonb OR c.document_id IN (SELECT id FROM filtered_documents))
+        ORDER BY ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text)) DESC
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    candidates AS (
+        SELECT id FROM vector_candidates
+        UNION
+        SELECT id FROM filtered_vector_candidates
+        UNION
+        SELECT id FROM text_candidates
+    ),
+    scored AS (
+        SELECT
+            c.id,
+            c.document_id,
+            c.content,
+            c.metadata,
+            d.title AS doc_title,
+            d.source AS doc_source,
+            d.created_at,
+            COALESCE(1 - (c.embedding <=> query_embedding), 0)::FLOAT AS vector_sim,
+            ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text))::FLOAT AS text_sim
+        FROM candidates k
+        JOIN chunks c ON c.id = k.id
+        JOIN documents d ON c.document_id = d.id
+    ),
+    enhanced_results AS (
+        SELECT
+            s.id AS chunk_id,
+            s.document_id,
+            s.content,
+            -- Base hybrid score
+            (s.vector_sim * (1 - text_weight) + s.text_sim * text_weight)::FLOAT AS base_score,
+            s.vector_sim,
+            s.text_sim,
+            -- Recency boost (newer documents get higher scores)
+            CASE
+                WHEN boost_recent THEN
+                    GREATEST(0, 1 - EXTRACT(DAYS FROM (NOW() - s.created_at)) / 365.0) * 0.1
+                ELSE 0
+            END::FLOAT AS recency_boost,
+            -- Content length factor (moderate length preferred)
+            CASE
+                WHEN LENGTH(s.content) BETWEEN 200 AND 2000 THEN 1.1
+                WHEN LENGTH(s.content) BETWEEN 100 AND 200 THEN 1.05
+                WHEN LENGTH(s.content) > 2000 THEN 0.95
+                ELSE 1.0
+            END::FLOAT AS content_length_factor,
+            -- Query term density
+            (
+                SELECT COUNT(*)::FLOAT / GREATEST(1, array_length(string_to_array(s.content, ' '), 1))
+                FROM unnest(string_to_array(lower(query_text), ' ')) AS query_term
+                WHERE position(query_term IN lower(s.content)) > 0
+            ) AS query_term_density,
+            s.metadata,
+            s.doc_title,
+            s.doc_source
+        FROM scored s
+    )
+    SELECT
+        er.chunk_id,
+        er.document_id,
+        er.content,
+        -- Enhanced score combining all factors
+        ((er.base_score + er.recency_boost) * er.content_length_factor + (er.query_term_density * 0.1))::FLOAT AS enhanced_score,
+        er.base_score,
+        er.vector_sim AS vector_similarity,
+        er.text_sim AS text_similarity,
+        er.recency_boost,
+        er.content_length_factor,
+        er.query_term_density,
+        er.metadata,
+        er.doc_title AS document_title,
+        er.doc_source AS document_source
+    FROM enhanced_results er
+    ORDER BY enhanced_score DESC
+    LIMIT match_count;
+$$;
@@ -0,0 +1,201 @@
+-- Migration: precomputed ranking features for enhanced_hybrid_search.
+--
+-- Run with psql in autocommit mode (not with -1/--single-transaction), since
+-- the backfill commits between batches:
+--
+--   psql "$DATABASE_URL" -f sql/migrations/003_chunk_ranking_features.sql
+--
+-- Fresh installs get these as GENERATED ... STORED columns from
+-- sql/schema.sql. As in 001, existing tables get plain columns maintained by
+-- a trigger so adding them does not rewrite the table under a long lock.
+
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS word_count INTEGER;
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS content_length_factor FLOAT;
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS content_terms TEXT[];
+
+CREATE OR REPLACE FUNCTION update_chunks_ranking_features()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.word_count = COALESCE(array_length(string_to_array(NEW.content, ' '), 1), 0);
+    NEW.content_length_factor = CASE
+        WHEN LENGTH(NEW.content) BETWEEN 200 AND 2000 THEN 1.1
+        WHEN LENGTH(NEW.content) BETWEEN 100 AND 200 THEN 1.05
+        WHEN LENGTH(NEW.content) > 2000 THEN 0.95
+        ELSE 1.0
+    END;
+    NEW.content_terms = tsvector_to_array(to_tsvector('simple', NEW.content));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_chunks_ranking_features ON chunks;
+CREATE TRIGGER update_chunks_ranking_features BEFORE INSERT OR UPDATE OF content ON chunks
+    FOR EACH ROW EXECUTE FUNCTION update_chunks_ranking_features();
+
+-- Backfill in primary key order, committing every batch
+DO $$
+DECLARE
+    batch_size CONSTANT INT := 5000;
+    last_id UUID := '00000000-0000-0000-0000-000000000000';
+    batch_last_id UUID;
+BEGIN
+    LOOP
+        batch_last_id := NULL;
+        WITH batch AS (
+            SELECT id FROM chunks
+            WHERE id > last_id
+            ORDER BY id
+            LIMIT batch_size
+        ),
+        updated AS (
+            UPDATE chunks c
+            SET word_count = COALESCE(array_length(string_to_array(c.content, ' '), 1), 0),
+                content_length_factor = CASE
+                    WHEN LENGTH(c.content) BETWEEN 200 AND 2000 THEN 1.1
+                    WHEN LENGTH(c.content) BETWEEN 100 AND 200 THEN 1.05
+                    WHEN LENGTH(c.content) > 2000 THEN 0.95
+                    ELSE 1.0
+                END,
+                content_terms = tsvector_to_array(to_tsvector('simple', c.content))
+            FROM batch b
+            WHERE c.id = b.id AND c.word_count IS NULL
+        )
+        SELECT id INTO batch_last_id FROM batch ORDER BY id DESC LIMIT 1;
+
+        EXIT WHEN batch_last_id IS NULL;
+        last_id := batch_last_id;
+        COMMIT;
+    END LOOP;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION enhanced_hybrid_search(
+    query_embedding vector(1536),
+    query_text TEXT,
+    match_count INT DEFAULT 10,
+    text_weight FLOAT DEFAULT 0.3,
+    boost_recent BOOLEAN DEFAULT FALSE,
+    filters JSONB DEFAULT '{}'
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    document_id UUID,
+    content TEXT,
+    enhanced_score FLOAT,
+    base_score FLOAT,
+    vector_similarity FLOAT,
+    text_similarity FLOAT,
+    recency_boost FLOAT,
+    content_length_factor FLOAT,
+    query_term_density FLOAT,
+    metadata JSONB,
+    document_title TEXT,
+    document_source TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH filtered_documents AS (
+        SELECT f.id FROM filter_documents(filters) f
+    ),
+    vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters = '{}'::jsonb
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    filtered_vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters <> '{}'::jsonb
+          AND c.document_id IN (SELECT id FROM filtered_documents)
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    text_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.content_tsv @@ plainto_tsquery('english', query_text)
+          AND (filters = '{}'::jsonb OR c.document_id IN (SELECT id FROM filtered_documents))
+        ORDER BY ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text)) DESC
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    candidates AS (
+        SELECT id FROM vector_candidates
+        UNION
+        SELECT id FROM filtered_vector_candidates
+        UNION
+        SELECT id FROM text_candidates
+    ),
+    scored AS (
+        SELECT
+            c.id,
+            c.document_id,
+            c.content,
+            c.metadata,
+            d.title AS doc_title,
+            d.source AS doc_source,
+            d.created_at,
+            c.word_count,
+            c.content_length_factor,
+            c.content_terms,
+            COALESCE(1 - (c.embedding <=> query_embedding), 0)::FLOAT AS vector_sim,
+            ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text))::FLOAT AS text_sim
+        FROM candidates k
+        JOIN chunks c ON c.id = k.id
+        JOIN documents d ON c.document_id = d.id
+    ),
+    query_terms AS (
+        SELECT tsvector_to_array(to_tsvector('simple', query_text)) AS terms
+    ),
+    enhanced_results AS (
+        SELECT
+            s.id AS chunk_id,
+            s.document_id,
+            s.content,
+            -- Base hybrid score
+            (s.vector_sim * (1 - text_weight) + s.text_sim * text_weight)::FLOAT AS base_score,
+            s.vector_sim,
+            s.text_sim,
+            -- Recency boost (newer documents get higher scores)
+            CASE
+                WHEN boost_recent THEN
+                    GREATEST(0, 1 - EXTRACT(DAYS FROM (NOW() - s.created_at)) / 365.0) * 0.1
+                ELSE 0
+            END::FLOAT AS recency_boost,
+            -- Content length factor (moderate length preferred), precomputed
+            s.content_length_factor,
+            -- Query term density against the precomputed lower-cased term set
+            (
+                SELECT COUNT(*)::FLOAT / GREATEST(1, s.word_count)
+                FROM unnest(q.terms) AS query_term
+                WHERE query_term = ANY(s.content_terms)
+            ) AS query_term_density,
+            s.metadata,
+            s.doc_title,
+            s.doc_source
+        FROM scored s
+        CROSS JOIN query_terms q
+    )
+    SELECT
+        er.chunk_id,
+        er.document_id,
+        er.content,
+        -- Enhanced score combining all factors
+        ((er.base_score + er.recency_boost) * er.content_length_factor + (er.query_term_density * 0.1))::FLOAT AS enhanced_score,
+        er.base_score,
+        er.vector_sim AS vector_similarity,
+        er.text_sim AS text_similarity,
+        er.recency_boost,
+        er.content_length_factor,
+        er.query_term_density,
+        er.metadata,
+        er.doc_title AS document_title,
+        er.doc_source AS document_source
+    FROM enhanced_results er
+    ORDER BY enhanced_score DESC
+    LIMIT match_count;
+$$;
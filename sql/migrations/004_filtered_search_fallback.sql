@@ -0,0 +1,325 @@
+-- Migration: exact-ranking fallback for filtered vector search.
+--
+-- Re-creates the search functions so that filtered searches whose ANN scan
+-- comes back short after filtering rank the filtered chunks exactly.
+--
+--   psql "$DATABASE_URL" -f sql/migrations/004_filtered_search_fallback.sql
+
+-- With filters, vector candidates come from a separate branch so the planner
+-- can pick an exact scan over a small filtered set instead of post-filtering
+-- the ANN results. Only one branch runs for a given call. If post-filtering
+-- still comes up short, the filtered chunks are ranked exactly; ordering by
+-- cosine_distance() rather than <=> keeps that branch off the ANN index.
+CREATE OR REPLACE FUNCTION match_chunks(
+    query_embedding vector(1536),
+    match_count INT DEFAULT 10,
+    filters JSONB DEFAULT '{}'
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    document_id UUID,
+    content TEXT,
+    similarity FLOAT,
+    metadata JSONB,
+    document_title TEXT,
+    document_source TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH filtered_documents AS (
+        SELECT f.id FROM filter_documents(filters) f
+    ),
+    vector_candidates AS (
+        (
+            SELECT c.id, c.embedding <=> query_embedding AS distance
+            FROM chunks c
+            WHERE c.embedding IS NOT NULL
+              AND filters = '{}'::jsonb
+            ORDER BY c.embedding <=> query_embedding
+            LIMIT match_count
+        )
+        UNION ALL
+        (
+            SELECT c.id, c.embedding <=> query_embedding AS distance
+            FROM chunks c
+            WHERE c.embedding IS NOT NULL
+              AND filters <> '{}'::jsonb
+              AND c.document_id IN (SELECT id FROM filtered_documents)
+            ORDER BY c.embedding <=> query_embedding
+            LIMIT match_count
+        )
+    ),
+    exact_candidates AS (
+        SELECT c.id, cosine_distance(c.embedding, query_embedding) AS distance
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters <> '{}'::jsonb
+          AND c.document_id IN (SELECT id FROM filtered_documents)
+          AND (SELECT count(*) FROM vector_candidates) < match_count
+        ORDER BY cosine_distance(c.embedding, query_embedding)
+        LIMIT match_count
+    ),
+    candidates AS (
+        SELECT id, distance FROM vector_candidates
+        WHERE filters = '{}'::jsonb OR (SELECT count(*) FROM vector_candidates) >= match_count
+        UNION ALL
+        SELECT id, distance FROM exact_candidates
+    )
+    SELECT
+        c.id AS chunk_id,
+        c.document_id,
+        c.content,
+        (1 - k.distance)::FLOAT AS similarity,
+        c.metadata,
+        d.title AS document_title,
+        d.source AS document_source
+    FROM candidates k
+    JOIN chunks c ON c.id = k.id
+    JOIN documents d ON c.document_id = d.id
+    ORDER BY k.distance
+    LIMIT match_count;
+$$;
+
+-- Hybrid search functions build two small candidate sets with top-k queries
+-- the planner can answer from the ANN index (ORDER BY distance LIMIT k) and
+-- the GIN index on content_tsv, then score only the union of those candidates.
+-- Filtered vector candidates follow the same branches as match_chunks.
+-- They are plain SQL so they get inlined into the caller's plan.
+CREATE OR REPLACE FUNCTION hybrid_search(
+    query_embedding vector(1536),
+    query_text TEXT,
+    match_count INT DEFAULT 10,
+    text_weight FLOAT DEFAULT 0.3,
+    filters JSONB DEFAULT '{}'
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    document_id UUID,
+    content TEXT,
+    combined_score FLOAT,
+    vector_similarity FLOAT,
+    text_similarity FLOAT,
+    metadata JSONB,
+    document_title TEXT,
+    document_source TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH filtered_documents AS (
+        SELECT f.id FROM filter_documents(filters) f
+    ),
+    vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters = '{}'::jsonb
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    filtered_vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters <> '{}'::jsonb
+          AND c.document_id IN (SELECT id FROM filtered_documents)
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    exact_vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters <> '{}'::jsonb
+          AND c.document_id IN (SELECT id FROM filtered_documents)
+          AND (SELECT count(*) FROM filtered_vector_candidates) < GREATEST(match_count * 4, 40)
+        ORDER BY cosine_distance(c.embedding, query_embedding)
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    text_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.content_tsv @@ plainto_tsquery('english', query_text)
+          AND (filters = '{}'::jsonb OR c.document_id IN (SELECT id FROM filtered_documents))
+        ORDER BY ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text)) DESC
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    candidates AS (
+        SELECT id FROM vector_candidates
+        UNION
+        SELECT id FROM filtered_vector_candidates
+        UNION
+        SELECT id FROM exact_vector_candidates
+        UNION
+        SELECT id FROM text_candidates
+    ),
+    scored AS (
+        SELECT
+            c.id,
+            c.document_id,
+            c.content,
+            c.metadata,
+            COALESCE(1 - (c.embedding <=> query_embedding), 0)::FLOAT AS vector_sim,
+            ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text))::FLOAT AS text_sim
+        FROM candidates k
+        JOIN chunks c ON c.id = k.id
+    )
+    SELECT
+        s.id AS chunk_id,
+        s.document_id,
+        s.content,
+        (s.vector_sim * (1 - text_weight) + s.text_sim * text_weight)::FLOAT AS combined_score,
+        s.vector_sim AS vector_similarity,
+        s.text_sim AS text_similarity,
+        s.metadata,
+        d.title AS document_title,
+        d.source AS document_source
+    FROM scored s
+    JOIN documents d ON s.document_id = d.id
+    ORDER BY combined_score DESC
+    LIMIT match_count;
+$$;
+
+CREATE OR REPLACE FUNCTION enhanced_hybrid_search(
+    query_embedding vector(1536),
+    query_text TEXT,
+    match_count INT DEFAULT 10,
+    text_weight FLOAT DEFAULT 0.3,
+    boost_recent BOOLEAN DEFAULT FALSE,
+    filters JSONB DEFAULT '{}'
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    document_id UUID,
+    content TEXT,
+    enhanced_score FLOAT,
+    base_score FLOAT,
+    vector_similarity FLOAT,
+    text_similarity FLOAT,
+    recency_boost FLOAT,
+    content_length_factor FLOAT,
+    query_term_density FLOAT,
+    metadata JSONB,
+    document_title TEXT,
+    document_source TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH filtered_documents AS (
+        SELECT f.id FROM filter_documents(filters) f
+    ),
+    vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters = '{}'::jsonb
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    filtered_vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters <> '{}'::jsonb
+          AND c.document_id IN (SELECT id FROM filtered_documents)
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    exact_vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters <> '{}'::jsonb
+          AND c.document_id IN (SELECT id FROM filtered_documents)
+          AND (SELECT count(*) FROM filtered_vector_candidates) < GREATEST(match_count * 4, 40)
+        ORDER BY cosine_distance(c.embedding, query_embedding)
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    text_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.content_tsv @@ plainto_tsquery('english', query_text)
+          AND (filters = '{}'::jsonb OR c.document_id IN (SELECT id FROM filtered_documents))
+        ORDER BY ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text)) DESC
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    candidates AS (
+        SELECT id FROM vector_candidates
+        UNION
+        SELECT id FROM filtered_vector_candidates
+        UNION
+        SELECT id FROM exact_vector_candidates
+        UNION
+        SELECT id FROM text_candidates
+    ),
+    scored AS (
+        SELECT
+            c.id,
+            c.document_id,
+            c.content,
+            c.metadata,
+            d.title AS doc_title,
+            d.source AS doc_source,
+            d.created_at,
+            c.word_count,
+            c.content_length_factor,
+            c.content_terms,
+            COALESCE(1 - (c.embedding <=> query_embedding), 0)::FLOAT AS vector_sim,
+            ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text))::FLOAT AS text_sim
+        FROM candidates k
+        JOIN chunks c ON c.id = k.id
+        JOIN documents d ON c.document_id = d.id
+    ),
+    query_terms AS (
+        SELECT tsvector_to_array(to_tsvector('simple', query_text)) AS terms
+    ),
+    enhanced_results AS (
+        SELECT
+            s.id AS chunk_id,
+            s.document_id,
+            s.content,
+            -- Base hybrid score
+            (s.vector_sim * (1 - text_weight) + s.text_sim * text_weight)::FLOAT AS base_score,
+            s.vector_sim,
+            s.text_sim,
+            -- Recency boost (newer documents get higher scores)
+            CASE
+                WHEN boost_recent THEN
+                    GREATEST(0, 1 - EXTRACT(DAYS FROM (NOW() - s.created_at)) / 365.0) * 0.1
+                ELSE 0
+            END::FLOAT AS recency_boost,
+            -- Content length factor (moderate length preferred), precomputed
+            s.content_length_factor,
+            -- Query term density against the precomputed lower-cased term set
+            (
+                SELECT COUNT(*)::FLOAT / GREATEST(1, s.word_count)
+                FROM unnest(q.terms) AS query_term
+                WHERE query_term = ANY(s.content_terms)
+            ) AS query_term_density,
+            s.metadata,
+            s.doc_title,
+            s.doc_source
+        FROM scored s
+        CROSS JOIN query_terms q
+    )
+    SELECT
+        er.chunk_id,
+        er.document_id,
+        er.content,
+        -- Enhanced score combining all factors
+        ((er.base_score + er.recency_boost) * er.content_length_factor + (er.query_term_density * 0.1))::FLOAT AS enhanced_score,
+        er.base_score,
+        er.vector_sim AS vector_similarity,
+        er.text_sim AS text_similarity,
+        er.recency_boost,
+        er.content_length_factor,
+        er.query_term_density,
+        er.metadata,
+        er.doc_title AS document_title,
+        er.doc_source AS document_source
+    FROM enhanced_results er
+    ORDER BY enhanced_score DESC
+    LIMIT match_count;
+$$;
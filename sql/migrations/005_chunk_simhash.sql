@@ -0,0 +1,13 @@
+-- Migration: SimHash signatures for near-duplicate chunk detection.
+--
+--   psql "$DATABASE_URL" -f sql/migrations/005_chunk_simhash.sql
+--
+-- Signatures are computed in Python (agent/simhash.py) when chunks are
+-- ingested, so this only adds the nullable column, which does not rewrite the
+-- table. Fill it in for existing chunks with:
+--
+--   python -m ingestion.ingest --backfill-simhash
+--
+-- Until then, search deduplication computes missing signatures on the fly.
+
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS simhash BIGINT;
@@ -0,0 +1,11 @@
+-- Migration: corpus version counter for the retrieval cache.
+--
+--   psql "$DATABASE_URL" -f sql/migrations/006_corpus_version.sql
+
+CREATE TABLE IF NOT EXISTS corpus_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO corpus_version DEFAULT VALUES ON CONFLICT (id) DO NOTHING;
@@ -0,0 +1,73 @@
+-- Migration: binary-quantized embeddings for two-stage vector search.
+--
+-- Run with psql in autocommit mode (not with -1/--single-transaction), since
+-- the backfill commits between batches:
+--
+--   psql "$DATABASE_URL" -f sql/migrations/007_quantized_embeddings.sql
+--
+-- Fresh installs get embedding_bits as a GENERATED ... STORED column from
+-- sql/schema.sql. As in 003, existing tables get a plain column maintained by
+-- a trigger so adding it does not rewrite the table under a long lock.
+
+CREATE OR REPLACE FUNCTION embedding_sign_bits(embedding vector)
+RETURNS bit(1536)
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT string_agg(CASE WHEN x > 0 THEN '1' ELSE '0' END, '' ORDER BY i)::bit(1536)
+    FROM unnest(embedding::real[]) WITH ORDINALITY AS t(x, i);
+$$;
+
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS embedding_bits bit(1536);
+
+CREATE OR REPLACE FUNCTION update_chunks_embedding_bits()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.embedding_bits = embedding_sign_bits(NEW.embedding);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_chunks_embedding_bits ON chunks;
+CREATE TRIGGER update_chunks_embedding_bits BEFORE INSERT OR UPDATE OF embedding ON chunks
+    FOR EACH ROW EXECUTE FUNCTION update_chunks_embedding_bits();
+
+-- Backfill in primary key order, committing every batch
+DO $$
+DECLARE
+    batch_size CONSTANT INT := 5000;
+    last_id UUID := '00000000-0000-0000-0000-000000000000';
+    batch_last_id UUID;
+BEGIN
+    LOOP
+        batch_last_id := NULL;
+        WITH batch AS (
+            SELECT id FROM chunks
+            WHERE id > last_id
+            ORDER BY id
+            LIMIT batch_size
+        ),
+        updated AS (
+            UPDATE chunks c
+            SET embedding_bits = embedding_sign_bits(c.embedding)
+            FROM batch b
+            WHERE c.id = b.id AND c.embedding_bits IS NULL AND c.embedding IS NOT NULL
+        )
+        SELECT id INTO batch_last_id FROM batch ORDER BY id DESC LIMIT 1;
+
+        EXIT WHEN batch_last_id IS NULL;
+        last_id := batch_last_id;
+        COMMIT;
+    END LOOP;
+END;
+$$;
+
+-- pgvector 0.7+ can index the quantized embeddings with HNSW on Hamming
+-- distance; older versions scan the compact column instead
+DO $$
+BEGIN
+    IF string_to_array((SELECT extversion FROM pg_extension WHERE extname = 'vector'), '.')::int[] >= ARRAY[0, 7, 0] THEN
+        EXECUTE 'CREATE INDEX IF NOT EXISTS idx_chunks_embedding_bits ON chunks USING hnsw (embedding_bits bit_hamming_ops)';
+    END IF;
+END;
+$$;
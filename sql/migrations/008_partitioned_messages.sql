@@ -0,0 +1,126 @@
+-- Migration: monthly range partitioning of messages by created_at.
+--
+-- Rebuilds messages as a partitioned table and copies the existing rows
+-- across in one transaction, so chat writes wait on the lock while it runs.
+-- Apply it in a quiet period (or with the API stopped):
+--
+--   psql "$DATABASE_URL" -f sql/migrations/008_partitioned_messages.sql
+--
+-- Afterwards agent/session_sweeper.py keeps partitions ahead of time, deletes
+-- expired sessions and, with MESSAGE_RETENTION_MONTHS set, retires old months.
+
+BEGIN;
+
+LOCK TABLE messages IN ACCESS EXCLUSIVE MODE;
+
+ALTER TABLE messages RENAME TO messages_unpartitioned;
+ALTER TABLE messages_unpartitioned RENAME CONSTRAINT messages_pkey TO messages_unpartitioned_pkey;
+ALTER INDEX idx_messages_session_id RENAME TO idx_messages_unpartitioned_session_id;
+
+CREATE TABLE messages (
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    session_id UUID NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    role TEXT NOT NULL CHECK (role IN ('user', 'assistant', 'system')),
+    content TEXT NOT NULL,
+    metadata JSONB DEFAULT '{}',
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE messages_default PARTITION OF messages DEFAULT;
+
+CREATE INDEX idx_messages_session_id ON messages (session_id, created_at);
+
+-- Create the partition for the month containing month_start (named
+-- messages_YYYY_MM). Rows that already landed in messages_default for that
+-- month are moved into it. Returns FALSE if the partition already exists.
+CREATE OR REPLACE FUNCTION create_message_partition(month_start TIMESTAMPTZ)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    lower_bound TIMESTAMPTZ := date_trunc('month', month_start, 'UTC');
+    upper_bound TIMESTAMPTZ := date_trunc('month', month_start, 'UTC') + INTERVAL '1 month';
+    partition_name TEXT := 'messages_' || to_char(lower_bound AT TIME ZONE 'UTC', 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE messages INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM messages_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        lower_bound, upper_bound, partition_name
+    );
+    EXECUTE format(
+        'ALTER TABLE messages ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, lower_bound, upper_bound
+    );
+    RETURN TRUE;
+END;
+$$;
+
+-- Make sure partitions exist for this month and the next months_ahead months.
+-- Returns the number of partitions created.
+CREATE OR REPLACE FUNCTION ensure_message_partitions(months_ahead INT DEFAULT 2)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    created INT := 0;
+BEGIN
+    FOR i IN 0..months_ahead LOOP
+        IF create_message_partition(CURRENT_TIMESTAMP + make_interval(months => i)) THEN
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+-- Detach (and unless keep_detached, drop) monthly partitions that ended more
+-- than retention_months months before the current month. Detached partitions
+-- stay behind as plain tables for archiving. Returns the affected partitions.
+CREATE OR REPLACE FUNCTION retire_message_partitions(retention_months INT, keep_detached BOOLEAN DEFAULT FALSE)
+RETURNS SETOF TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    cutoff TIMESTAMPTZ := date_trunc('month', CURRENT_TIMESTAMP, 'UTC') - make_interval(months => retention_months);
+    partition_name TEXT;
+BEGIN
+    FOR partition_name IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'messages'::regclass
+          AND c.relname ~ '^messages_[0-9]{4}_[0-9]{2}$'
+          AND to_date(substring(c.relname FROM 10), 'YYYY_MM')::timestamp AT TIME ZONE 'UTC' < cutoff
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('ALTER TABLE messages DETACH PARTITION %I', partition_name);
+        IF NOT keep_detached THEN
+            EXECUTE format('DROP TABLE %I', partition_name);
+        END IF;
+        RETURN NEXT partition_name;
+    END LOOP;
+END;
+$$;
+
+-- A partition for every month that has messages, then the upcoming months
+SELECT create_message_partition(month)
+FROM generate_series(
+    date_trunc('month', (SELECT min(created_at) FROM messages_unpartitioned), 'UTC'),
+    CURRENT_TIMESTAMP,
+    INTERVAL '1 month'
+) AS month;
+SELECT ensure_message_partitions();
+
+INSERT INTO messages (id, session_id, role, content, metadata, created_at)
+SELECT id, session_id, role, content, metadata, COALESCE(created_at, CURRENT_TIMESTAMP)
+FROM messages_unpartitioned;
+
+DROP TABLE messages_unpartitioned;
+
+COMMIT;
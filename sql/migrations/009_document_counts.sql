@@ -0,0 +1,48 @@
+-- Migration: per-document chunk_count/total_tokens and keyset listing order.
+--
+--   psql "$DATABASE_URL" -f sql/migrations/009_document_counts.sql
+--
+-- Document listings used to LEFT JOIN chunks and GROUP BY every document on
+-- each call. The counts are now stored on the document row, written by
+-- ingestion together with the chunks, and backfilled here once.
+
+ALTER TABLE documents
+    ADD COLUMN IF NOT EXISTS chunk_count INT NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS total_tokens INT NOT NULL DEFAULT 0;
+
+-- The backfill is bookkeeping, not an edit, so updated_at is left alone
+ALTER TABLE documents DISABLE TRIGGER update_documents_updated_at;
+
+UPDATE documents d
+SET chunk_count = c.chunk_count,
+    total_tokens = c.total_tokens
+FROM (
+    SELECT document_id, COUNT(*) AS chunk_count, COALESCE(SUM(token_count), 0) AS total_tokens
+    FROM chunks
+    GROUP BY document_id
+) c
+WHERE d.id = c.document_id;
+
+-- Keyset pagination compares (created_at, id), which needs created_at set
+UPDATE documents SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL;
+ALTER TABLE documents ALTER COLUMN created_at SET NOT NULL;
+
+ALTER TABLE documents ENABLE TRIGGER update_documents_updated_at;
+
+CREATE INDEX IF NOT EXISTS idx_documents_created_at_id ON documents (created_at DESC, id DESC);
+DROP INDEX IF EXISTS idx_documents_created_at;
+
+-- The column types change, so the view is recreated rather than replaced
+DROP VIEW IF EXISTS document_summaries;
+CREATE VIEW document_summaries AS
+SELECT
+    d.id,
+    d.title,
+    d.source,
+    d.created_at,
+    d.updated_at,
+    d.metadata,
+    d.chunk_count,
+    d.total_tokens::numeric / NULLIF(d.chunk_count, 0) AS avg_tokens_per_chunk,
+    d.total_tokens
+FROM documents d;
@@ -0,0 +1,73 @@
+-- Migration: move document bodies out of the documents table.
+--
+-- Run with psql in autocommit mode (not with -1/--single-transaction), since
+-- the copy commits between batches, and with ingestion stopped so no new
+-- document is written between the copy and dropping documents.content:
+--
+--   psql "$DATABASE_URL" -f sql/migrations/010_document_bodies.sql
+--
+-- Dropping the column only hides it; run VACUUM FULL documents afterwards
+-- (it takes an exclusive lock) to give the space back.
+
+CREATE TABLE IF NOT EXISTS document_bodies (
+    document_id UUID PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+    content TEXT NOT NULL
+);
+
+-- lz4 decompresses faster than the default pglz where the server supports it
+DO $$
+BEGIN
+    ALTER TABLE document_bodies ALTER COLUMN content SET COMPRESSION lz4;
+EXCEPTION WHEN feature_not_supported OR invalid_parameter_value OR syntax_error THEN
+    NULL;
+END;
+$$;
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_length INT NOT NULL DEFAULT 0;
+
+-- Copy in primary key order, committing every batch
+DO $$
+DECLARE
+    batch_size CONSTANT INT := 500;
+    last_id UUID := '00000000-0000-0000-0000-000000000000';
+    batch_last_id UUID;
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'documents' AND column_name = 'content'
+    ) THEN
+        RETURN;
+    END IF;
+
+    -- Bookkeeping, not an edit, so updated_at is left alone
+    ALTER TABLE documents DISABLE TRIGGER update_documents_updated_at;
+    LOOP
+        batch_last_id := NULL;
+        WITH batch AS (
+            SELECT id, content FROM documents
+            WHERE id > last_id
+            ORDER BY id
+            LIMIT batch_size
+        ),
+        copied AS (
+            INSERT INTO document_bodies (document_id, content)
+            SELECT id, content FROM batch
+            ON CONFLICT (document_id) DO NOTHING
+        ),
+        measured AS (
+            UPDATE documents d
+            SET content_length = length(b.content)
+            FROM batch b
+            WHERE d.id = b.id
+        )
+        SELECT id INTO batch_last_id FROM batch ORDER BY id DESC LIMIT 1;
+
+        EXIT WHEN batch_last_id IS NULL;
+        last_id := batch_last_id;
+        COMMIT;
+    END LOOP;
+    ALTER TABLE documents ENABLE TRIGGER update_documents_updated_at;
+END;
+$$;
+
+ALTER TABLE documents DROP COLUMN IF EXISTS content;
@@ -0,0 +1,11 @@
+-- Migration: record which chunks have been through graph extraction.
+--
+--   psql "$DATABASE_URL" -f sql/migrations/011_chunk_graph_extracted.sql
+--
+-- Near-duplicate detection at ingestion used to treat every stored chunk as
+-- already extracted, so a document stored without graph extraction was
+-- skipped as a duplicate of itself when ingested again. Only chunks flagged
+-- here now count. Whether existing chunks reached the graph is unknown, so
+-- they start unflagged and are extracted again the next time they are seen.
+
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS graph_extracted BOOLEAN NOT NULL DEFAULT FALSE;
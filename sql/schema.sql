@@ -5,40 +5,116 @@ CREATE EXTENSION IF NOT EXISTS pg_trgm;
 DROP TABLE IF EXISTS messages CASCADE;
 DROP TABLE IF EXISTS sessions CASCADE;
 DROP TABLE IF EXISTS chunks CASCADE;
+DROP TABLE IF EXISTS document_bodies CASCADE;
 DROP TABLE IF EXISTS documents CASCADE;
+DROP TABLE IF EXISTS corpus_version;
 DROP INDEX IF EXISTS idx_chunks_embedding;
+DROP INDEX IF EXISTS idx_chunks_embedding_bits;
 DROP INDEX IF EXISTS idx_chunks_document_id;
 DROP INDEX IF EXISTS idx_documents_metadata;
+DROP INDEX IF EXISTS idx_documents_created_at_id;
+DROP INDEX IF EXISTS idx_documents_source;
+DROP INDEX IF EXISTS idx_documents_title_trgm;
 DROP INDEX IF EXISTS idx_chunks_content_trgm;
+DROP INDEX IF EXISTS idx_chunks_content_tsv;
+
+-- Binary quantization of an embedding: one bit per dimension, set when the
+-- value is positive (the same rule as pgvector 0.7's binary_quantize). Stored
+-- per chunk for the coarse stage of quantized vector search.
+CREATE OR REPLACE FUNCTION embedding_sign_bits(embedding vector)
+RETURNS bit(1536)
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT string_agg(CASE WHEN x > 0 THEN '1' ELSE '0' END, '' ORDER BY i)::bit(1536)
+    FROM unnest(embedding::real[]) WITH ORDINALITY AS t(x, i);
+$$;
 
 CREATE TABLE documents (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     title TEXT NOT NULL,
     source TEXT NOT NULL,
-    content TEXT NOT NULL,
     metadata JSONB DEFAULT '{}',
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    -- Written with the chunks at ingestion, so listings need not aggregate chunks
+    chunk_count INT NOT NULL DEFAULT 0,
+    total_tokens INT NOT NULL DEFAULT 0,
+    -- Characters in the body, which lives in document_bodies
+    content_length INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE INDEX idx_documents_metadata ON documents USING GIN (metadata);
-CREATE INDEX idx_documents_created_at ON documents (created_at DESC);
+-- Keyset pagination order for document listings
+CREATE INDEX idx_documents_created_at_id ON documents (created_at DESC, id DESC);
+CREATE INDEX idx_documents_source ON documents (source);
+CREATE INDEX idx_documents_title_trgm ON documents USING GIN (title gin_trgm_ops);
+
+-- Full source text, kept out of the documents rows that listings and search
+-- joins read. Large bodies are compressed out of line (TOAST); reads of a
+-- character window only decompress up to the end of that window.
+CREATE TABLE document_bodies (
+    document_id UUID PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+    content TEXT NOT NULL
+);
+
+-- lz4 decompresses faster than the default pglz where the server supports it
+DO $$
+BEGIN
+    ALTER TABLE document_bodies ALTER COLUMN content SET COMPRESSION lz4;
+EXCEPTION WHEN feature_not_supported OR invalid_parameter_value OR syntax_error THEN
+    NULL;
+END;
+$$;
 
 CREATE TABLE chunks (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
     content TEXT NOT NULL,
     embedding vector(1536),
+    -- 192 bytes instead of ~6 KB; ranks candidates before the exact rerank
+    embedding_bits bit(1536) GENERATED ALWAYS AS (embedding_sign_bits(embedding)) STORED,
     chunk_index INTEGER NOT NULL,
     metadata JSONB DEFAULT '{}',
     token_count INTEGER,
+    content_tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', content)) STORED,
+    -- Ranking features for enhanced_hybrid_search, computed once at insert time
+    word_count INTEGER GENERATED ALWAYS AS (COALESCE(array_length(string_to_array(content, ' '), 1), 0)) STORED,
+    content_length_factor FLOAT GENERATED ALWAYS AS (
+        CASE
+            WHEN LENGTH(content) BETWEEN 200 AND 2000 THEN 1.1
+            WHEN LENGTH(content) BETWEEN 100 AND 200 THEN 1.05
+            WHEN LENGTH(content) > 2000 THEN 0.95
+            ELSE 1.0
+        END
+    ) STORED,
+    content_terms TEXT[] GENERATED ALWAYS AS (tsvector_to_array(to_tsvector('simple', content))) STORED,
+    -- 64-bit SimHash of the content for near-duplicate detection (agent/simhash.py)
+    simhash BIGINT,
+    -- Set once the chunk has been through entity extraction and into the graph;
+    -- only such chunks let later near-duplicates skip extraction
+    graph_extracted BOOLEAN NOT NULL DEFAULT FALSE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_chunks_embedding ON chunks USING ivfflat (embedding vector_cosine_ops) WITH (lists = 1);
+-- HNSW needs no training data, so it works from the first insert. Use
+-- `python -m agent.index_manager rebuild` to retune it as the table grows.
+CREATE INDEX idx_chunks_embedding ON chunks USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- pgvector 0.7+ can index the quantized embeddings with HNSW on Hamming
+-- distance; older versions scan the compact column instead
+DO $$
+BEGIN
+    IF string_to_array((SELECT extversion FROM pg_extension WHERE extname = 'vector'), '.')::int[] >= ARRAY[0, 7, 0] THEN
+        EXECUTE 'CREATE INDEX idx_chunks_embedding_bits ON chunks USING hnsw (embedding_bits bit_hamming_ops)';
+    END IF;
+END;
+$$;
+
 CREATE INDEX idx_chunks_document_id ON chunks (document_id);
 CREATE INDEX idx_chunks_chunk_index ON chunks (document_id, chunk_index);
 CREATE INDEX idx_chunks_content_trgm ON chunks USING GIN (content gin_trgm_ops);
+CREATE INDEX idx_chunks_content_tsv ON chunks USING GIN (content_tsv);
 
 CREATE TABLE sessions (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -52,20 +128,145 @@ CREATE TABLE sessions (
 CREATE INDEX idx_sessions_user_id ON sessions (user_id);
 CREATE INDEX idx_sessions_expires_at ON sessions (expires_at);
 
+-- Messages are range-partitioned by month (UTC) so old months can be dropped
+-- or detached as a whole instead of deleted row by row. The partition key has
+-- to be part of the primary key. See agent/session_sweeper.py for upkeep.
 CREATE TABLE messages (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     session_id UUID NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
     role TEXT NOT NULL CHECK (role IN ('user', 'assistant', 'system')),
     content TEXT NOT NULL,
     metadata JSONB DEFAULT '{}',
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Catches rows for months without a partition so inserts never fail
+CREATE TABLE messages_default PARTITION OF messages DEFAULT;
 
 CREATE INDEX idx_messages_session_id ON messages (session_id, created_at);
 
+-- Create the partition for the month containing month_start (named
+-- messages_YYYY_MM). Rows that already landed in messages_default for that
+-- month are moved into it. Returns FALSE if the partition already exists.
+CREATE OR REPLACE FUNCTION create_message_partition(month_start TIMESTAMPTZ)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    lower_bound TIMESTAMPTZ := date_trunc('month', month_start, 'UTC');
+    upper_bound TIMESTAMPTZ := date_trunc('month', month_start, 'UTC') + INTERVAL '1 month';
+    partition_name TEXT := 'messages_' || to_char(lower_bound AT TIME ZONE 'UTC', 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE messages INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM messages_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        lower_bound, upper_bound, partition_name
+    );
+    EXECUTE format(
+        'ALTER TABLE messages ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, lower_bound, upper_bound
+    );
+    RETURN TRUE;
+END;
+$$;
+
+-- Make sure partitions exist for this month and the next months_ahead months.
+-- Returns the number of partitions created.
+CREATE OR REPLACE FUNCTION ensure_message_partitions(months_ahead INT DEFAULT 2)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    created INT := 0;
+BEGIN
+    FOR i IN 0..months_ahead LOOP
+        IF create_message_partition(CURRENT_TIMESTAMP + make_interval(months => i)) THEN
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+-- Detach (and unless keep_detached, drop) monthly partitions that ended more
+-- than retention_months months before the current month. Detached partitions
+-- stay behind as plain tables for archiving. Returns the affected partitions.
+CREATE OR REPLACE FUNCTION retire_message_partitions(retention_months INT, keep_detached BOOLEAN DEFAULT FALSE)
+RETURNS SETOF TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    cutoff TIMESTAMPTZ := date_trunc('month', CURRENT_TIMESTAMP, 'UTC') - make_interval(months => retention_months);
+    partition_name TEXT;
+BEGIN
+    FOR partition_name IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'messages'::regclass
+          AND c.relname ~ '^messages_[0-9]{4}_[0-9]{2}$'
+          AND to_date(substring(c.relname FROM 10), 'YYYY_MM')::timestamp AT TIME ZONE 'UTC' < cutoff
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('ALTER TABLE messages DETACH PARTITION %I', partition_name);
+        IF NOT keep_detached THEN
+            EXECUTE format('DROP TABLE %I', partition_name);
+        END IF;
+        RETURN NEXT partition_name;
+    END LOOP;
+END;
+$$;
+
+SELECT ensure_message_partitions();
+
+-- Single-row counter bumped in the same transaction as document/chunk writes,
+-- so the API's retrieval cache knows when cached search results are stale
+CREATE TABLE corpus_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO corpus_version DEFAULT VALUES;
+
+-- Search filters are passed as one JSONB object; every key is optional:
+--   {"source": "exact/source.md", "title": "substring (case-insensitive)",
+--    "created_after": "2024-01-01T00:00:00Z", "created_before": "...",
+--    "metadata": {"category": "annual_report"}}   -- containment on documents.metadata
+CREATE OR REPLACE FUNCTION filter_documents(filters JSONB)
+RETURNS TABLE (id UUID)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT d.id
+    FROM documents d
+    WHERE (filters->>'source' IS NULL OR d.source = filters->>'source')
+      AND (filters->>'title' IS NULL OR d.title ILIKE '%' || (filters->>'title') || '%')
+      AND (filters->>'created_after' IS NULL OR d.created_at >= (filters->>'created_after')::timestamptz)
+      AND (filters->>'created_before' IS NULL OR d.created_at < (filters->>'created_before')::timestamptz)
+      AND (filters->'metadata' IS NULL OR d.metadata @> (filters->'metadata'));
+$$;
+
+-- Old signatures without the filters argument would make calls ambiguous
+DROP FUNCTION IF EXISTS match_chunks(vector, INT);
+DROP FUNCTION IF EXISTS hybrid_search(vector, TEXT, INT, FLOAT);
+DROP FUNCTION IF EXISTS enhanced_hybrid_search(vector, TEXT, INT, FLOAT, BOOLEAN);
+
+-- With filters, vector candidates come from a separate branch so the planner
+-- can pick an exact scan over a small filtered set instead of post-filtering
+-- the ANN results. Only one branch runs for a given call. If post-filtering
+-- still comes up short, the filtered chunks are ranked exactly; ordering by
+-- cosine_distance() rather than <=> keeps that branch off the ANN index.
 CREATE OR REPLACE FUNCTION match_chunks(
     query_embedding vector(1536),
-    match_count INT DEFAULT 10
+    match_count INT DEFAULT 10,
+    filters JSONB DEFAULT '{}'
 )
 RETURNS TABLE (
     chunk_id UUID,
@@ -76,31 +277,74 @@ RETURNS TABLE (
     document_title TEXT,
     document_source TEXT
 )
-LANGUAGE plpgsql
+LANGUAGE sql
+STABLE
 AS $$
-BEGIN
-    RETURN QUERY
-    SELECT 
+    WITH filtered_documents AS (
+        SELECT f.id FROM filter_documents(filters) f
+    ),
+    vector_candidates AS (
+        (
+            SELECT c.id, c.embedding <=> query_embedding AS distance
+            FROM chunks c
+            WHERE c.embedding IS NOT NULL
+              AND filters = '{}'::jsonb
+            ORDER BY c.embedding <=> query_embedding
+            LIMIT match_count
+        )
+        UNION ALL
+        (
+            SELECT c.id, c.embedding <=> query_embedding AS distance
+            FROM chunks c
+            WHERE c.embedding IS NOT NULL
+              AND filters <> '{}'::jsonb
+              AND c.document_id IN (SELECT id FROM filtered_documents)
+            ORDER BY c.embedding <=> query_embedding
+            LIMIT match_count
+        )
+    ),
+    exact_candidates AS (
+        SELECT c.id, cosine_distance(c.embedding, query_embedding) AS distance
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters <> '{}'::jsonb
+          AND c.document_id IN (SELECT id FROM filtered_documents)
+          AND (SELECT count(*) FROM vector_candidates) < match_count
+        ORDER BY cosine_distance(c.embedding, query_embedding)
+        LIMIT match_count
+    ),
+    candidates AS (
+        SELECT id, distance FROM vector_candidates
+        WHERE filters = '{}'::jsonb OR (SELECT count(*) FROM vector_candidates) >= match_count
+        UNION ALL
+        SELECT id, distance FROM exact_candidates
+    )
+    SELECT
         c.id AS chunk_id,
         c.document_id,
         c.content,
-        1 - (c.embedding <=> query_embedding) AS similarity,
+        (1 - k.distance)::FLOAT AS similarity,
         c.metadata,
         d.title AS document_title,
         d.source AS document_source
-    FROM chunks c
+    FROM candidates k
+    JOIN chunks c ON c.id = k.id
     JOIN documents d ON c.document_id = d.id
-    WHERE c.embedding IS NOT NULL
-    ORDER BY c.embedding <=> query_embedding
+    ORDER BY k.distance
     LIMIT match_count;
-END;
 $$;
 
+-- Hybrid search functions build two small candidate sets with top-k queries
+-- the planner can answer from the ANN index (ORDER BY distance LIMIT k) and
+-- the GIN index on content_tsv, then score only the union of those candidates.
+-- Filtered vector candidates follow the same branches as match_chunks.
+-- They are plain SQL so they get inlined into the caller's plan.
 CREATE OR REPLACE FUNCTION hybrid_search(
     query_embedding vector(1536),
     query_text TEXT,
     match_count INT DEFAULT 10,
-    text_weight FLOAT DEFAULT 0.3
+    text_weight FLOAT DEFAULT 0.3,
+    filters JSONB DEFAULT '{}'
 )
 RETURNS TABLE (
     chunk_id UUID,
@@ -113,51 +357,81 @@ RETURNS TABLE (
     document_title TEXT,
     document_source TEXT
 )
-LANGUAGE plpgsql
+LANGUAGE sql
+STABLE
 AS $$
-BEGIN
-    RETURN QUERY
-    WITH vector_results AS (
-        SELECT 
-            c.id AS chunk_id,
-            c.document_id,
-            c.content,
-            1 - (c.embedding <=> query_embedding) AS vector_sim,
-            c.metadata,
-            d.title AS doc_title,
-            d.source AS doc_source
+    WITH filtered_documents AS (
+        SELECT f.id FROM filter_documents(filters) f
+    ),
+    vector_candidates AS (
+        SELECT c.id
         FROM chunks c
-        JOIN documents d ON c.document_id = d.id
         WHERE c.embedding IS NOT NULL
+          AND filters = '{}'::jsonb
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
     ),
-    text_results AS (
-        SELECT 
-            c.id AS chunk_id,
+    filtered_vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters <> '{}'::jsonb
+          AND c.document_id IN (SELECT id FROM filtered_documents)
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    exact_vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters <> '{}'::jsonb
+          AND c.document_id IN (SELECT id FROM filtered_documents)
+          AND (SELECT count(*) FROM filtered_vector_candidates) < GREATEST(match_count * 4, 40)
+        ORDER BY cosine_distance(c.embedding, query_embedding)
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    text_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.content_tsv @@ plainto_tsquery('english', query_text)
+          AND (filters = '{}'::jsonb OR c.document_id IN (SELECT id FROM filtered_documents))
+        ORDER BY ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text)) DESC
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    candidates AS (
+        SELECT id FROM vector_candidates
+        UNION
+        SELECT id FROM filtered_vector_candidates
+        UNION
+        SELECT id FROM exact_vector_candidates
+        UNION
+        SELECT id FROM text_candidates
+    ),
+    scored AS (
+        SELECT
+            c.id,
             c.document_id,
             c.content,
-            ts_rank_cd(to_tsvector('english', c.content), plainto_tsquery('english', query_text)) AS text_sim,
             c.metadata,
-            d.title AS doc_title,
-            d.source AS doc_source
-        FROM chunks c
-        JOIN documents d ON c.document_id = d.id
-        WHERE to_tsvector('english', c.content) @@ plainto_tsquery('english', query_text)
+            COALESCE(1 - (c.embedding <=> query_embedding), 0)::FLOAT AS vector_sim,
+            ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text))::FLOAT AS text_sim
+        FROM candidates k
+        JOIN chunks c ON c.id = k.id
     )
-    SELECT 
-        COALESCE(v.chunk_id, t.chunk_id) AS chunk_id,
-        COALESCE(v.document_id, t.document_id) AS document_id,
-        COALESCE(v.content, t.content) AS content,
-        (COALESCE(v.vector_sim, 0) * (1 - text_weight) + COALESCE(t.text_sim, 0) * text_weight) AS combined_score,
-        COALESCE(v.vector_sim, 0) AS vector_similarity,
-        COALESCE(t.text_sim, 0) AS text_similarity,
-        COALESCE(v.metadata, t.metadata) AS metadata,
-        COALESCE(v.doc_title, t.doc_title) AS document_title,
-        COALESCE(v.doc_source, t.doc_source) AS document_source
-    FROM vector_results v
-    FULL OUTER JOIN text_results t ON v.chunk_id = t.chunk_id
+    SELECT
+        s.id AS chunk_id,
+        s.document_id,
+        s.content,
+        (s.vector_sim * (1 - text_weight) + s.text_sim * text_weight)::FLOAT AS combined_score,
+        s.vector_sim AS vector_similarity,
+        s.text_sim AS text_similarity,
+        s.metadata,
+        d.title AS document_title,
+        d.source AS document_source
+    FROM scored s
+    JOIN documents d ON s.document_id = d.id
     ORDER BY combined_score DESC
     LIMIT match_count;
-END;
 $$;
 
 CREATE OR REPLACE FUNCTION enhanced_hybrid_search(
@@ -165,7 +439,8 @@ CREATE OR REPLACE FUNCTION enhanced_hybrid_search(
     query_text TEXT,
     match_count INT DEFAULT 10,
     text_weight FLOAT DEFAULT 0.3,
-    boost_recent BOOLEAN DEFAULT FALSE
+    boost_recent BOOLEAN DEFAULT FALSE,
+    filters JSONB DEFAULT '{}'
 )
 RETURNS TABLE (
     chunk_id UUID,
@@ -182,91 +457,112 @@ RETURNS TABLE (
     document_title TEXT,
     document_source TEXT
 )
-LANGUAGE plpgsql
+LANGUAGE sql
+STABLE
 AS $$
-BEGIN
-    RETURN QUERY
-    WITH vector_results AS (
-        SELECT
-            c.id AS chunk_id,
-            c.document_id,
-            c.content,
-            1 - (c.embedding <=> query_embedding) AS vector_sim,
-            c.metadata,
-            d.title AS doc_title,
-            d.source AS doc_source,
-            d.created_at
+    WITH filtered_documents AS (
+        SELECT f.id FROM filter_documents(filters) f
+    ),
+    vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters = '{}'::jsonb
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    filtered_vector_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.embedding IS NOT NULL
+          AND filters <> '{}'::jsonb
+          AND c.document_id IN (SELECT id FROM filtered_documents)
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    exact_vector_candidates AS (
+        SELECT c.id
         FROM chunks c
-        JOIN documents d ON c.document_id = d.id
         WHERE c.embedding IS NOT NULL
+          AND filters <> '{}'::jsonb
+          AND c.document_id IN (SELECT id FROM filtered_documents)
+          AND (SELECT count(*) FROM filtered_vector_candidates) < GREATEST(match_count * 4, 40)
+        ORDER BY cosine_distance(c.embedding, query_embedding)
+        LIMIT GREATEST(match_count * 4, 40)
     ),
-    text_results AS (
+    text_candidates AS (
+        SELECT c.id
+        FROM chunks c
+        WHERE c.content_tsv @@ plainto_tsquery('english', query_text)
+          AND (filters = '{}'::jsonb OR c.document_id IN (SELECT id FROM filtered_documents))
+        ORDER BY ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text)) DESC
+        LIMIT GREATEST(match_count * 4, 40)
+    ),
+    candidates AS (
+        SELECT id FROM vector_candidates
+        UNION
+        SELECT id FROM filtered_vector_candidates
+        UNION
+        SELECT id FROM exact_vector_candidates
+        UNION
+        SELECT id FROM text_candidates
+    ),
+    scored AS (
         SELECT
-            c.id AS chunk_id,
+            c.id,
             c.document_id,
             c.content,
-            ts_rank_cd(to_tsvector('english', c.content), plainto_tsquery('english', query_text)) AS text_sim,
             c.metadata,
             d.title AS doc_title,
             d.source AS doc_source,
-            d.created_at
-        FROM chunks c
+            d.created_at,
+            c.word_count,
+            c.content_length_factor,
+            c.content_terms,
+            COALESCE(1 - (c.embedding <=> query_embedding), 0)::FLOAT AS vector_sim,
+            ts_rank_cd(c.content_tsv, plainto_tsquery('english', query_text))::FLOAT AS text_sim
+        FROM candidates k
+        JOIN chunks c ON c.id = k.id
         JOIN documents d ON c.document_id = d.id
-        WHERE to_tsvector('english', c.content) @@ plainto_tsquery('english', query_text)
     ),
-    combined_results AS (
-        SELECT
-            COALESCE(v.chunk_id, t.chunk_id) AS chunk_id,
-            COALESCE(v.document_id, t.document_id) AS document_id,
-            COALESCE(v.content, t.content) AS content,
-            COALESCE(v.vector_sim, 0) AS vector_sim,
-            COALESCE(t.text_sim, 0) AS text_sim,
-            COALESCE(v.metadata, t.metadata) AS metadata,
-            COALESCE(v.doc_title, t.doc_title) AS doc_title,
-            COALESCE(v.doc_source, t.doc_source) AS doc_source,
-            COALESCE(v.created_at, t.created_at) AS created_at
-        FROM vector_results v
-        FULL OUTER JOIN text_results t ON v.chunk_id = t.chunk_id
+    query_terms AS (
+        SELECT tsvector_to_array(to_tsvector('simple', query_text)) AS terms
     ),
     enhanced_results AS (
         SELECT
-            chunk_id,
-            document_id,
-            content,
+            s.id AS chunk_id,
+            s.document_id,
+            s.content,
             -- Base hybrid score
-            (vector_sim * (1 - text_weight) + text_sim * text_weight) AS base_score,
-            vector_sim,
-            text_sim,
+            (s.vector_sim * (1 - text_weight) + s.text_sim * text_weight)::FLOAT AS base_score,
+            s.vector_sim,
+            s.text_sim,
             -- Recency boost (newer documents get higher scores)
             CASE
                 WHEN boost_recent THEN
-                    GREATEST(0, 1 - EXTRACT(DAYS FROM (NOW() - created_at)) / 365.0) * 0.1
+                    GREATEST(0, 1 - EXTRACT(DAYS FROM (NOW() - s.created_at)) / 365.0) * 0.1
                 ELSE 0
-            END AS recency_boost,
-            -- Content length factor (moderate length preferred)
-            CASE
-                WHEN LENGTH(content) BETWEEN 200 AND 2000 THEN 1.1
-                WHEN LENGTH(content) BETWEEN 100 AND 200 THEN 1.05
-                WHEN LENGTH(content) > 2000 THEN 0.95
-                ELSE 1.0
-            END AS content_length_factor,
-            -- Query term density
+            END::FLOAT AS recency_boost,
+            -- Content length factor (moderate length preferred), precomputed
+            s.content_length_factor,
+            -- Query term density against the precomputed lower-cased term set
             (
-                SELECT COUNT(*)::FLOAT / GREATEST(1, array_length(string_to_array(content, ' '), 1))
-                FROM unnest(string_to_array(lower(query_text), ' ')) AS query_term
-                WHERE position(query_term IN lower(content)) > 0
+                SELECT COUNT(*)::FLOAT / GREATEST(1, s.word_count)
+                FROM unnest(q.terms) AS query_term
+                WHERE query_term = ANY(s.content_terms)
             ) AS query_term_density,
-            metadata,
-            doc_title,
-            doc_source
-        FROM combined_results
+            s.metadata,
+            s.doc_title,
+            s.doc_source
+        FROM scored s
+        CROSS JOIN query_terms q
     )
     SELECT
         er.chunk_id,
         er.document_id,
         er.content,
         -- Enhanced score combining all factors
-        (er.base_score + er.recency_boost) * er.content_length_factor + (er.query_term_density * 0.1) AS enhanced_score,
+        ((er.base_score + er.recency_boost) * er.content_length_factor + (er.query_term_density * 0.1))::FLOAT AS enhanced_score,
         er.base_score,
         er.vector_sim AS vector_similarity,
         er.text_sim AS text_similarity,
@@ -279,7 +575,6 @@ BEGIN
     FROM enhanced_results er
     ORDER BY enhanced_score DESC
     LIMIT match_count;
-END;
 $$;
 
 CREATE OR REPLACE FUNCTION get_document_chunks(doc_id UUID)
@@ -326,9 +621,7 @@ SELECT
     d.created_at,
     d.updated_at,
     d.metadata,
-    COUNT(c.id) AS chunk_count,
-    AVG(c.token_count) AS avg_tokens_per_chunk,
-    SUM(c.token_count) AS total_tokens
-FROM documents d
-LEFT JOIN chunks c ON d.id = c.document_id
-GROUP BY d.id, d.title, d.source, d.created_at, d.updated_at, d.metadata;
\ No newline at end of file
+    d.chunk_count,
+    d.total_tokens::numeric / NULLIF(d.chunk_count, 0) AS avg_tokens_per_chunk,
+    d.total_tokens
+FROM documents d;
\ No newline at end of file
@@ -0,0 +1,165 @@
+"""
+Tests for API response helpers.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+from agent.api import (
+    _search_response,
+    get_or_create_session,
+    get_conversation_context,
+    remember_messages,
+    session_context_cache,
+    get_document_endpoint,
+    get_document_content_endpoint,
+    get_document_chunks_endpoint,
+    CONTEXT_MAX_MESSAGES
+)
+from agent.models import ChatRequest, ChunkResult, GraphSearchResult, SearchResponse, SearchType
+from agent.tools import _to_chunk_results
+from agent.db_utils import DOCUMENT_CHUNK_RANGE_MAX
+
+
+def _row(index: int) -> dict:
+    return {
+        "chunk_id": f"chunk-{index}",
+        "document_id": "doc-1",
+        "content": f"Chunk {index} content",
+        "similarity": 1.2 if index == 0 else 0.5,
+        "metadata": {"page": index, "entities": {"people": ["Winfried Engelbrecht-Bresges"]}},
+        "document_title": "Annual Report",
+        "document_source": "annual_report.md"
+    }
+
+
+class TestSearchResponse:
+    """Test the orjson search response path."""
+
+    def test_matches_search_response_schema(self):
+        """Test the fast path produces the same JSON as the SearchResponse model."""
+        results = _to_chunk_results([_row(i) for i in range(3)], "similarity")
+
+        body = json.loads(_search_response(SearchType.VECTOR, 12.5, results=results).body)
+        expected = jsonable_encoder(SearchResponse(
+            results=[ChunkResult(**r.model_dump()) for r in results],
+            total_results=3,
+            search_type="vector",
+            query_time_ms=12.5
+        ))
+
+        assert body == expected
+        assert body["results"][0]["score"] == 1.0
+
+    def test_graph_results(self):
+        """Test graph results are counted and serialized."""
+        graph_results = [GraphSearchResult(fact="A chairs B", uuid="e1")]
+
+        body = json.loads(_search_response(SearchType.GRAPH, 3.0, graph_results=graph_results).body)
+
+        assert body["total_results"] == 1
+        assert body["search_type"] == "graph"
+        assert body["graph_results"][0]["fact"] == "A chairs B"
+        assert body["results"] == []
+
+
+class TestSessionContext:
+    """Test session bootstrap and the per-session context cache."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        session_context_cache.invalidate()
+        yield
+        session_context_cache.invalidate()
+
+    def _bootstrap(self, session_id: str, messages: list, expires_in: timedelta = timedelta(hours=1)):
+        session = {
+            "id": session_id,
+            "expires_at": (datetime.now(timezone.utc) + expires_in).isoformat(),
+            "created": False
+        }
+        return AsyncMock(return_value=(session, messages))
+
+    @pytest.mark.asyncio
+    async def test_cached_session_skips_database(self):
+        """Test the first request bootstraps in one call and later ones use the cache."""
+        bootstrap = self._bootstrap("s1", [{"id": "m1", "role": "user", "content": "Hello"}])
+        with patch("agent.api.bootstrap_session", bootstrap):
+            request = ChatRequest(message="Next", session_id="s1")
+            assert await get_or_create_session(request) == ("s1", [{"role": "user", "content": "Hello"}])
+
+            remember_messages("s1", [{"role": "assistant", "content": "Hi"}])
+            session_id, context = await get_or_create_session(request)
+
+        bootstrap.assert_awaited_once()
+        assert session_id == "s1"
+        assert [m["content"] for m in context] == ["Hello", "Hi"]
+
+    @pytest.mark.asyncio
+    async def test_context_is_trimmed_and_uncached_sessions_ignored(self):
+        """Test writes keep only the latest messages and do not create entries."""
+        with patch("agent.api.bootstrap_session", self._bootstrap("s1", [])):
+            await get_or_create_session(ChatRequest(message="Hi", session_id="s1"))
+
+        remember_messages("s1", [{"role": "user", "content": f"m{i}"} for i in range(CONTEXT_MAX_MESSAGES + 3)])
+        remember_messages("s2", [{"role": "user", "content": "unseen"}])
+
+        with patch("agent.api.get_session_messages", AsyncMock(return_value=[])) as get_messages:
+            context = await get_conversation_context("s1")
+            assert await get_conversation_context("s2") == []
+
+        assert [m["content"] for m in context] == [f"m{i}" for i in range(3, CONTEXT_MAX_MESSAGES + 3)]
+        get_messages.assert_awaited_once_with("s2", limit=CONTEXT_MAX_MESSAGES)
+
+    @pytest.mark.asyncio
+    async def test_expired_session_is_not_served_from_cache(self):
+        """Test a cached session past its expiry goes back to the database."""
+        bootstrap = self._bootstrap("s1", [], expires_in=timedelta(seconds=-1))
+        with patch("agent.api.bootstrap_session", bootstrap):
+            request = ChatRequest(message="Hi", session_id="s1")
+            await get_or_create_session(request)
+            await get_or_create_session(request)
+
+        assert bootstrap.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_queued_messages_are_part_of_the_context(self):
+        """Test messages still in the write queue are added to what the database returned."""
+        stored = {"id": "m1", "role": "user", "content": "Hello"}
+        pending = [stored, {"id": "m2", "role": "assistant", "content": "Hi"}]
+        with patch("agent.api.bootstrap_session", self._bootstrap("s1", [stored])), \
+             patch("agent.api.message_queue.pending_messages", return_value=pending):
+            _, context = await get_or_create_session(ChatRequest(message="Next", session_id="s1"))
+
+        assert [m["content"] for m in context] == ["Hello", "Hi"]
+
+
+class TestDocumentEndpoints:
+    """Test ranged document reads."""
+
+    @pytest.mark.asyncio
+    async def test_content_window_and_missing_document(self):
+        """Test the content endpoint returns a window and 404s for unknown documents."""
+        window = {"document_id": "doc-1", "start": 100, "end": 200, "content": "x" * 100,
+                  "content_length": 1000, "has_more": True}
+        with patch("agent.tools.get_document_window", AsyncMock(return_value=window)) as get_window:
+            assert await get_document_content_endpoint("doc-1", start=100, length=100) == window
+        get_window.assert_awaited_once_with("doc-1", 100, 100)
+
+        with patch("agent.tools.get_document", AsyncMock(return_value=None)):
+            with pytest.raises(HTTPException) as error:
+                await get_document_endpoint("missing")
+        assert error.value.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_chunk_range_clamps_neighbors(self):
+        """Test an oversized neighbors value is clamped and truncation is passed through."""
+        chunk_range = {"document_id": "doc-1", "chunks": [], "truncated": True}
+        with patch("agent.tools.get_document_chunk_range", AsyncMock(return_value=chunk_range)) as get_range:
+            assert await get_document_chunks_endpoint("doc-1", chunk_id="chunk-1", neighbors=10_000) == chunk_range
+        assert get_range.await_args.kwargs["neighbors"] == DOCUMENT_CHUNK_RANGE_MAX
@@ -0,0 +1,240 @@
+"""
+Tests for async result caching.
+"""
+
+import pytest
+import asyncio
+from unittest.mock import patch
+
+from agent.cache import AsyncTTLCache, SemanticCache, normalize_query
+
+
+class TestAsyncTTLCache:
+    """Test the async TTL cache."""
+
+    @pytest.mark.asyncio
+    async def test_hit_after_miss(self):
+        """Test a loaded value is served from the cache."""
+        cache = AsyncTTLCache("test")
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            return ["result"]
+
+        assert await cache.get_or_load("key", loader) == ["result"]
+        assert await cache.get_or_load("key", loader) == ["result"]
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_single_flight(self):
+        """Test concurrent identical lookups share one load."""
+        cache = AsyncTTLCache("test")
+        calls = []
+        release = asyncio.Event()
+
+        async def loader():
+            calls.append(1)
+            await release.wait()
+            return "value"
+
+        tasks = [asyncio.create_task(cache.get_or_load("key", loader)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*tasks) == ["value"] * 5
+        assert len(calls) == 1
+        assert cache.stats()["coalesced"] == 4
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_and_are_not_cached(self):
+        """Test loader failures reach all waiters and are retried later."""
+        cache = AsyncTTLCache("test")
+        release = asyncio.Event()
+
+        async def failing():
+            await release.wait()
+            raise RuntimeError("boom")
+
+        tasks = [asyncio.create_task(cache.get_or_load("key", failing)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+        async def loader():
+            return "ok"
+
+        assert await cache.get_or_load("key", loader) == "ok"
+
+    @pytest.mark.asyncio
+    async def test_ttl_expiry(self):
+        """Test entries expire after the TTL."""
+        cache = AsyncTTLCache("test", ttl_seconds=10)
+
+        with patch("agent.cache.time.monotonic", return_value=100.0):
+            cache.set("key", "value")
+            assert cache.get("key") == (True, "value")
+
+        with patch("agent.cache.time.monotonic", return_value=111.0):
+            assert cache.get("key") == (False, None)
+            assert cache.stats()["expirations"] == 1
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted when full."""
+        cache = AsyncTTLCache("test", max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") == (False, None)
+        assert cache.get("a") == (True, 1)
+        assert cache.stats()["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_discards_in_flight_results(self):
+        """Test a version bump drops entries and results loaded across it."""
+        cache = AsyncTTLCache("test")
+        cache.set("old", "stale")
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            return "value"
+
+        task = asyncio.create_task(cache.get_or_load("key", loader))
+        await asyncio.sleep(0)
+        cache.invalidate(version=2)
+        release.set()
+
+        assert await task == "value"
+        assert cache.version == 2
+        assert len(cache) == 0
+
+    def test_byte_budget_eviction(self):
+        """Test entries are evicted to keep the estimated size within max_bytes."""
+        cache = AsyncTTLCache("test", max_bytes=10, sizeof=len)
+        cache.set("a", "xxxx")
+        cache.set("b", "xxxx")
+        cache.set("c", "xxxx")
+        cache.set("huge", "x" * 11)
+
+        assert cache.get("a") == (False, None)
+        assert cache.get("huge") == (False, None)
+        assert cache.stats()["bytes"] == 8
+        assert cache.stats()["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_while_revalidate(self):
+        """Test stale hits return the old value once and refresh it in the background."""
+        cache = AsyncTTLCache("test", ttl_seconds=100, refresh_after=10)
+        values = iter(["old", "new"])
+        release = asyncio.Event()
+
+        async def loader():
+            value = next(values)
+            if value == "new":
+                await release.wait()
+            return value
+
+        with patch("agent.cache.time.monotonic", return_value=0.0):
+            assert await cache.get_or_load("key", loader) == "old"
+
+        with patch("agent.cache.time.monotonic", return_value=20.0):
+            assert await cache.get_or_load("key", loader) == "old"
+            assert await cache.get_or_load("key", loader) == "old"
+            release.set()
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            assert cache.get("key") == (True, "new")
+
+        assert cache.stats()["stale_hits"] == 1
+        assert cache.stats()["refreshes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache_always_loads(self):
+        """Test a disabled cache calls the loader every time."""
+        cache = AsyncTTLCache("test", enabled=False)
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            return "value"
+
+        await cache.get_or_load("key", loader)
+        await cache.get_or_load("key", loader)
+        assert len(calls) == 2
+
+
+class TestSemanticCache:
+    """Test the embedding-similarity cache."""
+
+    def test_hit_above_threshold_within_namespace(self):
+        """Test close embeddings hit only under the same namespace."""
+        cache = SemanticCache("test", threshold=0.9)
+        cache.put("vector", [1.0, 0.0], "results")
+
+        assert cache.lookup("vector", [2.0, 0.2]) == (True, "results")
+        assert cache.lookup("vector", [0.5, 0.5]) == (False, None)
+        assert cache.lookup("hybrid", [1.0, 0.0]) == (False, None)
+
+    def test_best_match_wins(self):
+        """Test the most similar entry is returned."""
+        cache = SemanticCache("test", threshold=0.5)
+        cache.put("ns", [1.0, 0.0, 0.0], "x")
+        cache.put("ns", [0.0, 1.0, 0.0], "y")
+
+        assert cache.lookup("ns", [0.2, 1.0, 0.0]) == (True, "y")
+
+    def test_ring_buffer_and_ttl(self):
+        """Test the oldest entry is overwritten when full and entries expire."""
+        cache = SemanticCache("test", max_entries=2, ttl_seconds=10)
+
+        with patch("agent.cache.time.monotonic", return_value=100.0):
+            cache.put("ns", [1.0, 0.0, 0.0], "a")
+            cache.put("ns", [0.0, 1.0, 0.0], "b")
+            cache.put("ns", [0.0, 0.0, 1.0], "c")
+
+            assert len(cache) == 2
+            assert cache.lookup("ns", [1.0, 0.0, 0.0]) == (False, None)
+            assert cache.lookup("ns", [0.0, 0.0, 1.0]) == (True, "c")
+
+        with patch("agent.cache.time.monotonic", return_value=111.0):
+            assert cache.lookup("ns", [0.0, 0.0, 1.0]) == (False, None)
+
+    def test_invalidate(self):
+        """Test invalidation drops entries and records the new version."""
+        cache = SemanticCache("test")
+        cache.put("ns", [1.0, 0.0], "a")
+        cache.invalidate(version=3)
+
+        assert cache.lookup("ns", [1.0, 0.0]) == (False, None)
+        assert cache.version == 3
+
+    def test_threshold_tuning_stats(self):
+        """Test stats report the hit rate other thresholds would have given."""
+        cache = SemanticCache("test", threshold=0.99)
+        cache.put("ns", [1.0, 0.0], "a")
+        cache.lookup("ns", [1.0, 0.0])
+        cache.lookup("ns", [0.9, 0.3])  # cosine ~0.949
+
+        stats = cache.stats()
+        assert stats["hit_rate"] == 0.5
+        assert stats["hit_rate_by_threshold"]["0.9"] == 1.0
+        assert stats["hit_rate_by_threshold"]["0.95"] == 0.5
+
+    def test_disabled(self):
+        """Test a disabled cache never stores or hits."""
+        cache = SemanticCache("test", enabled=False)
+        cache.put("ns", [1.0], "a")
+
+        assert cache.lookup("ns", [1.0]) == (False, None)
+        assert len(cache) == 0
+
+
+def test_normalize_query():
+    """Test query normalization for cache keys."""
+    assert normalize_query("  Who   is HKJC  chairman ") == "who is hkjc chairman"
@@ -5,21 +5,36 @@ Tests for database utilities.
 import pytest
 import asyncio
 import json
+import asyncpg
 from unittest.mock import Mock, AsyncMock, patch
 from datetime import datetime, timezone, timedelta
 
 from agent.db_utils import (
     DatabasePool,
+    _init_connection,
+    _encode_json,
+    _decode_metadata,
     create_session,
+    bootstrap_session,
     get_session,
     update_session,
     add_message,
     get_session_messages,
     get_document,
     list_documents,
+    encode_document_cursor,
+    decode_document_cursor,
     vector_search,
+    vector_search_many,
     hybrid_search,
+    enhanced_hybrid_search,
     get_document_chunks,
+    get_document_window,
+    get_document_chunk_range,
+    DOCUMENT_CHUNK_RANGE_MAX,
+    get_corpus_version,
+    shard_index,
+    PartialResults,
     test_connection as db_test_connection
 )
 
@@ -42,7 +57,7 @@ class TestDatabasePool:
     @pytest.mark.asyncio
     async def test_initialize(self):
         """Test pool initialization."""
-        pool = DatabasePool("postgresql://test")
+        pool = DatabasePool("postgresql://test", read_urls=[])
         
         with patch('asyncpg.create_pool', new_callable=AsyncMock) as mock_create_pool:
             mock_pool = Mock()
@@ -56,9 +71,38 @@ class TestDatabasePool:
                 min_size=5,
                 max_size=20,
                 max_inactive_connection_lifetime=300,
-                command_timeout=60
+                command_timeout=60,
+                statement_cache_size=100,
+                init=_init_connection
             )
     
+    @pytest.mark.asyncio
+    async def test_initialize_skips_unreachable_replicas(self):
+        """Test replicas get their own pools and a failing one is skipped."""
+        pool = DatabasePool("postgresql://primary", read_urls=["postgresql://r1", "postgresql://r2"])
+        primary, replica = Mock(), Mock()
+        
+        with patch('asyncpg.create_pool', new_callable=AsyncMock) as mock_create_pool:
+            mock_create_pool.side_effect = [primary, replica, OSError("connection refused")]
+            await pool.initialize()
+        
+        assert pool.pool is primary
+        assert pool.read_pools == [replica]
+    
+    @pytest.mark.asyncio
+    async def test_json_codecs(self):
+        """Test JSON codecs are registered and accept dicts or serialized strings."""
+        conn = AsyncMock()
+        
+        await _init_connection(conn)
+        
+        assert [c.args[0] for c in conn.set_type_codec.call_args_list] == ["json", "jsonb"]
+        assert json.loads(_encode_json({"a": [1, 2]})) == {"a": [1, 2]}
+        assert _encode_json('{"a": 1}') == '{"a": 1}'
+        assert _decode_metadata('{"a": 1}') == {"a": 1}
+        assert _decode_metadata({"a": 1}) == {"a": 1}
+        assert _decode_metadata(None) == {}
+    
     @pytest.mark.asyncio
     async def test_close(self):
         """Test pool closure."""
@@ -92,6 +136,60 @@ class TestDatabasePool:
         
         async with pool.acquire() as conn:
             assert conn == mock_connection
+    
+    @staticmethod
+    def _fake_pool(name, size=4, idle=4, max_size=10):
+        fake = Mock(name=name)
+        fake.get_size.return_value = size
+        fake.get_idle_size.return_value = idle
+        fake.get_min_size.return_value = 1
+        fake.get_max_size.return_value = max_size
+        
+        class _Acquire:
+            async def __aenter__(self):
+                return name
+            
+            async def __aexit__(self, *args):
+                return None
+        
+        fake.acquire = Mock(side_effect=lambda: _Acquire())
+        return fake
+    
+    @pytest.mark.asyncio
+    async def test_read_routing(self):
+        """Test reads rotate over replicas (or pick the least busy) and writes stay on the primary."""
+        pool = DatabasePool("postgresql://test", read_urls=[])
+        pool.pool = self._fake_pool("primary")
+        pool.read_pools = [self._fake_pool("r1", idle=1), self._fake_pool("r2", idle=3)]
+        
+        seen = []
+        for readonly in (True, True, True, False):
+            async with pool.acquire(readonly=readonly) as conn:
+                seen.append(conn)
+        assert seen == ["r1", "r2", "r1", "primary"]
+        
+        pool.read_routing = "least_busy"
+        async with pool.acquire(readonly=True) as conn:
+            assert conn == "r2"
+    
+    @pytest.mark.asyncio
+    async def test_stats(self):
+        """Test utilization and acquire counts are reported per pool."""
+        pool = DatabasePool("postgresql://test", read_urls=[])
+        pool.pool = self._fake_pool("primary", size=8, idle=2, max_size=10)
+        
+        async with pool.acquire():
+            pass
+        
+        stats = pool.stats()
+        assert stats["read_routing"] == "primary"
+        assert stats["pools"][0]["role"] == "primary"
+        assert stats["pools"][0]["in_use"] == 6
+        assert stats["pools"][0]["utilization"] == 0.6
+        assert stats["pools"][0]["acquired"] == 1
+        
+        with pytest.raises(ValueError):
+            DatabasePool("postgresql://test", read_routing="random")
 
 
 class TestSessionManagement:
@@ -146,6 +244,8 @@ class TestSessionManagement:
             assert session["id"] == "session-123"
             assert session["user_id"] == "user-123"
             assert session["metadata"] == {"client": "web"}
+            # A session just written must be visible, so it is read from the primary
+            mock_pool.acquire.assert_called_once_with(readonly=False)
     
     @pytest.mark.asyncio
     async def test_get_session_not_found(self):
@@ -234,6 +334,56 @@ class TestMessageManagement:
             assert messages[0]["role"] == "user"
             assert messages[1]["role"] == "assistant"
             mock_conn.fetch.assert_called_once()
+            # The limit keeps the latest messages, bound as a parameter
+            sql, *args = mock_conn.fetch.call_args[0]
+            assert "ORDER BY created_at DESC" in sql
+            assert args == ["session-123", 10]
+    
+    @pytest.mark.asyncio
+    async def test_bootstrap_session(self):
+        """Test session lookup/creation and recent messages come back from one query."""
+        with patch('agent.db_utils.db_pool') as mock_pool:
+            mock_conn = AsyncMock()
+            expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+            mock_conn.fetch.return_value = [
+                {
+                    "session_id": "session-123",
+                    "expires_at": expires_at,
+                    "created": False,
+                    "message_id": f"msg-{i}",
+                    "role": role,
+                    "content": content,
+                    "metadata": "{}",
+                    "created_at": datetime.now(timezone.utc)
+                }
+                for i, (role, content) in enumerate([("user", "Hello"), ("assistant", "Hi there!")])
+            ]
+            mock_pool.acquire.return_value.__aenter__ = AsyncMock(return_value=mock_conn)
+            mock_pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+            
+            session, messages = await bootstrap_session("session-123", message_limit=4)
+            
+            assert session == {"id": "session-123", "expires_at": expires_at.isoformat(), "created": False}
+            assert [m["content"] for m in messages] == ["Hello", "Hi there!"]
+            mock_conn.fetch.assert_called_once()
+            assert mock_conn.fetch.call_args[0][-1] == 4
+            
+            # A new session comes back as one row without a message
+            mock_conn.fetch.return_value = [{
+                "session_id": "session-456",
+                "expires_at": expires_at,
+                "created": True,
+                "message_id": None,
+                "role": None,
+                "content": None,
+                "metadata": None,
+                "created_at": None
+            }]
+            session, messages = await bootstrap_session(None, user_id="user-1")
+            
+            assert session["id"] == "session-456"
+            assert session["created"] is True
+            assert messages == []
 
 
 class TestDocumentManagement:
@@ -248,8 +398,10 @@ class TestDocumentManagement:
                 "id": "doc-123",
                 "title": "Test Document",
                 "source": "test.md",
-                "content": "Test content",
                 "metadata": '{"author": "test"}',
+                "chunk_count": 2,
+                "total_tokens": 40,
+                "content_length": 12,
                 "created_at": datetime.now(timezone.utc),
                 "updated_at": datetime.now(timezone.utc)
             }
@@ -265,6 +417,94 @@ class TestDocumentManagement:
             assert document["id"] == "doc-123"
             assert document["title"] == "Test Document"
             assert document["metadata"] == {"author": "test"}
+            assert document["content_length"] == 12
+            # The body is left in document_bodies unless asked for
+            assert "content" not in document
+            assert "document_bodies" not in mock_conn.fetchrow.call_args[0][0]
+            
+            mock_conn.fetchrow.return_value = {**mock_result, "content": "Test content"}
+            document = await get_document("doc-123", include_content=True)
+            
+            assert document["content"] == "Test content"
+            assert "document_bodies" in mock_conn.fetchrow.call_args[0][0]
+    
+    @pytest.mark.asyncio
+    async def test_get_document_window(self):
+        """Test a window is cut in the database and clamped to the size limit."""
+        with patch('agent.db_utils.db_pool') as mock_pool:
+            mock_conn = AsyncMock()
+            mock_conn.fetchrow.return_value = {"content": "0123456789", "content_length": 50}
+            mock_pool.acquire.return_value.__aenter__ = AsyncMock(return_value=mock_conn)
+            mock_pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+            
+            with patch('agent.db_utils.DOCUMENT_WINDOW_MAX_CHARS', 10):
+                window = await get_document_window("doc-123", start=20, length=1000)
+            
+            assert mock_conn.fetchrow.call_args[0][1:] == ("doc-123", 20, 10)
+            assert window["start"] == 20
+            assert window["end"] == 30
+            assert window["has_more"] is True
+            
+            mock_conn.fetchrow.return_value = None
+            assert await get_document_window("missing") is None
+    
+    @pytest.mark.asyncio
+    async def test_get_document_chunk_range(self):
+        """Test ranges by index or around a chunk, widened by neighbours and capped."""
+        with patch('agent.db_utils.db_pool') as mock_pool:
+            mock_conn = AsyncMock()
+            mock_conn.fetch.return_value = [
+                {"chunk_id": f"chunk-{i}", "content": f"c{i}", "chunk_index": i, "anchor_offset": i - 4, "metadata": "{}"}
+                for i in (3, 4, 5)
+            ]
+            mock_pool.acquire.return_value.__aenter__ = AsyncMock(return_value=mock_conn)
+            mock_pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+            
+            result = await get_document_chunk_range("doc-123", start_index=4, neighbors=1)
+            
+            assert [c["chunk_index"] for c in result["chunks"]] == [3, 4, 5]
+            assert result["truncated"] is False
+            query, *params = mock_conn.fetch.call_args[0]
+            assert "BETWEEN b.lo - $4 AND b.hi + $4" in query
+            assert params == ["doc-123", 4, 4, 1, DOCUMENT_CHUNK_RANGE_MAX + 2]
+            
+            await get_document_chunk_range("doc-123", chunk_id="chunk-4", neighbors=2)
+            
+            query, *params = mock_conn.fetch.call_args[0]
+            assert "WHERE id = $2::uuid" in query
+            assert params == ["doc-123", "chunk-4", 2, DOCUMENT_CHUNK_RANGE_MAX + 2]
+    
+    @pytest.mark.asyncio
+    async def test_get_document_chunk_range_keeps_anchor_when_capped(self):
+        """Test too many neighbours are trimmed evenly around the anchor and reported."""
+        with patch('agent.db_utils.db_pool') as mock_pool, \
+             patch('agent.db_utils.DOCUMENT_CHUNK_RANGE_MAX', 5):
+            mock_conn = AsyncMock()
+            mock_conn.fetch.return_value = [
+                {"chunk_id": f"chunk-{i}", "content": f"c{i}", "chunk_index": i, "anchor_offset": i - 100, "metadata": "{}"}
+                for i in range(97, 104)
+            ]
+            mock_pool.acquire.return_value.__aenter__ = AsyncMock(return_value=mock_conn)
+            mock_pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+            
+            result = await get_document_chunk_range("doc-123", chunk_id="chunk-100", neighbors=25)
+            
+            assert [c["chunk_index"] for c in result["chunks"]] == [98, 99, 100, 101, 102]
+            assert result["truncated"] is True
+            # Two neighbours fit, one more is fetched to detect the cut
+            assert mock_conn.fetch.call_args[0][1:] == ("doc-123", "chunk-100", 3, 7)
+            
+            mock_conn.fetch.return_value = mock_conn.fetch.return_value[1:-1]
+            result = await get_document_chunk_range("doc-123", chunk_id="chunk-100", neighbors=25)
+            assert result["truncated"] is False
+            
+            mock_conn.fetch.return_value = [
+                {"chunk_id": f"chunk-{i}", "content": f"c{i}", "chunk_index": i, "anchor_offset": i, "metadata": "{}"}
+                for i in range(7)
+            ]
+            result = await get_document_chunk_range("doc-123", start_index=0, end_index=50)
+            assert [c["chunk_index"] for c in result["chunks"]] == [0, 1, 2, 3, 4]
+            assert result["truncated"] is True
     
     @pytest.mark.asyncio
     async def test_list_documents(self):
@@ -279,7 +519,8 @@ class TestDocumentManagement:
                     "metadata": '{}',
                     "created_at": datetime.now(timezone.utc),
                     "updated_at": datetime.now(timezone.utc),
-                    "chunk_count": 5
+                    "chunk_count": 5,
+                    "total_tokens": 500
                 },
                 {
                     "id": "doc-2",
@@ -288,7 +529,8 @@ class TestDocumentManagement:
                     "metadata": '{}',
                     "created_at": datetime.now(timezone.utc),
                     "updated_at": datetime.now(timezone.utc),
-                    "chunk_count": 3
+                    "chunk_count": 3,
+                    "total_tokens": 300
                 }
             ]
             mock_conn.fetch.return_value = mock_results
@@ -300,6 +542,29 @@ class TestDocumentManagement:
             assert len(documents) == 2
             assert documents[0]["title"] == "Document 1"
             assert documents[1]["title"] == "Document 2"
+    
+    @pytest.mark.asyncio
+    async def test_list_documents_after_cursor(self):
+        """Test a cursor resumes after its document with a keyset condition instead of aggregating chunks."""
+        created = datetime(2024, 3, 1, 12, tzinfo=timezone.utc)
+        document_id = "6f1c1b7e-3d7a-4c7e-9a59-0d5b1f3c2a10"
+        cursor = encode_document_cursor(created, document_id)
+        assert decode_document_cursor(cursor) == (created, document_id)
+        with pytest.raises(ValueError):
+            decode_document_cursor("not-a-cursor")
+        
+        with patch('agent.db_utils.db_pool') as mock_pool:
+            mock_conn = AsyncMock()
+            mock_conn.fetch.return_value = []
+            mock_pool.acquire.return_value.__aenter__ = AsyncMock(return_value=mock_conn)
+            mock_pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+            
+            await list_documents(limit=10, cursor=cursor)
+        
+        query, *params = mock_conn.fetch.call_args[0]
+        assert "(d.created_at, d.id) < ($1, $2::uuid)" in query
+        assert "chunks" not in query and "GROUP BY" not in query
+        assert params == [created, document_id, 10, 0]
 
 
 class TestVectorSearch:
@@ -372,6 +637,209 @@ class TestVectorSearch:
             assert results[0]["vector_similarity"] == 0.85
             assert results[0]["text_similarity"] == 0.70
     
+    @pytest.mark.asyncio
+    async def test_hybrid_search_ann_settings(self):
+        """Test per-request ANN settings are applied transaction-locally."""
+        with patch('agent.db_utils.db_pool') as mock_pool:
+            mock_conn = AsyncMock()
+            mock_conn.transaction = Mock(return_value=AsyncMock())
+            mock_conn.fetch.return_value = []
+            mock_pool.acquire.return_value.__aenter__ = AsyncMock(return_value=mock_conn)
+            mock_pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+            
+            await hybrid_search([0.1] * 1536, "test query", ef_search=100, probes=10)
+            
+            mock_conn.transaction.assert_called_once()
+            sql, *args = mock_conn.execute.call_args[0]
+            assert "set_config('hnsw.ef_search', $1, true)" in sql
+            assert "set_config('ivfflat.probes', $2, true)" in sql
+            assert args == ["100", "10"]
+            
+            # Without settings the query runs outside a transaction
+            mock_conn.reset_mock()
+            await hybrid_search([0.1] * 1536, "test query")
+            mock_conn.transaction.assert_not_called()
+            mock_conn.execute.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_index_query_params_are_the_default(self):
+        """Test the probes stored on the index apply unless a request or the environment overrides them."""
+        with patch('agent.db_utils.db_pool') as mock_pool, \
+             patch('agent.db_utils._index_query_params', {}):
+            mock_conn = AsyncMock()
+            mock_conn.transaction = Mock(return_value=AsyncMock())
+            mock_conn.fetch.return_value = []
+            mock_conn.fetchval.return_value = '{"probes": 32}'
+            mock_pool.acquire.return_value.__aenter__ = AsyncMock(return_value=mock_conn)
+            mock_pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+            
+            await vector_search([0.1] * 1536)
+            assert "set_config('ivfflat.probes', $1, true)" in mock_conn.execute.call_args[0][0]
+            assert mock_conn.execute.call_args[0][1:] == ("32",)
+            
+            await vector_search([0.1] * 1536, probes=50)
+            assert mock_conn.execute.call_args[0][1:] == ("50",)
+            
+            with patch.dict('os.environ', {"IVFFLAT_PROBES": "8"}):
+                await vector_search([0.1] * 1536)
+            assert mock_conn.execute.call_args[0][1:] == ("8",)
+            
+            # The comment is read once per refresh interval
+            assert mock_conn.fetchval.await_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_vector_search_filters(self):
+        """Test filters are passed to SQL and raise ef_search on older pgvector."""
+        with patch('agent.db_utils.db_pool') as mock_pool, \
+             patch('agent.db_utils._pgvector_version', (0, 6, 2)):
+            mock_conn = AsyncMock()
+            mock_conn.transaction = Mock(return_value=AsyncMock())
+            mock_conn.fetch.return_value = []
+            mock_pool.acquire.return_value.__aenter__ = AsyncMock(return_value=mock_conn)
+            mock_pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+            
+            await vector_search(
+                [0.1] * 1536,
+                filters={"source": "report.md", "title": None, "metadata": {}}
+            )
+            
+            assert mock_conn.fetch.call_args[0][-1] == '{"source": "report.md"}'
+            assert "hnsw.ef_search" in mock_conn.execute.call_args[0][0]
+            assert mock_conn.execute.call_args[0][1:] == ("200",)
+    
+    @pytest.mark.asyncio
+    async def test_metadata_projection(self):
+        """Test requested metadata keys are projected in SQL and bound as an array."""
+        with patch('agent.db_utils.db_pool') as mock_pool:
+            mock_conn = AsyncMock()
+            mock_conn.fetch.return_value = []
+            mock_pool.acquire.return_value.__aenter__ = AsyncMock(return_value=mock_conn)
+            mock_pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+            
+            await hybrid_search([0.1] * 1536, "test query", metadata_keys=["page"])
+            sql, *args = mock_conn.fetch.call_args[0]
+            assert "jsonb_object_agg" in sql and "$6::text[]" in sql
+            assert args[-1] == ["page"]
+            
+            await hybrid_search([0.1] * 1536, "test query")
+            sql, *args = mock_conn.fetch.call_args[0]
+            assert "jsonb_object_agg" not in sql
+            assert len(args) == 5
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("pgvector_version, hamming_distance", [
+        ((0, 6, 2), "bit_count(c.embedding_bits # $4::bit(1536))"),
+        ((0, 7, 0), "c.embedding_bits <~> $4::bit(1536)"),
+    ])
+    async def test_quantized_vector_search(self, pgvector_version, hamming_distance):
+        """Test quantized search ranks on sign bits, reranks limit * factor candidates and skips filtered queries."""
+        with patch('agent.db_utils.db_pool') as mock_pool, \
+             patch('agent.db_utils._pgvector_version', pgvector_version):
+            mock_conn = AsyncMock()
+            mock_conn.transaction = Mock(return_value=AsyncMock())
+            mock_conn.fetch.return_value = []
+            mock_pool.acquire.return_value.__aenter__ = AsyncMock(return_value=mock_conn)
+            mock_pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+            
+            await vector_search([0.5, -0.1, 0.0, 2.0], limit=5, quantized=True)
+            
+            sql, *args = mock_conn.fetch.call_args[0]
+            assert hamming_distance in sql
+            assert "cosine_distance(c.embedding, $1::vector)" in sql
+            assert args[1:] == [5, 50, asyncpg.BitString("1001")]
+            # ef_search must cover the candidate count for the HNSW scan on the bits
+            assert mock_conn.execute.call_args[0][1:] == ("50",)
+            
+            await vector_search([0.1] * 4, quantized=True, filters={"source": "report.md"})
+            assert "match_chunks" in mock_conn.fetch.call_args[0][0]
+    
+    @pytest.mark.asyncio
+    async def test_vector_search_filters_iterative_scan(self):
+        """Test filtered searches use iterative index scans on pgvector 0.8+."""
+        with patch('agent.db_utils.db_pool') as mock_pool, \
+             patch('agent.db_utils._pgvector_version', (0, 8, 0)):
+            mock_conn = AsyncMock()
+            mock_conn.transaction = Mock(return_value=AsyncMock())
+            mock_conn.fetch.return_value = []
+            mock_pool.acquire.return_value.__aenter__ = AsyncMock(return_value=mock_conn)
+            mock_pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+            
+            await vector_search([0.1] * 1536, filters={"metadata": {"category": "finance"}})
+            
+            sql = mock_conn.execute.call_args[0][0]
+            assert "hnsw.iterative_scan" in sql
+            assert "ivfflat.iterative_scan" in sql
+            assert "hnsw.ef_search" not in sql
+    
+    @pytest.mark.asyncio
+    async def test_vector_search_many(self):
+        """Test several embeddings are searched in one statement and grouped by query."""
+        with patch('agent.db_utils.db_pool') as mock_pool:
+            mock_conn = AsyncMock()
+            mock_conn.fetch.return_value = [
+                {
+                    "query_index": query_index,
+                    "chunk_id": f"chunk-{query_index}",
+                    "document_id": "doc-1",
+                    "content": "Test content",
+                    "similarity": 0.9,
+                    "metadata": "{}",
+                    "document_title": "Test Doc",
+                    "document_source": "test.md"
+                }
+                for query_index in (0, 2)
+            ]
+            mock_pool.acquire.return_value.__aenter__ = AsyncMock(return_value=mock_conn)
+            mock_pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+            
+            results = await vector_search_many([[0.1] * 3, [0.2] * 3, [0.3] * 3], limit=5)
+            
+            mock_conn.fetch.assert_awaited_once()
+            sql, embeddings, limit, filters = mock_conn.fetch.call_args[0]
+            assert "CROSS JOIN LATERAL match_chunks" in sql
+            assert embeddings == ["[0.1,0.1,0.1]", "[0.2,0.2,0.2]", "[0.3,0.3,0.3]"]
+            assert limit == 5
+            assert [[r["chunk_id"] for r in group] for group in results] == [["chunk-0"], [], ["chunk-2"]]
+            
+            assert await vector_search_many([]) == []
+            mock_conn.fetch.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_enhanced_hybrid_search_embeddings(self):
+        """Test stored embeddings are fetched in binary form and decoded."""
+        with patch('agent.db_utils.db_pool') as mock_pool:
+            mock_conn = AsyncMock()
+            mock_conn.fetch.return_value = [
+                {
+                    "chunk_id": "chunk-1",
+                    "document_id": "doc-1",
+                    "content": "Test content",
+                    "enhanced_score": 0.8,
+                    "vector_similarity": 0.7,
+                    "text_similarity": 0.5,
+                    "metadata": "{}",
+                    "document_title": "Test Doc",
+                    "document_source": "test.md",
+                    "simhash": -42,
+                    # vector_send('[1,2.5,-3]')
+                    "embedding": bytes.fromhex("000300003f80000040200000c0400000")
+                }
+            ]
+            mock_pool.acquire.return_value.__aenter__ = AsyncMock(return_value=mock_conn)
+            mock_pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+            
+            results = await enhanced_hybrid_search(
+                [0.1] * 1536, "test query", "test query", include_embeddings=True
+            )
+            
+            assert "vector_send(c.embedding)" in mock_conn.fetch.call_args[0][0]
+            assert results[0]["embedding"].tolist() == [1.0, 2.5, -3.0]
+            assert results[0]["simhash"] == -42
+            
+            mock_conn.fetch.return_value = []
+            await enhanced_hybrid_search([0.1] * 1536, "test query", "test query")
+            assert "vector_send" not in mock_conn.fetch.call_args[0][0]
+    
     @pytest.mark.asyncio
     async def test_get_document_chunks(self):
         """Test getting document chunks."""
@@ -402,6 +870,113 @@ class TestVectorSearch:
             assert chunks[1]["chunk_index"] == 1
 
 
+def _shard(rows=None, fetchval=None, error=None):
+    """Fake shard pool whose connection returns the given rows."""
+    conn = AsyncMock()
+    conn.fetch.return_value = rows or []
+    conn.fetchrow.return_value = None
+    conn.fetchval.return_value = fetchval
+    if error:
+        conn.fetch.side_effect = error
+    shard = Mock()
+    shard.acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+    shard.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+    shard.conn = conn
+    return shard
+
+
+def _chunk_row(chunk_id, similarity):
+    return {
+        "chunk_id": chunk_id,
+        "document_id": "doc",
+        "content": "content",
+        "similarity": similarity,
+        "metadata": "{}",
+        "document_title": "Doc",
+        "document_source": "doc.md"
+    }
+
+
+class TestSharding:
+    """Test shard routing and scatter-gather."""
+    
+    def test_shard_index(self):
+        """Test document ids map to a stable, roughly even shard."""
+        ids = [f"00000000-0000-4000-8000-{i:012d}" for i in range(400)]
+        counts = [0, 0, 0, 0]
+        for document_id in ids:
+            counts[shard_index(document_id, 4)] += 1
+        
+        assert shard_index(ids[0], 4) == shard_index(ids[0].upper(), 4)
+        assert min(counts) > 60
+    
+    @pytest.mark.asyncio
+    async def test_vector_search_merges_top_k(self):
+        """Test every shard is searched and the global top-k is kept."""
+        shards = [
+            _shard([_chunk_row("a", 0.9), _chunk_row("b", 0.5)]),
+            _shard([_chunk_row("c", 0.8), _chunk_row("d", 0.7)])
+        ]
+        
+        with patch('agent.db_utils.get_shard_pools', return_value=shards):
+            results = await vector_search([0.1] * 1536, limit=2)
+        
+        assert [r["chunk_id"] for r in results] == ["a", "c"]
+        assert all(shard.conn.fetch.await_count == 1 for shard in shards)
+    
+    @pytest.mark.asyncio
+    async def test_failing_shard_degrades(self):
+        """Test a failing shard is skipped unless every shard fails."""
+        shards = [_shard([_chunk_row("a", 0.9)]), _shard(error=OSError("shard down"))]
+        
+        with patch('agent.db_utils.get_shard_pools', return_value=shards):
+            results = await vector_search([0.1] * 1536)
+        assert [r["chunk_id"] for r in results] == ["a"]
+        assert isinstance(results, PartialResults)
+        
+        with patch('agent.db_utils.get_shard_pools', return_value=[shards[0], shards[0]]):
+            assert not isinstance(await vector_search([0.1] * 1536), PartialResults)
+        
+        with patch('agent.db_utils.get_shard_pools', return_value=[shards[1], shards[1]]):
+            with pytest.raises(OSError):
+                await vector_search([0.1] * 1536)
+    
+    @pytest.mark.asyncio
+    async def test_document_reads_go_to_owning_shard(self):
+        """Test single-document reads only touch the owning shard."""
+        shards = [_shard(), _shard()]
+        document_id = "00000000-0000-4000-8000-000000000001"
+        
+        with patch('agent.db_utils.get_shard_pools', return_value=shards):
+            await get_document_chunks(document_id)
+        
+        owner = shard_index(document_id, 2)
+        assert shards[owner].conn.fetch.await_count == 1
+        assert shards[1 - owner].conn.fetch.await_count == 0
+    
+    @pytest.mark.asyncio
+    async def test_list_documents_pages_across_shards(self):
+        """Test each shard returns offset + limit rows and the page is cut after merging."""
+        def document(name, day):
+            created = datetime(2024, 1, day, tzinfo=timezone.utc)
+            return {"id": name, "title": name, "source": f"{name}.md", "metadata": "{}",
+                    "created_at": created, "updated_at": created, "chunk_count": 1, "total_tokens": 10}
+        
+        shards = [_shard([document("d5", 5), document("d3", 3)]), _shard([document("d4", 4), document("d1", 1)])]
+        
+        with patch('agent.db_utils.get_shard_pools', return_value=shards):
+            documents = await list_documents(limit=2, offset=1)
+        
+        assert [d["id"] for d in documents] == ["d4", "d3"]
+        assert shards[0].conn.fetch.call_args[0][-2:] == (3, 0)
+    
+    @pytest.mark.asyncio
+    async def test_corpus_version_sums_shards(self):
+        """Test the corpus version moves when any shard's version does."""
+        with patch('agent.db_utils.get_shard_pools', return_value=[_shard(fetchval=3), _shard(fetchval=4)]):
+            assert await get_corpus_version() == 7
+
+
 class TestUtilityFunctions:
     """Test utility functions."""
     
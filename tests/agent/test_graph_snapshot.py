@@ -0,0 +1,148 @@
+"""
+Tests for the in-memory graph snapshot.
+"""
+
+import pytest
+import numpy as np
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from agent.graph_snapshot import GraphSnapshot, GraphSnapshotManager
+
+
+def _node(uuid, name, labels=None):
+    return {"uuid": uuid, "name": name, "labels": labels or ["Entity", "Person"], "summary": None}
+
+
+def _edge(uuid, source, target, name="RELATES_TO", invalid_at=None):
+    return {
+        "uuid": uuid,
+        "name": name,
+        "fact": f"{source} {name} {target}",
+        "source_node_uuid": source,
+        "target_node_uuid": target,
+        "valid_at": None,
+        "invalid_at": invalid_at
+    }
+
+
+@pytest.fixture
+def snapshot():
+    """Small graph: alice - acme - bob - beta, plus alice - beta directly invalidated."""
+    nodes = [
+        _node("a", "Alice"),
+        _node("b", "Bob"),
+        _node("c", "Acme", ["Entity", "Company"]),
+        _node("d", "Beta Holdings", ["Company"]),
+        _node("e", "Alice Smith")
+    ]
+    edges = [
+        _edge("e1", "a", "c", "EMPLOYED_BY"),
+        _edge("e2", "b", "c", "EMPLOYED_BY"),
+        _edge("e3", "b", "d", "DIRECTOR_OF"),
+        _edge("e4", "a", "d", "DIRECTOR_OF", invalid_at="2023-01-01"),
+        _edge("e5", "a", "missing")
+    ]
+    return GraphSnapshot(nodes, edges, epoch=3)
+
+
+class TestGraphSnapshot:
+    """Test CSR construction and traversal."""
+
+    def test_csr_arrays(self, snapshot):
+        """Test adjacency arrays are compact and consistent."""
+        assert snapshot.node_count == 5
+        assert snapshot.edge_count == 4  # edge to unknown node dropped
+        assert snapshot.offsets.dtype == np.int32
+        assert snapshot.indices.dtype == np.int32
+        assert snapshot.edge_types.dtype == np.int16
+        assert snapshot.offsets[-1] == 2 * snapshot.edge_count
+        alice = snapshot.uuid_to_index["a"]
+        degree = snapshot.offsets[alice + 1] - snapshot.offsets[alice]
+        assert degree == 2
+
+    def test_resolve_prefers_exact_then_shortest(self, snapshot):
+        """Test name resolution order."""
+        matches = snapshot.resolve("alice")
+        assert [snapshot.nodes[i]["uuid"] for i in matches] == ["a", "e"]
+        assert snapshot.resolve("nobody") == []
+        assert snapshot.nodes[snapshot.uuid_to_index["c"]]["labels"] == ["Company"]
+
+    def test_neighbors_with_filters(self, snapshot):
+        """Test neighbour expansion, type filter and direction."""
+        alice = snapshot.uuid_to_index["a"]
+
+        neighbours = snapshot.neighbors(alice)
+        assert {n["node"]["uuid"] for n in neighbours} == {"c", "d"}
+        assert all(n["direction"] == "outgoing" for n in neighbours)
+
+        employed = snapshot.neighbors(alice, edge_types=["employed_by"])
+        assert [n["node"]["uuid"] for n in employed] == ["c"]
+
+        current = snapshot.neighbors(alice, include_invalid=False)
+        assert [n["edge"]["uuid"] for n in current] == ["e1"]
+
+        acme = snapshot.uuid_to_index["c"]
+        assert all(n["direction"] == "incoming" for n in snapshot.neighbors(acme))
+
+    def test_k_hop_subgraph(self, snapshot):
+        """Test k-hop expansion records hop distance and truncates."""
+        bob = snapshot.uuid_to_index["b"]
+
+        one_hop = snapshot.k_hop_subgraph([bob], depth=1)
+        assert {n["uuid"]: n["hops"] for n in one_hop["nodes"]} == {"b": 0, "c": 1, "d": 1}
+        assert {e["uuid"] for e in one_hop["edges"]} == {"e2", "e3"}
+
+        two_hop = snapshot.k_hop_subgraph([bob], depth=2)
+        assert {n["uuid"] for n in two_hop["nodes"]} == {"a", "b", "c", "d"}
+        assert not two_hop["truncated"]
+
+        limited = snapshot.k_hop_subgraph([bob], depth=2, max_nodes=2)
+        assert len(limited["nodes"]) == 2
+        assert limited["truncated"]
+
+    def test_shortest_paths(self, snapshot):
+        """Test bidirectional BFS returns all shortest paths only."""
+        alice = snapshot.uuid_to_index["a"]
+        bob = snapshot.uuid_to_index["b"]
+
+        paths = snapshot.shortest_paths([alice], [bob], max_depth=3)
+        assert len(paths) == 2
+        assert all(len(p["edges"]) == 2 for p in paths)
+        assert all(p["nodes"][0]["uuid"] == "a" and p["nodes"][-1]["uuid"] == "b" for p in paths)
+
+        assert snapshot.shortest_paths([alice], [bob], max_depth=1) == []
+
+        valid_only = snapshot.shortest_paths([alice], [bob], max_depth=3, include_invalid=False)
+        assert [[e["uuid"] for e in p["edges"]] for p in valid_only] == [["e1", "e2"]]
+
+
+class TestGraphSnapshotManager:
+    """Test keeping the snapshot in step with the graph epoch."""
+
+    @pytest.mark.asyncio
+    async def test_epoch_change_reloads_updated_records(self):
+        """Test in-place node updates (summary, labels) are picked up when the epoch moves."""
+        client = MagicMock()
+        client.get_graph_epoch = AsyncMock(side_effect=[
+            {"epoch": 3, "reset_epoch": 0},
+            {"epoch": 3, "reset_epoch": 0},
+            {"epoch": 4, "reset_epoch": 0},
+            {"epoch": 4, "reset_epoch": 0}
+        ])
+        before = dict(_node("a", "Alice", ["Entity"]), summary="Joined Acme")
+        after = dict(_node("a", "Alice", ["Entity", "Person"]), summary="Chairs Acme")
+        fetch = AsyncMock(side_effect=[([before], []), ([after], [])])
+        manager = GraphSnapshotManager()
+
+        with patch("agent.graph_utils.get_graph_client", return_value=client), \
+             patch.object(manager, "_fetch", fetch):
+            await manager.load()
+            unchanged = await manager.refresh()
+            refreshed = await manager.refresh()
+
+        assert unchanged.node_info(0)["summary"] == "Joined Acme"
+        assert fetch.await_count == 2
+        assert refreshed.epoch == 4
+        info = refreshed.node_info(refreshed.uuid_to_index["a"])
+        assert info["summary"] == "Chairs Acme"
+        assert "Person" in info["labels"]
@@ -0,0 +1,174 @@
+"""
+Tests for knowledge graph utilities.
+"""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+from agent.graph_utils import GraphitiClient, rank_entity_paths
+
+
+def _node(uuid, name):
+    return {"uuid": uuid, "name": name}
+
+
+def _edge(uuid, source, target, name="RELATES_TO", invalid_at=None):
+    return {
+        "uuid": uuid,
+        "name": name,
+        "fact": f"{source} {name} {target}",
+        "source_node_uuid": source,
+        "target_node_uuid": target,
+        "invalid_at": invalid_at
+    }
+
+
+class TestRankEntityPaths:
+    """Test path ranking between entities."""
+
+    def test_shorter_paths_rank_first(self):
+        """Test that paths are ordered by hop count."""
+        two_hop = {
+            "nodes": [_node("a", "Alice"), _node("c", "Acme"), _node("b", "Bob")],
+            "edges": [_edge("e1", "a", "c"), _edge("e2", "c", "b")]
+        }
+        one_hop = {
+            "nodes": [_node("a", "Alice"), _node("b", "Bob")],
+            "edges": [_edge("e3", "a", "b", "KNOWS")]
+        }
+
+        ranked = rank_entity_paths([two_hop, one_hop])
+
+        assert [p["hops"] for p in ranked] == [1, 2]
+        assert ranked[0]["score"] == 1.0
+        assert ranked[1]["score"] == 0.5
+        assert ranked[0]["summary"] == "Alice -[KNOWS]-> Bob"
+
+    def test_deduplicates_and_skips_empty_paths(self):
+        """Test duplicate edge sequences and empty paths are dropped."""
+        path = {
+            "nodes": [_node("a", "Alice"), _node("b", "Bob")],
+            "edges": [_edge("e1", "a", "b")]
+        }
+
+        ranked = rank_entity_paths([path, dict(path), {"nodes": [], "edges": []}])
+
+        assert len(ranked) == 1
+
+    def test_reverse_edge_direction_in_summary(self):
+        """Test edges pointing back along the path render reversed."""
+        path = {
+            "nodes": [_node("a", "Alice"), _node("c", "Acme")],
+            "edges": [_edge("e1", "c", "a", "EMPLOYS")]
+        }
+
+        ranked = rank_entity_paths([path])
+
+        assert ranked[0]["summary"] == "Alice <-[EMPLOYS]- Acme"
+
+    def test_invalidated_facts_score_lower(self):
+        """Test paths through invalidated facts rank below current ones."""
+        current = {
+            "nodes": [_node("a", "Alice"), _node("c", "Acme"), _node("b", "Bob")],
+            "edges": [_edge("e1", "a", "c"), _edge("e2", "c", "b")]
+        }
+        stale = {
+            "nodes": [_node("a", "Alice"), _node("d", "Beta"), _node("b", "Bob")],
+            "edges": [_edge("e3", "a", "d", invalid_at="2024-01-01"), _edge("e4", "d", "b")]
+        }
+
+        ranked = rank_entity_paths([stale, current])
+
+        assert ranked[0]["edges"][0]["uuid"] == "e1"
+        assert ranked[1]["score"] == pytest.approx(0.4)
+
+    def test_exact_endpoint_bonus_is_capped(self):
+        """Test exact name matches boost scores without exceeding 1.0."""
+        path = {
+            "nodes": [_node("a", "Alice"), _node("b", "Bob")],
+            "edges": [_edge("e1", "a", "b")]
+        }
+
+        ranked = rank_entity_paths([path], exact_node_uuids={"a", "b"})
+
+        assert ranked[0]["score"] == 1.0
+
+
+class TestSearchMany:
+    """Test concurrent multi-query graph search."""
+
+    @pytest.fixture
+    def client(self):
+        """Graphiti client with a mocked Graphiti instance."""
+        client = GraphitiClient()
+        client._initialized = True
+        client.graphiti = Mock()
+        client.graphiti.embedder.create_batch = AsyncMock(
+            side_effect=lambda texts: [[float(i)] for i, _ in enumerate(texts)]
+        )
+        client.get_graph_epoch = AsyncMock(return_value={"epoch": 1, "reset_epoch": 0})
+        return client
+
+    @staticmethod
+    def _edge(query):
+        return SimpleNamespace(
+            fact=f"fact for {query}",
+            uuid=f"uuid-{query}",
+            valid_at=None,
+            invalid_at=None,
+            source_node_uuid="node"
+        )
+
+    @pytest.mark.asyncio
+    async def test_single_embedding_call_and_order(self, client):
+        """Test all queries are embedded in one batch and results keep input order."""
+        calls = []
+
+        async def fake_search(clients, query, group_ids, config, search_filter, query_vector=None):
+            calls.append((query, query_vector))
+            return SimpleNamespace(edges=[self._edge(query)])
+
+        with patch("agent.graph_utils.graphiti_search", side_effect=fake_search):
+            results = await client.search_many(["HKJC", "facts about HKJC", "hkjc "])
+
+        client.graphiti.embedder.create_batch.assert_awaited_once_with(["HKJC", "facts about HKJC"])
+        assert [r[0]["fact"] for r in results] == ["fact for HKJC", "fact for facts about HKJC", "fact for HKJC"]
+        # The duplicate (after normalization) query shares one search
+        assert len(calls) == 2
+        assert all(vector is not None for _, vector in calls)
+
+    @pytest.mark.asyncio
+    async def test_cached_queries_are_not_reembedded(self, client):
+        """Test cached queries skip embedding and failures return empty lists."""
+        async def fake_search(clients, query, group_ids, config, search_filter, query_vector=None):
+            if query == "broken":
+                raise RuntimeError("neo4j down")
+            return SimpleNamespace(edges=[self._edge(query)])
+
+        with patch("agent.graph_utils.graphiti_search", side_effect=fake_search):
+            await client.search_many(["HKJC"])
+            client.graphiti.embedder.create_batch.reset_mock()
+            results = await client.search_many(["HKJC", "broken"])
+
+        client.graphiti.embedder.create_batch.assert_awaited_once_with(["broken"])
+        assert results[0][0]["uuid"] == "uuid-HKJC"
+        assert results[1] == []
+
+    @pytest.mark.asyncio
+    async def test_profile_and_limit_pushed_down(self, client):
+        """Test the profile picks the recipe and num_results sets its limit."""
+        configs = []
+
+        async def fake_search(clients, query, group_ids, config, search_filter, query_vector=None):
+            configs.append(config)
+            return SimpleNamespace(edges=[])
+
+        with patch("agent.graph_utils.graphiti_search", side_effect=fake_search):
+            await client.search("HKJC", profile="accurate", num_results=3)
+            await client.search("HKJC", num_results=5)
+
+        assert configs[0].edge_config.reranker.value == "cross_encoder"
+        assert configs[0].limit == 3
+        assert configs[1].edge_config.reranker.value == "reciprocal_rank_fusion"
+        assert configs[1].limit == 5
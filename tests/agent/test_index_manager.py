@@ -0,0 +1,99 @@
+"""
+Tests for vector index management.
+"""
+
+import pytest
+
+from agent.index_manager import (
+    IndexParams,
+    recommend_index_params,
+    parse_index_definition,
+    needs_rebuild
+)
+from agent.db_utils import parse_index_query_params
+
+
+class TestRecommendIndexParams:
+    """Test parameter selection by table size."""
+
+    def test_auto_prefers_hnsw_for_moderate_tables(self):
+        """Test HNSW is chosen below the row threshold."""
+        params = recommend_index_params(50_000)
+
+        assert params.method == "hnsw"
+        assert params.build_params == {"m": 16, "ef_construction": 64}
+        assert params.query_params == {"ef_search": 40}
+
+    def test_large_tables(self):
+        """Test larger HNSW graphs and IVFFlat past the threshold."""
+        assert recommend_index_params(2_000_000).build_params == {"m": 24, "ef_construction": 128}
+        assert recommend_index_params(10_000_000).method == "ivfflat"
+
+    def test_ivfflat_lists_and_probes(self):
+        """Test lists ~ sqrt(rows) and probes ~ sqrt(lists)."""
+        params = recommend_index_params(1_000_000, method="ivfflat")
+
+        assert params.build_params == {"lists": 1000}
+        assert params.query_params == {"probes": 32}
+        assert recommend_index_params(0, method="ivfflat").build_params == {"lists": 1}
+
+    def test_unknown_method(self):
+        """Test unknown methods are rejected."""
+        with pytest.raises(ValueError):
+            recommend_index_params(10, method="diskann")
+
+    def test_create_sql(self):
+        """Test the rendered CREATE INDEX statement."""
+        sql = IndexParams("hnsw", {"m": 16, "ef_construction": 64}).create_sql("idx_new")
+
+        assert sql == (
+            "CREATE INDEX CONCURRENTLY idx_new ON chunks USING hnsw "
+            "(embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+        )
+
+    def test_query_params_round_trip_through_comment(self):
+        """Test the tuned query parameters are stored as a comment searches can parse."""
+        params = recommend_index_params(1_000_000, method="ivfflat")
+
+        sql = params.comment_sql()
+        assert sql == """COMMENT ON INDEX idx_chunks_embedding IS '{"probes": 32}'"""
+        assert parse_index_query_params(sql.split("IS ", 1)[1].strip("'")) == {"probes": 32}
+        assert parse_index_query_params(None) == {}
+        assert parse_index_query_params("built by hand") == {}
+
+
+class TestNeedsRebuild:
+    """Test comparison of the current index against the recommendation."""
+
+    def test_parse_index_definition(self):
+        """Test pg_indexes definitions are parsed."""
+        params = parse_index_definition(
+            "CREATE INDEX idx_chunks_embedding ON public.chunks USING ivfflat "
+            "(embedding vector_cosine_ops) WITH (lists='1')"
+        )
+
+        assert params.method == "ivfflat"
+        assert params.build_params == {"lists": 1}
+        assert parse_index_definition("garbage") is None
+
+    def test_missing_or_different_method(self):
+        """Test a missing index or a method change requires a rebuild."""
+        recommended = recommend_index_params(1000, method="hnsw")
+
+        assert needs_rebuild(None, recommended)
+        assert needs_rebuild(IndexParams("ivfflat", {"lists": 30}), recommended)
+
+    def test_hnsw_defaults_match(self):
+        """Test an HNSW index built without options counts as m=16/ef_construction=64."""
+        recommended = recommend_index_params(1000, method="hnsw")
+
+        assert not needs_rebuild(IndexParams("hnsw", {}), recommended)
+        assert needs_rebuild(IndexParams("hnsw", {"m": 8}), recommended)
+
+    def test_ivfflat_lists_tolerance(self):
+        """Test IVFFlat lists may drift within a factor of two."""
+        recommended = recommend_index_params(10_000, method="ivfflat")  # lists = 100
+
+        assert not needs_rebuild(IndexParams("ivfflat", {"lists": 60}), recommended)
+        assert not needs_rebuild(IndexParams("ivfflat", {"lists": 200}), recommended)
+        assert needs_rebuild(IndexParams("ivfflat", {"lists": 1}), recommended)
@@ -0,0 +1,109 @@
+"""
+Tests for the write-behind message queue.
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from agent.message_queue import MessageWriteQueue
+
+
+def _contents(insert: AsyncMock) -> list:
+    """Message contents of every insert_messages call, one list per call."""
+    return [[row[3] for row in call.args[0]] for call in insert.await_args_list]
+
+
+class TestMessageWriteQueue:
+    """Test batching, durability modes and failure handling."""
+
+    @pytest.mark.asyncio
+    async def test_batches_messages_across_callers(self):
+        """Test messages queued together are written in one insert after the flush interval."""
+        queue = MessageWriteQueue(mode="write_behind", flush_ms=10, batch_size=100)
+        with patch("agent.message_queue.insert_messages", AsyncMock()) as insert:
+            ids = await asyncio.gather(*(queue.add("s1", "user", f"m{i}") for i in range(5)))
+
+            assert len(set(ids)) == 5
+            insert.assert_not_awaited()
+            assert [m["content"] for m in queue.pending_messages("s1")] == [f"m{i}" for i in range(5)]
+
+            await asyncio.sleep(0.05)
+
+            assert _contents(insert) == [[f"m{i}" for i in range(5)]]
+            assert [row[0] for row in insert.await_args.args[0]] == ids
+            assert queue.pending_messages("s1") == []
+            await queue.close()
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_written_immediately(self):
+        """Test reaching the batch size flushes without waiting for the interval."""
+        queue = MessageWriteQueue(mode="write_behind", flush_ms=10_000, batch_size=3)
+        with patch("agent.message_queue.insert_messages", AsyncMock()) as insert:
+            for i in range(3):
+                await queue.add("s1", "user", f"m{i}")
+            await asyncio.sleep(0.01)
+
+            assert _contents(insert) == [["m0", "m1", "m2"]]
+
+            # A partial batch waits for the interval
+            await queue.add("s1", "user", "m3")
+            await asyncio.sleep(0.01)
+            assert len(insert.await_args_list) == 1
+
+            # Closing flushes what is left
+            await queue.close()
+            assert _contents(insert) == [["m0", "m1", "m2"], ["m3"]]
+
+            # After close, messages are written directly
+            await queue.add("s1", "user", "late")
+            assert _contents(insert)[-1] == ["late"]
+
+    @pytest.mark.asyncio
+    async def test_group_commit_waits_for_the_batch(self):
+        """Test group_commit callers return only after their batch is written."""
+        queue = MessageWriteQueue(mode="group_commit", flush_ms=10, batch_size=100)
+        with patch("agent.message_queue.insert_messages", AsyncMock()) as insert:
+            await asyncio.gather(queue.add("s1", "user", "question"), queue.add("s1", "assistant", "answer"))
+
+            assert _contents(insert) == [["question", "answer"]]
+            await queue.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_falls_back_to_single_inserts(self):
+        """Test one bad message is dropped without losing the rest of its batch."""
+        async def insert_messages(rows):
+            if any(row[1] == "deleted-session" for row in rows):
+                raise ValueError("foreign key violation")
+
+        queue = MessageWriteQueue(mode="group_commit", flush_ms=10, batch_size=100)
+        with patch("agent.message_queue.insert_messages", AsyncMock(side_effect=insert_messages)) as insert:
+            results = await asyncio.gather(
+                queue.add("s1", "user", "kept"),
+                queue.add("deleted-session", "user", "dropped"),
+                return_exceptions=True
+            )
+
+            assert isinstance(results[0], str)
+            assert isinstance(results[1], ValueError)
+            assert _contents(insert) == [["kept", "dropped"], ["kept"], ["dropped"]]
+            assert queue.stats()["written"] == 1
+            assert queue.stats()["failed"] == 1
+            await queue.close()
+
+    @pytest.mark.asyncio
+    async def test_direct_mode_and_backpressure(self):
+        """Test direct mode and a full queue both write on the caller's path."""
+        with patch("agent.message_queue.insert_messages", AsyncMock()) as insert:
+            await MessageWriteQueue(mode="direct").add("s1", "user", "now")
+            assert _contents(insert) == [["now"]]
+
+            queue = MessageWriteQueue(mode="write_behind", flush_ms=10_000, max_pending=1)
+            await queue.add("s1", "user", "queued")
+            await queue.add("s1", "user", "overflow")
+
+            assert _contents(insert) == [["now"], ["overflow"]]
+            assert queue.stats()["direct_writes"] == 1
+            await queue.close()
+            assert _contents(insert)[-1] == ["queued"]
@@ -86,6 +86,29 @@ class TestRequestModels:
         
         request = SearchRequest(query="test", limit=50)
         assert request.limit == 50
+    
+    def test_search_request_filters_validation(self):
+        """Test search filters are validated and normalized."""
+        request = SearchRequest(
+            query="test",
+            filters={
+                "source": "annual_report.md",
+                "created_after": "2024-01-01T00:00:00Z",
+                "metadata": {"category": "finance"}
+            }
+        )
+        
+        assert request.filters == {
+            "source": "annual_report.md",
+            "created_after": "2024-01-01T00:00:00Z",
+            "metadata": {"category": "finance"}
+        }
+        
+        with pytest.raises(ValueError):
+            SearchRequest(query="test", filters={"author": "someone"})
+        
+        with pytest.raises(ValueError):
+            SearchRequest(query="test", filters={"created_before": "not a date"})
 
 
 class TestResponseModels:
@@ -0,0 +1,372 @@
+"""
+Query plan tests for the SQL search functions.
+
+These run against a real PostgreSQL database with sql/schema.sql applied and
+are skipped unless TEST_DATABASE_URL is set. Test rows are inserted inside a
+transaction that is always rolled back. The scatter-gather test additionally
+needs TEST_SHARD_DATABASE_URLS: comma-separated databases with the schema
+applied (they can live on the same server).
+"""
+
+import os
+import json
+import uuid
+import random
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import pytest
+import pytest_asyncio
+from unittest.mock import patch
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+TEST_SHARD_DATABASE_URLS = [url for url in os.getenv("TEST_SHARD_DATABASE_URLS", "").split(",") if url]
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL,
+    reason="TEST_DATABASE_URL not set"
+)
+
+EMBEDDING_DIM = 1536
+WORDS = ["racing", "club", "jockey", "chairman", "director", "board", "annual", "report", "horse", "betting"]
+
+
+def _vector(rng: random.Random) -> str:
+    return "[" + ",".join(f"{rng.random():.4f}" for _ in range(EMBEDDING_DIM)) + "]"
+
+
+class _ConnectionPool:
+    """Stands in for DatabasePool, handing out one test connection."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def acquire(self, readonly=False):
+        connection = self.connection
+
+        class _Acquire:
+            async def __aenter__(self):
+                return connection
+
+            async def __aexit__(self, *args):
+                return None
+        return _Acquire()
+
+
+@pytest_asyncio.fixture
+async def conn():
+    """Connection inside a rolled-back transaction seeded with test chunks."""
+    asyncpg = pytest.importorskip("asyncpg")
+    connection = await asyncpg.connect(TEST_DATABASE_URL)
+    transaction = connection.transaction()
+    await transaction.start()
+    try:
+        rng = random.Random(7)
+        doc_id = await connection.fetchval(
+            "INSERT INTO documents (title, source) VALUES ($1, $2) RETURNING id",
+            "Plan test", "plan_test.md"
+        )
+        other_doc_id = await connection.fetchval(
+            "INSERT INTO documents (title, source, metadata) VALUES ($1, $2, $3) RETURNING id",
+            "Filtered report", "filtered_report.md", '{"category": "finance"}'
+        )
+        await connection.executemany(
+            """
+            INSERT INTO chunks (document_id, content, embedding, chunk_index)
+            VALUES ($1::uuid, $2, $3::vector, $4)
+            """,
+            [
+                (doc_id, " ".join(rng.choices(WORDS, k=30)), _vector(rng), i)
+                for i in range(300)
+            ] + [
+                (other_doc_id, " ".join(rng.choices(WORDS, k=30)), _vector(rng), i)
+                for i in range(20)
+            ]
+        )
+        await connection.execute("ANALYZE chunks")
+        await connection.execute("ANALYZE documents")
+        # Small tables favour sequential scans; disable them so the plan shows
+        # whether the query shape allows index access at all.
+        await connection.execute("SET LOCAL enable_seqscan = off")
+        yield connection
+    finally:
+        await transaction.rollback()
+        await connection.close()
+
+
+async def _plan_nodes(conn, sql: str, *args) -> List[Dict[str, Any]]:
+    """Flatten the EXPLAIN plan tree into a list of nodes."""
+    plan = json.loads(await conn.fetchval(f"EXPLAIN (FORMAT JSON) {sql}", *args))[0]["Plan"]
+    nodes, stack = [], [plan]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node.get("Plans", []))
+    return nodes
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("function, extra_args", [
+    ("hybrid_search($1::vector, $2, 10, 0.3)", ()),
+    ("enhanced_hybrid_search($1::vector, $2, 10, 0.3, $3)", (True,)),
+])
+async def test_hybrid_search_uses_indexes(conn, function, extra_args):
+    """Test both candidate sets come from index scans rather than full scans."""
+    query_vector = _vector(random.Random(11))
+
+    nodes = await _plan_nodes(conn, f"SELECT * FROM {function}", query_vector, "jockey club chairman", *extra_args)
+
+    indexes = {node.get("Index Name") for node in nodes}
+    assert "idx_chunks_embedding" in indexes
+    assert "idx_chunks_content_tsv" in indexes
+    assert not [
+        node for node in nodes
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") == "chunks"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_returns_fused_results(conn):
+    """Test results carry the expected columns and are ordered by score."""
+    query_vector = _vector(random.Random(11))
+
+    rows = await conn.fetch(
+        "SELECT * FROM hybrid_search($1::vector, $2, 5, 0.3)",
+        query_vector, "jockey club chairman"
+    )
+
+    assert len(rows) == 5
+    scores = [row["combined_score"] for row in rows]
+    assert scores == sorted(scores, reverse=True)
+    assert {row["document_title"] for row in rows} <= {"Plan test", "Filtered report"}
+    assert all(row["text_similarity"] >= 0 for row in rows)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("function", [
+    "match_chunks($1::vector, 10, $2::jsonb)",
+    "hybrid_search($1::vector, 'jockey club', 10, 0.3, $2::jsonb)",
+])
+@pytest.mark.parametrize("filters", [
+    '{"source": "filtered_report.md"}',
+    '{"metadata": {"category": "finance"}}',
+    '{"title": "FILTERED", "created_after": "2000-01-01T00:00:00Z"}',
+])
+async def test_filters_are_applied_before_ranking(conn, function, filters):
+    """Test filtered searches only return (and still fill up with) matching documents."""
+    query_vector = _vector(random.Random(11))
+    # Steer the planner to post-filter the ANN scan (no sort-based exact plan)
+    # at the default ef_search: that returns too few rows, so the exact
+    # fallback has to fill the results
+    await conn.execute("SET LOCAL enable_sort = off")
+
+    rows = await conn.fetch(f"SELECT * FROM {function}", query_vector, filters)
+
+    assert len(rows) == 10
+    assert {row["document_source"] for row in rows} == {"filtered_report.md"}
+
+
+@pytest.mark.asyncio
+async def test_enhanced_search_uses_precomputed_features(conn):
+    """Test ranking features are stored on insert and used for term density."""
+    doc_id = await conn.fetchval("SELECT id FROM documents WHERE source = 'plan_test.md'")
+    features = await conn.fetchrow(
+        """
+        INSERT INTO chunks (document_id, content, embedding, chunk_index)
+        VALUES ($1, $2, $3::vector, 999)
+        RETURNING id, word_count, content_length_factor, content_terms
+        """,
+        doc_id, "Jockey Club chairman, jockey club.", _vector(random.Random(3))
+    )
+
+    assert features["word_count"] == 5
+    assert features["content_length_factor"] == 1.0
+    assert sorted(features["content_terms"]) == ["chairman", "club", "jockey"]
+
+    rows = await conn.fetch(
+        "SELECT * FROM enhanced_hybrid_search($1::vector, $2, 400, 0.3)",
+        _vector(random.Random(3)), "Jockey chairman board"
+    )
+    row = next(r for r in rows if r["chunk_id"] == features["id"])
+    assert row["query_term_density"] == pytest.approx(2 / 5)
+    assert row["content_length_factor"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_vector_search_many_matches_single_queries(conn):
+    """Test the batched statement returns each query's own top-k."""
+    from agent.db_utils import vector_search_many
+
+    rng = random.Random(5)
+    embeddings = [[rng.random() for _ in range(EMBEDDING_DIM)] for _ in range(3)]
+
+    with patch("agent.db_utils.db_pool", _ConnectionPool(conn)):
+        results = await vector_search_many(embeddings, limit=5)
+
+    assert len(results) == 3
+    for query_index, embedding in enumerate(embeddings):
+        expected = await conn.fetch(
+            "SELECT chunk_id FROM match_chunks($1::vector, 5)",
+            "[" + ",".join(map(str, embedding)) + "]"
+        )
+        assert [r["chunk_id"] for r in results[query_index]] == [r["chunk_id"] for r in expected]
+        assert {r["query_index"] for r in results[query_index]} == {query_index}
+
+
+@pytest.mark.asyncio
+async def test_quantized_search_matches_exact_top_k(conn):
+    """Test two-stage search over the sign bits finds the exact nearest neighbours."""
+    from agent.db_utils import _sign_bits, vector_search
+
+    # Sign quantization needs embeddings centred on zero, like real model output
+    rng = random.Random(21)
+    base = [rng.gauss(0, 1) for _ in range(EMBEDDING_DIM)]
+    near = [[x + rng.gauss(0, 0.3) for x in base] for _ in range(5)]
+    far = [[rng.gauss(0, 1) for _ in range(EMBEDDING_DIM)] for _ in range(200)]
+    doc_id = await conn.fetchval("SELECT id FROM documents WHERE source = 'plan_test.md'")
+    await conn.executemany(
+        "INSERT INTO chunks (document_id, content, embedding, chunk_index) VALUES ($1, $2, $3::vector, $4)",
+        [
+            (doc_id, f"centred {i}", "[" + ",".join(map(str, vector)) + "]", 1000 + i)
+            for i, vector in enumerate(near + far)
+        ]
+    )
+    stored_bits = await conn.fetchval("SELECT embedding_bits FROM chunks WHERE content = 'centred 0'")
+    assert stored_bits == _sign_bits(near[0])
+
+    query = [x + rng.gauss(0, 0.3) for x in base]
+    with patch("agent.db_utils.db_pool", _ConnectionPool(conn)):
+        quantized = await vector_search(query, limit=5, quantized=True)
+    exact = await conn.fetch(
+        """
+        SELECT id, 1 - cosine_distance(embedding, $1::vector) AS similarity
+        FROM chunks ORDER BY cosine_distance(embedding, $1::vector) LIMIT 5
+        """,
+        "[" + ",".join(map(str, query)) + "]"
+    )
+
+    assert [r["chunk_id"] for r in quantized] == [r["id"] for r in exact]
+    assert [r["similarity"] for r in quantized] == pytest.approx([r["similarity"] for r in exact])
+
+
+@pytest.mark.asyncio
+async def test_document_listing_pages_by_keyset(conn):
+    """Test cursor pages walk every document once, in order, off the listing index."""
+    from agent.db_utils import list_documents
+
+    # Equal timestamps make the id tie-break carry the ordering
+    await conn.executemany(
+        "INSERT INTO documents (title, source, created_at, chunk_count) VALUES ($1, $2, $3, $4)",
+        [(f"Keyset {i}", f"keyset_{i}.md", datetime(2024, 1 + i % 2, 1, tzinfo=timezone.utc), i) for i in range(15)]
+    )
+    expected = [
+        row["id"] for row in
+        await conn.fetch("SELECT id::text FROM documents ORDER BY created_at DESC, id DESC")
+    ]
+
+    pages, cursor = [], None
+    with patch("agent.db_utils.db_pool", _ConnectionPool(conn)):
+        while True:
+            page = await list_documents(limit=4, cursor=cursor)
+            pages.append(page)
+            if len(page) < 4:
+                break
+            cursor = page[-1]["cursor"]
+
+    assert [d["id"] for page in pages for d in page] == expected
+    nodes = await _plan_nodes(
+        conn,
+        "SELECT id FROM documents d WHERE (d.created_at, d.id) < ($1, $2::uuid) ORDER BY d.created_at DESC, d.id DESC LIMIT 4",
+        datetime(2024, 1, 15, tzinfo=timezone.utc), uuid.uuid4()
+    )
+    assert "idx_documents_created_at_id" in {node.get("Index Name") for node in nodes}
+    assert not [node for node in nodes if node["Node Type"] == "Sort"]
+
+
+@pytest.mark.asyncio
+async def test_ranged_document_reads(conn):
+    """Test windows come from the body table and chunk ranges from the chunk index."""
+    from agent.db_utils import get_document, get_document_window, get_document_chunk_range
+
+    doc_id = await conn.fetchval("SELECT id::text FROM documents WHERE source = 'plan_test.md'")
+    body = "".join(f"line {i:05d}\n" for i in range(20000))
+    await conn.execute("INSERT INTO document_bodies (document_id, content) VALUES ($1::uuid, $2)", doc_id, body)
+    await conn.execute("UPDATE documents SET content_length = $2 WHERE id = $1::uuid", doc_id, len(body))
+    anchor = await conn.fetchval("SELECT id::text FROM chunks WHERE document_id = $1::uuid AND chunk_index = 150", doc_id)
+
+    with patch("agent.db_utils.db_pool", _ConnectionPool(conn)):
+        document = await get_document(doc_id)
+        window = await get_document_window(doc_id, start=110, length=22)
+        tail = await get_document_window(doc_id, start=len(body) - 5, length=100)
+        around = await get_document_chunk_range(doc_id, chunk_id=anchor, neighbors=2)
+        by_index = await get_document_chunk_range(doc_id, start_index=298, end_index=400)
+        wide = await get_document_chunk_range(doc_id, chunk_id=anchor, neighbors=25)
+
+    assert "content" not in document and document["content_length"] == len(body)
+    assert window["content"] == "line 00010\nline 00011\n"
+    assert tail["content"] == body[-5:] and tail["has_more"] is False
+    assert [c["chunk_index"] for c in around["chunks"]] == [148, 149, 150, 151, 152]
+    assert [c["chunk_index"] for c in by_index["chunks"]] == [298, 299]
+    assert not around["truncated"] and not by_index["truncated"]
+    assert [c["chunk_index"] for c in wide["chunks"]] == list(range(141, 160))
+    assert wide["truncated"] is True
+
+    nodes = await _plan_nodes(
+        conn,
+        "SELECT id FROM chunks WHERE document_id = $1::uuid AND chunk_index BETWEEN $2 AND $3",
+        doc_id, 10, 20
+    )
+    assert "idx_chunks_chunk_index" in {node.get("Index Name") for node in nodes}
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not TEST_SHARD_DATABASE_URLS, reason="TEST_SHARD_DATABASE_URLS not set")
+async def test_sharded_search_matches_single_database():
+    """Test scatter-gather over shards returns what one database holding every row would."""
+    asyncpg = pytest.importorskip("asyncpg")
+    from agent.db_utils import shard_index, vector_search, hybrid_search
+
+    urls = [TEST_DATABASE_URL] + TEST_SHARD_DATABASE_URLS
+    connections = [await asyncpg.connect(url) for url in urls]
+    transactions = [connection.transaction() for connection in connections]
+    for transaction in transactions:
+        await transaction.start()
+    try:
+        combined, shards = connections[0], connections[1:]
+        rng = random.Random(13)
+        for i in range(12):
+            document_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            chunks = [
+                (document_id, " ".join(rng.choices(WORDS, k=30)), _vector(rng), j)
+                for j in range(10)
+            ]
+            owner = shards[shard_index(document_id, len(shards))]
+            for target in (combined, owner):
+                await target.execute(
+                    "INSERT INTO documents (id, title, source) VALUES ($1::uuid, $2, $3)",
+                    document_id, f"Doc {i}", f"doc_{i}.md"
+                )
+                await target.executemany(
+                    "INSERT INTO chunks (document_id, content, embedding, chunk_index) VALUES ($1::uuid, $2, $3::vector, $4)",
+                    chunks
+                )
+
+        query = [random.Random(17).random() for _ in range(EMBEDDING_DIM)]
+        searches = [
+            (lambda: vector_search(query, limit=8), "similarity"),
+            (lambda: hybrid_search(query, "jockey club", limit=8), "combined_score"),
+        ]
+        for search, score_key in searches:
+            with patch("agent.db_utils.get_shard_pools", return_value=[]), \
+                 patch("agent.db_utils.db_pool", _ConnectionPool(combined)):
+                expected = await search()
+            with patch("agent.db_utils.get_shard_pools", return_value=[_ConnectionPool(c) for c in shards]):
+                sharded = await search()
+
+            assert len(sharded) == 8
+            assert [(r["content"], round(r[score_key], 6)) for r in sharded] == \
+                [(r["content"], round(r[score_key], 6)) for r in expected]
+    finally:
+        for transaction, connection in zip(transactions, connections):
+            await transaction.rollback()
+            await connection.close()
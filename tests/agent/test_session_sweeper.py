@@ -0,0 +1,81 @@
+"""
+Tests for the session sweeper.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from agent.session_sweeper import sweep, SWEEP_LOCK_KEY
+
+
+def _pool(conn: MagicMock) -> MagicMock:
+    """A pool whose acquire() yields conn."""
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+    pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+    return pool
+
+
+def _conn(lock: bool = True, deleted=(), partitions_created: int = 0) -> MagicMock:
+    """A connection answering the lock, partition and delete queries in order."""
+    conn = MagicMock()
+    conn.fetchval = AsyncMock(side_effect=[lock, partitions_created, *deleted])
+    conn.fetch = AsyncMock(return_value=[])
+    conn.execute = AsyncMock()
+    return conn
+
+
+class TestSweep:
+    """Test batching, locking and partition retention."""
+
+    @pytest.mark.asyncio
+    async def test_deletes_in_batches_until_a_short_batch(self):
+        """Test the sweep stops once a batch deletes fewer rows than the batch size."""
+        conn = _conn(deleted=[2, 2, 1], partitions_created=1)
+        with patch("agent.session_sweeper.SESSION_SWEEP_BATCH_PAUSE", 0):
+            result = await sweep(_pool(conn), batch_size=2, max_batches=10, retention_months=0)
+
+        assert result["sessions_deleted"] == 5
+        assert result["partitions_created"] == 1
+        # lock + ensure partitions + three delete batches
+        assert conn.fetchval.await_count == 5
+        assert conn.fetchval.await_args.args[1] == 2
+        conn.fetch.assert_not_awaited()
+        conn.execute.assert_awaited_once_with("SELECT pg_advisory_unlock($1)", SWEEP_LOCK_KEY)
+
+    @pytest.mark.asyncio
+    async def test_stops_after_max_batches(self):
+        """Test a large backlog is left for the next sweep after max_batches."""
+        conn = _conn(deleted=[3, 3, 3, 3])
+        with patch("agent.session_sweeper.SESSION_SWEEP_BATCH_PAUSE", 0):
+            result = await sweep(_pool(conn), batch_size=3, max_batches=2, retention_months=0)
+
+        assert result["sessions_deleted"] == 6
+        assert conn.fetchval.await_count == 4
+
+    @pytest.mark.asyncio
+    async def test_skips_when_another_sweeper_holds_the_lock(self):
+        """Test nothing is done, and nothing unlocked, without the advisory lock."""
+        conn = _conn(lock=False)
+        result = await sweep(_pool(conn))
+
+        assert result == {"skipped": True}
+        assert conn.fetchval.await_count == 1
+        conn.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_retires_old_partitions_and_always_unlocks(self):
+        """Test retention retires partitions and a failure still releases the lock."""
+        conn = _conn(deleted=[0])
+        conn.fetch.return_value = [("messages_2024_01",), ("messages_2024_02",)]
+        result = await sweep(_pool(conn), batch_size=10, retention_months=12, archive=True)
+
+        assert result["partitions_retired"] == ["messages_2024_01", "messages_2024_02"]
+        assert result["partitions_archived"] is True
+        assert conn.fetch.await_args.args[1:] == (12, True)
+
+        conn = _conn(deleted=[0])
+        conn.fetch.side_effect = RuntimeError("lock timeout")
+        with pytest.raises(RuntimeError):
+            await sweep(_pool(conn), batch_size=10, retention_months=12)
+        conn.execute.assert_awaited_once_with("SELECT pg_advisory_unlock($1)", SWEEP_LOCK_KEY)
@@ -0,0 +1,60 @@
+"""
+Tests for SimHash near-duplicate detection.
+"""
+
+import random
+
+from agent.simhash import simhash, hamming_distance, SimHashIndex
+
+WORDS = [f"word{i}" for i in range(500)]
+
+
+def _text(seed: int, length: int = 300) -> str:
+    return " ".join(random.Random(seed).choices(WORDS, k=length))
+
+
+class TestSimHash:
+    """Test signature computation."""
+
+    def test_stable_signed_64_bit(self):
+        """Test signatures are deterministic and fit a BIGINT."""
+        text = _text(1)
+
+        assert simhash(text) == simhash(text)
+        assert -2 ** 63 <= simhash(text) < 2 ** 63
+        assert simhash("") == 0
+
+    def test_case_and_punctuation_insensitive(self):
+        """Test formatting differences do not change the signature."""
+        assert simhash("The Jockey Club, annual report.") == simhash("the jockey club annual report")
+
+    def test_near_duplicates_are_close(self):
+        """Test a small edit stays within a few bits while unrelated text does not."""
+        text = _text(1)
+        words = text.split()
+        words[150] = "edited"
+
+        assert hamming_distance(simhash(text), simhash(" ".join(words))) <= 3
+        assert hamming_distance(simhash(text), simhash(_text(2))) > 10
+
+
+class TestSimHashIndex:
+    """Test LSH lookups."""
+
+    def test_find_within_distance(self):
+        """Test signatures within max_distance bits are found in any band."""
+        index = SimHashIndex(max_distance=3)
+        index.add(0, "zero")
+
+        assert index.find(0b111) == "zero"
+        assert index.find((1 << 63) | (1 << 20) | 1) == "zero"
+        assert index.find(0b1111) is None
+        assert len(index) == 1
+
+    def test_negative_signatures(self):
+        """Test signed signatures compare on their 64-bit patterns."""
+        index = SimHashIndex(max_distance=1)
+        index.add(-1, "all ones")
+
+        assert index.find(-2) == "all ones"
+        assert index.find(-4) is None
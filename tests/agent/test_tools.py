@@ -0,0 +1,270 @@
+"""
+Tests for agent tool helpers.
+"""
+
+import asyncio
+
+import pytest
+import numpy as np
+from unittest.mock import AsyncMock, patch
+
+from agent.tools import (
+    EnhancedHybridSearchInput,
+    HybridSearchInput,
+    VectorSearchInput,
+    hybrid_search_tool,
+    retrieval_cache,
+    semantic_cache,
+    enhanced_hybrid_search_tool,
+    vector_search_tool,
+    _apply_semantic_reranking,
+    _deduplicate_results
+)
+from agent.db_utils import PartialResults
+from agent.simhash import simhash
+
+
+@pytest.fixture(autouse=True)
+def empty_retrieval_cache():
+    """Start every test with empty retrieval caches at corpus version 1."""
+    retrieval_cache.invalidate(1)
+    semantic_cache.invalidate(1)
+    with patch("agent.tools.get_corpus_version", AsyncMock(return_value=1)), \
+         patch("agent.tools.CORPUS_VERSION_CHECK_INTERVAL", 0):
+        yield
+
+
+def _result(chunk_id, score, embedding):
+    return {
+        "chunk_id": chunk_id,
+        "document_id": "doc-1",
+        "content": f"content {chunk_id}",
+        "enhanced_score": score,
+        "vector_similarity": 0.5,
+        "text_similarity": 0.2,
+        "metadata": {},
+        "document_title": "Doc",
+        "document_source": "doc.md",
+        "relevance_factors": {},
+        "embedding": None if embedding is None else np.asarray(embedding, dtype=np.float32)
+    }
+
+
+class TestSemanticReranking:
+    """Test reranking against stored chunk embeddings."""
+
+    def test_reranks_by_query_similarity(self):
+        """Test results closer to the query move up."""
+        results = [
+            _result("far", 0.6, [0.0, 1.0]),
+            _result("near", 0.5, [2.0, 0.0])
+        ]
+
+        reranked = _apply_semantic_reranking(results, [1.0, 0.0])
+
+        assert [r["chunk_id"] for r in reranked] == ["near", "far"]
+        assert reranked[0]["semantic_similarity"] == pytest.approx(1.0)
+        assert reranked[0]["enhanced_score"] == pytest.approx(0.5 * 0.7 + 0.3)
+        assert reranked[1]["relevance_factors"]["semantic_reranking"] == pytest.approx(0.0)
+
+    def test_missing_and_zero_embeddings(self):
+        """Test results without usable embeddings do not break reranking."""
+        results = [
+            _result("none", 0.9, None),
+            _result("zero", 0.8, [0.0, 0.0]),
+            _result("match", 0.1, [1.0, 1.0])
+        ]
+
+        reranked = _apply_semantic_reranking(results, [1.0, 1.0])
+
+        assert reranked[0]["enhanced_score"] == 0.9
+        assert "semantic_similarity" not in reranked[0]
+        zero = next(r for r in reranked if r["chunk_id"] == "zero")
+        assert zero["semantic_similarity"] == 0.0
+
+
+class TestDeduplication:
+    """Test SimHash-based result deduplication."""
+
+    def test_drops_near_duplicates_keeping_best(self):
+        """Test later near-duplicates are dropped and stored signatures are used."""
+        boilerplate = "The Hong Kong Jockey Club is a not-for-profit organisation " * 5
+        results = [
+            dict(_result("first", 0.9, None), content=boilerplate, simhash=simhash(boilerplate)),
+            dict(_result("other", 0.8, None), content="Board of stewards meeting minutes", simhash=None),
+            dict(_result("copy", 0.7, None), content=boilerplate.upper(), simhash=None),
+            dict(_result("stored", 0.6, None), content="unrelated", simhash=simhash(boilerplate))
+        ]
+
+        deduplicated = _deduplicate_results(results)
+
+        assert [r["chunk_id"] for r in deduplicated] == ["first", "other"]
+        assert deduplicated[0]["relevance_factors"]["deduplication"] == "unique"
+
+
+class TestEnhancedHybridSearchTool:
+    """Test the enhanced hybrid search tool end to end with mocked storage."""
+
+    @pytest.mark.asyncio
+    async def test_reranking_uses_stored_embeddings(self):
+        """Test reranking needs no embedding calls beyond the query."""
+        search = AsyncMock(return_value=[
+            _result("a", 0.4, [0.0, 1.0]),
+            _result("b", 0.3, [1.0, 0.0])
+        ])
+
+        with patch("agent.tools.generate_embedding", AsyncMock(return_value=[1.0, 0.0])) as embed, \
+             patch("agent.tools.enhanced_hybrid_search", search):
+            results = await enhanced_hybrid_search_tool(EnhancedHybridSearchInput(
+                query="board members",
+                enable_query_expansion=False,
+                enable_deduplication=False
+            ))
+
+        embed.assert_awaited_once_with("board members")
+        assert search.call_args.kwargs["include_embeddings"] is True
+        assert [r.chunk_id for r in results] == ["b", "a"]
+        assert results[0].vector_similarity == 0.5
+        assert results[0].relevance_factors["semantic_reranking"] == pytest.approx(1.0)
+
+
+class TestVectorSearchTool:
+    """Test multi-query vector search."""
+
+    @pytest.mark.asyncio
+    async def test_alternative_queries_share_one_round_trip(self):
+        """Test phrasings are embedded together, searched together and merged."""
+        def hit(chunk_id, similarity):
+            return dict(_result(chunk_id, 0, None), similarity=similarity)
+
+        embed = AsyncMock(return_value=[[1.0], [2.0]])
+        search_many = AsyncMock(return_value=[
+            [hit("a", 0.9), hit("b", 0.5)],
+            [hit("b", 0.8), hit("c", 0.4)]
+        ])
+
+        with patch("agent.tools.generate_embeddings", embed), \
+             patch("agent.tools.vector_search_many", search_many):
+            results = await vector_search_tool(VectorSearchInput(
+                query="HKJC chairman",
+                alternative_queries=["Hong Kong Jockey Club chairman", "HKJC chairman"],
+                limit=2
+            ))
+
+        embed.assert_awaited_once_with(["HKJC chairman", "Hong Kong Jockey Club chairman"])
+        assert search_many.call_args.args[0] == [[1.0], [2.0]]
+        assert [(r.chunk_id, r.score) for r in results] == [("a", 0.9), ("b", 0.8)]
+
+
+class TestRetrievalCache:
+    """Test caching of vector and hybrid search results."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_search_skips_embedding_and_sql(self):
+        """Test equivalent searches share a cached result while parameters still matter."""
+        embed = AsyncMock(return_value=[1.0, 0.0])
+        search = AsyncMock(return_value=[dict(_result("a", 0, None), combined_score=0.7)])
+
+        with patch("agent.tools.generate_embedding", embed), \
+             patch("agent.tools.hybrid_search", search):
+            first = await hybrid_search_tool(HybridSearchInput(query="HKJC  Chairman"))
+            second = await hybrid_search_tool(HybridSearchInput(query="hkjc chairman"))
+            await hybrid_search_tool(HybridSearchInput(query="hkjc chairman", text_weight=0.5))
+            await hybrid_search_tool(HybridSearchInput(query="hkjc chairman", filters={"source": "a.md"}))
+
+        assert [r.chunk_id for r in second] == [r.chunk_id for r in first] == ["a"]
+        assert embed.await_count == 3
+        assert search.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_corpus_version_change_invalidates(self):
+        """Test a new corpus version forces a fresh search."""
+        search = AsyncMock(return_value=[dict(_result("a", 0, None), similarity=0.9)])
+
+        with patch("agent.tools.generate_embedding", AsyncMock(return_value=[1.0])), \
+             patch("agent.tools.vector_search", search):
+            await vector_search_tool(VectorSearchInput(query="stewards"))
+            await vector_search_tool(VectorSearchInput(query="stewards"))
+            with patch("agent.tools.get_corpus_version", AsyncMock(return_value=2)):
+                await vector_search_tool(VectorSearchInput(query="stewards"))
+
+        assert search.await_count == 2
+        assert retrieval_cache.version == 2
+
+    @pytest.mark.asyncio
+    async def test_failures_are_not_cached(self):
+        """Test a failed search returns [] and is retried next time."""
+        search = AsyncMock(side_effect=[RuntimeError("db down"), [dict(_result("a", 0, None), similarity=0.9)]])
+
+        with patch("agent.tools.generate_embedding", AsyncMock(return_value=[1.0])), \
+             patch("agent.tools.vector_search", search):
+            assert await vector_search_tool(VectorSearchInput(query="stewards")) == []
+            assert len(await vector_search_tool(VectorSearchInput(query="stewards"))) == 1
+
+
+    @pytest.mark.asyncio
+    async def test_background_refresh_bypasses_semantic_cache(self):
+        """Test a stale entry is refreshed from SQL, and the semantic cache gets the fresh rows too."""
+        search = AsyncMock(side_effect=[
+            [dict(_result("old", 0, None), similarity=0.9)],
+            [dict(_result("new", 0, None), similarity=0.9)]
+        ])
+
+        with patch("agent.tools.generate_embedding", AsyncMock(return_value=[1.0, 0.0])), \
+             patch("agent.tools.vector_search", search), \
+             patch.object(retrieval_cache, "refresh_after", 0):
+            await vector_search_tool(VectorSearchInput(query="stewards"))
+            stale = await vector_search_tool(VectorSearchInput(query="stewards"))
+            for _ in range(5):
+                await asyncio.sleep(0)
+
+        assert [r.chunk_id for r in stale] == ["old"]
+        assert search.await_count == 2
+        found, cached = semantic_cache.lookup(("vector", 10, None, None, "{}"), [1.0, 0.0])
+        assert found and [r.chunk_id for r in cached] == ["new"]
+        assert len(semantic_cache) == 1
+
+
+    @pytest.mark.asyncio
+    async def test_partial_results_are_not_cached(self):
+        """Test results missing a failed shard are served but kept out of both caches."""
+        search = AsyncMock(side_effect=[
+            PartialResults([dict(_result("a", 0, None), similarity=0.9)]),
+            [dict(_result("a", 0, None), similarity=0.9), dict(_result("b", 0, None), similarity=0.8)]
+        ])
+
+        with patch("agent.tools.generate_embedding", AsyncMock(return_value=[1.0, 0.0])), \
+             patch("agent.tools.vector_search", search):
+            partial = await vector_search_tool(VectorSearchInput(query="stewards"))
+            full = await vector_search_tool(VectorSearchInput(query="stewards"))
+
+        assert [r.chunk_id for r in partial] == ["a"]
+        assert [r.chunk_id for r in full] == ["a", "b"]
+        assert search.await_count == 2
+        assert len(semantic_cache) == 1
+
+
+class TestSemanticQueryCache:
+    """Test reuse of results across near-identical queries."""
+
+    @pytest.mark.asyncio
+    async def test_rephrased_query_reuses_results(self):
+        """Test a similar embedding skips the SQL search, a dissimilar one does not."""
+        embeddings = {
+            "who chairs the hkjc": [1.0, 0.0],
+            "who is the hkjc chairman": [0.99, 0.05],
+            "racing fixtures": [0.0, 1.0]
+        }
+        search = AsyncMock(return_value=[dict(_result("a", 0, None), similarity=0.9)])
+        hits = semantic_cache.stats()["hits"]
+
+        with patch("agent.tools.generate_embedding", AsyncMock(side_effect=embeddings.get)), \
+             patch("agent.tools.vector_search", search):
+            first = await vector_search_tool(VectorSearchInput(query="who chairs the hkjc"))
+            second = await vector_search_tool(VectorSearchInput(query="who is the hkjc chairman"))
+            await vector_search_tool(VectorSearchInput(query="racing fixtures"))
+            await vector_search_tool(VectorSearchInput(query="who is the hkjc chairman", limit=5))
+
+        assert [r.chunk_id for r in second] == [r.chunk_id for r in first]
+        assert search.await_count == 3
+        assert semantic_cache.stats()["hits"] - hits == 1
@@ -0,0 +1,90 @@
+"""
+Tests for the ingestion pipeline.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+from ingestion.chunker import DocumentChunk
+from ingestion.ingest import DocumentIngestionPipeline
+from agent.models import IngestionConfig
+from agent.simhash import SimHashIndex, simhash
+
+BOILERPLATE = "This announcement is issued by the Hong Kong Jockey Club for information only. " * 5
+
+
+def _pipeline(**config) -> DocumentIngestionPipeline:
+    with patch("ingestion.ingest.create_embedder", Mock()), \
+         patch("ingestion.ingest.create_graph_builder", Mock()):
+        return DocumentIngestionPipeline(IngestionConfig(**config))
+
+
+def _chunk(index: int, content: str) -> DocumentChunk:
+    return DocumentChunk(content=content, index=index, start_char=0, end_char=len(content), metadata={})
+
+
+class TestNearDuplicates:
+    """Test near-duplicate chunks are flagged before LLM extraction."""
+
+    def test_flags_duplicates_within_and_across_documents(self):
+        """Test repeats of stored or earlier chunks are flagged but still signed."""
+        pipeline = _pipeline()
+        pipeline.simhash_index = SimHashIndex()
+        pipeline.simhash_index.add(simhash(BOILERPLATE), "earlier.md#3")
+        chunks = [
+            _chunk(0, "Race meeting results for Sha Tin"),
+            _chunk(1, BOILERPLATE.lower()),
+            _chunk(2, "Race meeting results for Sha Tin!")
+        ]
+
+        unique = pipeline._flag_near_duplicates(chunks, "new.md")
+
+        assert [chunk.index for chunk in unique] == [0]
+        assert chunks[1].metadata["near_duplicate_of"] == "earlier.md#3"
+        assert chunks[2].metadata["near_duplicate_of"] == "new.md#0"
+        assert all(chunk.simhash is not None for chunk in chunks)
+
+    def test_disabled(self):
+        """Test all chunks are kept when near-duplicate skipping is off."""
+        pipeline = _pipeline(skip_near_duplicates=False)
+        chunks = [_chunk(0, BOILERPLATE), _chunk(1, BOILERPLATE)]
+
+        unique = pipeline._flag_near_duplicates(chunks, "new.md")
+
+        assert unique == chunks
+        assert chunks[1].simhash == chunks[0].simhash
+        assert "near_duplicate_of" not in chunks[1].metadata
+
+    def test_reingest_is_not_a_duplicate_of_its_stored_copy(self):
+        """Test stored chunks of the same source never count, and flagging alone does not index chunks."""
+        pipeline = _pipeline()
+        pipeline.simhash_index = SimHashIndex()
+        pipeline.simhash_index.add(simhash(BOILERPLATE), "new.md#1")
+
+        assert len(pipeline._flag_near_duplicates([_chunk(0, BOILERPLATE)], "new.md")) == 1
+
+        # Until its extraction is recorded, another document repeating it is extracted too
+        pipeline.simhash_index = SimHashIndex()
+        pipeline._flag_near_duplicates([_chunk(0, BOILERPLATE)], "new.md")
+        assert len(pipeline.simhash_index) == 0
+        assert len(pipeline._flag_near_duplicates([_chunk(0, BOILERPLATE)], "other.md")) == 1
+
+    @pytest.mark.asyncio
+    async def test_extracted_chunks_join_the_index(self):
+        """Test chunks are flagged in the database and indexed once extraction succeeded."""
+        pipeline = _pipeline()
+        pipeline.simhash_index = SimHashIndex()
+        chunks = [_chunk(0, BOILERPLATE)]
+        pipeline._flag_near_duplicates(chunks, "new.md")
+
+        conn = AsyncMock()
+        pool = Mock()
+        pool.acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+        pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+        with patch("ingestion.ingest.get_document_pool", return_value=pool):
+            await pipeline._mark_graph_extracted("doc-1", "new.md", chunks)
+
+        assert conn.execute.await_args.args[1:] == ("doc-1", [0])
+        other = [_chunk(0, BOILERPLATE)]
+        assert pipeline._flag_near_duplicates(other, "other.md") == []
+        assert other[0].metadata["near_duplicate_of"] == "new.md#0"